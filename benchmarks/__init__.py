@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+أدوات قياس أداء المزامنة: خادم Odoo وهمي (JSON-RPC) ومولدات بيانات وسكربت قياس شامل.
+"""
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+مولدات بيانات قياس الأداء
+datasets.py
+
+الغرض:
+- إنشاء قاعدة بيانات مصدر وهمية بحجم محدد تشبه بنية Odoo Community الفعلية:
+  شركات، جهات اتصال، شجرة حسابات، دفاتر يومية، ضرائب، فواتير وقيود يومية مع بنودها.
+- إنشاء قاعدة بيانات وجهة شبه فارغة تحتوي فقط على البيانات المرجعية التي
+  تفترض وحدات المزامنة وجودها مسبقًا (الدول وعلامات الضرائب).
+
+حجم مجموعة البيانات `size` هو عدد جهات الاتصال؛ ويُشتق منه عدد الحركات
+(`size // 10` فاتورة و `size // 10` قيد يومية، لكل منها بندان).
+"""
+
+import random
+
+from benchmarks.fake_odoo import FakeOdooDatabase
+
+WRITE_DATE = '2025-01-01 00:00:00'
+COUNTRIES = [('Saudi Arabia', 'SA'), ('United Arab Emirates', 'AE'), ('Egypt', 'EG')]
+ACCOUNT_TYPES = ['asset_receivable', 'liability_payable', 'income', 'expense', 'asset_current']
+
+
+def _reference_data(database):
+    for name, code in COUNTRIES:
+        database.insert('res.country', {'name': name, 'code': code})
+    database.insert('res.currency', {'name': 'SAR'})
+    database.insert('account.account.tag', {'name': '+10', 'applicability': 'taxes', 'country_id': 1})
+    database.insert('account.account.tag', {'name': '-10', 'applicability': 'taxes', 'country_id': 1})
+    for model in ('res.partner', 'res.company', 'account.account', 'account.journal',
+                  'account.tax', 'account.move', 'account.move.line'):
+        database.insert('ir.model', {'model': model, 'name': model})
+
+
+def generate_source(size, companies=1, accounts=50, seed=0):
+    """
+    إنشاء قاعدة بيانات المصدر.
+
+    Args:
+        size (int): عدد جهات الاتصال (ويُشتق منه عدد الفواتير والقيود).
+        companies (int): عدد الشركات.
+        accounts (int): عدد الحسابات لكل شركة.
+        seed (int): بذرة المولد العشوائي لضمان تكرار نفس البيانات.
+
+    Returns:
+        FakeOdooDatabase: قاعدة بيانات المصدر.
+    """
+    rng = random.Random(seed)
+    database = FakeOdooDatabase('source')
+    _reference_data(database)
+
+    moves_per_type = max(1, size // 10)
+    sale_journals, misc_journals = {}, {}
+    company_accounts = {}
+    taxes = {}
+    for company in range(1, companies + 1):
+        company_id = database.insert('res.company', {
+            'name': f'Company {company}', 'currency_id': 1, 'email': f'info@company{company}.test',
+        })
+        company_accounts[company_id] = [
+            database.insert('account.account', {
+                'name': f'Account {company}-{index}', 'code': f'{100000 + index}',
+                'account_type': ACCOUNT_TYPES[index % len(ACCOUNT_TYPES)],
+                'reconcile': index % len(ACCOUNT_TYPES) < 2, 'company_ids': [company_id],
+            })
+            for index in range(1, accounts + 1)
+        ]
+        sale_journals[company_id] = database.insert('account.journal', {
+            'name': f'Sales {company}', 'code': f'INV{company}', 'type': 'sale',
+            'company_id': company_id, 'default_account_id': company_accounts[company_id][2],
+        })
+        misc_journals[company_id] = database.insert('account.journal', {
+            'name': f'Miscellaneous {company}', 'code': f'MISC{company}', 'type': 'general',
+            'company_id': company_id, 'default_account_id': company_accounts[company_id][4],
+        })
+        taxes[company_id] = [
+            database.insert('account.tax', {
+                'name': f'VAT {amount}% ({company})', 'amount': amount, 'type_tax_use': use,
+                'company_id': company_id, 'active': True,
+            })
+            for amount, use in ((15, 'sale'), (15, 'purchase'), (5, 'sale'))
+        ]
+
+    partner_ids = [
+        database.insert('res.partner', {
+            'name': f'Partner {index}', 'display_name': f'Partner {index}',
+            'company_type': 'company' if index % 5 == 0 else 'person',
+            'street': f'{index} Main Street', 'city': 'Riyadh', 'zip': f'{10000 + index % 90000}',
+            'country_id': rng.randint(1, len(COUNTRIES)), 'phone': f'+966 5{index:08d}',
+            'email': f'partner{index}@example.test', 'active': True,
+        })
+        for index in range(1, size + 1)
+    ]
+
+    for index in range(1, 2 * moves_per_type + 1):
+        company_id = rng.randint(1, companies)
+        is_invoice = index % 2 == 1
+        partner_id = rng.choice(partner_ids)
+        move_id = database.insert('account.move', {
+            'name': f'{"INV" if is_invoice else "MISC"}/2025/{index:06d}',
+            'move_type': 'out_invoice' if is_invoice else 'entry',
+            'journal_id': (sale_journals if is_invoice else misc_journals)[company_id],
+            'company_id': company_id, 'partner_id': partner_id if is_invoice else False,
+            'state': 'posted', 'payment_state': 'not_paid' if is_invoice else False,
+            'date': '2025-01-01', 'invoice_date': '2025-01-01' if is_invoice else False,
+            'invoice_date_due': '2025-01-31' if is_invoice else False, 'ref': f'REF{index}',
+        })
+        amount = float(rng.randint(10, 10000))
+        for debit, credit in ((amount, 0.0), (0.0, amount)):
+            database.insert('account.move.line', {
+                'move_id': move_id, 'name': f'Line of move {index}', 'quantity': 1.0, 'price_unit': amount,
+                'debit': debit, 'credit': credit, 'account_id': rng.choice(company_accounts[company_id]),
+                'partner_id': partner_id, 'product_id': False, 'tax_ids': [taxes[company_id][0]],
+                'tax_tag_ids': [1], 'tax_line_id': False, 'tax_repartition_line_id': False,
+            })
+
+    for table in database.tables.values():
+        for record in table.values():
+            record['write_date'] = WRITE_DATE
+    return database
+
+
+def generate_destination():
+    """
+    إنشاء قاعدة بيانات الوجهة (البيانات المرجعية فقط).
+
+    Returns:
+        FakeOdooDatabase: قاعدة بيانات الوجهة.
+    """
+    database = FakeOdooDatabase('destination')
+    _reference_data(database)
+    return database
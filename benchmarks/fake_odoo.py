@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+خادم Odoo وهمي (JSON-RPC) لقياس الأداء
+fake_odoo.py
+
+الغرض:
+- محاكاة واجهة JSON-RPC الخاصة بـ Odoo (`/jsonrpc` بخدماتها `common` و `db` و `object`)
+  على localhost، مع جداول في الذاكرة بدلاً من قاعدة بيانات فعلية.
+- دعم الدوال التي تستخدمها وحدات المزامنة فقط: search, search_read, search_count,
+  read, create, write, unlink, action_post, button_draft, fields_get.
+- دعم زمن استجابة قابل للضبط (latency) لكل طلب لمحاكاة Odoo Online عبر الشبكة.
+
+هذا الخادم ليس تطبيقًا كاملًا لـ ORM الخاص بـ Odoo: لا توجد حقول محسوبة أو قيود
+أو قيود محاسبية متوازنة، والهدف هو قياس عدد الاستدعاءات وزمن المزامنة وذاكرتها فقط.
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVER_VERSION = '17.0'
+UID = 2
+
+# حقول many2one المعروفة والنموذج المرتبط بكل منها (تُقرأ بصيغة [id, name]).
+MANY2ONE = {
+    'partner_id': 'res.partner',
+    'company_id': 'res.company',
+    'country_id': 'res.country',
+    'currency_id': 'res.currency',
+    'journal_id': 'account.journal',
+    'account_id': 'account.account',
+    'default_account_id': 'account.account',
+    'move_id': 'account.move',
+    'product_id': 'product.product',
+    'tax_line_id': 'account.tax',
+    'tax_repartition_line_id': 'account.tax.repartition.line',
+    'model_id': 'ir.model',
+}
+
+# حقول many2many (قائمة معرفات).
+MANY2MANY = {
+    'company_ids': 'res.company',
+    'tax_ids': 'account.tax',
+    'tax_tag_ids': 'account.account.tag',
+}
+
+# حقول one2many: (النموذج الفرعي، حقل الربط العكسي).
+ONE2MANY = {
+    ('account.move', 'line_ids'): ('account.move.line', 'move_id'),
+    ('account.move', 'invoice_line_ids'): ('account.move.line', 'move_id'),
+}
+
+
+class FakeOdooError(Exception):
+    """
+    خطأ يتم إرجاعه للعميل كاستجابة JSON-RPC تحتوي على `error`.
+    """
+
+
+class FakeOdooDatabase:
+    """
+    قاعدة بيانات Odoo وهمية في الذاكرة: {النموذج: {المعرف: قاموس القيم}}.
+    جميع العمليات محمية بقفل واحد لأن الخادم يعالج الطلبات في عدة خيوط.
+    """
+    def __init__(self, name='fake'):
+        self.name = name
+        self.tables = {}
+        self._sequences = {}
+        self._lock = threading.RLock()
+        # قاعدة اختيارية لرفض إنشاء سجلات معينة: دالة (النموذج، القيم) -> bool.
+        self.fail_create = None
+
+    def table(self, model):
+        return self.tables.setdefault(model, {})
+
+    def next_id(self, model):
+        sequence = self._sequences.get(model)
+        if sequence is None:
+            sequence = self._sequences[model] = itertools.count(max(self.table(model), default=0) + 1)
+        return next(sequence)
+
+    def insert(self, model, values):
+        """
+        إدراج سجل مباشرة (لمولدات البيانات) دون تحويل أوامر x2many.
+        """
+        with self._lock:
+            record_id = values.pop('id', None) or self.next_id(model)
+            values.setdefault('write_date', _now())
+            self.table(model)[record_id] = values
+            return record_id
+
+    # --- تقييم النطاقات (domains) ---
+    def _value(self, model, record, path):
+        field, _, rest = path.partition('.')
+        value = record.get(field, False) if field != 'id' else record['id']
+        if not rest:
+            return value
+        related_model = MANY2ONE.get(field)
+        if not value or related_model is None:
+            return False
+        related = self.table(related_model).get(value)
+        if related is None:
+            return False
+        return self._value(related_model, dict(related, id=value), rest)
+
+    def _term(self, model, record, term):
+        field, operator, expected = term
+        value = self._value(model, record, field)
+        if isinstance(value, list) and operator in ('=', 'in'):
+            expected = expected if isinstance(expected, (list, tuple)) else [expected]
+            return bool(set(value) & set(expected))
+        if operator == '=':
+            return value == expected or (expected is False and not value)
+        if operator == '!=':
+            return not (value == expected or (expected is False and not value))
+        if operator == 'in':
+            return value in expected
+        if operator == 'not in':
+            return value not in expected
+        if operator == 'ilike':
+            return bool(value) and str(expected).lower() in str(value).lower()
+        if value is False or value is None:
+            return False
+        if operator == '>':
+            return value > expected
+        if operator == '>=':
+            return value >= expected
+        if operator == '<':
+            return value < expected
+        if operator == '<=':
+            return value <= expected
+        raise FakeOdooError(f"Unsupported operator: {operator}")
+
+    def _match(self, model, record, domain):
+        # تقييم الترميز البولندي المستخدم في Odoo مع '&' ضمني بين الشروط.
+        stack = []
+        for term in reversed(domain):
+            if term == '|':
+                stack.append(stack.pop() | stack.pop())
+            elif term == '&':
+                stack.append(stack.pop() & stack.pop())
+            elif term == '!':
+                stack.append(not stack.pop())
+            else:
+                stack.append(self._term(model, record, term))
+        return all(stack)
+
+    def _search(self, model, domain, offset=0, limit=None, order=None, context=None):
+        domain = [tuple(term) if isinstance(term, list) else term for term in (domain or [])]
+        active_test = (context or {}).get('active_test', True) and not any(
+            isinstance(term, tuple) and term[0] == 'active' for term in domain)
+        ids = [
+            record_id for record_id, record in self.table(model).items()
+            if (not active_test or record.get('active', True))
+            and self._match(model, dict(record, id=record_id), domain)
+        ]
+        ids = self._order(model, ids, order)
+        ids = ids[offset or 0:]
+        return ids[:limit] if limit else ids
+
+    def _order(self, model, ids, order):
+        if not order:
+            return sorted(ids)
+        table = self.table(model)
+        for part in reversed([p.strip() for p in order.split(',') if p.strip()]):
+            field, _, direction = part.partition(' ')
+            reverse = direction.strip().lower() == 'desc'
+            ids = sorted(ids, key=lambda i: i if field == 'id' else (table[i].get(field) or ''), reverse=reverse)
+        return ids
+
+    # --- قراءة السجلات ---
+    def _display_name(self, model, record_id):
+        record = self.table(model).get(record_id) or {}
+        return record.get('display_name') or record.get('name') or f"{model},{record_id}"
+
+    def _read_value(self, model, record_id, record, field):
+        if field == 'id':
+            return record_id
+        if field == 'display_name':
+            return self._display_name(model, record_id)
+        child = ONE2MANY.get((model, field))
+        if child:
+            child_model, inverse = child
+            return sorted(i for i, r in self.table(child_model).items() if r.get(inverse) == record_id)
+        value = record.get(field, False)
+        if field in MANY2ONE and value:
+            return [value, self._display_name(MANY2ONE[field], value)]
+        return value
+
+    def _read(self, model, ids, fields=None):
+        table = self.table(model)
+        rows = []
+        for record_id in ids:
+            record = table.get(record_id)
+            if record is None:
+                continue
+            names = fields or ['id'] + list(record)
+            row = {name: self._read_value(model, record_id, record, name) for name in names}
+            row['id'] = record_id
+            rows.append(row)
+        return rows
+
+    # --- الكتابة ---
+    def _apply(self, model, record_id, values):
+        record = self.table(model)[record_id]
+        for field, value in values.items():
+            child = ONE2MANY.get((model, field))
+            if child:
+                self._apply_one2many(child, record_id, value)
+                continue
+            if isinstance(value, list) and value and isinstance(value[0], (list, tuple)):
+                ids = list(record.get(field) or [])
+                for command in value:
+                    if command[0] == 6:
+                        ids = list(command[2])
+                    elif command[0] == 5:
+                        ids = []
+                    elif command[0] == 4:
+                        ids.append(command[1])
+                    elif command[0] == 3:
+                        ids = [i for i in ids if i != command[1]]
+                value = ids
+            record[field] = value
+        record['write_date'] = _now()
+
+    def _apply_one2many(self, child, parent_id, commands):
+        child_model, inverse = child
+        children = self.table(child_model)
+        for command in commands:
+            if command[0] == 0:
+                line_id = self.next_id(child_model)
+                children[line_id] = {inverse: parent_id, 'write_date': _now()}
+                self._apply(child_model, line_id, dict(command[2]))
+            elif command[0] == 1:
+                self._apply(child_model, command[1], dict(command[2]))
+            elif command[0] in (2, 3):
+                children.pop(command[1], None)
+            elif command[0] == 5:
+                for line_id in [i for i, r in children.items() if r.get(inverse) == parent_id]:
+                    del children[line_id]
+
+    # --- واجهة ORM ---
+    def execute(self, model, method, args, kwargs):
+        """
+        تنفيذ دالة ORM على نموذج (ما يقابل `execute_kw` في Odoo).
+        """
+        kwargs = dict(kwargs or {})
+        context = kwargs.pop('context', None)
+        with self._lock:
+            if method == 'search':
+                domain = args[0] if args else kwargs.pop('args', kwargs.pop('domain', []))
+                if kwargs.pop('count', False):
+                    return len(self._search(model, domain, context=context))
+                return self._search(model, domain, context=context, **kwargs)
+            if method == 'search_count':
+                domain = args[0] if args else kwargs.get('domain', [])
+                return len(self._search(model, domain, context=context))
+            if method == 'search_read':
+                domain = args[0] if args else kwargs.pop('domain', [])
+                fields = args[1] if len(args) > 1 else kwargs.pop('fields', None)
+                ids = self._search(model, domain, context=context, **kwargs)
+                return self._read(model, ids, fields)
+            if method == 'read':
+                ids = args[0]
+                fields = args[1] if len(args) > 1 else kwargs.get('fields')
+                single = isinstance(ids, int)
+                return self._read(model, [ids] if single else ids, fields)
+            if method == 'create':
+                vals = args[0]
+                many = isinstance(vals, list)
+                new_ids = [self._create(model, v) for v in (vals if many else [vals])]
+                return new_ids if many else new_ids[0]
+            if method == 'write':
+                ids, vals = args[0], args[1]
+                for record_id in ([ids] if isinstance(ids, int) else ids):
+                    if record_id not in self.table(model):
+                        raise FakeOdooError(f"Record {model}({record_id}) does not exist")
+                    self._apply(model, record_id, vals)
+                return True
+            if method == 'unlink':
+                for record_id in args[0]:
+                    self.table(model).pop(record_id, None)
+                return True
+            if method in ('action_post', 'button_draft'):
+                state = 'posted' if method == 'action_post' else 'draft'
+                for record_id in args[0]:
+                    self.table(model)[record_id]['state'] = state
+                return True
+            if method == 'fields_get':
+                return {}
+            raise FakeOdooError(f"Method {model}.{method} is not supported by fake server")
+
+    def _create(self, model, vals):
+        # إنشاء ذري لكل استدعاء: فشل أي سجل يلغي الاستدعاء كاملًا كما في Odoo.
+        if self.fail_create and self.fail_create(model, vals):
+            raise FakeOdooError(f"Validation error while creating {model}")
+        record_id = self.next_id(model)
+        self.table(model)[record_id] = {}
+        self._apply(model, record_id, dict(vals))
+        return record_id
+
+
+def _now():
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # إرسال الترويسة والمحتوى دون انتظار خوارزمية Nagle (تأخير ~40ms لكل طلب).
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        request = json.loads(body or b'{}')
+        if server.latency:
+            time.sleep(server.latency)
+        server.requests += 1
+        try:
+            response = {'jsonrpc': '2.0', 'id': request.get('id'), 'result': server.dispatch(request.get('params') or {})}
+        except Exception as e:
+            response = {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {
+                'code': 200, 'message': 'Odoo Server Error',
+                'data': {'name': type(e).__name__, 'message': str(e), 'debug': ''},
+            }}
+        data = json.dumps(response, default=str).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeOdooServer(ThreadingHTTPServer):
+    """
+    خادم JSON-RPC وهمي يخدم قاعدة بيانات `FakeOdooDatabase` واحدة.
+
+    مثال:
+        server = FakeOdooServer(database, latency=0.05).start()
+        client = odoorpc.Client('127.0.0.1', database.name, 'admin', 'admin',
+                                protocol='json-rpc', port=server.port)
+        ...
+        server.stop()
+    """
+    daemon_threads = True
+    # طابور اتصالات أكبر من الافتراضي (5) حتى لا تُرفض الاتصالات عند إرسال مئات الطلبات المتزامنة.
+    request_queue_size = 256
+
+    def __init__(self, database, host='127.0.0.1', port=0, latency=0.0, username='admin', password='admin'):
+        """
+        Args:
+            database (FakeOdooDatabase): قاعدة البيانات التي يخدمها الخادم.
+            host (str): عنوان الاستماع.
+            port (int): المنفذ (0 لاختيار منفذ متاح تلقائيًا).
+            latency (float): زمن انتظار إضافي لكل طلب بالثواني.
+            username (str): اسم المستخدم المقبول في تسجيل الدخول.
+            password (str): كلمة المرور المقبولة في تسجيل الدخول.
+        """
+        super().__init__((host, port), _Handler)
+        self.database = database
+        self.latency = float(latency)
+        self.credentials = (username, password)
+        self.requests = 0
+        # عدد اتصالات TCP المقبولة (لقياس إعادة استخدام الاتصالات).
+        self.connections = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.port}"
+
+    def start(self):
+        """
+        تشغيل الخادم في خيط خلفي.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    def dispatch(self, params):
+        service, method, args = params.get('service'), params.get('method'), params.get('args') or []
+        if service == 'common':
+            if method == 'version':
+                return {'server_version': SERVER_VERSION, 'server_serie': SERVER_VERSION, 'protocol_version': 1}
+            if method in ('login', 'authenticate'):
+                return UID if tuple(args[1:3]) == self.credentials and args[0] == self.database.name else False
+        elif service == 'db':
+            if method == 'server_version':
+                return SERVER_VERSION
+            if method == 'list':
+                return [self.database.name]
+        elif service == 'object' and method == 'execute_kw':
+            db, uid, password, model, model_method = args[:5]
+            if uid != UID or password != self.credentials[1]:
+                raise FakeOdooError('Access Denied')
+            return self.database.execute(model, model_method, args[5] if len(args) > 5 else [],
+                                         args[6] if len(args) > 6 else {})
+        raise FakeOdooError(f"Unsupported call: {service}.{method}")
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+إعادة تشغيل مزامنة مسجلة دون شبكة
+replay_sync.py
+
+الغرض:
+- تشغيل وحدات المزامنة (كلها أو وحدة محددة مثل InvoiceSyncModule) على ردود RPC
+  مسجلة مسبقًا من تشغيل فعلي (`record_to` في config.ini)، دون أي اتصال بالخوادم.
+- قياس زمن المعالج (CPU) والزمن الكلي وعدد استدعاءات RPC لكل وحدة، لمقارنة أداء
+  الكود قبل التعديل وبعده على نفس البيانات تمامًا.
+- حفظ ملف cProfile اختياريًا لتحليل النقاط الساخنة.
+
+تحتاج إعادة التشغيل إلى نفس حالة المزامنة التي بدأ منها التسجيل: انسخ `sync_map.db`
+و `last_sync_time.txt` إلى مجلد قبل تشغيل التسجيل ومرره عبر `--state`.
+
+الاستخدام:
+    python -m benchmarks.replay_sync --source rec/source.jsonl.gz --dest rec/destination.jsonl.gz \\
+        --state rec/state --module InvoiceSyncModule --profile invoices.prof
+"""
+
+import argparse
+import cProfile
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+STATE_FILES = ('sync_map.db', 'last_sync_time.txt')
+
+CONFIG_TEMPLATE = """[odoo_community]
+url = {source_url}
+db = {source_db}
+username = {source_user}
+password = replay
+replay_from = {source}
+
+[odoo_online]
+url = {dest_url}
+db = {dest_db}
+username = {dest_user}
+password = replay
+replay_from = {dest}
+"""
+
+
+def _recorded_login(path):
+    """
+    قاعدة البيانات واسم المستخدم من أول تسجيل دخول في ملف التسجيل
+    (يجب أن تطابق وسائط الاستدعاءات المسجلة).
+    """
+    from odoorpc.connection.recording import get_cassette
+    for entry in get_cassette(path).entries:
+        if entry['service'] == 'common' and entry['method'] in ('login', 'authenticate'):
+            return entry['args'][0], entry['args'][1]
+    return 'replay', 'replay'
+
+
+def _recorded_urls(workdir):
+    """
+    عناوين الخوادم المحفوظة مع إصداراتها في جدول `meta` بنسخة `sync_map.db`
+    ({قاعدة البيانات: [العناوين]})، حتى يستخدم المحرك الإصدار المحفوظ كما حدث
+    أثناء التسجيل (لا يحتوي التسجيل حينها على استدعاء `db.server_version`).
+    """
+    urls = {}
+    db_path = os.path.join(workdir, 'sync_map.db')
+    if not os.path.exists(db_path):
+        return urls
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT key FROM meta WHERE key LIKE 'server_version:%'").fetchall()
+    except sqlite3.Error:
+        rows = []
+    finally:
+        conn.close()
+    for (key,) in rows:
+        url, _, db = key[len('server_version:'):].rpartition('|')
+        urls.setdefault(db, []).append(url)
+    return urls
+
+
+def replay(source, dest, state=None, modules=None, profile=None, verbose=False):
+    """
+    تشغيل المزامنة على ردود مسجلة وإرجاع القياسات.
+
+    Args:
+        source (str): ملف تسجيل خادم المصدر.
+        dest (str): ملف تسجيل خادم الوجهة.
+        state (str): مجلد يحتوي على نسخة `sync_map.db` و `last_sync_time.txt` قبل التسجيل.
+        modules (list): أسماء الوحدات المراد تشغيلها (الافتراضي: جميع وحدات main.py).
+        profile (str): مسار ملف cProfile المراد حفظه.
+        verbose (bool): عرض سجلات المزامنة على الشاشة.
+
+    Returns:
+        dict: نتائج القياس.
+    """
+    from core.sync_engine import SyncEngine
+    from main import SYNC_MODULES
+    from odoorpc.connection.recording import get_cassette
+    from odoorpc.metrics import metrics
+    from services.logger_config import setup_logging
+
+    source, dest = os.path.abspath(source), os.path.abspath(dest)
+    selected = [m for m in SYNC_MODULES if not modules or m.__name__ in modules]
+    unknown = set(modules or ()) - {m.__name__ for m in SYNC_MODULES}
+    if unknown:
+        raise ValueError(f"وحدات غير معروفة: {', '.join(sorted(unknown))}")
+
+    source_db, source_user = _recorded_login(source)
+    dest_db, dest_user = _recorded_login(dest)
+    workdir = tempfile.mkdtemp(prefix='sync_replay_')
+    cwd = os.getcwd()
+    profiler = cProfile.Profile() if profile else None
+    try:
+        for name in STATE_FILES:
+            if state and os.path.exists(os.path.join(state, name)):
+                shutil.copy(os.path.join(state, name), workdir)
+        urls = _recorded_urls(workdir)
+        source_url = (urls.get(source_db) or ['http://source.replay']).pop(0)
+        dest_url = (urls.get(dest_db) or ['http://destination.replay']).pop(0)
+        with open(os.path.join(workdir, 'config.ini'), 'w') as f:
+            f.write(CONFIG_TEMPLATE.format(source=source, dest=dest, source_url=source_url, dest_url=dest_url,
+                                           source_db=source_db, source_user=source_user,
+                                           dest_db=dest_db, dest_user=dest_user))
+        os.chdir(workdir)
+        loggers = setup_logging()
+        if not verbose:
+            for handler in logging.getLogger().handlers:
+                if type(handler) is logging.StreamHandler:
+                    handler.setLevel(logging.ERROR)
+
+        metrics.reset()
+        started, cpu_started = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        engine = SyncEngine(loggers)
+        for module_class in selected:
+            engine.register_module(module_class)
+        engine.run_sync()
+        if profiler:
+            profiler.disable()
+        wall_time, cpu_time = time.perf_counter() - started, time.process_time() - cpu_started
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if profiler:
+        profiler.dump_stats(profile)
+    cassettes = (get_cassette(source), get_cassette(dest))
+    totals = metrics.totals()
+    return {
+        'wall_seconds': wall_time,
+        'cpu_seconds': cpu_time,
+        'rpc_calls': sum(total['calls'] for total in totals.values()),
+        'rpc_errors': sum(total['errors'] for total in totals.values()),
+        'per_module_calls': {scope or '(engine)': total['calls'] for scope, total in totals.items()},
+        'inexact_replays': sum(cassette.inexact for cassette in cassettes),
+        'unused_recorded_calls': sum(cassette.unused for cassette in cassettes),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="إعادة تشغيل مزامنة مسجلة دون شبكة وقياس أدائها.")
+    parser.add_argument('--source', required=True, help="ملف تسجيل خادم المصدر (record_to).")
+    parser.add_argument('--dest', required=True, help="ملف تسجيل خادم الوجهة (record_to).")
+    parser.add_argument('--state', help="مجلد نسخة sync_map.db و last_sync_time.txt قبل التسجيل.")
+    parser.add_argument('--module', action='append', dest='modules', help="اسم وحدة للتشغيل (يمكن تكراره).")
+    parser.add_argument('--profile', help="حفظ نتائج cProfile في هذا الملف.")
+    parser.add_argument('--verbose', action='store_true', help="عرض سجلات المزامنة.")
+    args = parser.parse_args(argv)
+
+    result = replay(args.source, args.dest, state=args.state, modules=args.modules,
+                    profile=args.profile, verbose=args.verbose)
+    print(
+        f"time={result['wall_seconds']:.2f}s  cpu={result['cpu_seconds']:.2f}s  "
+        f"rpc={result['rpc_calls']} (errors {result['rpc_errors']})  "
+        f"inexact={result['inexact_replays']}  unused={result['unused_recorded_calls']}"
+    )
+    print("    " + ", ".join(f"{name}={calls}" for name, calls in sorted(result['per_module_calls'].items())))
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+قياس أداء المزامنة الكاملة من البداية إلى النهاية
+run_sync_benchmark.py
+
+الغرض:
+- تشغيل خادمي Odoo وهميين (مصدر ووجهة) على localhost لكل حجم بيانات.
+- تشغيل `SyncEngine` بنفس وحدات `main.py` (SYNC_MODULES) في عملية فرعية منفصلة
+  داخل مجلد مؤقت (config.ini و sync_map.db و logs/ خاصة بالقياس فقط).
+- عرض زمن التشغيل، عدد استدعاءات RPC وحجم البيانات المنقولة، وذروة الذاكرة
+  لكل حجم، مع كتابة النتائج اختياريًا في ملف JSON.
+
+الاستخدام:
+    python -m benchmarks.run_sync_benchmark --sizes 1000 10000 100000 --latency 0.02
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.datasets import generate_destination, generate_source
+from benchmarks.fake_odoo import FakeOdooServer
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+CONFIG_TEMPLATE = """[odoo_community]
+url = {source_url}
+db = source
+username = admin
+password = admin
+{source_extra}
+[odoo_online]
+url = {dest_url}
+db = destination
+username = admin
+password = admin
+{dest_extra}
+[sync]
+max_workers = {max_workers}
+company_workers = {company_workers}
+"""
+
+
+def _peak_memory_mb():
+    """
+    ذروة الذاكرة المقيمة (RSS) للعملية الحالية بالميغابايت.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss بالكيلوبايت على Linux وبالبايت على macOS.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_sync(workdir, results, verbose):
+    """
+    تشغيل المزامنة الكاملة داخل العملية الفرعية وإرسال القياسات إلى العملية الرئيسية.
+    """
+    os.chdir(workdir)
+    from core.sync_engine import SyncEngine
+    from main import SYNC_MODULES
+    from odoorpc.metrics import metrics
+    from services.logger_config import setup_logging
+
+    loggers = setup_logging()
+    if not verbose:
+        for handler in logging.getLogger().handlers:
+            if type(handler) is logging.StreamHandler:
+                handler.setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    engine = SyncEngine(loggers)
+    for module_class in SYNC_MODULES:
+        engine.register_module(module_class)
+    engine.run_sync()
+    wall_time = time.perf_counter() - started
+
+    totals = metrics.totals()
+    results.put({
+        'wall_seconds': wall_time,
+        'rpc_calls': sum(total['calls'] for total in totals.values()),
+        'rpc_errors': sum(total['errors'] for total in totals.values()),
+        'request_bytes': sum(total['request_bytes'] for total in totals.values()),
+        'response_bytes': sum(total['response_bytes'] for total in totals.values()),
+        'per_module_calls': {scope or '(engine)': total['calls'] for scope, total in totals.items()},
+        'peak_memory_mb': _peak_memory_mb(),
+    })
+
+
+def run_benchmark(size, latency=0.0, max_workers=1, verbose=False, record_dir=None, companies=1, company_workers=4):
+    """
+    قياس مزامنة كاملة لمجموعة بيانات بحجم `size` إلى وجهة فارغة.
+
+    Args:
+        size (int): عدد جهات الاتصال في المصدر (انظر `datasets.generate_source`).
+        latency (float): زمن استجابة إضافي لكل طلب RPC بالثواني.
+        max_workers (int): قيمة الإعداد `max_workers` لمحرك المزامنة.
+        verbose (bool): عرض سجلات المزامنة على الشاشة.
+        record_dir (str): مجلد لتسجيل حركة RPC (`source.jsonl.gz` و `destination.jsonl.gz`)
+            لإعادة تشغيلها لاحقًا عبر `benchmarks.replay_sync`.
+        companies (int): عدد الشركات في المصدر.
+        company_workers (int): قيمة الإعداد `company_workers` (عدد الشركات التي تتم معالجتها بالتوازي).
+
+    Returns:
+        dict: نتائج القياس.
+    """
+    source, destination = generate_source(size, companies=companies), generate_destination()
+    source_records = sum(len(table) for table in source.tables.values())
+    source_server = FakeOdooServer(source, latency=latency).start()
+    dest_server = FakeOdooServer(destination, latency=latency).start()
+    workdir = tempfile.mkdtemp(prefix='sync_benchmark_')
+    try:
+        extra = {'source_extra': '', 'dest_extra': ''}
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+            for key, name in (('source_extra', 'source'), ('dest_extra', 'destination')):
+                extra[key] = f"record_to = {os.path.abspath(os.path.join(record_dir, name + '.jsonl.gz'))}\n"
+        with open(os.path.join(workdir, 'config.ini'), 'w') as f:
+            f.write(CONFIG_TEMPLATE.format(source_url=source_server.url, dest_url=dest_server.url,
+                                           max_workers=max_workers, company_workers=company_workers, **extra))
+        # عملية فرعية جديدة لكل حجم حتى تكون ذروة الذاكرة خاصة بالمزامنة وحدها.
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        process = context.Process(target=_run_sync, args=(workdir, results, verbose))
+        process.start()
+        result = results.get()
+        process.join()
+    finally:
+        source_server.stop()
+        dest_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result.update({
+        'size': size,
+        'latency': latency,
+        'max_workers': max_workers,
+        'companies': companies,
+        'company_workers': company_workers,
+        'source_records': source_records,
+        'synced_partners': len([r for r in destination.table('res.partner').values() if r.get('x_partner_sync_id')]),
+        'synced_moves': len(destination.table('account.move')),
+        'records_per_second': source_records / result['wall_seconds'] if result['wall_seconds'] else 0.0,
+    })
+    return result
+
+
+def _print_result(result):
+    print(
+        f"size={result['size']:>7}  records={result['source_records']:>7}  "
+        f"time={result['wall_seconds']:8.2f}s  rate={result['records_per_second']:8.1f} rec/s  "
+        f"rpc={result['rpc_calls']:>6} (errors {result['rpc_errors']})  "
+        f"sent={result['request_bytes'] / 1e6:7.2f}MB  received={result['response_bytes'] / 1e6:7.2f}MB  "
+        f"peak={result['peak_memory_mb']:7.1f}MB"
+    )
+    print(f"    synced: partners={result['synced_partners']}, moves={result['synced_moves']}")
+    print("    " + ", ".join(f"{name}={calls}" for name, calls in sorted(result['per_module_calls'].items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء المزامنة باستخدام خادم Odoo وهمي.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="أحجام مجموعات البيانات (عدد جهات الاتصال).")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="زمن استجابة إضافي لكل طلب RPC بالثواني (لمحاكاة الشبكة).")
+    parser.add_argument('--max-workers', type=int, default=1, help="عدد الوحدات التي تعمل بالتوازي.")
+    parser.add_argument('--companies', type=int, default=1, help="عدد الشركات في بيانات المصدر.")
+    parser.add_argument('--company-workers', type=int, default=4,
+                        help="عدد الشركات التي تتم معالجتها بالتوازي في وحدتي الحسابات والضرائب.")
+    parser.add_argument('--output', help="ملف JSON لحفظ النتائج.")
+    parser.add_argument('--record', help="مجلد لتسجيل حركة RPC لآخر حجم (لإعادة تشغيلها عبر replay_sync).")
+    parser.add_argument('--verbose', action='store_true', help="عرض سجلات المزامنة.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        result = run_benchmark(size, latency=args.latency, max_workers=args.max_workers, verbose=args.verbose,
+                               record_dir=args.record, companies=args.companies,
+                               company_workers=args.company_workers)
+        _print_result(result)
+        results.append(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+مجدول وحدات المزامنة حسب الاعتماديات
+module_scheduler.py
+
+الغرض:
+- تشغيل وحدات المزامنة المستقلة عن بعضها بشكل متوازٍ على مجموعة خيوط (thread pool).
+- احترام الاعتماديات المعلنة في كل وحدة عبر `DEPENDS_ON`: لا تبدأ الوحدة إلا بعد
+  نجاح جميع الوحدات التي تعتمد عليها.
+- فشل وحدة ما يمنع فقط الوحدات التي تعتمد عليها (بشكل مباشر أو غير مباشر)،
+  بينما تستمر بقية الوحدات في العمل.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# حالات الوحدات بعد انتهاء الجدولة.
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+BLOCKED = 'blocked'
+
+
+class ModuleScheduler:
+    """
+    ينفذ مجموعة من المهام المسماة مع اعتمادياتها.
+    """
+    def __init__(self, max_workers=1, logger=None):
+        """
+        Args:
+            max_workers (int): الحد الأقصى لعدد الوحدات التي تعمل في نفس الوقت.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def run(self, tasks, run_task):
+        """
+        تشغيل المهام مع احترام الاعتماديات.
+
+        Args:
+            tasks (list): قائمة أزواج (اسم المهمة، قائمة أسماء المهام التي تعتمد عليها)
+                بترتيب التسجيل. الاعتماديات غير المسجلة يتم تجاهلها.
+            run_task (callable): دالة تستقبل اسم المهمة وتنفذها، وتطلق استثناء عند الفشل.
+
+        Returns:
+            dict: قاموس {اسم المهمة: (الحالة، الخطأ أو None)}.
+        """
+        names = [name for name, _ in tasks]
+        depends = {}
+        for name, deps in tasks:
+            depends[name] = [dep for dep in deps if dep in names and dep != name]
+            for dep in deps:
+                if dep not in names:
+                    self.logger.debug(f"  - الاعتمادية '{dep}' للوحدة '{name}' غير مسجلة. سيتم تجاهلها.")
+
+        results = {}
+        pending = list(names)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sync') as executor:
+            while pending or running:
+                # 1. منع الوحدات التي فشلت إحدى اعتمادياتها أو مُنعت.
+                for name in list(pending):
+                    broken = [dep for dep in depends[name] if results.get(dep, (None,))[0] in (FAILED, BLOCKED)]
+                    if broken:
+                        pending.remove(name)
+                        results[name] = (BLOCKED, None)
+                        self.logger.warning(f"  - تم منع تشغيل الوحدة '{name}' بسبب فشل: {', '.join(broken)}.")
+
+                # 2. إرسال الوحدات الجاهزة (نجحت جميع اعتمادياتها) بترتيب التسجيل.
+                for name in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    if all(results.get(dep, (None,))[0] == SUCCEEDED for dep in depends[name]):
+                        pending.remove(name)
+                        running[executor.submit(run_task, name)] = name
+
+                if not running:
+                    # لا توجد وحدات قيد التشغيل ولا وحدات جاهزة: اعتماديات دائرية.
+                    for name in pending:
+                        results[name] = (BLOCKED, None)
+                        self.logger.error(f"  - تم منع تشغيل الوحدة '{name}' بسبب اعتماديات دائرية.")
+                    break
+
+                # 3. انتظار انتهاء وحدة واحدة على الأقل.
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    results[name] = (FAILED, error) if error is not None else (SUCCEEDED, None)
+
+        return results
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+خط المعالجة المتدفق للمزامنة
+pipeline.py
+
+الغرض:
+- تشغيل مراحل المزامنة (قراءة دفعات المصدر، التحويل، الكتابة في الوجهة، حفظ الروابط)
+  بشكل متداخل بدلاً من قراءة الكل ثم تحويل الكل ثم كتابة الكل: بينما تُكتب الدفعة N
+  في الوجهة، يتم تحويل الدفعة N+1 وقراءة الدفعة N+2 من المصدر.
+- المراحل متصلة بطوابير محدودة الحجم حتى لا تسبق القراءة الكتابة بأكثر من عدد قليل
+  من الدفعات، فتبقى الذاكرة محدودة.
+- تعمل المرحلة الأخيرة (حفظ الروابط في `SyncKeyManager`) في الخيط المستدعي، فيقترب
+  الزمن الكلي من زمن أبطأ مرحلة بدلاً من مجموع أزمنة جميع المراحل.
+- تحصل كل مرحلة على نسخها الخاصة من عملاء Odoo (`clone()`) حتى لا تتشارك خيوط
+  المراحل حالة HTTP، ويتم إغلاق هذه النسخ عند انتهاء التشغيل.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from odoorpc.metrics import metrics
+
+# علامة نهاية التدفق بين المراحل.
+_END = object()
+
+
+class PipelineStage:
+    """
+    مرحلة واحدة في خط المعالجة.
+    """
+    def __init__(self, name, func, workers=1):
+        """
+        Args:
+            name (str): اسم المرحلة (للسجلات والإحصائيات).
+            func (callable): دالة تستقبل عنصرًا وترجع العنصر التالي، أو None لإسقاطه.
+            workers (int): عدد الخيوط التي تنفذ المرحلة بالتوازي.
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.items = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def process(self, item):
+        started = time.perf_counter()
+        try:
+            return self.func(item)
+        finally:
+            with self._lock:
+                self.items += 1
+                self.seconds += time.perf_counter() - started
+
+
+class SyncPipeline:
+    """
+    خط معالجة متدفق من مراحل متصلة بطوابير محدودة الحجم.
+
+    مثال:
+        pipeline = SyncPipeline('InvoiceSyncModule', queue_size=2)
+        pipeline.add_stage('transform', transform_chunk)
+        pipeline.add_stage('push', push_chunk)
+        pipeline.run(read_chunks(), commit=commit_chunk)
+    """
+    DEFAULT_QUEUE_SIZE = 2
+
+    def __init__(self, name, queue_size=DEFAULT_QUEUE_SIZE, logger=None):
+        """
+        Args:
+            name (str): اسم خط المعالجة (للسجلات).
+            queue_size (int): الحد الأقصى لعدد العناصر المنتظرة بين كل مرحلتين.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.name = name
+        self.queue_size = max(1, int(queue_size))
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.stages = []
+        # نسخ عملاء Odoo الخاصة بالمراحل، تُغلق في نهاية `run()`.
+        self._clones = []
+
+    def clone(self, client):
+        """
+        إنشاء نسخة من عميل Odoo بجلسة HTTP خاصة لاستخدامها في مرحلة واحدة.
+        يتم إغلاق النسخة عند انتهاء `run()`.
+
+        Args:
+            client: كائن اتصال Odoo API (`Client`).
+
+        Returns:
+            Client: النسخة الجديدة.
+        """
+        clone = client.clone()
+        self._clones.append(clone)
+        return clone
+
+    def _close_clones(self):
+        clones, self._clones = self._clones, []
+        for clone in clones:
+            close = getattr(clone.connection, 'close', None)
+            if close is not None:
+                close()
+
+    def add_stage(self, name, func, workers=1):
+        """
+        إضافة مرحلة بعد المراحل الحالية.
+
+        Returns:
+            SyncPipeline: نفس الكائن لتسلسل الاستدعاءات.
+        """
+        self.stages.append(PipelineStage(name, func, workers))
+        return self
+
+    def run(self, source, commit=None):
+        """
+        تشغيل خط المعالجة حتى نهاية المصدر.
+        يتم إيقاف جميع المراحل عند أول خطأ، ثم يُطلق الخطأ في الخيط المستدعي.
+
+        Args:
+            source (iterable): مصدر العناصر (مثل مولد دفعات المصدر)، تتم قراءته في خيط مستقل.
+            commit (callable): دالة المرحلة الأخيرة، تُنفذ في الخيط المستدعي لكل عنصر
+                بنفس ترتيب خروجه من آخر مرحلة.
+
+        Returns:
+            dict: إحصائيات المراحل {اسم المرحلة: {'items': العدد، 'seconds': زمن العمل}}.
+        """
+        reader = PipelineStage('read', None)
+        commit_stage = PipelineStage('commit', commit or (lambda item: item))
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        stop = threading.Event()
+        errors = []
+        # نسب استدعاءات RPC في خيوط المراحل إلى الوحدة التي أطلقتها.
+        scope = metrics.current_scope
+
+        def fail(error):
+            errors.append(error)
+            stop.set()
+
+        def put(target, item):
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(source_queue):
+            while not stop.is_set():
+                try:
+                    return source_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _END
+
+        def read():
+            with metrics.scope(scope):
+                try:
+                    iterator = iter(source)
+                    while not stop.is_set():
+                        started = time.perf_counter()
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            break
+                        finally:
+                            reader.seconds += time.perf_counter() - started
+                        reader.items += 1
+                        if not put(queues[0], item):
+                            return
+                except Exception as e:
+                    fail(e)
+                    return
+                put(queues[0], _END)
+
+        def work(stage, inbox, outbox, remaining):
+            with metrics.scope(scope):
+                while True:
+                    item = get(inbox)
+                    if item is _END:
+                        # إعادة العلامة لبقية خيوط نفس المرحلة.
+                        put(inbox, _END)
+                        break
+                    try:
+                        result = stage.process(item)
+                    except Exception as e:
+                        fail(e)
+                        return
+                    if result is not None and not put(outbox, result):
+                        return
+                # آخر خيط ينتهي في المرحلة يمرر علامة النهاية للمرحلة التالية.
+                with remaining['lock']:
+                    remaining['count'] -= 1
+                    last = remaining['count'] == 0
+                if last:
+                    put(outbox, _END)
+
+        threads = [threading.Thread(target=read, name=f'{self.name}-read', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining = {'count': stage.workers, 'lock': threading.Lock()}
+            for number in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=work, args=(stage, queues[index], queues[index + 1], remaining),
+                    name=f'{self.name}-{stage.name}-{number}', daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = get(queues[-1])
+                if item is _END:
+                    break
+                commit_stage.process(item)
+        except BaseException as e:
+            fail(e)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self._close_clones()
+
+        stats = {stage.name: {'items': stage.items, 'seconds': stage.seconds}
+                 for stage in [reader] + self.stages + [commit_stage]}
+        self.logger.info(
+            f"  - خط المعالجة {self.name}: "
+            + "، ".join(f"{name} {s['items']} عنصر في {s['seconds']:.2f} ث" for name, s in stats.items())
+        )
+        if errors:
+            raise errors[0]
+        return stats
@@ -12,14 +12,34 @@ sync_engine.py
 from services.config_manager import ConfigManager
 from services.sync_key_manager import SyncKeyManager
 from services.odoo_connector import OdooConnector
+from services.reference_cache import ReferenceDataCache
 from services.logger_config import setup_logging
+from core.module_scheduler import ModuleScheduler, SUCCEEDED, FAILED, BLOCKED
+from odoorpc.metrics import metrics
+import hashlib
 import logging
+import os
+import threading
 
 class SyncEngine:
     """
     المنسق الرئيسي لعملية المزامنة. يقوم بتهيئة جميع الخدمات
     وتشغيل وحدات المزامنة المسجلة بالترتيب.
     """
+    # ملفات إحصائيات استدعاءات RPC التي تتم كتابتها في نهاية كل تشغيل.
+    METRICS_JSON_FILE = os.path.join('logs', 'rpc_metrics.json')
+    METRICS_PROMETHEUS_FILE = os.path.join('logs', 'rpc_metrics.prom')
+    # الحقول المخصصة المطلوبة في الوجهة: (النموذج، اسم الحقل، الاسم المرئي، النوع).
+    CUSTOM_FIELDS = [
+        ('res.partner', 'x_partner_sync_id', 'Partner Sync ID', 'char'),
+        ('res.company', 'x_company_sync_id', 'Company Sync ID', 'char'),
+        ('account.account', 'x_account_sync_id', 'Account Sync ID', 'char'),
+        ('account.journal', 'x_journal_sync_id', 'Journal Sync ID', 'char'),
+        ('account.tax', 'x_tax_sync_id', 'Tax Sync ID', 'char'),
+        ('account.move', 'x_move_sync_id', 'Move Sync ID', 'char'),
+        ('account.move', 'x_original_source_id', 'Original Source ID', 'integer'),
+        ('account.move', 'x_original_write_date', 'Original Write Date', 'datetime'),
+    ]
     def __init__(self, loggers=None):
         """
         تهيئة النواة الأساسية للمزامنة.
@@ -33,10 +53,17 @@ class SyncEngine:
         self.engine_logger.info("="*50)
         self.engine_logger.info("بدء تشغيل محرك المزامنة (Sync Engine)...")
         self.config_manager = None
+        self.settings = {}
         self.key_manager = None
         self.source_conn = None
         self.dest_conn = None
+        self.reference_data = None
         self.sync_modules = []
+        # اتصالات خاصة بكل خيط تشغيل (thread) عند التشغيل المتوازي.
+        self._thread_state = threading.local()
+        # جميع كائنات `OdooConnector` الخاصة بالخيوط، لإغلاقها في نهاية `run_sync`.
+        self._worker_connectors = []
+        self._worker_connectors_lock = threading.Lock()
         # قراءة آخر وقت مزامنة من الملف، أو تعيين تاريخ قديم إذا لم يكن موجودًا.
         self.last_sync_time = self._read_last_sync_time()
         # تهيئة جميع الخدمات الأساسية المطلوبة للمزامنة.
@@ -86,42 +113,50 @@ class SyncEngine:
         try:
             # 1. تحميل الإعدادات من ملف config.ini.
             self.config_manager = ConfigManager()
+            self.settings = self.config_manager.get_sync_settings()
 
             # 2. تهيئة مدير مفاتيح المزامنة (الذاكرة المحلية).
-            self.key_manager = SyncKeyManager()
+            self.key_manager = SyncKeyManager(
+                synchronous=self.settings.get('sqlite_synchronous', 'NORMAL'),
+                cache_size=self.settings.get('sqlite_cache_size', -8000)
+            )
+            if self.settings.get('preload_mappings', True):
+                # تحميل جدول الربط في الذاكرة مرة واحدة ومشاركته بين جميع الوحدات.
+                loaded = self.key_manager.preload()
+                self.engine_logger.info(f"تم تحميل {loaded} ربط في الذاكرة.")
 
             # 3. إنشاء اتصال بنظام المصدر (Odoo Community).
             community_creds = self.config_manager.get_community_credentials()
+            self._community_creds = community_creds
             self._source_connector = OdooConnector(community_creds, logger=self.loggers.get("connector"))
             self.source_conn = self._source_connector.get_api()
+            self._restore_server_version(self._source_connector)
             self.loggers["engine"].info("تم الاتصال وتسجيل الدخول بنجاح إلى Odoo المصدر.")
 
 
             # 4. إنشاء اتصال بنظام الوجهة (Odoo Online).
             online_creds = self.config_manager.get_online_credentials()
+            self._online_creds = online_creds
             self._dest_connector = OdooConnector(online_creds, logger=self.loggers.get("connector"))
             self.dest_conn = self._dest_connector.get_api()
+            self._restore_server_version(self._dest_connector)
             self.loggers["engine"].info("تم الاتصال وتسجيل الدخول بنجاح إلى Odoo الوجهة.")
 
 
             # 5. التأكد من وجود الحقول المخصصة في نظام Odoo الوجهة.
             self.engine_logger.info("\n[جاري التحقق] من الحقول المخصصة في نظام الوجهة...")
-            
-            fields_to_ensure = [
-                ('res.partner', 'x_partner_sync_id', 'Partner Sync ID', 'char'),
-                ('res.company', 'x_company_sync_id', 'Company Sync ID', 'char'),
-                ('account.account', 'x_account_sync_id', 'Account Sync ID', 'char'),
-                ('account.journal', 'x_journal_sync_id', 'Journal Sync ID', 'char'),
-                ('account.tax', 'x_tax_sync_id', 'Tax Sync ID', 'char'),
-                ('account.move', 'x_move_sync_id', 'Move Sync ID', 'char'),
-                ('account.move', 'x_original_source_id', 'Original Source ID', 'integer'),
-                ('account.move', 'x_original_write_date', 'Original Write Date', 'datetime'),
-            ]
-
-            for model, field_name, label, field_type in fields_to_ensure:
-                self._dest_connector.ensure_custom_field(model, field_name, label, field_type)
-            
-            self.engine_logger.info("  - تم التحقق بنجاح من جميع الحقول المخصصة.")
+            self._ensure_custom_fields()
+
+            # 6. تحميل البيانات المرجعية للوجهة (البلدان، العملات، الشركات، علامات الضرائب)
+            # مرة واحدة ومشاركتها بين جميع الوحدات.
+            self.engine_logger.info("\n[جاري التحميل] البيانات المرجعية للوجهة...")
+            self.reference_data = ReferenceDataCache(
+                self.dest_conn, self.key_manager,
+                ttl=self.settings.get('reference_cache_ttl', ReferenceDataCache.DEFAULT_TTL),
+                namespace=f"{self._dest_connector.url}|{self._dest_connector.db}",
+                logger=self.engine_logger
+            )
+            self.reference_data.load()
             self.engine_logger.info("\n[نجاح] تم تهيئة جميع الخدمات الأساسية بنجاح.")
 
         except (FileNotFoundError, ValueError, ConnectionError) as e:
@@ -129,10 +164,57 @@ class SyncEngine:
             self.error_logger.critical("لا يمكن متابعة عملية المزامنة. يرجى مراجعة الأخطاء أعلاه.")
             raise
 
+    def _ensure_custom_fields(self):
+        """
+        التحقق من وجود جميع الحقول المخصصة (`CUSTOM_FIELDS`) في الوجهة وإنشاء الناقص
+        منها دفعة واحدة. يتم حفظ بصمة المخطط الذي تم التحقق منه في جدول `meta`،
+        فيتم تخطي التحقق بالكامل في التشغيلات التالية ما لم تتغير قائمة الحقول أو الوجهة.
+        """
+        fingerprint = hashlib.sha256(repr(sorted(self.CUSTOM_FIELDS)).encode('utf-8')).hexdigest()
+        meta_key = f"schema_fingerprint:{self._dest_connector.url}|{self._dest_connector.db}"
+        if self.key_manager.get_meta(meta_key) == fingerprint:
+            self.engine_logger.info("  - مخطط الحقول المخصصة لم يتغير منذ آخر تحقق. تم تخطي التحقق.")
+            return
+
+        self._dest_connector.ensure_custom_fields(self.CUSTOM_FIELDS)
+        self.key_manager.set_meta(meta_key, fingerprint)
+        self.engine_logger.info("  - تم التحقق بنجاح من جميع الحقول المخصصة.")
+
+    @staticmethod
+    def _server_version_key(connector):
+        """
+        مفتاح حفظ إصدار الخادم في جدول `meta` (خاص بكل خادم وقاعدة بيانات).
+        """
+        return f"server_version:{connector.url}|{connector.db}"
+
+    def _restore_server_version(self, connector):
+        """
+        تعيين إصدار الخادم المحفوظ من التشغيل السابق في العميل، لتجنب
+        استدعاء `db.server_version` عند بدء التشغيل.
+        """
+        version = self.key_manager.get_meta(self._server_version_key(connector))
+        if version is None:
+            return
+        try:
+            connector.api.server_version = float(version)
+            self.engine_logger.debug(f"  - تم استخدام إصدار الخادم المحفوظ ({version}) لـ '{connector.url}'.")
+        except (TypeError, ValueError):
+            self.engine_logger.debug(f"  - تجاهل إصدار خادم محفوظ غير صالح: {version}")
+
+    def _store_server_versions(self):
+        """
+        حفظ إصدار خادمي المصدر والوجهة (إذا تم حلّه) لاستخدامه في التشغيل التالي.
+        """
+        for connector in (self._source_connector, self._dest_connector):
+            version = getattr(connector.api, '_server_version', None)
+            if version is not None:
+                self.key_manager.set_meta(self._server_version_key(connector), version)
+
     def register_module(self, module_class):
         """
         تسجيل وحدة مزامنة متخصصة لتشغيلها لاحقًا.
-        يتم إنشاء كائن من الوحدة وتمرير الاتصالات ومدير المفاتيح وآخر وقت مزامنة إليها.
+        يتم إنشاء كائن الوحدة عند تشغيلها (داخل خيط التشغيل الخاص بها) وتمرير
+        الاتصالات ومدير المفاتيح وآخر وقت مزامنة إليه.
 
         Args:
             module_class: الكلاس الخاص بوحدة المزامنة (وليس كائنًا منه).
@@ -141,52 +223,167 @@ class SyncEngine:
         """
         if not hasattr(module_class, 'run'):
             raise TypeError(f"فشلت محاولة تسجيل الوحدة {module_class.__name__}: يجب أن تحتوي على دالة 'run'.")
-            
-        # إنشاء كائن من الوحدة وتمرير الخدمات الأساسية إليه.
-        module_instance = module_class(
-            source_conn=self.source_conn,
-            dest_conn=self.dest_conn,
-            key_manager=self.key_manager,
-            last_sync_time=self.last_sync_time,
-            loggers=self.loggers # تمرير كائنات المنسق إلى الوحدة
+
+        self.sync_modules.append(module_class)
+        depends_on = getattr(module_class, 'DEPENDS_ON', ())
+        self.engine_logger.info(
+            f"تم تسجيل وحدة المزامنة: {module_class.__name__}"
+            + (f" (تعتمد على: {', '.join(depends_on)})" if depends_on else "")
         )
-        self.sync_modules.append(module_instance)
-        self.engine_logger.info(f"تم تسجيل وحدة المزامنة: {module_class.__name__}")
 
-    def run_sync(self):
+    def _get_worker_connections(self):
+        """
+        إرجاع اتصالات المصدر والوجهة الخاصة بخيط التشغيل الحالي.
+        عند التشغيل بعامل واحد يتم استخدام الاتصالات الرئيسية، وإلا يحصل كل خيط
+        على كائنات `Client` خاصة به حتى لا تتم مشاركة حالة HTTP بين الخيوط.
+
+        Returns:
+            tuple: (اتصال المصدر، اتصال الوجهة).
+        """
+        if self.settings.get('max_workers', 1) <= 1:
+            return self.source_conn, self.dest_conn
+
+        state = self._thread_state
+        if getattr(state, 'connections', None) is None:
+            connector_logger = self.loggers.get("connector")
+            source_connector = OdooConnector(self._community_creds, logger=connector_logger)
+            dest_connector = OdooConnector(self._online_creds, logger=connector_logger)
+            for connector, main_connector in ((source_connector, self._source_connector),
+                                              (dest_connector, self._dest_connector)):
+                # إعادة استخدام إصدار الخادم المعروف مسبقًا لتجنب استدعاء RPC إضافي.
+                version = getattr(main_connector.api, '_server_version', None)
+                if version is not None:
+                    connector.api.server_version = version
+            with self._worker_connectors_lock:
+                self._worker_connectors.extend((source_connector, dest_connector))
+            state.connections = (source_connector.get_api(), dest_connector.get_api())
+        return state.connections
+
+    def _close_worker_connections(self):
+        """
+        إغلاق اتصالات HTTP الخاصة بخيوط التشغيل بعد انتهاء جميع الوحدات.
+        """
+        with self._worker_connectors_lock:
+            connectors, self._worker_connectors = self._worker_connectors, []
+        for connector in connectors:
+            connector.close()
+        self._thread_state = threading.local()
+
+    def _run_module(self, module_class, retry_failed=False):
+        """
+        إنشاء كائن الوحدة وتشغيلها باستخدام اتصالات خيط التشغيل الحالي.
+
+        Args:
+            module_class: الكلاس الخاص بوحدة المزامنة.
+            retry_failed (bool): إعادة محاولة السجلات الفاشلة فقط بدلاً من المزامنة التزايدية.
+        """
+        module_name = module_class.__name__
+        source_conn, dest_conn = self._get_worker_connections()
+        self.engine_logger.info(f"\n--- [جارٍ التشغيل] وحدة: {module_name} ---")
+        # نسب جميع استدعاءات RPC التي تتم في هذا الخيط إلى الوحدة الحالية.
+        with metrics.scope(module_name):
+            module = module_class(
+                source_conn=source_conn,
+                dest_conn=dest_conn,
+                key_manager=self.key_manager,
+                last_sync_time=self.last_sync_time,
+                loggers=self.loggers, # تمرير كائنات المنسق إلى الوحدة
+                settings=self.settings,
+                reference_data=self.reference_data
+            )
+            if retry_failed:
+                module.retry_failed()
+            else:
+                module.run()
+        self.engine_logger.info(f"--- [اكتمل] وحدة: {module_name} ---")
+
+    def _report_metrics(self):
         """
-        تشغيل جميع وحدات المزامنة المسجلة بالترتيب.
-        يتم التعامل مع الأخطاء على مستوى الوحدة لضمان استمرارية العملية قدر الإمكان.
+        عرض ملخص استدعاءات RPC لكل وحدة (العدد، الأخطاء، الزمن، حجم البيانات)
+        وأبطأ العمليات، وكتابة الإحصائيات الكاملة بصيغة JSON وبصيغة Prometheus.
+        """
+        totals = metrics.totals()
+        if not totals:
+            return
+        self.engine_logger.info("\n--- ملخص استدعاءات RPC لكل وحدة ---")
+        for scope, total in sorted(totals.items(), key=lambda item: -item[1]['seconds']):
+            self.engine_logger.info(
+                f"  - {scope or 'SyncEngine'}: {total['calls']} استدعاء، {total['errors']} خطأ، "
+                f"{total['seconds']:.2f} ثانية، أرسل {total['request_bytes']} بايت واستقبل {total['response_bytes']} بايت."
+            )
+        slowest = sorted(metrics.snapshot(), key=lambda row: -row['seconds'])[:5]
+        for row in slowest:
+            self.engine_logger.info(
+                f"    * {row['model']}.{row['method']} ({row['scope'] or 'SyncEngine'}): "
+                f"{row['calls']} استدعاء في {row['seconds']:.2f} ثانية."
+            )
+        try:
+            os.makedirs(os.path.dirname(self.METRICS_JSON_FILE), exist_ok=True)
+            metrics.write_json(self.METRICS_JSON_FILE)
+            metrics.write_prometheus(self.METRICS_PROMETHEUS_FILE)
+            self.engine_logger.info(f"  - تم حفظ إحصائيات RPC في '{self.METRICS_JSON_FILE}' و '{self.METRICS_PROMETHEUS_FILE}'.")
+        except OSError as e:
+            self.error_logger.error(f"فشل في حفظ إحصائيات RPC: {e}")
+
+    def run_sync(self, retry_failed=False):
+        """
+        تشغيل جميع وحدات المزامنة المسجلة حسب اعتمادياتها (`DEPENDS_ON`).
+        الوحدات المستقلة تعمل بشكل متوازٍ (حسب إعداد `max_workers`)، وفشل وحدة
+        يمنع فقط الوحدات التي تعتمد عليها.
+
+        Args:
+            retry_failed (bool): إعادة محاولة السجلات المسجلة كفاشلة فقط
+                (`main.py --retry-failed`)، دون تحديث آخر وقت مزامنة.
         """
         if not self.sync_modules:
             self.activity_logger.warning("\n[تحذير] لا توجد وحدات مزامنة مسجلة. لم يتم تنفيذ أي شيء.")
             return
 
         self.engine_logger.info("\n" + "="*50)
-        self.engine_logger.info("بدء عملية المزامنة الكاملة...")
+        if retry_failed:
+            self.engine_logger.info("بدء إعادة محاولة السجلات الفاشلة...")
+        else:
+            self.engine_logger.info("بدء عملية المزامنة الكاملة...")
         self.engine_logger.info("*** تم الوصول إلى دالة run_sync في SyncEngine ***")
         self.engine_logger.info("="*50)
 
-        for module in self.sync_modules:
-            try:
-                module_name = module.__class__.__name__
-                self.engine_logger.info(f"\n--- [جارٍ التشغيل] وحدة: {module_name} ---")
-                module.run()
-                self.engine_logger.info(f"--- [اكتمل] وحدة: {module_name} ---")
-            except Exception as e:
-                # تسجيل الخطأ وإيقاف المزامنة إذا حدث خطأ فادح في إحدى الوحدات.
-                self.error_logger.critical(f"\n[خطأ فادح] فشلت وحدة '{module_name}' وتوقفت عملية المزامنة.")
-                self.error_logger.critical(f"تفاصيل الخطأ: {e}")
+        modules_by_name = {module_class.__name__: module_class for module_class in self.sync_modules}
+        scheduler = ModuleScheduler(max_workers=self.settings.get('max_workers', 1), logger=self.engine_logger)
+        try:
+            results = scheduler.run(
+                [(name, getattr(module_class, 'DEPENDS_ON', ())) for name, module_class in modules_by_name.items()],
+                lambda name: self._run_module(modules_by_name[name], retry_failed)
+            )
+        finally:
+            self._close_worker_connections()
+
+        for module_name, (status, error) in results.items():
+            if status == FAILED:
+                # تسجيل الخطأ؛ الوحدات التي تعتمد على هذه الوحدة لم يتم تشغيلها.
+                self.error_logger.critical(f"\n[خطأ فادح] فشلت وحدة '{module_name}'.")
+                self.error_logger.critical(f"تفاصيل الخطأ: {error}")
                 # في بيئة الإنتاج، قد ترغب في إرسال إشعار بالبريد الإلكتروني هنا.
-                break  # إيقاف المزامنة عند حدوث خطأ فادح في إحدى الوحدات.
+            elif status == BLOCKED:
+                self.error_logger.error(f"[تخطي] لم يتم تشغيل وحدة '{module_name}' بسبب فشل وحدة تعتمد عليها.")
 
         self.engine_logger.info("\n" + "="*50)
         self.engine_logger.info("اكتملت عملية المزامنة الكاملة.")
         self.engine_logger.info("="*50)
-        
+
+        self._report_metrics()
+
         # إغلاق الاتصالات بقاعدة بيانات الربط وحفظ آخر وقت مزامنة.
+        self._store_server_versions()
         self.key_manager.close_connection()
-        self._write_last_sync_time()
+        # لا يتم تقديم آخر وقت مزامنة إذا فشلت أو مُنعت أي وحدة، حتى تتم إعادة
+        # معالجة السجلات المعدلة في التشغيل التالي.
+        if retry_failed:
+            # وضع إعادة المحاولة لا يعالج السجلات المعدلة، لذا لا يقدم آخر وقت مزامنة.
+            return
+        if all(status == SUCCEEDED for status, _ in results.values()):
+            self._write_last_sync_time()
+        else:
+            self.activity_logger.warning("لم يتم تحديث آخر وقت مزامنة بسبب فشل بعض الوحدات.")
 
 # --- هذا الملف هو إطار عمل ولا يتم تشغيله مباشرة ---
 # --- سيتم استيراده وتشغيله من ملف رئيسي لاحقًا (مثل main.py) ---
@@ -25,41 +25,86 @@ from sync.modules.journal_entries_sync import JournalEntrySyncModule
 from sync.modules.taxes_sync import TaxSyncModule
 
 from services.logger_config import setup_logging
+from services.sync_key_manager import SyncKeyManager
+import argparse
 import logging
 
-def main():
+# وحدات المزامنة بالترتيب المنطقي الحاسم.
+# الترتيب ضروري لضمان وجود البيانات المعتمد عليها مسبقًا في نظام الوجهة
+# قبل محاولة مزامنة السجلات التي تعتمد عليها.
+SYNC_MODULES = (
+    ContactSyncModule,       # البيانات الرئيسية (عملاء، موردون) - يجب مزامنتها أولاً.
+    CompanySyncModule,       # الشركات (مهم قبل الحسابات ودفاتر اليومية) - تعتمد عليها العديد من النماذج.
+    AccountSyncModule,       # أساس المحاسبة (شجرة الحسابات) - تعتمد عليها دفاتر اليومية والحركات.
+    JournalSyncModule,       # دفاتر اليومية (تعتمد على الحسابات) - ضرورية للفواتير وقيود اليومية.
+    TaxSyncModule,           # الضرائب (مهمة قبل الفواتير) - الفواتير تعتمد على سجلات الضرائب.
+    InvoiceSyncModule,       # المعاملات (الفواتير، تعتمد على كل ما سبق) - من النماذج الحركية الرئيسية.
+    JournalEntrySyncModule,  # المعاملات (القيود اليدوية، تعتمد على كل ما سبق) - من النماذج الحركية الرئيسية.
+)
+
+def parse_args(argv=None):
+    """
+    قراءة خيارات سطر الأوامر.
+    """
+    parser = argparse.ArgumentParser(description="مزامنة بيانات Odoo Community مع Odoo Online.")
+    parser.add_argument(
+        '--retry-failed', action='store_true',
+        help="إعادة محاولة السجلات المسجلة كفاشلة فقط (جدول failed_records) بدلاً من المزامنة التزايدية."
+    )
+    parser.add_argument(
+        '--check-mappings', action='store_true',
+        help="فحص اتساق قاعدة بيانات الربط (سجلات الوجهة المربوطة بأكثر من سجل مصدر) دون مزامنة."
+    )
+    return parser.parse_args(argv)
+
+def check_mappings(loggers):
+    """
+    فحص اتساق `sync_map.db` عبر الفهرس العكسي وتسجيل سجلات الوجهة المكررة.
+    لا يحتاج إلى الاتصال بخوادم Odoo.
+
+    Returns:
+        list: قائمة التكرارات التي تم العثور عليها.
+    """
+    key_manager = SyncKeyManager()
+    try:
+        duplicates = key_manager.find_duplicate_destinations()
+    finally:
+        key_manager.close_connection()
+    for model, destination_id, source_ids in duplicates:
+        loggers["error"].error(f"[تكرار] سجل الوجهة {model} ID {destination_id} مربوط بعدة سجلات مصدر: {source_ids}")
+    loggers["main"].info(f"اكتمل فحص قاعدة بيانات الربط: {len(duplicates)} سجل وجهة مكرر.")
+    return duplicates
+
+def main(argv=None):
     """
     الدالة الرئيسية لتشغيل عملية المزامنة.
     تقوم بتهيئة محرك المزامنة، وتسجيل الوحدات، ثم بدء عملية المزامنة.
     """
+    args = parse_args(argv)
     # تهيئة نظام السجلات في بداية تشغيل التطبيق.
     loggers = setup_logging()
     main_logger = loggers["main"]
     error_logger = loggers["error"]
 
     main_logger.info("===== بدء تطبيق المزامنة =====")
+    if args.check_mappings:
+        check_mappings(loggers)
+        return
     try:
         # 1. تهيئة المحرك الأساسي
         # سيقوم المحرك تلقائيًا بتهيئة الاتصالات ومدير المفاتيح وقاعدة بيانات الربط.
         engine = SyncEngine(loggers) # تمرير كائنات المنسق إلى المحرك
 
-        # 2. تسجيل وحدات المزامنة بالترتيب المنطقي الحاسم
-        # الترتيب ضروري لضمان وجود البيانات المعتمد عليها مسبقًا في نظام الوجهة
-        # قبل محاولة مزامنة السجلات التي تعتمد عليها.
+        # 2. تسجيل وحدات المزامنة بالترتيب المنطقي الحاسم (انظر SYNC_MODULES).
         main_logger.info("\n--- تسجيل وحدات المزامنة ---")
-        engine.register_module(ContactSyncModule)       # البيانات الرئيسية (عملاء، موردون) - يجب مزامنتها أولاً.
-        engine.register_module(CompanySyncModule)        # الشركات (مهم قبل الحسابات ودفاتر اليومية) - تعتمد عليها العديد من النماذج.
-        engine.register_module(AccountSyncModule)        # أساس المحاسبة (شجرة الحسابات) - تعتمد عليها دفاتر اليومية والحركات.
-        engine.register_module(JournalSyncModule)        # دفاتر اليومية (تعتمد على الحسابات) - ضرورية للفواتير وقيود اليومية.
-        engine.register_module(TaxSyncModule)            # الضرائب (مهمة قبل الفواتير) - الفواتير تعتمد على سجلات الضرائب.
-        engine.register_module(InvoiceSyncModule)        # المعاملات (الفواتير، تعتمد على كل ما سبق) - من النماذج الحركية الرئيسية.
-        engine.register_module(JournalEntrySyncModule)   # المعاملات (القيود اليدوية، تعتمد على كل ما سبق) - من النماذج الحركية الرئيسية.
+        for module_class in SYNC_MODULES:
+            engine.register_module(module_class)
         main_logger.info("--- اكتمل تسجيل الوحدات ---\n")
         
         # 3. تشغيل عملية المزامنة
         # يقوم محرك المزامنة بتشغيل الوحدات المسجلة بالترتيب.
         main_logger.info("[!] بدء تشغيل محرك المزامنة من main.py...")
-        engine.run_sync()
+        engine.run_sync(retry_failed=args.retry_failed)
 
     except Exception as e:
         # معالجة أي أخطاء غير متوقعة قد توقف التطبيق.
@@ -8,6 +8,7 @@
 #######################################################################
 
 from .client import Client      # noqa
+from .async_client import AsyncClient  # noqa
 
 from . import version
 
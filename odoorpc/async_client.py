@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+# Copyright © 2014-2018 Dmytro Katyukha <dmytro.katyukha@gmail.com>
+
+#######################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public #
+# License, v. 2.0. If a copy of the MPL was not distributed with this #
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.            #
+#######################################################################
+
+""" asyncio client for Odoo
+
+    Mirrors most used methods of *Client* and *Object*, but all of them
+    are coroutines, so many requests may be kept in flight from single
+    thread:
+
+.. code:: python
+
+    >>> async with AsyncClient('server.com', 'db', 'user', 'pwd',
+    ...                        protocol='json-rpcs-async', port=443) as cl:
+    ...     partners = cl['res.partner']
+    ...     ids = await partners.search([('customer_rank', '>', 0)])
+    ...     chunks = await asyncio.gather(*[
+    ...         partners.read(ids[i:i + 100], ['name'])
+    ...         for i in range(0, len(ids), 100)])
+"""
+
+import asyncio
+import time
+
+from .connection.connection import DEFAULT_TIMEOUT
+from .connection.jsonrpc_async import get_async_connector
+from .exceptions import LoginException
+from .metrics import metrics
+from .utils import preprocess_args, stdcall
+
+__all__ = ('AsyncClient', 'AsyncObject')
+
+
+class AsyncClient(object):
+    """ asyncio client to connect to Odoo instance via JSON-RPC
+
+        :param str host: server hostname to connect to
+        :param str dbname: name of database to connect to
+        :param str user: username to login as
+        :param str pwd: password to log-in with
+        :param int port: port number of server
+        :param str protocol: protocol used to connect. To get list of
+                             available protocols call:
+                             ``odoorpc.connection.jsonrpc_async
+                             .get_async_connector_names()``
+        :param uid: ID of user, if it is already known (no login is done)
+        :param float timeout: timeout of single request in seconds
+
+        any other keyword arguments will be directly passed to connector
+    """
+
+    def __init__(self, host, dbname=None, user=None, pwd=None, port=8069,
+                 protocol='json-rpc-async', uid=None,
+                 timeout=DEFAULT_TIMEOUT, **extra_args):
+        self._dbname = dbname
+        self._username = user
+        self._pwd = pwd
+        self._uid = uid
+        self._login_lock = None
+        self._objects = {}
+        self._connection = get_async_connector(protocol)(
+            host, port, timeout=timeout, extra_args=extra_args)
+
+    @property
+    def dbname(self):
+        """ Name of database to connect to
+        """
+        return self._dbname
+
+    @property
+    def username(self):
+        """ User login used to access DB
+        """
+        return self._username
+
+    @property
+    def host(self):
+        """ Server host
+        """
+        return self._connection.host
+
+    @property
+    def port(self):
+        """ Server port
+        """
+        return self._connection.port
+
+    @property
+    def protocol(self):
+        """ Server protocol
+        """
+        return self._connection.Meta.name
+
+    @property
+    def connection(self):
+        """ Connection to server.
+
+            :rtype: odoorpc.connection.jsonrpc_async.ConnectorJSONRPCAsync
+        """
+        return self._connection
+
+    @property
+    def uid(self):
+        """ ID of current user, or None if client did not log in yet
+            (see *login*)
+        """
+        return self._uid
+
+    async def login(self):
+        """ Log in to the server. Concurrent calls share single login
+            request
+
+            :return: ID of user logged in
+            :rtype: int
+            :raises LoginException: if wrong login or password
+        """
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            if self._uid is not None:
+                return self._uid
+
+            if not self._pwd or not self.username or not self.dbname:
+                raise LoginException("User login and password and dbname "
+                                     "required for this operation")
+
+            uid = await self._connection.get_service('common').login(
+                self.dbname, self.username, self._pwd)
+            if not uid:
+                raise LoginException("Bad login or password")
+            self._uid = uid
+            return uid
+
+    async def execute(self, obj, method, *args, **kwargs):
+        """ Call method *method* on object *obj* passing all next
+            positional and keyword arguments to remote method
+
+            :param str obj: object name to call method for
+            :param str method: name of method to call
+            :return: result of RPC method call
+        """
+        if self._uid is None:
+            await self.login()
+
+        # avoid sending context when it is set to None
+        if 'context' in kwargs and kwargs['context'] is None:
+            kwargs = kwargs.copy()
+            del kwargs['context']
+
+        started = time.perf_counter()
+        error = True
+        try:
+            result = await self._connection.get_service('object').execute_kw(
+                self.dbname, self._uid, self._pwd, obj, method,
+                list(args), kwargs)
+            error = False
+        finally:
+            metrics.record_call(obj, method,
+                                time.perf_counter() - started, error=error)
+        return result
+
+    def get_obj(self, object_name):
+        """ Returns wrapper around Odoo object 'object_name'
+
+            :param str object_name: name of an object to get wrapper for
+            :return: instance of AsyncObject which wraps choosen object
+            :rtype: AsyncObject
+        """
+        obj = self._objects.get(object_name)
+        if obj is None:
+            obj = self._objects[object_name] = AsyncObject(self, object_name)
+        return obj
+
+    def __getitem__(self, name):
+        """ Returns instance of AsyncObject with name 'name'
+        """
+        return self.get_obj(name)
+
+    def close(self):
+        """ Close all pooled connections
+        """
+        self._connection.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __str__(self):
+        return u"AsyncClient: %s:%s/%s (%s)" % (self.host, self.port,
+                                                 self.dbname, self.protocol)
+
+    def __repr__(self):
+        return str(self)
+
+
+class AsyncObject(object):
+    """ Wrapper around Odoo object, whose methods return coroutines.
+
+        Any other method of Odoo object may be called as
+        ``await obj.method_name(*args, **kwargs)``
+
+        :param AsyncClient client: client to use to call methods
+        :param str name: name of object
+    """
+
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+
+    @property
+    def name(self):
+        """ Name of the object
+        """
+        return self._name
+
+    @property
+    def client(self):
+        """ Client instance, this object is bound to
+        """
+        return self._client
+
+    def __getattr__(self, name):
+        # Private methods are not available to be called via RPC
+        if name.startswith('_'):
+            raise AttributeError("Private methods are not exposed to RPC. "
+                                 "(attr: %s)" % name)
+
+        object_name = self._name
+
+        @stdcall
+        async def wrapper(*args, **kwargs):
+            return await self._client.execute(object_name, name,
+                                              *args, **kwargs)
+        wrapper.__name__ = str('%s:%s' % (object_name, name))
+        setattr(self, name, wrapper)
+        return wrapper
+
+    async def search(self, *args, **kwargs):
+        """search(args[, offset=0][, limit=None][, order=None][, count=False][, context=None])
+
+            Search records by criteria.
+        """  # noqa
+        _, kwargs = preprocess_args(**kwargs)  # preprocess kwargs
+        return await self._client.execute(self._name, 'search',
+                                          *args, **kwargs)
+
+    async def search_read(self, domain=None, fields=None, offset=0,
+                          limit=None, order=None, context=None):
+        """ Search and read records specified by domain
+
+            Requires Odoo 8.0+
+
+            :return: list of dictionaries with data had been read
+            :rtype: list
+        """
+        _, kwargs = preprocess_args(domain=domain,
+                                    fields=fields,
+                                    offset=offset,
+                                    limit=limit,
+                                    order=order,
+                                    context=context)
+        return await self._client.execute(self._name, 'search_read',
+                                          **kwargs)
+
+    @stdcall
+    async def read(self, ids, fields=None, context=None):
+        """ Read *fields* for records with id in *ids*
+
+            :param int|list ids: ID or list of IDs of records to read data for
+            :param list fields: list of field names to read.
+                                if not passed all fields will be read.
+            :param dict context: dictionary with extra context
+            :return: list of dictionaries with data had been read
+            :rtype: list
+        """
+        args, kwargs = preprocess_args(ids, fields, context=context)
+        res = await self._client.execute(self._name, 'read', *args, **kwargs)
+        # Same as *Object.read*: ``read(<id>)`` returns dict
+        if res and isinstance(ids, int) and isinstance(res, list):
+            res = res[0]
+        return res
+
+    @stdcall
+    async def write(self, ids, vals, context=None):
+        """ Write data in *vals* dictionary to records with ID in *ids*
+
+            :param int|list ids: ID or list of IDs of records to write data for
+            :param dict vals: dictinary with values to be written to database
+                              for records specified by ids
+            :param dict context: context dictionary
+        """
+        args, kwargs = preprocess_args(ids, vals, context=context)
+        return await self._client.execute(self._name, 'write',
+                                          *args, **kwargs)
+
+    async def create(self, vals, context=None):
+        """ Create new record with *vals*
+
+            :param dict|list vals: dictionary (or list of dictionaries)
+                                   with values to be written to newly
+                                   created record
+            :param dict context: context dictionary
+            :return: ID (or list of IDs) of newly created record
+            :rtype: int|list
+        """
+        args, kwargs = preprocess_args(vals, context=context)
+        return await self._client.execute(self._name, 'create',
+                                          *args, **kwargs)
+
+    def __str__(self):
+        return "AsyncObject ('%s')" % self._name
+
+    def __repr__(self):
+        return str(self)
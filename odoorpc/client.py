@@ -66,10 +66,13 @@ Ability to use Record class as analog to browse_record:
 
 import six
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from extend_me import Extensible
 
 # project imports
 from .connection import get_connector, DEFAULT_TIMEOUT
+from .metrics import metrics
 from .exceptions import LoginException
 from .service import ServiceManager
 from .plugin import PluginManager
@@ -80,6 +83,10 @@ from . import orm  # noqa
 
 __all__ = ('Client',)
 
+# Default number of threads used by *Client.map_execute*. It is kept below
+# default size of JSON-RPC connection pool, so all calls reuse connections
+DEFAULT_MAP_WORKERS = 8
+
 RE_CLIENT_URL = re.compile(
     r"(?:(?P<protocol>[\w\-]+)\:\/\/)?(?:(?P<user>[\w\-]+)?"
     r"(?:\:(?P<pwd>[\w\-\.\,]+))?\@)?"
@@ -132,6 +139,7 @@ class Client(Extensible):
         self._user = None
         self._user_context = None
         self._database_version_full = None
+        self._server_version = None
 
     @property
     def dbname(self):
@@ -247,9 +255,21 @@ class Client(Extensible):
     @property
     def server_version(self):
         """ Server base version  ('8.0', '9.0', etc)
+
+            Resolved once per client (it is checked before most RPC calls)
+            and cached until ``reconnect`` or ``clean_caches``.
+        """
+        if self._server_version is None:
+            self._server_version = self.services.db.server_base_version()
+        return self._server_version
+
+    @server_version.setter
+    def server_version(self, value):
+        """ Seed cached server version (for example from value
+            persisted by previous run), to avoid RPC call on startup.
+            Set to None to force resolving it from server again.
         """
-        # This now correctly returns the version as a string, e.g., "18.0"
-        return self.services.db.server_base_version()
+        self._server_version = float(value) if value is not None else None
 
     @property
     def database_version_full(self):
@@ -332,6 +352,22 @@ class Client(Extensible):
 
         return uid
 
+    def clone(self):
+        """ Create new Client instance with same connection parameters
+            and credentials, but with its own connector (and HTTP session).
+            Already resolved user ID and server version are reused, so
+            clone does not make any RPC calls on creation.
+
+            Useful to give each worker thread its own client.
+
+            :rtype: Client
+        """
+        client = Client(pwd=self._pwd, timeout=self.connection.timeout,
+                        **self.get_init_args())
+        client._uid = self._uid
+        client._server_version = self._server_version
+        return client
+
     def reconnect(self):
         """ Recreates connection to the server and clears caches
 
@@ -341,6 +377,7 @@ class Client(Extensible):
         """
         self.services.clean_cache()
         self._uid = None
+        self._server_version = None
         self._uid = self.connect()
         return self._uid
 
@@ -360,6 +397,78 @@ class Client(Extensible):
         """
         return self.services['object'].execute(obj, method, *args, **kwargs)
 
+    def map_execute(self, obj, method, arglists, max_workers=DEFAULT_MAP_WORKERS,
+                    **kwargs):
+        """ Call method *method* on object *obj* once for each item of
+            *arglists*, running calls concurrently on thread pool.
+            Useful for independent calls, that could not be batched into
+            single call on server side (for example *search* with
+            different domains), to overlap network latency.
+
+            If connector is thread safe (JSON-RPC), then all threads share
+            this client and its pooled HTTP session, otherwise each thread
+            uses its own clone of this client (see *clone*).
+
+            Errors are captured per call, so failure of one call does not
+            affect others.
+
+            >>> res = cl.map_execute('res.partner', 'search',
+            ...                      [([('ref', '=', r)],) for r in refs],
+            ...                      limit=1)
+            >>> for ids, error in res:
+            ...     ...
+
+            :param obj: object name to call method for
+            :type obj: string
+            :param method: name of method to call
+            :type method: string
+            :param arglists: positional arguments for each call. Each item
+                             is tuple of arguments, any other value is
+                             passed as single argument
+            :type arglists: iterable
+            :param int max_workers: max number of concurrent calls
+            :param kwargs: keyword arguments passed to each call
+            :return: list of (result, error) tuples, in order of *arglists*.
+                     *error* is None if call succeeded, otherwise *result*
+                     is None and *error* is exception raised by call
+            :rtype: list
+        """
+        arglists = [args if isinstance(args, tuple) else (args,)
+                    for args in arglists]
+
+        def call(client, args):
+            try:
+                return client.execute(obj, method, *args, **kwargs), None
+            except Exception as exc:
+                return None, exc
+
+        workers = min(max(1, int(max_workers)), len(arglists))
+        if workers <= 1:
+            return [call(self, args) for args in arglists]
+
+        # login and create service once, before calls are spread
+        # over threads
+        self.uid  # noqa
+        self.services['object']  # noqa
+        shared = self.connection.thread_safe
+        local = threading.local()
+        scope = metrics.current_scope
+
+        def run(args):
+            if shared:
+                client = self
+            else:
+                client = getattr(local, 'client', None)
+                if client is None:
+                    client = local.client = self.clone()
+            # attribute calls to scope of calling thread
+            with metrics.scope(scope):
+                return call(client, args)
+
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='odoorpc') as executor:
+            return list(executor.map(run, arglists))
+
     def execute_wkf(self, object_name, signal, object_id):
         """ Triggers workflow event on specified object
 
@@ -483,6 +592,7 @@ class Client(Extensible):
         self._user_context = None
         self._user = None
         self._database_version_full = None
+        self._server_version = None
 
     def __str__(self):
         return u"Client: %s" % self.get_url()
@@ -10,6 +10,8 @@
 import six
 from extend_me import ExtensibleByHashType
 
+from .recording import RecordingProxy, get_recorder
+
 DEFAULT_TIMEOUT = None
 
 __all__ = ('get_connector', 'get_connector_names', 'ConnectorBase')
@@ -35,8 +37,16 @@ class ConnectorBase(six.with_metaclass(ConnectorType)):
         :param str host: hostname to connect to
         :param int port: port to connect to
         :param dict extra_args: extra arguments for specific connector.
+                                ``record_to`` (path) is supported by all
+                                connectors and records every call to that
+                                file (see *odoorpc.connection.recording*)
     """
 
+    #: True if services of this connector may be called from several
+    #: threads at once. Otherwise *Client.map_execute* gives each thread
+    #: its own client
+    thread_safe = False
+
     def __init__(self, host, port, timeout=DEFAULT_TIMEOUT, extra_args=None):
         self._host = host
         self._port = port
@@ -87,6 +97,10 @@ class ConnectorBase(six.with_metaclass(ConnectorType)):
         service = self.__services.get(name, None)
         if service is None:
             service = self._get_service(name)
+            record_to = self.extra_args.get('record_to')
+            if record_to:
+                service = RecordingProxy(service, name,
+                                         get_recorder(record_to))
             self.__services[name] = service
 
         return service
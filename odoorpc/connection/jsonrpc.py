@@ -10,17 +10,75 @@
 # python imports
 import simplejson  # Standard json cannot dump bytes on py3
 import random
+import six
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # project imports
 from .connection import ConnectorBase, DEFAULT_TIMEOUT
+from .recording import RECORDING_ARGS
 from .. import exceptions as exceptions
+from ..metrics import metrics
 from ..utils import ustr
 
 
 logger = logging.getLogger(__name__)
 
+# Default size of HTTP connection pool, shared by all services of connector
+DEFAULT_POOL_SIZE = 10
+
+# Default number of retries on connection errors (before request is sent)
+DEFAULT_MAX_RETRIES = 3
+
+# Names of extra_args consumed by connector to configure HTTP session.
+# They are not passed to JSONRPCProxy
+SESSION_ARGS = ('pool_size', 'max_retries', 'keep_alive')
+
+
+def _to_bool(value):
+    """ Convert value, that may be read from config file, to bool
+    """
+    if isinstance(value, six.string_types):
+        return value.strip().lower() not in ('0', 'false', 'no', 'off', '')
+    return bool(value)
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE,
+                   max_retries=DEFAULT_MAX_RETRIES,
+                   keep_alive=True):
+    """ Create pooled keep-alive HTTP session
+
+        Only connection errors are retried: at that point request was not
+        sent to server yet, so it is safe to retry even non-idempotent
+        RPC calls (like *create*).
+
+        :param int pool_size: max number of connections kept open per host
+        :param int max_retries: number of retries on connection errors
+        :param bool keep_alive: if False, connections will be closed
+                                after each request
+        :return: configured session
+        :rtype: requests.Session
+    """
+    retry = Retry(total=max_retries,
+                  connect=max_retries,
+                  read=0,
+                  redirect=0,
+                  status=0,
+                  backoff_factor=0.3,
+                  allowed_methods=None,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
 
 class JSONRPCError(exceptions.ConnectorError):
     """ JSON-RPC error wrapper
@@ -82,13 +140,22 @@ class JSONRPCMethod(object):
             "id": random.randint(0, 1000000000),
         }
 
+    def _metrics_key(self, args):
+        """ (model, method) key used to record payload sizes.
+            For *object.execute_kw* calls it is called model and method,
+            otherwise it is (service, method)
+        """
+        if self.__method in ('execute_kw', 'execute') and len(args) >= 5:
+            return args[3], args[4]
+        return self.__service, self.__method
+
     def __call__(self, *args):
         method_data = self.prepare_method_data(*args)
         data = simplejson.dumps(method_data)
 
         # Call rpc
         try:
-            res = requests.post(
+            res = self.__rpc_proxy.session.post(
                 self.__url, data=data,
                 headers={"Content-Type": "application/json"},
                 verify=self.__rpc_proxy.ssl_verify,
@@ -99,6 +166,9 @@ class JSONRPCMethod(object):
             logger.error(msg)
             raise JSONRPCError(msg)
 
+        model, method = self._metrics_key(args)
+        metrics.record_bytes(model, method, len(data), len(res.content))
+
         # Process results
         try:
             result = simplejson.loads(res.text)
@@ -127,7 +197,7 @@ class JSONRPCProxy(object):
     """ Simple Odoo service proxy wrapper
     """
     def __init__(self, host, port, service, ssl=False, ssl_verify=True,
-                 timeout=DEFAULT_TIMEOUT):
+                 timeout=DEFAULT_TIMEOUT, session=None):
         self.host = host
         self.port = port
         self.service = service
@@ -141,6 +211,10 @@ class JSONRPCProxy(object):
         self.ssl_verify = ssl_verify
         self.timeout = timeout
 
+        # HTTP session used to send requests. If not passed, then
+        # module-level requests functions are used (no connection reuse)
+        self.session = session if session is not None else requests
+
         # variable to cach methods
         self._methods = {}
 
@@ -159,7 +233,16 @@ class ConnectorJSONRPC(ConnectorBase):
 
         available extra arguments:
             - ssl_verify: (optional) if True, the SSL cert will be verified.
+            - pool_size: (optional) size of HTTP connection pool shared
+              by all services of this connector. Default: 10
+            - max_retries: (optional) number of retries on connection
+              errors. Default: 3
+            - keep_alive: (optional) if False, connections will not be
+              reused between requests. Default: True
     """
+    # pooled HTTP session may be used by several threads at once
+    thread_safe = True
+
     class Meta:
         name = 'json-rpc'
         use_ssl = False
@@ -169,14 +252,44 @@ class ConnectorJSONRPC(ConnectorBase):
     def __init__(self, *args, **kwargs):
         super(ConnectorJSONRPC, self).__init__(*args, **kwargs)
         self.extra_args.pop('verbose', None)
+        self._session = None
+
+    @property
+    def session(self):
+        """ Pooled HTTP session shared by all services of this connector
+        """
+        if self._session is None:
+            self._session = create_session(
+                pool_size=int(self.extra_args.get('pool_size',
+                                                  DEFAULT_POOL_SIZE)),
+                max_retries=int(self.extra_args.get('max_retries',
+                                                    DEFAULT_MAX_RETRIES)),
+                keep_alive=_to_bool(self.extra_args.get('keep_alive', True)))
+        return self._session
+
+    def close(self):
+        """ Close HTTP session and all pooled connections
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def update_extra_args(self, **kwargs):
+        """ Update extra args, clean service cache and recreate session
+        """
+        self.close()
+        super(ConnectorJSONRPC, self).update_extra_args(**kwargs)
 
     def _get_service(self, name):
+        proxy_args = {key: val for key, val in self.extra_args.items()
+                      if key not in SESSION_ARGS + RECORDING_ARGS}
         return JSONRPCProxy(self.host,
                             self.port,
                             name,
                             ssl=self.Meta.use_ssl,
                             timeout=self.timeout,
-                            **self.extra_args)
+                            session=self.session,
+                            **proxy_args)
 
 
 class ConnectorJSONRPCS(ConnectorJSONRPC):
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+# Copyright © 2014-2018 Dmytro Katyukha <dmytro.katyukha@gmail.com>
+
+#######################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public #
+# License, v. 2.0. If a copy of the MPL was not distributed with this #
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.            #
+#######################################################################
+
+""" asyncio JSON-RPC connectors
+
+    Unlike blocking connectors, services of these connectors return
+    coroutines, so single thread can keep many requests in flight.
+    Requests are sent over pool of keep-alive HTTP/1.1 connections, built
+    on asyncio streams (no extra dependencies).
+
+    These connectors are used by *odoorpc.async_client.AsyncClient* and
+    are not registered for blocking *Client*.
+"""
+
+import asyncio
+import collections
+import logging
+import random
+import ssl as ssl_module
+
+import simplejson
+
+from .connection import DEFAULT_TIMEOUT
+from .jsonrpc import (JSONRPCError,
+                      DEFAULT_POOL_SIZE,
+                      DEFAULT_MAX_RETRIES,
+                      _to_bool)
+from .recording import RECORDING_ARGS
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+__all__ = ('ConnectorJSONRPCAsync', 'ConnectorJSONRPCSAsync',
+           'get_async_connector', 'get_async_connector_names')
+
+# Delay between retries of failed connection attempts (multiplied by
+# number of attempt)
+BACKOFF_FACTOR = 0.3
+
+
+class _StaleConnection(Exception):
+    """ Raised when pooled connection was closed by server before
+        request was processed (so it is safe to resend request)
+    """
+    pass
+
+
+class AsyncHTTPConnectionPool(object):
+    """ Pool of keep-alive HTTP/1.1 connections to single host
+
+        At most *pool_size* requests are sent at same time, others wait
+        for free connection.
+
+        :param str host: host to connect to
+        :param int port: port to connect to
+        :param bool ssl: use HTTPS
+        :param bool ssl_verify: verify SSL certificate
+        :param int pool_size: max number of open connections
+        :param int max_retries: number of retries on connection errors
+        :param bool keep_alive: if False, connections will be closed
+                                after each request
+        :param float timeout: timeout of single request in seconds
+    """
+
+    def __init__(self, host, port, ssl=False, ssl_verify=True,
+                 pool_size=DEFAULT_POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES,
+                 keep_alive=True, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.ssl_verify = ssl_verify
+        self.pool_size = max(1, int(pool_size))
+        self.max_retries = max(0, int(max_retries))
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._idle = collections.deque()
+        self._semaphore = None
+        self._loop = None
+        # number of opened connections (for diagnostics)
+        self.connections_opened = 0
+
+    @property
+    def host_header(self):
+        default_port = 443 if self.ssl else 80
+        if not self.port or self.port == default_port:
+            return self.host
+        return '%s:%s' % (self.host, self.port)
+
+    def _ensure_loop(self):
+        """ Connections and semaphore belong to event loop they were
+            created in, so reset them if pool is used from other loop
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._idle.clear()
+            self._semaphore = asyncio.Semaphore(self.pool_size)
+            self._loop = loop
+
+    def _ssl_context(self):
+        if not self.ssl:
+            return None
+        context = ssl_module.create_default_context()
+        if not self.ssl_verify:
+            context.check_hostname = False
+            context.verify_mode = ssl_module.CERT_NONE
+        return context
+
+    async def _open(self):
+        attempt = 0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, ssl=self._ssl_context())
+                self.connections_opened += 1
+                return reader, writer
+            except OSError:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                await asyncio.sleep(BACKOFF_FACTOR * attempt)
+
+    async def post(self, path, body, content_type='application/json'):
+        """ Send POST request
+
+            :param str path: request path
+            :param bytes body: request body
+            :return: tuple (status code, response body)
+            :rtype: tuple
+        """
+        self._ensure_loop()
+        async with self._semaphore:
+            while self._idle:
+                reader, writer = self._idle.pop()
+                try:
+                    return await self._send(reader, writer, path, body,
+                                            content_type)
+                except _StaleConnection:
+                    # server closed idle connection, try next one
+                    continue
+            reader, writer = await self._open()
+            try:
+                return await self._send(reader, writer, path, body,
+                                        content_type)
+            except _StaleConnection:
+                raise ConnectionError("Connection closed by server")
+
+    async def _send(self, reader, writer, path, body, content_type):
+        request = ('POST %s HTTP/1.1\r\n'
+                   'Host: %s\r\n'
+                   'Content-Type: %s\r\n'
+                   'Content-Length: %d\r\n'
+                   'Connection: %s\r\n'
+                   '\r\n' % (path, self.host_header, content_type, len(body),
+                             'keep-alive' if self.keep_alive else 'close'))
+        reusable = False
+        try:
+            try:
+                writer.write(request.encode('latin-1') + body)
+                await writer.drain()
+                status_line = await asyncio.wait_for(reader.readline(),
+                                                     self.timeout)
+            except (ConnectionResetError, BrokenPipeError):
+                raise _StaleConnection()
+            if not status_line:
+                raise _StaleConnection()
+            status, content, reusable = await asyncio.wait_for(
+                self._read_response(reader, status_line), self.timeout)
+            return status, content
+        finally:
+            if reusable and self.keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+
+    async def _read_response(self, reader, status_line):
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        reusable = (version != 'HTTP/1.0' and
+                    headers.get('connection', '').lower() != 'close')
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(
+                    (await reader.readline()).split(b';')[0].strip(), 16)
+                if not size:
+                    # skip trailers
+                    while (await reader.readline()) not in (b'\r\n', b'\n',
+                                                            b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await reader.readexactly(
+                int(headers['content-length']))
+        else:
+            # response is delimited by closing connection
+            content = await reader.read()
+            reusable = False
+        return int(status), content, reusable
+
+    def close(self):
+        """ Close all idle connections
+        """
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class AsyncJSONRPCMethod(object):
+    """ Class that implements asynchronous RPC call via json-rpc protocol
+    """
+    __slots__ = ('__method', '__service', '__rpc_proxy')
+
+    def __init__(self, rpc_proxy, service, method):
+        self.__method = method
+        self.__service = service
+        self.__rpc_proxy = rpc_proxy
+
+    def prepare_method_data(self, *args):
+        """ Prepare data for JSON request
+        """
+        return {
+            "jsonrpc": "2.0",
+            "method": 'call',
+            "params": {
+                "service": self.__service,
+                "method": self.__method,
+                "args": args,
+            },
+            "id": random.randint(0, 1000000000),
+        }
+
+    def _metrics_key(self, args):
+        if self.__method in ('execute_kw', 'execute') and len(args) >= 5:
+            return args[3], args[4]
+        return self.__service, self.__method
+
+    async def __call__(self, *args):
+        data = simplejson.dumps(self.prepare_method_data(*args))
+
+        try:
+            status, content = await self.__rpc_proxy.pool.post(
+                '/jsonrpc', data.encode('utf-8'))
+        except (OSError, asyncio.TimeoutError,
+                asyncio.IncompleteReadError) as exc:
+            msg = ("Cannot connect to url %s\n"
+                   "Exception %r raised!" % (self.__rpc_proxy.url, exc))
+            logger.error(msg)
+            raise JSONRPCError(msg)
+
+        model, method = self._metrics_key(args)
+        metrics.record_bytes(model, method, len(data), len(content))
+
+        try:
+            result = simplejson.loads(content)
+        except ValueError:
+            info = {
+                "url": self.__rpc_proxy.url,
+                "code": status,
+                "content": content[:2000],
+            }
+            logger.error("Cannot decode JSON")
+            raise JSONRPCError("Cannot decode JSON: %s" % info)
+
+        if result.get("error", None):
+            error = result['error']
+            raise JSONRPCError(error['message'],
+                               code=error.get('code', None),
+                               data=error.get('data', None))
+        return result.get("result", None)
+
+
+class AsyncJSONRPCProxy(object):
+    """ Simple Odoo service proxy wrapper, methods of which return
+        coroutines
+    """
+    def __init__(self, pool, service):
+        self.pool = pool
+        self.service = service
+        self.url = '%s://%s/jsonrpc' % (pool.ssl and 'https' or 'http',
+                                        pool.host_header)
+        self._methods = {}
+
+    def __getattr__(self, name):
+        meth = self._methods.get(name, None)
+        if meth is None:
+            self._methods[name] = meth = AsyncJSONRPCMethod(self,
+                                                            self.service,
+                                                            name)
+        return meth
+
+
+class ConnectorJSONRPCAsync(object):
+    """ asyncio JSON-RPC connector
+
+        available extra arguments:
+            - ssl_verify: (optional) if True, the SSL cert will be verified.
+            - pool_size: (optional) max number of connections (and so
+              requests in flight). Default: 10
+            - max_retries: (optional) number of retries on connection
+              errors. Default: 3
+            - keep_alive: (optional) if False, connections will not be
+              reused between requests. Default: True
+    """
+    class Meta:
+        name = 'json-rpc-async'
+        ssl = False
+
+    def __init__(self, host, port, timeout=DEFAULT_TIMEOUT, extra_args=None):
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._extra_args = {} if extra_args is None else extra_args
+        unsupported = set(RECORDING_ARGS) & set(self._extra_args)
+        if unsupported:
+            raise ValueError("Extra arguments %s are not supported by "
+                             "async connector" % ', '.join(sorted(unsupported)))
+        self._pool = None
+        self.__services = {}
+
+    @property
+    def host(self):
+        """ Connector host
+        """
+        return self._host
+
+    @property
+    def port(self):
+        """ Connector port
+        """
+        return self._port
+
+    @property
+    def timeout(self):
+        """ Connector timeout
+        """
+        return self._timeout
+
+    @property
+    def extra_args(self):
+        """ Connector extra arguments
+        """
+        return self._extra_args
+
+    @property
+    def pool(self):
+        """ HTTP connection pool shared by all services of this connector
+        """
+        if self._pool is None:
+            self._pool = AsyncHTTPConnectionPool(
+                self.host, self.port,
+                ssl=self.Meta.ssl,
+                ssl_verify=_to_bool(self.extra_args.get('ssl_verify', True)),
+                pool_size=int(self.extra_args.get('pool_size',
+                                                  DEFAULT_POOL_SIZE)),
+                max_retries=int(self.extra_args.get('max_retries',
+                                                    DEFAULT_MAX_RETRIES)),
+                keep_alive=_to_bool(self.extra_args.get('keep_alive', True)),
+                timeout=self.timeout)
+        return self._pool
+
+    def get_service(self, name):
+        """ Returns service for specified *name*
+
+            :param name: name of service
+            :return: specified service instance
+        """
+        service = self.__services.get(name, None)
+        if service is None:
+            service = self.__services[name] = AsyncJSONRPCProxy(self.pool,
+                                                                name)
+        return service
+
+    def close(self):
+        """ Close all pooled connections
+        """
+        if self._pool is not None:
+            self._pool.close()
+
+
+class ConnectorJSONRPCSAsync(ConnectorJSONRPCAsync):
+    """ asyncio JSON-RPCS connector
+
+        available extra arguments:
+            - ssl_verify: (optional) if True, the SSL cert will be verified.
+            - pool_size, max_retries, keep_alive: same as for
+              *ConnectorJSONRPCAsync*
+    """
+    class Meta:
+        name = 'json-rpcs-async'
+        ssl = True
+
+
+_ASYNC_CONNECTORS = {cls.Meta.name: cls
+                     for cls in (ConnectorJSONRPCAsync,
+                                 ConnectorJSONRPCSAsync)}
+
+
+def get_async_connector(name):
+    """ Return async connector specified by it's name
+    """
+    try:
+        return _ASYNC_CONNECTORS[name]
+    except KeyError:
+        raise ValueError("Unknown async connector: %s" % name)
+
+
+def get_async_connector_names():
+    """ Returns list of async connector names
+    """
+    return list(_ASYNC_CONNECTORS)
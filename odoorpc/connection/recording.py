@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+#######################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public #
+# License, v. 2.0. If a copy of the MPL was not distributed with this #
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.            #
+#######################################################################
+
+""" Recording and replay of RPC traffic
+
+    Any connector (json-rpc, xml-rpc, ...) records every service call when
+    created with ``record_to`` extra argument::
+
+        cl = Client('host', 'db', 'user', 'pwd', protocol='json-rpc',
+                    record_to='source.jsonl.gz')
+
+    Each call is appended to gzip-compressed file as one JSON line with
+    service, method, arguments and result (or error). Passwords are
+    never written to recording.
+
+    Recording can be served back offline by ``replay`` connector::
+
+        cl = Client('host', 'db', 'user', 'pwd', protocol='replay',
+                    replay_from='source.jsonl.gz')
+
+    Calls are matched by service, method and arguments. If exact call was
+    not recorded (for example domain contains current time), next unused
+    response of same model and method is returned.
+"""
+
+import atexit
+import collections
+import gzip
+import json
+import threading
+import time
+
+
+__all__ = ('RECORDING_ARGS', 'RPCRecorder', 'RecordingProxy', 'Cassette',
+           'get_recorder', 'get_cassette', 'close_recorders')
+
+
+# Names of extra_args consumed by recording. They are not passed to proxies
+RECORDING_ARGS = ('record_to', 'replay_from')
+
+# Placeholder written instead of passwords
+REDACTED = '********'
+
+_registry_lock = threading.Lock()
+_recorders = {}
+_cassettes = {}
+
+
+def _redact(service, method, args):
+    """ Return *args* with password replaced by placeholder
+    """
+    args = list(args)
+    if ((service == 'object' and method in ('execute_kw', 'execute')) or
+            (service == 'common' and method in ('login', 'authenticate'))):
+        if len(args) > 2:
+            args[2] = REDACTED
+    return args
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, default=str,
+                      separators=(',', ':'))
+
+
+def call_key(service, method, args):
+    """ Key of exact call (service, method, arguments without password)
+    """
+    return _dumps([service, method, _redact(service, method, args)])
+
+
+def loose_key(service, method, args):
+    """ Key of call ignoring arguments: (model, model method) for object
+        service calls and (service, method) for others
+    """
+    if service == 'object' and len(args) >= 5:
+        return (service, method, args[3], args[4])
+    return (service, method)
+
+
+def dump_error(exc):
+    """ Serializable description of exception raised by RPC call
+    """
+    fault = getattr(exc, 'fault', None)
+    if fault is not None:
+        return {'type': type(exc).__name__, 'code': fault.faultCode,
+                'message': fault.faultString}
+    if hasattr(exc, 'code') and hasattr(exc, 'data'):
+        return {'type': type(exc).__name__, 'code': exc.code,
+                'message': getattr(exc, 'message', str(exc)),
+                'data': exc.data}
+    return {'type': type(exc).__name__, 'message': str(exc)}
+
+
+class RPCRecorder(object):
+    """ Thread-safe writer of recorded calls to gzip-compressed JSON lines
+        file. One recorder is shared by all connectors that record to
+        same path (see *get_recorder*).
+
+        :param str path: path of recording file (truncated on open)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def record(self, service, method, args, result=None, error=None,
+               seconds=0.0):
+        """ Append one call to recording
+        """
+        entry = {
+            'service': service,
+            'method': method,
+            'args': _redact(service, method, args),
+            'seconds': round(seconds, 6),
+        }
+        if error is not None:
+            entry['error'] = error
+        else:
+            entry['result'] = result
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self.calls += 1
+
+    def close(self):
+        """ Flush and close recording file
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class _RecordingMethod(object):
+    __slots__ = ('_method', '_service', '_name', '_recorder')
+
+    def __init__(self, method, service, name, recorder):
+        self._method = method
+        self._service = service
+        self._name = name
+        self._recorder = recorder
+
+    def __call__(self, *args):
+        started = time.perf_counter()
+        try:
+            result = self._method(*args)
+        except Exception as exc:
+            self._recorder.record(self._service, self._name, args,
+                                  error=dump_error(exc),
+                                  seconds=time.perf_counter() - started)
+            raise
+        self._recorder.record(self._service, self._name, args, result=result,
+                              seconds=time.perf_counter() - started)
+        return result
+
+
+class RecordingProxy(object):
+    """ Wrapper around service proxy of any connector, that records all
+        calls made through it
+
+        :param proxy: service proxy returned by connector
+        :param str service: name of service
+        :param RPCRecorder recorder: recorder to write calls to
+    """
+
+    def __init__(self, proxy, service, recorder):
+        self._proxy = proxy
+        self._service = service
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return _RecordingMethod(getattr(self._proxy, name), self._service,
+                                name, self._recorder)
+
+
+class Cassette(object):
+    """ Recorded calls loaded from file, served in recorded order
+
+        :param str path: path of recording file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = []
+        self._exact = collections.defaultdict(collections.deque)
+        self._loose = collections.defaultdict(collections.deque)
+        self._used = set()
+        # number of calls served by (model, method) instead of exact match
+        self.inexact = 0
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                index = len(self._entries)
+                self._entries.append(entry)
+                service, method = entry['service'], entry['method']
+                self._exact[call_key(service, method,
+                                     entry['args'])].append(index)
+                self._loose[loose_key(service, method,
+                                      entry['args'])].append(index)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def entries(self):
+        """ All recorded calls (list of dicts), in recorded order
+        """
+        return list(self._entries)
+
+    @property
+    def unused(self):
+        """ Number of recorded calls that were not replayed yet
+        """
+        return len(self._entries) - len(self._used)
+
+    def _pop(self, queue):
+        while queue:
+            index = queue.popleft()
+            if index not in self._used:
+                self._used.add(index)
+                return self._entries[index]
+        return None
+
+    def lookup(self, service, method, args):
+        """ Find recorded entry for call
+
+            :return: tuple (entry, exact) or (None, False) if there is no
+                     unused recorded call of same model and method
+        """
+        with self._lock:
+            entry = self._pop(self._exact.get(call_key(service, method, args),
+                                              collections.deque()))
+            if entry is not None:
+                return entry, True
+            entry = self._pop(self._loose.get(
+                loose_key(service, method, args), collections.deque()))
+            if entry is not None:
+                self.inexact += 1
+            return entry, False
+
+
+def get_recorder(path):
+    """ Return recorder for *path*, shared by all connectors of process
+    """
+    with _registry_lock:
+        recorder = _recorders.get(path)
+        if recorder is None:
+            recorder = _recorders[path] = RPCRecorder(path)
+        return recorder
+
+
+def get_cassette(path):
+    """ Return cassette loaded from *path*, shared by all connectors of
+        process (so each recorded call is replayed once)
+    """
+    with _registry_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = _cassettes[path] = Cassette(path)
+        return cassette
+
+
+def close_recorders():
+    """ Close all recording files (called automatically at exit)
+    """
+    with _registry_lock:
+        recorders = list(_recorders.values())
+        _recorders.clear()
+    for recorder in recorders:
+        recorder.close()
+
+
+atexit.register(close_recorders)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+#######################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public #
+# License, v. 2.0. If a copy of the MPL was not distributed with this #
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.            #
+#######################################################################
+
+import logging
+
+from six.moves import xmlrpc_client as xmlrpclib
+
+from .connection import ConnectorBase
+from .jsonrpc import JSONRPCError
+from .recording import get_cassette
+from .xmlrpc import XMLRPCError
+from .. import exceptions as exceptions
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayError(exceptions.ConnectorError):
+    """ Raised when call was not found in recording
+    """
+    pass
+
+
+def _restore_error(error):
+    """ Build exception equal to recorded one
+    """
+    if error['type'] == 'JSONRPCError':
+        return JSONRPCError(error['message'], code=error.get('code'),
+                            data=error.get('data'))
+    if error['type'] == 'XMLRPCError':
+        return XMLRPCError(xmlrpclib.Fault(error.get('code'),
+                                           error['message']))
+    return exceptions.ConnectorError(error['message'])
+
+
+class ReplayMethod(object):
+    """ Serves responses of one service method from cassette
+    """
+    __slots__ = ('_cassette', '_service', '_method')
+
+    def __init__(self, cassette, service, method):
+        self._cassette = cassette
+        self._service = service
+        self._method = method
+
+    def __call__(self, *args):
+        entry, exact = self._cassette.lookup(self._service, self._method,
+                                             args)
+        if entry is None:
+            raise ReplayError(
+                "Call %s.%s%s was not found in recording %s" % (
+                    self._service, self._method,
+                    tuple(args[3:5]) if len(args) >= 5 else '',
+                    self._cassette.path))
+        if not exact:
+            logger.debug("Inexact replay of %s.%s: arguments differ from "
+                         "recording", self._service, self._method)
+        if 'error' in entry:
+            raise _restore_error(entry['error'])
+        return entry['result']
+
+
+class ReplayProxy(object):
+    """ Service proxy that serves recorded responses
+    """
+
+    def __init__(self, cassette, service):
+        self._cassette = cassette
+        self._service = service
+
+    def __getattr__(self, name):
+        return ReplayMethod(self._cassette, self._service, name)
+
+
+class ConnectorReplay(ConnectorBase):
+    """ Offline connector that serves responses recorded by
+        ``record_to`` extra argument of other connectors
+
+        required extra arguments:
+            - replay_from: path of recording file
+    """
+    # recorded calls are looked up under lock
+    thread_safe = True
+
+    class Meta:
+        name = 'replay'
+
+    def __init__(self, *args, **kwargs):
+        super(ConnectorReplay, self).__init__(*args, **kwargs)
+        if not self.extra_args.get('replay_from'):
+            raise ValueError("'replay_from' extra argument is required "
+                             "for replay connector")
+
+    @property
+    def cassette(self):
+        """ Recorded calls served by this connector
+        """
+        return get_cassette(self.extra_args['replay_from'])
+
+    def _get_service(self, name):
+        return ReplayProxy(self.cassette, name)
@@ -14,6 +14,7 @@ from six.moves import http_client as httplib
 
 # project imports
 from .connection import ConnectorBase, DEFAULT_TIMEOUT
+from .recording import RECORDING_ARGS
 from ..utils import ustr
 from .. import exceptions as exceptions
 
@@ -150,11 +151,13 @@ class ConnectorXMLRPC(ConnectorBase):
         return '%s://%s/xmlrpc/%s' % (proto, addr, service_name)
 
     def _get_service(self, name):
+        proxy_args = {key: val for key, val in self.extra_args.items()
+                      if key not in RECORDING_ARGS}
         return XMLRPCProxy(
             self.get_service_url(name),
             timeout=self.timeout,
             ssl=self.Meta.ssl,
-            **self.extra_args)
+            **proxy_args)
 
 
 class ConnectorXMLRPCS(ConnectorXMLRPC):
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+#######################################################################
+# This Source Code Form is subject to the terms of the Mozilla Public #
+# License, v. 2.0. If a copy of the MPL was not distributed with this #
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.            #
+#######################################################################
+
+""" RPC instrumentation
+
+    Collects, per (scope, model, method), number of calls, errors,
+    wall-time histogram and request/response sizes.
+
+    *Scope* is a free-form label bound to current thread (for example
+    name of sync module that makes calls)::
+
+        from odoorpc.metrics import metrics
+
+        with metrics.scope('ContactSyncModule'):
+            client['res.partner'].search_read([], ['name'])
+
+        metrics.write_json('rpc_metrics.json')
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+
+
+__all__ = ('RPCMetrics', 'metrics', 'DEFAULT_BUCKETS')
+
+
+# Upper bounds (in seconds) of wall-time histogram buckets
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, float('inf'))
+
+# Scope used for calls made outside of any *scope()* block
+DEFAULT_SCOPE = ''
+
+
+class _CallStats(object):
+    """ Aggregated statistics of one (scope, model, method) key
+    """
+    __slots__ = ('calls', 'errors', 'seconds', 'request_bytes',
+                 'response_bytes', 'buckets')
+
+    def __init__(self, n_buckets):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.buckets = [0] * n_buckets
+
+
+class RPCMetrics(object):
+    """ Thread-safe collector of RPC call statistics
+
+        :param tuple buckets: upper bounds (seconds) of histogram buckets,
+                              last one should be ``inf``
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # Scopes
+    @property
+    def current_scope(self):
+        """ Scope bound to current thread
+        """
+        return getattr(self._local, 'scope', DEFAULT_SCOPE)
+
+    @contextmanager
+    def scope(self, name):
+        """ Attribute all calls made by current thread inside this block
+            to scope *name*. Scopes may be nested.
+        """
+        previous = self.current_scope
+        self._local.scope = name
+        try:
+            yield self
+        finally:
+            self._local.scope = previous
+
+    # Recording
+    def _get(self, model, method):
+        key = (self.current_scope, model, method)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _CallStats(len(self.buckets))
+        return stats
+
+    def record_call(self, model, method, seconds, error=False):
+        """ Record one call of *method* on *model*
+
+            :param str model: name of model (or service for non-object calls)
+            :param str method: name of called method
+            :param float seconds: wall time of call
+            :param bool error: True if call raised exception
+        """
+        with self._lock:
+            stats = self._get(model, method)
+            stats.calls += 1
+            stats.seconds += seconds
+            if error:
+                stats.errors += 1
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats.buckets[index] += 1
+                    break
+
+    def record_bytes(self, model, method, request_bytes, response_bytes):
+        """ Record sizes of request and response bodies of one call
+        """
+        with self._lock:
+            stats = self._get(model, method)
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+
+    def reset(self):
+        """ Forget all collected statistics
+        """
+        with self._lock:
+            self._stats = {}
+
+    # Reporting
+    def snapshot(self):
+        """ Collected statistics
+
+            :return: list of dicts with keys: scope, model, method, calls,
+                     errors, seconds, request_bytes, response_bytes,
+                     buckets (list of [upper bound, count] pairs)
+            :rtype: list
+        """
+        with self._lock:
+            items = sorted(self._stats.items())
+            return [{
+                'scope': scope,
+                'model': model,
+                'method': method,
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'seconds': stats.seconds,
+                'request_bytes': stats.request_bytes,
+                'response_bytes': stats.response_bytes,
+                'buckets': [[bound, count] for bound, count
+                            in zip(self.buckets, stats.buckets)],
+            } for (scope, model, method), stats in items]
+
+    def totals(self):
+        """ Statistics aggregated per scope
+
+            :return: dict {scope: dict(calls, errors, seconds,
+                     request_bytes, response_bytes)}
+            :rtype: dict
+        """
+        result = {}
+        for row in self.snapshot():
+            total = result.setdefault(row['scope'], {
+                'calls': 0, 'errors': 0, 'seconds': 0.0,
+                'request_bytes': 0, 'response_bytes': 0})
+            for key in total:
+                total[key] += row[key]
+        return result
+
+    def write_json(self, path):
+        """ Write collected statistics to *path* as JSON
+        """
+        data = {
+            'totals': self.totals(),
+            'calls': [dict(row, buckets=[[str(bound), count]
+                                         for bound, count in row['buckets']])
+                      for row in self.snapshot()],
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    def write_prometheus(self, path, prefix='odoorpc'):
+        """ Write collected statistics to *path* in Prometheus text
+            exposition format (suitable for node_exporter textfile collector)
+
+            Each metric family is written as one block: its ``HELP`` and
+            ``TYPE`` lines followed by all of its samples.
+        """
+        rows = self.snapshot()
+        labels = [_prometheus_labels(scope=row['scope'], model=row['model'],
+                                     method=row['method'])
+                  for row in rows]
+        lines = []
+        for name, help_text, key in (
+                ('calls_total', 'RPC calls', 'calls'),
+                ('errors_total', 'Failed RPC calls', 'errors'),
+                ('request_bytes_total', 'Bytes sent in requests',
+                 'request_bytes'),
+                ('response_bytes_total', 'Bytes received in responses',
+                 'response_bytes')):
+            lines.append('# HELP %s_%s %s' % (prefix, name, help_text))
+            lines.append('# TYPE %s_%s counter' % (prefix, name))
+            for row, row_labels in zip(rows, labels):
+                lines.append('%s_%s{%s} %d' % (
+                    prefix, name, row_labels, row[key]))
+        lines.append('# HELP %s_call_seconds RPC call duration' % prefix)
+        lines.append('# TYPE %s_call_seconds histogram' % prefix)
+        for row, row_labels in zip(rows, labels):
+            cumulative = 0
+            for bound, count in row['buckets']:
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('%s_call_seconds_bucket{%s,le="%s"} %d' % (
+                    prefix, row_labels, le, cumulative))
+            lines.append('%s_call_seconds_sum{%s} %f' % (
+                prefix, row_labels, row['seconds']))
+            lines.append('%s_call_seconds_count{%s} %d' % (
+                prefix, row_labels, row['calls']))
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def _prometheus_labels(**labels):
+    """ Format *labels* as a Prometheus label set, escaping backslashes,
+        double quotes and newlines in the values
+    """
+    return ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\')
+                     .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items())
+
+
+# Process-wide collector used by odoorpc services and connectors
+metrics = RPCMetrics()
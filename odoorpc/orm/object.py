@@ -297,6 +297,58 @@ class Object(six.with_metaclass(ObjectType, DirMixIn)):
             index = dict((r['id'], r) for r in read)
             return [index[x] for x in ids if x in index]
 
+    def iter_search_read(self, domain=None, fields=None, chunk_size=500,
+                         context=None, order='id asc', keyset=None):
+        """ Search and read records specified by domain, chunk by chunk
+
+            Records are paged by keyset (by default ``id > last_id``, ordered
+            by id) instead of offset, so each request stays cheap on server
+            side and memory is bounded by *chunk_size*. Next chunk is
+            requested only when previous one was consumed.
+
+            To page in another order, pass *order* together with a *keyset*
+            callable building the domain of records located after the last
+            record of the previous chunk, e.g. for ``write_date asc, id asc``:
+
+            >>> def after(record):
+            ...     return ['|', ('write_date', '>', record['write_date']),
+            ...             '&', ('write_date', '=', record['write_date']),
+            ...             ('id', '>', record['id'])]
+            >>> for chunk in Partner.iter_search_read(
+            ...         [], ['name', 'write_date'],
+            ...         order='write_date asc, id asc', keyset=after):
+            ...     pass
+
+            The fields used by *keyset* must be part of *fields*.
+
+            :param list domain: search domain
+            :param list fields: list of field names to read
+            :param int chunk_size: max number of records per chunk
+            :param dict context: dictionary with extra context
+            :param str order: sort order, it must match *keyset*
+            :param keyset: callable returning the domain of records after
+                the given record (default: ``id > record['id']``)
+            :return: generator of lists of dictionaries with data had been read
+        """
+        domain = list(domain or [])
+        chunk_size = max(1, int(chunk_size))
+        after = []
+        if keyset is None:
+            keyset = lambda record: [('id', '>', record['id'])]
+            after = keyset({'id': 0})
+        while True:
+            chunk = self.search_read(domain + after,
+                                     fields=fields,
+                                     limit=chunk_size,
+                                     order=order,
+                                     context=context)
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            after = keyset(chunk[-1])
+
     def search_count(self, domain=None, context=None):
         """ Returns the number of records matching the provided domain.
 
@@ -7,9 +7,12 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.            #
 #######################################################################
 
+import time
+
 from pkg_resources import parse_version
 
 from ..service.service import ServiceBase
+from ..metrics import metrics
 
 
 class ObjectService(ServiceBase):
@@ -35,13 +38,20 @@ class ObjectService(ServiceBase):
             kwargs = kwargs.copy()
             del kwargs['context']
 
-        result = self._service.execute_kw(self.client.dbname,
-                                          self.client.uid,
-                                          self.client._pwd,
-                                          obj,
-                                          method,
-                                          args,
-                                          kwargs)
+        started = time.perf_counter()
+        error = True
+        try:
+            result = self._service.execute_kw(self.client.dbname,
+                                              self.client.uid,
+                                              self.client._pwd,
+                                              obj,
+                                              method,
+                                              args,
+                                              kwargs)
+            error = False
+        finally:
+            metrics.record_call(obj, method,
+                                time.perf_counter() - started, error=error)
         return result
 
     def execute_wkf(self, object_name, signal, object_id):
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة الإنشاء الدفعي بحجم دفعة متكيف
+batch_creator.py
+
+الغرض:
+- إرسال السجلات الجديدة إلى الوجهة عبر `create([...])` على دفعات بدلاً من
+  استدعاء واحد يحتوي على جميع سجلات الوحدة.
+- تكييف حجم الدفعة حسب زمن الاستجابة الفعلي (زمن مستهدف لكل استدعاء) وحجم
+  البيانات المرسلة، حتى لا تتجاوز الاستدعاءات مهلة الطلب في Odoo Online.
+- عند رفض الخادم لدفعة (خطأ تحقق من Odoo)، يتم تقسيمها إلى نصفين وإعادة المحاولة
+  (bisect) حتى يتم عزل السجلات غير الصالحة فقط، بينما يتم إنشاء بقية السجلات السليمة.
+- عند أخطاء الاتصال أو انتهاء المهلة لا تتم إعادة إرسال الدفعة، لأن الخادم ربما
+  أنشأها بالفعل: يتم البحث عن سجلاتها في الوجهة عبر حقل المزامنة، وما لم يُعثر
+  عليه يُسجل كفاشل لإعادة محاولته لاحقًا (`--retry-failed`).
+"""
+
+import json
+import logging
+import time
+
+from odoorpc.connection.jsonrpc import JSONRPCError
+
+
+class AdaptiveBatchCreator:
+    """
+    خدمة مشتركة تستخدمها وحدات المزامنة لإنشاء السجلات الجديدة.
+    """
+    DEFAULT_BATCH_SIZE = 100
+    MAX_BATCH_SIZE = 1000
+    DEFAULT_TARGET_SECONDS = 10.0
+    # الحد الأقصى التقريبي لحجم بيانات استدعاء `create` واحد (بالبايت).
+    MAX_PAYLOAD_BYTES = 2 * 1024 * 1024
+
+    def __init__(self, dest_conn, model, batch_size=DEFAULT_BATCH_SIZE, target_seconds=DEFAULT_TARGET_SECONDS,
+                 max_batch_size=MAX_BATCH_SIZE, max_payload_bytes=MAX_PAYLOAD_BYTES, sync_field=None, logger=None):
+        """
+        Args:
+            dest_conn: كائن اتصال Odoo API للوجهة.
+            model (str): اسم النموذج (مثال: 'account.move').
+            batch_size (int): حجم الدفعة الابتدائي.
+            target_seconds (float): الزمن المستهدف لكل استدعاء `create`.
+            max_batch_size (int): الحد الأقصى لحجم الدفعة.
+            max_payload_bytes (int): الحد الأقصى التقريبي لحجم بيانات الدفعة.
+            sync_field (str): حقل المزامنة المخصص (مثال: 'x_move_sync_id') للبحث عن
+                سجلات الدفعة في الوجهة بعد خطأ اتصال (اختياري).
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.dest = dest_conn
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_size = min(max(1, int(batch_size)), self.max_batch_size)
+        self.target_seconds = float(target_seconds)
+        self.max_payload_bytes = int(max_payload_bytes)
+        self.sync_field = sync_field
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+    @staticmethod
+    def _payload_size(vals):
+        return len(json.dumps(vals, default=str))
+
+    def _next_chunk(self, pending, sizes):
+        """
+        أخذ الدفعة التالية من بداية قائمة الفهارس المعلقة، بحيث لا تتجاوز حجم
+        الدفعة الحالي ولا الحد الأقصى لحجم البيانات (مع سجل واحد على الأقل).
+        """
+        chunk, payload = [], 0
+        for index in pending[:self.batch_size]:
+            if chunk and payload + sizes[index] > self.max_payload_bytes:
+                break
+            chunk.append(index)
+            payload += sizes[index]
+        return chunk
+
+    def _adapt(self, chunk_size, elapsed, grow=True):
+        """
+        تعديل حجم الدفعة حسب زمن آخر استدعاء ناجح مقارنة بالزمن المستهدف.
+        لا يتم تكبير الدفعة إذا كان `grow` خطأ (أثناء عزل سجل خاطئ).
+        """
+        if elapsed > self.target_seconds:
+            # تصغير الدفعة بنسبة تجاوز الزمن المستهدف.
+            self.batch_size = max(1, int(chunk_size * self.target_seconds / elapsed))
+        elif grow and elapsed < self.target_seconds / 2 and chunk_size >= self.batch_size:
+            # الاستدعاء سريع والدفعة كانت ممتلئة: مضاعفة الحجم.
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    @staticmethod
+    def _is_rejected(error):
+        """
+        هل رفض الخادم الدفعة (خطأ تحقق يعيده Odoo مع بيانات الخطأ)؟ في هذه الحالة
+        يتم التراجع عن معاملة الاستدعاء كاملة في الخادم، فإعادة الإرسال آمنة.
+        """
+        return isinstance(error, JSONRPCError) and bool(error.data)
+
+    def _find_created(self, chunk, vals_list):
+        """
+        البحث في الوجهة عن سجلات دفعة انقطع استدعاؤها، عبر قيم حقل المزامنة.
+
+        Returns:
+            dict: {فهرس السجل: معرف الوجهة} للسجلات التي أنشأها الخادم بالفعل.
+        """
+        if not self.sync_field:
+            return {}
+        indexes = {vals_list[index].get(self.sync_field): index for index in chunk if vals_list[index].get(self.sync_field)}
+        if not indexes:
+            return {}
+        try:
+            rows = self.dest[self.model].search_read([(self.sync_field, 'in', list(indexes))], ['id', self.sync_field])
+        except Exception as e:
+            self.logger.warning(f"      - تعذر البحث عن سجلات الدفعة في الوجهة ({e}).")
+            return {}
+        return {indexes[row[self.sync_field]]: row['id'] for row in rows if row.get(self.sync_field) in indexes}
+
+    def create(self, vals_list):
+        """
+        إنشاء السجلات على دفعات متكيفة مع عزل السجلات الفاشلة.
+
+        Args:
+            vals_list (list): قائمة قواميس القيم للسجلات الجديدة.
+
+        Returns:
+            tuple: (قاموس {فهرس السجل في القائمة: معرف الوجهة الجديد}،
+                    قاموس {فهرس السجل: الخطأ} للسجلات التي فشل إنشاؤها).
+        """
+        created, failed = {}, {}
+        sizes = [self._payload_size(vals) for vals in vals_list]
+        pending = list(range(len(vals_list)))
+        calls = 0
+        # عدد الفهارس في بداية `pending` التي تنتمي إلى دفعة مرفوضة لم يُعزل سجلها
+        # الخاطئ بعد؛ لا يتم تكبير الدفعة قبل الانتهاء منها.
+        suspect = 0
+
+        while pending:
+            chunk = self._next_chunk(pending, sizes)
+            del pending[:len(chunk)]
+            isolating = suspect > 0
+            suspect = max(0, suspect - len(chunk))
+            calls += 1
+            started = time.monotonic()
+            try:
+                new_ids = self.dest[self.model].create([vals_list[index] for index in chunk])
+            except Exception as e:
+                if not self._is_rejected(e):
+                    # خطأ اتصال أو انتهاء مهلة: ربما أنشأ الخادم الدفعة، فلا يعاد إرسالها.
+                    found = self._find_created(chunk, vals_list)
+                    created.update(found)
+                    failed.update((index, e) for index in chunk if index not in found)
+                    self.logger.warning(
+                        f"      - انقطع إنشاء دفعة من {len(chunk)} سجل {self.model} ({e}). "
+                        f"تم العثور على {len(found)} منها في الوجهة، وسيعاد محاولة البقية لاحقًا."
+                    )
+                    continue
+                if len(chunk) == 1:
+                    failed[chunk[0]] = e
+                    continue
+                # تقسيم الدفعة الفاشلة إلى نصفين وإعادتهما إلى بداية القائمة،
+                # وعدم إرسال دفعات أكبر من النصف حتى يتم عزل السجل الخاطئ.
+                half = len(chunk) // 2
+                pending[:0] = chunk
+                suspect += len(chunk)
+                self.batch_size = half
+                self.logger.warning(f"      - فشل إنشاء دفعة من {len(chunk)} سجل {self.model} ({e}). التقسيم إلى دفعات من {half}.")
+                continue
+
+            if isinstance(new_ids, int):
+                new_ids = [new_ids]
+            created.update(zip(chunk, new_ids))
+            self._adapt(len(chunk), time.monotonic() - started, grow=not isolating)
+
+        self.logger.info(
+            f"      - تم إنشاء {len(created)} سجل {self.model} في {calls} استدعاء create "
+            f"(فشل {len(failed)}، حجم الدفعة الحالي {self.batch_size})."
+        )
+        return created, failed
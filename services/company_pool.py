@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة المعالجة المتوازية لكل شركة
+company_pool.py
+
+الغرض:
+- تشغيل وحدات عمل مستقلة (شركة واحدة لكل وحدة) على مجموعة خيوط محدودة العدد،
+  بدلاً من المرور على الشركات واحدة تلو الأخرى في وحدتي الحسابات والضرائب.
+- منح كل خيط عميل Odoo خاصًا به للمصدر وللوجهة (`Client.clone()`) حتى لا تتم
+  مشاركة حالة HTTP بين الخيوط.
+- جمع نتائج كل وحدة عمل (الروابط والسجلات الفاشلة) في `SyncResult` بدلاً من
+  الكتابة في `SyncKeyManager` من داخل الخيوط؛ تقوم الوحدة بدمج جميع النتائج في
+  معاملة واحدة بعد انتهاء جميع الشركات.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from odoorpc.metrics import metrics
+
+
+class CompanyWorkerPool:
+    """
+    مجموعة خيوط محدودة لتشغيل وحدات العمل الخاصة بكل شركة.
+
+    مثال:
+        pool = CompanyWorkerPool(source_conn, dest_conn, max_workers=4)
+        for company, result, error in pool.map(sync_company, companies):
+            ...
+    """
+    DEFAULT_WORKERS = 4
+
+    def __init__(self, source_conn, dest_conn, max_workers=DEFAULT_WORKERS, logger=None):
+        """
+        Args:
+            source_conn: كائن اتصال Odoo API للمصدر.
+            dest_conn: كائن اتصال Odoo API للوجهة.
+            max_workers (int): الحد الأقصى لعدد الشركات التي تتم معالجتها في نفس الوقت.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.source = source_conn
+        self.dest = dest_conn
+        self.max_workers = max(1, int(max_workers))
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self._local = threading.local()
+
+    def _connections(self):
+        """
+        اتصالات المصدر والوجهة الخاصة بخيط التشغيل الحالي.
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = (self.source.clone(), self.dest.clone())
+        return connections
+
+    def map(self, work, items):
+        """
+        تنفيذ `work(item, source_conn, dest_conn)` لكل عنصر.
+        فشل وحدة عمل لا يوقف بقية الوحدات.
+
+        Args:
+            work (callable): دالة وحدة العمل.
+            items (list): عناصر العمل (مثل الشركات).
+
+        Returns:
+            list: قائمة (العنصر، النتيجة، الخطأ أو None) بنفس ترتيب العناصر.
+        """
+        items = list(items)
+        if self.max_workers == 1 or len(items) <= 1:
+            return [self._run(work, item, (self.source, self.dest)) for item in items]
+
+        # نسب استدعاءات RPC في الخيوط إلى الوحدة التي أطلقتها.
+        scope = metrics.current_scope
+
+        def run_in_worker(item):
+            with metrics.scope(scope):
+                return self._run(work, item, self._connections())
+
+        workers = min(self.max_workers, len(items))
+        self.logger.info(f"  - معالجة {len(items)} شركة على {workers} خيط.")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='company') as executor:
+            return list(executor.map(run_in_worker, items))
+
+    def _run(self, work, item, connections):
+        try:
+            return item, work(item, *connections), None
+        except Exception as e:
+            return item, None, e
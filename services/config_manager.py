@@ -67,6 +67,42 @@ class ConfigManager:
         except KeyError:
             raise ValueError("Section 'ONLINE_ODOO' not found or incomplete in config.ini")
 
+    # القيم الافتراضية لإعدادات المزامنة (قسم [sync] اختياري في config.ini).
+    DEFAULT_SYNC_SETTINGS = {
+        'deletion_scan_every': 1,
+        'deletion_chunk_size': 1000,
+        'max_workers': 1,
+        'company_workers': 4,
+        'rpc_concurrency': 8,
+        'read_chunk_size': 500,
+        'pipeline_queue_size': 2,
+        'create_batch_size': 100,
+        'create_target_seconds': 10.0,
+        'preload_mappings': True,
+        'reference_cache_ttl': 86400,
+        'sqlite_synchronous': 'NORMAL',
+        'sqlite_cache_size': -8000,
+    }
+
+    def get_sync_settings(self):
+        """
+        جلب إعدادات سلوك المزامنة من قسم [sync] الاختياري.
+        القيم غير المحددة تأخذ القيم الافتراضية.
+
+        Returns:
+            dict: قاموس الإعدادات (القيم محولة إلى نوع القيمة الافتراضية).
+        """
+        settings = dict(self.DEFAULT_SYNC_SETTINGS)
+        if self.config.has_section('sync'):
+            for key, default in self.DEFAULT_SYNC_SETTINGS.items():
+                if not self.config.has_option('sync', key):
+                    continue
+                if isinstance(default, bool):
+                    settings[key] = self.config.getboolean('sync', key)
+                else:
+                    settings[key] = type(default)(self.config.get('sync', key))
+        return settings
+
 # --- مثال على كيفية الاستخدام (للاختبار فقط) ---
 # يتم تشغيل هذا الجزء فقط إذا تم تشغيل الملف مباشرة (وليس عند استيراده كوحدة).
 if __name__ == '__main__':
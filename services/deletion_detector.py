@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة اكتشاف السجلات المحذوفة في المصدر
+deletion_detector.py
+
+الغرض:
+- تحديد السجلات التي تم ربطها سابقًا (موجودة في `SyncKeyManager`) ولم تعد
+  موجودة في نظام المصدر، دون جلب جميع معرفات النموذج عبر `search([])`.
+- يتم ذلك بتقسيم المعرفات المربوطة إلى مجموعات وسؤال المصدر عن المعرفات
+  التي لا تزال موجودة في كل مجموعة، ثم حساب الفرق باستخدام عمليات المجموعات.
+- جدولة الفحص بحيث يمكن تشغيله كل N تشغيلات بدلاً من كل تشغيل.
+"""
+
+import logging
+
+
+class DeletionDetector:
+    """
+    خدمة مشتركة تستخدمها وحدات المزامنة في `_handle_deletions`.
+    """
+    DEFAULT_CHUNK_SIZE = 1000
+
+    def __init__(self, source_conn, key_manager, chunk_size=DEFAULT_CHUNK_SIZE, scan_every=1, logger=None):
+        """
+        تهيئة الخدمة.
+
+        Args:
+            source_conn: كائن اتصال Odoo API للمصدر.
+            key_manager: كائن مدير مفاتيح المزامنة.
+            chunk_size (int): عدد المعرفات المربوطة التي يتم فحصها في كل استدعاء `search`.
+            scan_every (int): تشغيل فحص الحذف مرة كل N تشغيلات (1 = في كل تشغيل).
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.source = source_conn
+        self.key_manager = key_manager
+        self.chunk_size = max(1, int(chunk_size))
+        self.scan_every = max(1, int(scan_every))
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def is_due(self, scan_key):
+        """
+        تحديد ما إذا كان فحص الحذف مستحقًا في هذا التشغيل.
+        يتم حفظ عدد التشغيلات منذ آخر فحص في جدول `meta` لكل مفتاح.
+
+        Args:
+            scan_key (str): مفتاح الجدولة (عادة اسم وحدة المزامنة).
+
+        Returns:
+            bool: True إذا كان يجب تشغيل الفحص الآن.
+        """
+        if self.scan_every <= 1:
+            return True
+        meta_key = f"deletion_scan_runs:{scan_key}"
+        runs = int(self.key_manager.get_meta(meta_key, 0)) + 1
+        if runs >= self.scan_every:
+            self.key_manager.set_meta(meta_key, 0)
+            return True
+        self.key_manager.set_meta(meta_key, runs)
+        self.logger.info(f"  - تخطي فحص الحذف لـ {scan_key} (التشغيل {runs}/{self.scan_every}).")
+        return False
+
+    def find_deleted(self, model):
+        """
+        إيجاد السجلات المربوطة التي لم تعد موجودة في المصدر.
+
+        Args:
+            model (str): اسم النموذج (مثال: 'res.partner').
+
+        Returns:
+            dict: قاموس {معرف المصدر: معرف الوجهة} للسجلات المحذوفة من المصدر.
+        """
+        deleted = {}
+        checked = 0
+        for mappings in self.key_manager.iter_mappings(model, self.chunk_size):
+            chunk = dict(mappings)
+            # تعطيل active_test حتى لا تُعتبر السجلات المؤرشفة محذوفة.
+            existing = set(self.source[model].search(
+                [('id', 'in', list(chunk))], context={'active_test': False}))
+            for source_id in chunk.keys() - existing:
+                deleted[source_id] = chunk[source_id]
+            checked += len(chunk)
+
+        self.logger.debug(f"  - تم فحص {checked} معرف مربوط لـ {model}، المحذوف منها: {len(deleted)}.")
+        return deleted
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة تتبع السجلات الفاشلة (dead-letter)
+failed_records.py
+
+الغرض:
+- تسجيل كل سجل فشلت مزامنته (التحويل، الإنشاء، التحديث، الترحيل) في جدول
+  `failed_records` داخل `sync_map.db` مع المرحلة والخطأ وعدد المحاولات،
+  بدلاً من الاكتفاء بكتابته في `error.log`.
+- إزالة السجل من الجدول بمجرد نجاح مزامنته.
+- توفير قائمة المعرفات التي حان موعد إعادة محاولتها لوضع `main.py --retry-failed`،
+  مع مهلة تتضاعف بين التشغيلات (exponential backoff).
+"""
+
+import logging
+
+# مراحل الفشل المسجلة.
+STAGE_TRANSFORM = 'transform'
+STAGE_CREATE = 'create'
+STAGE_UPDATE = 'update'
+STAGE_POST = 'post'
+
+
+class FailedRecordTracker:
+    """
+    خدمة مشتركة تستخدمها وحدات المزامنة لتسجيل السجلات الفاشلة وإعادة محاولتها.
+    """
+    RETRY_BASE_SECONDS = 60
+    RETRY_MAX_SECONDS = 24 * 60 * 60
+
+    def __init__(self, key_manager, module_name, model, logger=None):
+        """
+        Args:
+            key_manager: كائن مدير مفاتيح المزامنة (يحفظ السجلات الفاشلة).
+            module_name (str): اسم وحدة المزامنة.
+            model (str): اسم النموذج في المصدر.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.key_manager = key_manager
+        self.module_name = module_name
+        self.model = model
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def record(self, source_ids, stage, error):
+        """
+        تسجيل فشل مجموعة من السجلات في نفس المرحلة وبنفس الخطأ.
+
+        Args:
+            source_ids (iterable): معرفات المصدر.
+            stage (str): مرحلة الفشل (مثل STAGE_CREATE).
+            error: الخطأ أو رسالة الفشل.
+        """
+        self.record_many({source_id: error for source_id in source_ids}, stage)
+
+    def record_many(self, errors, stage):
+        """
+        تسجيل فشل مجموعة من السجلات لكل منها خطؤه الخاص.
+
+        Args:
+            errors (dict): قاموس {معرف المصدر: الخطأ}.
+            stage (str): مرحلة الفشل.
+        """
+        if not errors:
+            return
+        self.key_manager.record_failures(
+            self.module_name, self.model,
+            {source_id: (stage, error) for source_id, error in errors.items()},
+            base_delay=self.RETRY_BASE_SECONDS, max_delay=self.RETRY_MAX_SECONDS
+        )
+
+    def clear(self, source_ids):
+        """
+        إزالة السجلات التي نجحت مزامنتها من قائمة السجلات الفاشلة.
+        """
+        self.key_manager.clear_failures(self.module_name, self.model, source_ids)
+
+    def due_ids(self):
+        """
+        معرفات المصدر التي حان موعد إعادة محاولتها.
+
+        Returns:
+            list: قائمة معرفات المصدر مرتبة تصاعديًا.
+        """
+        due = self.key_manager.get_failed_records(self.module_name, self.model, due_only=True)
+        pending = self.key_manager.get_failed_records(self.module_name, self.model, due_only=False)
+        if len(pending) > len(due):
+            self.logger.info(f"  - {len(pending) - len(due)} سجل فاشل لم يحن موعد إعادة محاولته بعد.")
+        return [row['source_id'] for row in due]
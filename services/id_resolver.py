@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة حل معرفات الوجهة دفعة واحدة
+id_resolver.py
+
+الغرض:
+- تحويل قائمة من معرفات المصدر إلى معرفات الوجهة المقابلة لها باستخدام حقول
+  `x_*_sync_id` المخصصة، عبر استدعاء `search_read` واحد لكل مجموعة (chunk)
+  بدلاً من استدعاء `search` لكل سجل على حدة.
+- تغذية النتائج في `SyncKeyManager` حتى تبقى قاعدة بيانات الربط المحلية متزامنة
+  مع ما هو موجود فعليًا في نظام الوجهة.
+"""
+
+import logging
+
+
+class DestinationIdResolver:
+    """
+    خدمة مشتركة لحل معرفات الوجهة لمجموعة من معرفات المصدر في نموذج معين.
+    تستخدمها جميع وحدات المزامنة لتصنيف السجلات (إنشاء أم تحديث) بعدد
+    استدعاءات يتناسب مع عدد المجموعات وليس مع عدد السجلات.
+    """
+    DEFAULT_CHUNK_SIZE = 500
+
+    def __init__(self, dest_conn, key_manager=None, chunk_size=DEFAULT_CHUNK_SIZE, logger=None):
+        """
+        تهيئة الخدمة.
+
+        Args:
+            dest_conn: كائن اتصال Odoo API للوجهة.
+            key_manager: كائن مدير مفاتيح المزامنة (اختياري) لتسجيل الروابط المكتشفة.
+            chunk_size (int): الحد الأقصى لعدد المعرفات في كل استدعاء `search_read`.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.dest = dest_conn
+        self.key_manager = key_manager
+        self.chunk_size = max(1, int(chunk_size))
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def resolve(self, model, sync_field, source_ids):
+        """
+        حل معرفات الوجهة لقائمة من معرفات المصدر.
+
+        Args:
+            model (str): اسم النموذج في الوجهة (مثال: 'res.partner').
+            sync_field (str): اسم حقل المزامنة المخصص (مثال: 'x_partner_sync_id').
+            source_ids (iterable): معرفات المصدر المطلوب حلها.
+
+        Returns:
+            dict: قاموس {معرف المصدر: معرف الوجهة} للسجلات الموجودة في الوجهة فقط.
+        """
+        unique_ids = sorted({int(sid) for sid in source_ids if sid})
+        resolved = {}
+        if not unique_ids:
+            return resolved
+
+        for start in range(0, len(unique_ids), self.chunk_size):
+            chunk = unique_ids[start:start + self.chunk_size]
+            rows = self.dest[model].search_read(
+                [(sync_field, 'in', [str(sid) for sid in chunk])],
+                ['id', sync_field]
+            )
+            for row in rows:
+                if not row.get(sync_field):
+                    continue
+                try:
+                    source_id = int(row[sync_field])
+                except (TypeError, ValueError):
+                    continue
+                # الاحتفاظ بأول تطابق فقط (مطابق لسلوك `search(..., limit=1)` السابق).
+                resolved.setdefault(source_id, row['id'])
+
+        self.logger.debug(
+            f"  - تم حل {len(resolved)}/{len(unique_ids)} معرف لـ {model} عبر {sync_field} "
+            f"في {(len(unique_ids) + self.chunk_size - 1) // self.chunk_size} استدعاء."
+        )
+
+        if self.key_manager is not None:
+            self.key_manager.add_mappings_bulk(model, resolved)
+
+        return resolved
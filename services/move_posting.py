@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة ترحيل وإلغاء ترحيل الحركات المحاسبية دفعة واحدة
+move_posting.py
+
+الغرض:
+- قراءة حالة جميع الحركات (account.move) المستهدفة في استدعاء واحد.
+- إلغاء ترحيل المجموعة المرحلة منها (`button_draft`) في استدعاء واحد.
+- ترحيل الدفعة كاملة (`action_post`) في استدعاء واحد.
+- الرجوع إلى المعالجة سجلًا بسجل فقط عند فشل الاستدعاء المجمع، حتى لا يمنع
+  سجل واحد غير صالح ترحيل بقية الدفعة.
+"""
+
+import logging
+
+from services.write_planner import WritePlanner
+
+
+class MovePostingPipeline:
+    """
+    خدمة مشتركة لوحدتي مزامنة الفواتير وقيود اليومية.
+    """
+    def __init__(self, dest_conn, model='account.move', logger=None, error_logger=None):
+        """
+        تهيئة الخدمة.
+
+        Args:
+            dest_conn: كائن اتصال Odoo API للوجهة.
+            model (str): اسم نموذج الحركات (الافتراضي 'account.move').
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+            error_logger: كائن المنسق المستخدم لتسجيل الأخطاء.
+        """
+        self.dest = dest_conn
+        self.model = model
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.error_logger = error_logger if error_logger is not None else self.logger
+
+    def read_states(self, destination_ids):
+        """
+        قراءة حالة مجموعة من الحركات في استدعاء `read` واحد.
+
+        Returns:
+            dict: قاموس {معرف الوجهة: الحالة}.
+        """
+        ids = list(dict.fromkeys(destination_ids))
+        if not ids:
+            return {}
+        return {row['id']: row['state'] for row in self.dest[self.model].read(ids, ['state'])}
+
+    def _call(self, method, destination_ids):
+        """
+        استدعاء دالة سير العمل (`action_post` أو `button_draft`) على الدفعة كاملة،
+        ثم على كل سجل على حدة إذا فشل الاستدعاء المجمع.
+
+        Returns:
+            tuple: (قائمة المعرفات الناجحة، قاموس {المعرف: الخطأ} للفاشلة).
+        """
+        ids = list(dict.fromkeys(destination_ids))
+        if not ids:
+            return [], {}
+        try:
+            getattr(self.dest[self.model].browse(ids), method)()
+            return ids, {}
+        except Exception as e:
+            if len(ids) == 1:
+                return [], {ids[0]: e}
+            self.logger.warning(f"      - فشل استدعاء {method} المجمع لـ {len(ids)} حركة ({e}). المحاولة سجلًا بسجل.")
+
+        succeeded, failed = [], {}
+        for destination_id in ids:
+            try:
+                getattr(self.dest[self.model].browse([destination_id]), method)()
+                succeeded.append(destination_id)
+            except Exception as e:
+                failed[destination_id] = e
+        return succeeded, failed
+
+    def post(self, destination_ids):
+        """
+        ترحيل مجموعة من الحركات في استدعاء `action_post` واحد.
+
+        Returns:
+            tuple: (قائمة المعرفات المرحلة، قاموس {المعرف: الخطأ} للفاشلة).
+        """
+        posted, failed = self._call('action_post', destination_ids)
+        for destination_id, error in failed.items():
+            self.error_logger.error(f"    - [خطأ] فشل في ترحيل الحركة ID {destination_id}. الخطأ: {error}")
+        return posted, failed
+
+    def unpost(self, destination_ids, states=None):
+        """
+        إلغاء ترحيل الحركات المرحلة فقط من بين المعرفات المعطاة في استدعاء
+        `button_draft` واحد.
+
+        Args:
+            destination_ids (iterable): معرفات الحركات في الوجهة.
+            states (dict): حالات الحركات إذا كانت مقروءة مسبقًا (اختياري).
+
+        Returns:
+            tuple: (قائمة المعرفات التي تم إلغاء ترحيلها، قاموس {المعرف: الخطأ} للفاشلة).
+        """
+        if states is None:
+            states = self.read_states(destination_ids)
+        posted_ids = [did for did in destination_ids if states.get(did) == 'posted']
+        if posted_ids:
+            self.logger.info(f"      - إلغاء ترحيل {len(posted_ids)} حركة دفعة واحدة.")
+        drafted, failed = self._call('button_draft', posted_ids)
+        for destination_id, error in failed.items():
+            self.error_logger.error(f"    - [خطأ] فشل في إلغاء ترحيل الحركة ID {destination_id}. الخطأ: {error}")
+        return drafted, failed
+
+    def update(self, updates, post_ids=()):
+        """
+        تحديث مجموعة من الحركات مع الحفاظ على حالة الترحيل:
+        قراءة الحالات مرة واحدة، إلغاء ترحيل المرحلة منها دفعة واحدة، الكتابة،
+        ثم إعادة ترحيل ما كان مرحلًا دفعة واحدة.
+
+        Args:
+            updates (list): قائمة أزواج (معرف الوجهة، القيم المراد كتابتها).
+            post_ids (iterable): معرفات الوجهة التي حركتها في المصدر مرحلة؛ يتم ترحيل
+                ما بقي منها مسودة بعد الكتابة (مثل حركة أُنشئت وفشل ترحيلها سابقًا).
+
+        Returns:
+            tuple: (قائمة المعرفات التي تم تحديثها، قاموس {المعرف: الخطأ} للفاشلة).
+        """
+        if not updates:
+            return [], {}
+        states = self.read_states([did for did, _ in updates])
+        _, failed = self.unpost([did for did, _ in updates], states)
+
+        # تجميع الكتابات ذات القيم المتطابقة في استدعاء write واحد لكل مجموعة.
+        planner = WritePlanner(self.dest, self.model, logger=self.logger)
+        for destination_id, vals in updates:
+            if destination_id not in failed:
+                planner.add(destination_id, vals)
+        written, write_failed = planner.flush()
+        for destination_id, error in write_failed.items():
+            self.error_logger.error(f"    - [خطأ] فشل في تحديث الحركة ID {destination_id}. الخطأ: {error}")
+        failed.update(write_failed)
+
+        # إعادة ترحيل الحركات التي كانت مرحلة قبل التحديث، وترحيل المسودات
+        # التي يجب أن تكون مرحلة حسب حالة المصدر.
+        post_ids = set(post_ids)
+        to_repost = [
+            did for did in written
+            if states.get(did) == 'posted' or (did in post_ids and states.get(did) == 'draft')
+        ]
+        if to_repost:
+            self.logger.info(f"      - إعادة ترحيل {len(to_repost)} حركة دفعة واحدة.")
+        _, repost_failed = self.post(to_repost)
+        failed.update(repost_failed)
+        return written, failed
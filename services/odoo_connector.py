@@ -36,6 +36,15 @@ class OdooConnector:
         self.db = credentials.get('db')
         self.username = credentials.get('username')
         self.password = credentials.get('password')
+        # إعدادات تجمع اتصالات HTTP (اختيارية): حجم التجمع، عدد إعادة المحاولة
+        # عند أخطاء الاتصال، وإبقاء الاتصال مفتوحًا بين الطلبات.
+        # `record_to`: تسجيل جميع طلبات/ردود RPC في ملف مضغوط.
+        # `replay_from`: تشغيل المزامنة دون شبكة بإعادة الردود المسجلة من ملف.
+        self.connection_args = {
+            key: credentials[key]
+            for key in ('pool_size', 'max_retries', 'keep_alive', 'record_to', 'replay_from')
+            if credentials.get(key) not in (None, '')
+        }
         self.api = None
         # يتم استدعاء دالة الاتصال عند تهيئة الكائن.
         self._connect()
@@ -52,6 +61,9 @@ class OdooConnector:
             # تحديد البروتوكول (http/https) والمنفذ بناءً على الـ URL.
             # odoorpc يتعامل مع هذه التفاصيل تلقائيًا بناءً على البروتوكول المحدد.
             protocol = 'json-rpcs' if self.url.startswith('https') else 'json-rpc'
+            if self.connection_args.get('replay_from'):
+                # إعادة الردود المسجلة دون الاتصال بالخادم.
+                protocol = 'replay'
             
             # تحليل الـ URL لاستخراج المضيف والمنفذ.
             parsed_url = urlparse(self.url)
@@ -66,7 +78,8 @@ class OdooConnector:
                 self.username,
                 self.password,
                 protocol=protocol,
-                port=port
+                port=port,
+                **self.connection_args
             )
             self.logger.info(f"تم الاتصال وتسجيل الدخول بنجاح إلى Odoo في '{self.url}' (قاعدة البيانات: {self.db})")
             self.logger.debug(f"[DEBUG] In _connect: self.api type: {type(self.api)}, self.api.uid: {self.api.uid if self.api else 'N/A'}")
@@ -94,6 +107,42 @@ class OdooConnector:
             self._connect()
         return self.api
 
+    def close(self):
+        """
+        إغلاق جلسة HTTP الخاصة بهذا الاتصال وجميع الاتصالات المفتوحة في تجمعها.
+        """
+        if self.api is None:
+            return
+        close = getattr(self.api.connection, 'close', None)
+        if close is not None:
+            close()
+
+    def get_async_api(self):
+        """
+        إنشاء عميل asyncio (`odoorpc.AsyncClient`) لنفس الخادم وبيانات الاعتماد،
+        يسمح بإبقاء عدد كبير من طلبات RPC قيد التنفيذ من خيط واحد.
+        يعيد استخدام معرف المستخدم من الاتصال الحالي فلا يحتاج لتسجيل دخول جديد.
+
+        Returns:
+            odoorpc.AsyncClient: عميل Odoo غير متزامن.
+        Raises:
+            ValueError: عند تشغيل المزامنة من ردود مسجلة (`replay_from`) أو مع `record_to`،
+                لأن العميل غير المتزامن لا يدعمهما.
+        """
+        parsed_url = urlparse(self.url)
+        port = parsed_url.port if parsed_url.port else (443 if parsed_url.scheme == 'https' else 8069)
+        protocol = 'json-rpcs-async' if self.url.startswith('https') else 'json-rpc-async'
+        return odoorpc.AsyncClient(
+            parsed_url.hostname,
+            self.db,
+            self.username,
+            self.password,
+            protocol=protocol,
+            port=port,
+            uid=self.get_api().uid,
+            **self.connection_args
+        )
+
     def ensure_custom_field(self, model_name, field_name, field_label, field_type='char'):
         """
         تضمن وجود حقل مخصص في نموذج Odoo معين. إذا لم يكن موجودًا، تقوم بإنشائه.
@@ -141,6 +190,71 @@ class OdooConnector:
             # إذا كان الحقل موجودًا بالفعل، لا تفعل شيئًا.
             self.logger.info(f"  - الحقل '{field_name}' موجود بالفعل في النموذج '{model_name}'.")
 
+    def ensure_custom_fields(self, fields):
+        """
+        تضمن وجود مجموعة من الحقول المخصصة دفعة واحدة: استدعاء `search_read` واحد
+        على `ir.model.fields` لجميع الحقول، ثم إنشاء الحقول الناقصة فقط في
+        استدعاء `create` واحد (مع استدعاء واحد لـ `ir.model` لحل معرفات النماذج).
+
+        Args:
+            fields (list): قائمة (النموذج، اسم الحقل، الاسم المرئي، نوع الحقل).
+        Returns:
+            list: قائمة (النموذج، اسم الحقل) للحقول التي تم إنشاؤها.
+        Raises:
+            ValueError: إذا كان نموذج أحد الحقول الناقصة غير موجود في الوجهة.
+            Exception: إذا فشل إنشاء الحقول المخصصة.
+        """
+        fields = list(fields)
+        if not fields:
+            return []
+        IrModelFields = self.api['ir.model.fields']
+
+        # 1. البحث عن جميع الحقول في استدعاء واحد ثم المطابقة في الذاكرة.
+        models = sorted({model_name for model_name, _, _, _ in fields})
+        names = sorted({field_name for _, field_name, _, _ in fields})
+        existing = {
+            (row['model'], row['name'])
+            for row in IrModelFields.search_read([('model', 'in', models), ('name', 'in', names)], ['model', 'name'])
+        }
+        missing = [field for field in fields if (field[0], field[1]) not in existing]
+        if not missing:
+            self.logger.info(f"  - جميع الحقول المخصصة ({len(fields)}) موجودة بالفعل.")
+            return []
+
+        # 2. حل معرفات النماذج للحقول الناقصة فقط في استدعاء واحد.
+        missing_models = sorted({model_name for model_name, _, _, _ in missing})
+        model_ids = {
+            row['model']: row['id']
+            for row in self.api['ir.model'].search_read([('model', 'in', missing_models)], ['id', 'model'])
+        }
+        unknown = [model_name for model_name in missing_models if model_name not in model_ids]
+        if unknown:
+            raise ValueError(f"النماذج التالية غير موجودة في Odoo: {', '.join(unknown)}")
+
+        # 3. إنشاء جميع الحقول الناقصة في استدعاء واحد.
+        for model_name, field_name, _, _ in missing:
+            self.logger.info(f"  - الحقل '{field_name}' غير موجود في النموذج '{model_name}'. جاري الإنشاء...")
+        try:
+            IrModelFields.create([
+                {
+                    'name': field_name,
+                    'model': model_name,
+                    'model_id': model_ids[model_name],
+                    'field_description': field_label,
+                    'ttype': field_type,
+                    'store': True,
+                    'index': True,
+                    'required': False,
+                    'readonly': False,
+                }
+                for model_name, field_name, field_label, field_type in missing
+            ])
+        except Exception as e:
+            self.logger.error(f"  - خطأ أثناء إنشاء {len(missing)} حقل مخصص: {e}")
+            raise
+        self.logger.info(f"  - تم إنشاء {len(missing)} حقل مخصص بنجاح.")
+        return [(model_name, field_name) for model_name, field_name, _, _ in missing]
+
 # --- مثال على كيفية الاستخدام (للاختبار فقط) ---
 # يتم تشغيل هذا الجزء فقط إذا تم تشغيل الملف مباشرة (وليس عند استيراده كوحدة).
 if __name__ == '__main__':
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة تخطي عمليات الكتابة التي لا تغير شيئًا
+payload_hash.py
+
+الغرض:
+- حساب بصمة ثابتة (SHA-1) لناتج `_transform_data` لكل سجل.
+- حفظ البصمة مع الربط في `sync_map.db` بعد كل كتابة ناجحة في الوجهة.
+- تخطي تحديث السجلات التي تغير `write_date` الخاص بها في المصدر دون أن تتغير
+  البيانات التي نزامنها فعليًا (مثل إضافة رسالة في المحادثة)، وبالتالي تجنب
+  `write()` ودورة إلغاء الترحيل وإعادة الترحيل للحركات المرحلة.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+
+
+def payload_hash(payload, exclude=()):
+    """
+    حساب بصمة ثابتة لقاموس البيانات بغض النظر عن ترتيب المفاتيح.
+
+    Args:
+        payload (dict): البيانات المحولة المراد كتابتها في الوجهة.
+        exclude (iterable): مفاتيح يتم تجاهلها (مثل حقل `x_*_sync_id`).
+
+    Returns:
+        str: البصمة بصيغة hex.
+    """
+    data = {key: _without_clear_commands(value) for key, value in payload.items() if key not in exclude}
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def _without_clear_commands(value):
+    """
+    إزالة أوامر الحذف الشامل `(5, 0, 0)` من قائمة أوامر x2many.
+    مسار التحديث يبدأ سطور الحركة بهذا الأمر بينما لا يحتاجه مسار الإنشاء، والنتيجة
+    في الوجهة واحدة في الحالتين، لذلك يجب أن تكون البصمة واحدة أيضًا.
+    """
+    if not isinstance(value, (list, tuple)):
+        return value
+    return [command for command in value if not (isinstance(command, (list, tuple)) and command and command[0] == 5)]
+
+
+class PayloadHashFilter:
+    """
+    خدمة مشتركة تستخدمها وحدات المزامنة قبل تحديث السجلات الموجودة.
+    """
+    # حقول تتغير مع كل تعديل في المصدر (نسخ من `write_date`) ولا تمثل تغييرًا
+    # في البيانات نفسها، لذا يتم استبعادها من البصمة.
+    IGNORED_FIELDS = ('write_date', 'x_original_write_date')
+
+    def __init__(self, key_manager, model, sync_field=None, logger=None):
+        """
+        Args:
+            key_manager: كائن مدير مفاتيح المزامنة (يحفظ البصمات مع الروابط).
+            model (str): اسم النموذج (مثال: 'res.partner').
+            sync_field (str): حقل معرف المزامنة في الوجهة (مثال: 'x_partner_sync_id')،
+                يتم استبعاده من البصمة لأنه يضاف فقط عند الإنشاء.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.key_manager = key_manager
+        self.model = model
+        self.exclude = self.IGNORED_FIELDS + ((sync_field,) if sync_field else ())
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        # عدد السجلات التي تم تخطيها خلال هذا التشغيل. يتم تحديثه تحت القفل لأن
+        # `filter_updates` تُستدعى من خيوط `CompanyWorkerPool` في نفس الوقت.
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def hash(self, data):
+        """
+        بصمة البيانات المحولة لسجل واحد.
+        """
+        return payload_hash(data, self.exclude)
+
+    def filter_updates(self, records_to_update):
+        """
+        إزالة السجلات التي لم تتغير بياناتها منذ آخر كتابة ناجحة.
+        يتم إضافة المفتاح 'payload_hash' لكل سجل متبقٍ لحفظه بعد نجاح الكتابة.
+
+        Args:
+            records_to_update (list): قائمة قواميس {'id', 'data', 'source_id'}.
+
+        Returns:
+            list: السجلات التي تحتاج إلى تحديث فعلًا.
+        """
+        if not records_to_update:
+            return records_to_update
+        stored = self.key_manager.get_payload_hashes(self.model, [rec['source_id'] for rec in records_to_update])
+        changed = []
+        for record in records_to_update:
+            record['payload_hash'] = self.hash(record['data'])
+            # التخطي فقط إذا كانت البصمة لنفس سجل الوجهة.
+            if stored.get(record['source_id']) == (record['id'], record['payload_hash']):
+                continue
+            changed.append(record)
+
+        skipped = len(records_to_update) - len(changed)
+        if skipped:
+            with self._lock:
+                self.skipped += skipped
+            self.logger.info(f"    - تم تخطي {skipped} سجل {self.model} لم تتغير بياناته منذ آخر مزامنة.")
+        return changed
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+ذاكرة البيانات المرجعية في الوجهة
+reference_cache.py
+
+الغرض:
+- ربط البيانات المرجعية التي نادرًا ما تتغير (البلدان، علامات الضرائب، العملات،
+  الشركات) بمعرفاتها في الوجهة عبر الاسم أو الرمز، بدلاً من استدعاء `search`
+  في الوجهة لكل جهة اتصال أو سطر قيد.
+- حفظ الجدول في `sync_map.db` (جدول `reference_data`) وتحميله مرة واحدة عند بدء
+  المحرك ومشاركته بين جميع الوحدات.
+- تحديث بيانات النموذج بعد انتهاء مدة الصلاحية (TTL) فقط إذا تغيرت بصمته في
+  الوجهة (عدد السجلات وأحدث `write_date`).
+"""
+
+import logging
+import threading
+import time
+
+
+class ReferenceDataCache:
+    """
+    ذاكرة دائمة مفتاحها (النموذج، حقل البحث، القيمة) وقيمتها معرف الوجهة.
+
+    مثال:
+        reference_data = ReferenceDataCache(dest_conn, key_manager, ttl=86400)
+        reference_data.load()
+        country_id = reference_data.get('res.country', 'name', 'Egypt')
+    """
+    # حقول البحث لكل نموذج مرجعي؛ المفتاح المركب يُكتب كمجموعة حقول.
+    KEYS = {
+        'res.country': (('code',), ('name',)),
+        'res.currency': (('name',),),
+        'res.company': (('name',),),
+        'account.account.tag': (('name', 'applicability', 'country_id'),),
+    }
+    # نماذج تحتوي على سجلات غير نشطة يجب ربطها أيضًا (مثل عملة غير مفعلة في الوجهة).
+    INCLUDE_INACTIVE = ('res.country', 'res.currency')
+    DEFAULT_TTL = 86400
+
+    def __init__(self, dest_conn, key_manager, ttl=DEFAULT_TTL, namespace='', logger=None):
+        """
+        Args:
+            dest_conn: كائن اتصال Odoo API للوجهة.
+            key_manager: كائن مدير مفاتيح المزامنة (مكان حفظ الجدول).
+            ttl (int): مدة صلاحية البيانات المحفوظة بالثواني قبل فحص تغيرها في الوجهة.
+            namespace (str): معرف خادم الوجهة وقاعدة بياناته، حتى لا تُستخدم بيانات
+                محفوظة لوجهة أخرى.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.dest = dest_conn
+        self.key_manager = key_manager
+        self.ttl = ttl
+        self.namespace = namespace
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        # model -> {(key_field, key): destination_id}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, models=None):
+        """
+        تحميل البيانات المرجعية لجميع النماذج (أو النماذج المحددة).
+
+        Args:
+            models (iterable): النماذج المطلوب تحميلها، الافتراضي جميع نماذج `KEYS`.
+        """
+        for model in models or self.KEYS:
+            self._ensure(model)
+
+    def get(self, model, fields, values):
+        """
+        إرجاع معرف الوجهة لسجل مرجعي، أو None إذا لم يوجد.
+
+        Args:
+            model (str): اسم النموذج (مثال: 'res.country').
+            fields (str|tuple): حقل البحث أو مجموعة الحقول المركبة.
+            values: قيمة الحقل أو مجموعة القيم المقابلة.
+        """
+        if isinstance(fields, str):
+            fields, values = (fields,), (values,)
+        return self._ensure(model).get((self._key_field(fields), self._key(values)))
+
+    def get_tax_tag(self, name, applicability, country_id):
+        """
+        إرجاع معرف علامة الضريبة في الوجهة بمطابقة (الاسم، قابلية التطبيق، البلد في الوجهة).
+        """
+        return self.get('account.account.tag', ('name', 'applicability', 'country_id'), (name, applicability, country_id))
+
+    def _ensure(self, model):
+        entries = self._entries.get(model)
+        if entries is None:
+            with self._lock:
+                entries = self._entries.get(model)
+                if entries is None:
+                    entries = self._entries[model] = self._load_model(model)
+        return entries
+
+    def _load_model(self, model):
+        """
+        تحميل نموذج واحد: من `sync_map.db` إذا كان ضمن مدة الصلاحية أو لم تتغير
+        بصمته في الوجهة، وإلا من الوجهة في استدعاء `search_read` واحد.
+        """
+        stored_model = f"{self.namespace}|{model}" if self.namespace else model
+        loaded_key = f"reference_data_loaded_at:{stored_model}"
+        fingerprint_key = f"reference_data_fingerprint:{stored_model}"
+        loaded_at = self.key_manager.get_meta(loaded_key)
+        now = time.time()
+
+        if loaded_at is not None and now - float(loaded_at) < self.ttl:
+            entries = self.key_manager.get_reference_data(stored_model)
+            self.logger.info(f"  - تم تحميل {len(entries)} مفتاح مرجعي لـ {model} من الذاكرة المحلية.")
+            return entries
+
+        fingerprint = self._fingerprint(model)
+        if loaded_at is not None and fingerprint == self.key_manager.get_meta(fingerprint_key):
+            # لم تتغير البيانات في الوجهة: تمديد الصلاحية دون إعادة القراءة.
+            self.key_manager.set_meta(loaded_key, now)
+            entries = self.key_manager.get_reference_data(stored_model)
+            self.logger.info(f"  - البيانات المرجعية لـ {model} لم تتغير في الوجهة ({len(entries)} مفتاح).")
+            return entries
+
+        entries = self._fetch(model)
+        with self.key_manager.batch():
+            self.key_manager.replace_reference_data(stored_model, entries)
+            self.key_manager.set_meta(fingerprint_key, fingerprint)
+            self.key_manager.set_meta(loaded_key, now)
+        self.logger.info(f"  - تم تحديث {len(entries)} مفتاح مرجعي لـ {model} من الوجهة.")
+        return entries
+
+    def _fingerprint(self, model):
+        """
+        بصمة بيانات النموذج في الوجهة: عدد السجلات وأحدث `write_date`.
+        """
+        context = self._context(model)
+        count = self.dest[model].search_count([], context=context)
+        latest = self.dest[model].search_read([], ['write_date'], order='write_date desc', limit=1, context=context)
+        return f"{count}:{latest[0]['write_date'] if latest else ''}"
+
+    def _fetch(self, model):
+        """
+        قراءة جميع سجلات النموذج في الوجهة وبناء فهرس حقول البحث.
+        عند تكرار القيمة يتم الاحتفاظ بأصغر معرف.
+        """
+        key_specs = self.KEYS[model]
+        fields = sorted({field for spec in key_specs for field in spec})
+        entries = {}
+        for row in self.dest[model].search_read([], ['id'] + fields, order='id', context=self._context(model)):
+            for spec in key_specs:
+                entries.setdefault((self._key_field(spec), self._key(row.get(field) for field in spec)), row['id'])
+        return entries
+
+    def _context(self, model):
+        return {'active_test': False} if model in self.INCLUDE_INACTIVE else None
+
+    @staticmethod
+    def _key_field(fields):
+        return '+'.join(fields)
+
+    @staticmethod
+    def _key(values):
+        parts = []
+        for value in values:
+            if isinstance(value, (list, tuple)):
+                # حقل many2one يعود بالشكل [id, name].
+                value = value[0] if value else False
+            parts.append('' if value is False or value is None else str(value))
+        return '|'.join(parts)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة ذاكرة البحث عن الحقول العلائقية
+relation_cache.py
+
+الغرض:
+- حل جميع العلاقات التي تشير إليها سطور الفواتير وقيود اليومية (الحسابات،
+  الشركاء، الضرائب، علامات الضرائب، البلدان) لدفعة كاملة من السجلات في
+  عدد قليل من الاستدعاءات المجمعة.
+- جعل دوال `_transform_data` عمليات بحث في قواميس داخل الذاكرة فقط
+  بدلاً من استدعاء `search` و `read` لكل سطر.
+"""
+
+import logging
+
+
+class RelationalLookupCache:
+    """
+    ذاكرة بحث خاصة بتشغيل واحد، مفتاحها (النموذج، معرف المصدر).
+    يتم ملؤها مسبقًا عبر دوال `prefetch_*` ثم قراءتها عبر دوال `get_*`.
+    """
+    # حقل المزامنة المخصص لكل نموذج في الوجهة.
+    SYNC_FIELDS = {
+        'res.partner': 'x_partner_sync_id',
+        'res.company': 'x_company_sync_id',
+        'account.account': 'x_account_sync_id',
+        'account.journal': 'x_journal_sync_id',
+        'account.tax': 'x_tax_sync_id',
+        'account.move': 'x_move_sync_id',
+    }
+
+    def __init__(self, source_conn, dest_conn, resolver, logger=None, reference_data=None):
+        """
+        تهيئة الذاكرة.
+
+        Args:
+            source_conn: كائن اتصال Odoo API للمصدر.
+            dest_conn: كائن اتصال Odoo API للوجهة.
+            resolver: كائن `DestinationIdResolver` لحل معرفات الوجهة دفعة واحدة.
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+            reference_data: كائن `ReferenceDataCache` لمطابقة البلدان وعلامات الضرائب
+                في الوجهة دون استدعاءات RPC (اختياري).
+        """
+        self.source = source_conn
+        self.dest = dest_conn
+        self.resolver = resolver
+        self.reference_data = reference_data
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+
+        # (model, source_id) -> destination_id أو None إذا لم يوجد في الوجهة.
+        self._ids = {}
+        # (model, destination_id) -> قائمة معرفات الشركات في الوجهة.
+        self._companies = {}
+        # source_tag_id -> destination_tag_id أو None.
+        self._tax_tags = {}
+        # source_tag_id -> اسم العلامة (لرسائل التحذير فقط).
+        self._tax_tag_names = {}
+
+    # ------------------------------------------------------------------
+    # معرفات الوجهة عبر حقول x_*_sync_id
+    # ------------------------------------------------------------------
+    def prefetch(self, model, source_ids):
+        """
+        حل معرفات الوجهة لجميع معرفات المصدر غير المحلولة بعد في نموذج معين.
+        """
+        pending = {int(sid) for sid in source_ids if sid and (model, int(sid)) not in self._ids}
+        if not pending:
+            return
+        resolved = self.resolver.resolve(model, self.SYNC_FIELDS[model], pending)
+        for source_id in pending:
+            self._ids[(model, source_id)] = resolved.get(source_id)
+
+    def get(self, model, source_id):
+        """
+        إرجاع معرف الوجهة المقابل لمعرف المصدر، أو None إذا لم يكن موجودًا.
+        """
+        return self._ids.get((model, source_id))
+
+    # ------------------------------------------------------------------
+    # شركات السجلات في الوجهة
+    # ------------------------------------------------------------------
+    def prefetch_companies(self, model, destination_ids, field='company_ids'):
+        """
+        قراءة حقل الشركة (`company_ids` أو `company_id`) لمجموعة من سجلات
+        الوجهة في استدعاء `read` واحد.
+        """
+        pending = sorted({did for did in destination_ids if did and (model, did) not in self._companies})
+        if not pending:
+            return
+        for row in self.dest[model].read(pending, [field]):
+            value = row.get(field) or []
+            if field.endswith('_id'):
+                # حقل many2one يعود بالشكل [id, name].
+                value = [value[0]] if value else []
+            self._companies[(model, row['id'])] = value
+
+    def get_companies(self, model, destination_id):
+        """
+        إرجاع قائمة معرفات الشركات في الوجهة لسجل معين.
+        """
+        return self._companies.get((model, destination_id), [])
+
+    # ------------------------------------------------------------------
+    # علامات الضرائب (account.account.tag)
+    # ------------------------------------------------------------------
+    def prefetch_tax_tags(self, source_tag_ids):
+        """
+        حل علامات الضرائب بمطابقة (الاسم، قابلية التطبيق، البلد) في أربعة
+        استدعاءات مجمعة بغض النظر عن عدد العلامات (استدعاءان فقط عند توفر
+        ذاكرة البيانات المرجعية).
+        """
+        pending = sorted({tid for tid in source_tag_ids if tid and tid not in self._tax_tags})
+        if not pending:
+            return
+
+        # 1. قراءة علامات المصدر دفعة واحدة.
+        source_tags = self.source['account.account.tag'].read(pending, ['name', 'applicability', 'country_id'])
+
+        # 2. قراءة رموز البلدان في المصدر دفعة واحدة.
+        source_country_ids = sorted({t['country_id'][0] for t in source_tags if t.get('country_id')})
+        source_country_codes = {}
+        if source_country_ids:
+            for country in self.source['res.country'].read(source_country_ids, ['code']):
+                source_country_codes[country['id']] = country['code']
+
+        codes = sorted(set(source_country_codes.values()))
+        if self.reference_data is not None:
+            # 3-4. البلدان والعلامات في الوجهة من ذاكرة البيانات المرجعية دون استدعاءات.
+            dest_country_by_code = {code: self.reference_data.get('res.country', 'code', code) for code in codes}
+            find_tag = self.reference_data.get_tax_tag
+        else:
+            # 3. البحث عن البلدان المقابلة في الوجهة بالرمز دفعة واحدة.
+            dest_country_by_code = {}
+            if codes:
+                for country in self.dest['res.country'].search_read([('code', 'in', codes)], ['id', 'code']):
+                    dest_country_by_code.setdefault(country['code'], country['id'])
+
+            # 4. البحث عن العلامات المرشحة في الوجهة بالاسم دفعة واحدة ثم المطابقة في الذاكرة.
+            names = sorted({t['name'] for t in source_tags})
+            dest_tag_index = {}
+            for tag in self.dest['account.account.tag'].search_read(
+                    [('name', 'in', names)], ['id', 'name', 'applicability', 'country_id']):
+                country_id = tag['country_id'][0] if tag.get('country_id') else False
+                dest_tag_index.setdefault((tag['name'], tag['applicability'], country_id), tag['id'])
+
+            def find_tag(name, applicability, country_id):
+                return dest_tag_index.get((name, applicability, country_id))
+
+        for tag in source_tags:
+            dest_country_id = False
+            if tag.get('country_id'):
+                code = source_country_codes.get(tag['country_id'][0])
+                dest_country_id = dest_country_by_code.get(code) or False
+            self._tax_tags[tag['id']] = find_tag(tag['name'], tag['applicability'], dest_country_id)
+            self._tax_tag_names[tag['id']] = tag['name']
+
+        # العلامات غير الموجودة في المصدر تُسجل كغير محلولة لتجنب إعادة المحاولة.
+        for tag_id in pending:
+            self._tax_tags.setdefault(tag_id, None)
+
+    def get_tax_tag(self, source_tag_id):
+        """
+        إرجاع معرف علامة الضريبة في الوجهة، أو None إذا لم توجد.
+        """
+        return self._tax_tags.get(source_tag_id)
+
+    def get_tax_tag_name(self, source_tag_id):
+        """
+        إرجاع اسم علامة الضريبة في المصدر (لرسائل السجل).
+        """
+        return self._tax_tag_names.get(source_tag_id, str(source_tag_id))
+
+    # ------------------------------------------------------------------
+    # سطور الحركات
+    # ------------------------------------------------------------------
+    def prefetch_lines(self, lines):
+        """
+        حل جميع العلاقات المشار إليها في مجموعة من سطور `account.move.line`
+        (الحساب، الشريك، الضرائب، علامات الضرائب) دفعة واحدة.
+        """
+        account_ids, partner_ids, tax_ids, tag_ids = set(), set(), set(), set()
+        for line in lines:
+            if line.get('account_id'):
+                account_ids.add(line['account_id'][0])
+            if line.get('partner_id'):
+                partner_ids.add(line['partner_id'][0])
+            tax_ids.update(line.get('tax_ids') or [])
+            tag_ids.update(line.get('tax_tag_ids') or [])
+
+        self.prefetch('account.account', account_ids)
+        self.prefetch('res.partner', partner_ids)
+        self.prefetch('account.tax', tax_ids)
+        self.prefetch_tax_tags(tag_ids)
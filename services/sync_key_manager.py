@@ -14,6 +14,9 @@ sync_key_manager.py
 
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
 
 class SyncKeyManager:
     """
@@ -23,20 +26,48 @@ class SyncKeyManager:
     للسجلات التي لا تحتوي على حقول `x_sync_id` خاصة بها في الوجهة،
     أو كطبقة احتياطية للبحث عن الروابط.
     """
-    def __init__(self, db_file='sync_map.db'):
+    # الحد الأقصى لعدد المعرفات في استعلام `IN` واحد (حد متغيرات SQLite).
+    CHUNK_SIZE = 500
+    # عدد عمليات إضافة الروابط المؤجلة في الذاكرة قبل كتابتها في SQLite دفعة واحدة.
+    WRITE_BUFFER_SIZE = 1000
+    # القيم المسموح بها لـ `PRAGMA synchronous`.
+    SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+    def __init__(self, db_file='sync_map.db', synchronous='NORMAL', cache_size=-8000):
         """
         تهيئة مدير مفتاح المزامنة. يتصل بقاعدة البيانات وينشئ الجدول إذا لم يكن موجودًا.
 
         Args:
             db_file (str): اسم ملف قاعدة بيانات SQLite (الافتراضي هو 'sync_map.db').
+            synchronous (str): قيمة `PRAGMA synchronous` (OFF, NORMAL, FULL, EXTRA).
+                في وضع WAL تكفي NORMAL لضمان سلامة البيانات مع تقليل عمليات fsync.
+            cache_size (int): قيمة `PRAGMA cache_size` (القيم السالبة بالكيلوبايت).
         Raises:
+            ValueError: إذا كانت قيمة `synchronous` أو `cache_size` غير صالحة.
             sqlite3.Error: إذا حدث خطأ أثناء الاتصال بقاعدة البيانات أو إنشاء الجدول.
         """
+        # التحقق من القيم قبل استخدامها في جمل PRAGMA (لا تقبل معاملات SQL).
+        synchronous = str(synchronous).strip().upper()
+        if synchronous not in self.SYNCHRONOUS_LEVELS:
+            raise ValueError(f"قيمة synchronous غير صالحة: '{synchronous}'. القيم المسموح بها: {', '.join(self.SYNCHRONOUS_LEVELS)}.")
+        cache_size = int(cache_size)
         self.db_file = db_file
         self.conn = None
+        # الاتصال مشترك بين خيوط التشغيل (وحدات المزامنة المتوازية)، لذا يتم
+        # حماية جميع العمليات بقفل واحد.
+        self._lock = threading.RLock()
+        # عمق نطاقات `batch()` المتداخلة على الاتصال؛ لا يتم تنفيذ commit إلا عند الخروج
+        # من آخرها. يتغير فقط من الخيط الذي يحمل القفل (انظر `batch()`).
+        self._batch_depth = 0
+        # فهرس الروابط في الذاكرة {النموذج: {معرف المصدر: معرف الوجهة}}، يتم
+        # تحميله مرة واحدة عبر `preload()` ومشاركته بين جميع وحدات المزامنة.
+        self._index = None
+        # صفوف الروابط التي لم تُكتب بعد في SQLite (تُكتب عبر `flush()`).
+        self._pending = []
         try:
             # الاتصال بقاعدة البيانات (سيتم إنشاؤها إذا لم تكن موجودة).
-            self.conn = sqlite3.connect(self.db_file)
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._configure(synchronous, cache_size)
             # إنشاء جدول الربط إذا لم يكن موجودًا.
             self._create_table()
             print(f"تم الاتصال بقاعدة بيانات الربط بنجاح: '{self.db_file}'")
@@ -44,6 +75,111 @@ class SyncKeyManager:
             print(f"حدث خطأ في قاعدة البيانات: {e}")
             raise
 
+    def _configure(self, synchronous, cache_size):
+        """
+        ضبط إعدادات SQLite: وضع WAL، مستوى `synchronous`، وحجم ذاكرة الصفحات.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA cache_size={cache_size}")
+
+    def _commit(self):
+        """
+        تنفيذ commit فقط إذا لم نكن داخل نطاق `batch()`.
+        تُكتب الروابط المؤجلة أولاً حتى لا يُحفظ مؤشر تقدم أو قيمة `meta` تسبق
+        روابط لم تُكتب بعد (يجب استدعاؤها مع القفل).
+        """
+        if self._batch_depth == 0:
+            self._flush_pending()
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        نطاق تجميع (context manager) لعمليات الكتابة: جميع عمليات الإضافة والإزالة
+        داخله تتم في معاملة واحدة يتم تنفيذ commit لها عند الخروج من النطاق الخارجي.
+
+        يتم تنفيذ commit حتى عند حدوث استثناء، لأن الروابط المسجلة تمثل سجلات
+        تم إنشاؤها فعليًا في نظام الوجهة ولا يجب فقدانها.
+
+        يحمل النطاق قفل الاتصال حتى نهايته: الاتصال مشترك بين الخيوط، فلو كتب خيط
+        آخر خارج نطاق `batch()` أثناءه لنفذ commit لنصف معاملة هذا النطاق. لذلك
+        يجب ألا يحتوي النطاق إلا على عمليات الكتابة المحلية (دون استدعاءات RPC).
+
+        مثال:
+            with key_manager.batch():
+                for source_id, destination_id in pairs:
+                    key_manager.add_mapping('res.partner', source_id, destination_id)
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._flush_pending()
+                    self.conn.commit()
+
+    def preload(self):
+        """
+        تحميل جدول الربط بالكامل في الذاكرة مرة واحدة (عند بدء تشغيل المحرك)،
+        بحيث تتم عمليات البحث عن الروابط بعد ذلك في قاموس لكل نموذج دون
+        استعلام SQLite. يتم تحديث الفهرس مع كل إضافة أو إزالة لاحقة.
+
+        Returns:
+            int: عدد الروابط التي تم تحميلها.
+        """
+        with self._lock:
+            self._flush_pending()
+            index = {}
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT source_model, source_id, destination_id FROM mapping")
+            for source_model, source_id, destination_id in cursor:
+                model_index = index.get(source_model)
+                if model_index is None:
+                    model_index = index[source_model] = {}
+                model_index[source_id] = destination_id
+            self._index = index
+            return sum(len(model_index) for model_index in index.values())
+
+    def flush(self):
+        """
+        كتابة الروابط المؤجلة في SQLite (وتنفيذ commit إذا لم نكن داخل `batch()`).
+        """
+        try:
+            with self._lock:
+                self._flush_pending()
+                self._commit()
+        except sqlite3.Error as e:
+            print(f"فشل في كتابة الروابط المؤجلة: {e}")
+            raise
+
+    def _flush_pending(self):
+        """
+        كتابة الصفوف المؤجلة في استدعاء `executemany` واحد (يجب استدعاؤها مع القفل).
+        يتم استدعاؤها قبل أي استعلام مباشر على جدول الربط حتى يرى نتائج محدثة.
+        """
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        self.conn.cursor().executemany(self._UPSERT_SQL, rows)
+
+    def _queue_mappings(self, rows):
+        """
+        إضافة صفوف (النموذج، معرف المصدر، معرف الوجهة، البصمة) إلى الفهرس في الذاكرة
+        وإلى قائمة الكتابة المؤجلة، مع كتابتها في SQLite عند امتلاء المخزن المؤقت.
+        """
+        with self._lock:
+            self._pending.extend(rows)
+            if self._index is not None:
+                for source_model, source_id, destination_id, _ in rows:
+                    self._index.setdefault(source_model, {})[source_id] = destination_id
+            if len(self._pending) >= self.WRITE_BUFFER_SIZE:
+                self._flush_pending()
+                self._commit()
+
     def _create_table(self):
         """
         إنشاء جدول الربط (mapping) إذا لم يكن موجودًا.
@@ -51,45 +187,132 @@ class SyncKeyManager:
         `source_model`: اسم النموذج (مثال: 'res.partner').
         `source_id`: المعرف الفريد للسجل في نظام المصدر.
         `destination_id`: المعرف الفريد للسجل المقابل في نظام الوجهة.
+        `payload_hash`: بصمة آخر بيانات تمت كتابتها في الوجهة لهذا السجل (اختياري).
         `PRIMARY KEY (source_model, source_id)`: يضمن أن كل ربط فريد.
         """
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS mapping (
-                    source_model TEXT NOT NULL,
-                    source_id INTEGER NOT NULL,
-                    destination_id INTEGER NOT NULL,
-                    PRIMARY KEY (source_model, source_id)
-                );
-            """)
-            self.conn.commit()
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS mapping (
+                        source_model TEXT NOT NULL,
+                        source_id INTEGER NOT NULL,
+                        destination_id INTEGER NOT NULL,
+                        payload_hash TEXT,
+                        PRIMARY KEY (source_model, source_id)
+                    );
+                """)
+                # ترقية قواعد البيانات القديمة التي أنشئت قبل إضافة عمود `payload_hash`.
+                cursor.execute("PRAGMA table_info(mapping)")
+                if 'payload_hash' not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute("ALTER TABLE mapping ADD COLUMN payload_hash TEXT")
+                # فهرس عكسي (الوجهة ← المصدر) للبحث عن سجل المصدر لمعرف وجهة معين
+                # واكتشاف سجلات الوجهة المربوطة بأكثر من سجل مصدر.
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS mapping_destination_idx ON mapping (source_model, destination_id)"
+                )
+                # جدول قيم عامة (مفتاح/قيمة) يحتفظ بمعلومات بين التشغيلات،
+                # مثل إصدار خادم Odoo لتجنب استدعاء RPC عند كل بدء تشغيل.
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS meta (
+                        key TEXT PRIMARY KEY,
+                        value TEXT
+                    );
+                """)
+                # مؤشر التقدم (write_date, id) لكل وحدة مزامنة ونموذج.
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS watermarks (
+                        module TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        write_date TEXT NOT NULL,
+                        last_id INTEGER NOT NULL,
+                        PRIMARY KEY (module, model)
+                    );
+                """)
+                # السجلات التي فشلت مزامنتها (dead-letter) مع عدد المحاولات وموعد
+                # إعادة المحاولة التالية (بالثواني منذ epoch).
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS failed_records (
+                        module TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        source_id INTEGER NOT NULL,
+                        stage TEXT NOT NULL,
+                        error TEXT,
+                        attempts INTEGER NOT NULL DEFAULT 1,
+                        last_failed_at REAL NOT NULL,
+                        next_retry_at REAL NOT NULL,
+                        PRIMARY KEY (module, model, source_id)
+                    );
+                """)
+                # معرفات البيانات المرجعية في الوجهة (البلدان، العملات، الشركات، علامات
+                # الضرائب) مفهرسة بحقل البحث وقيمته، تُحمّل مرة واحدة وتُشارك بين الوحدات.
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS reference_data (
+                        model TEXT NOT NULL,
+                        key_field TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        destination_id INTEGER NOT NULL,
+                        PRIMARY KEY (model, key_field, key)
+                    );
+                """)
+                self.conn.commit()
         except sqlite3.Error as e:
             print(f"فشل في إنشاء جدول 'mapping': {e}")
             raise
 
-    def add_mapping(self, source_model, source_id, destination_id):
+    # إضافة ربط أو تحديثه. يتم الاحتفاظ ببصمة البيانات المحفوظة إذا لم تُمرر بصمة
+    # جديدة ولم يتغير معرف الوجهة، وإلا يتم مسحها لأنها تخص سجلًا آخر.
+    _UPSERT_SQL = (
+        "INSERT INTO mapping (source_model, source_id, destination_id, payload_hash) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (source_model, source_id) DO UPDATE SET "
+        "destination_id = excluded.destination_id, "
+        "payload_hash = COALESCE(excluded.payload_hash, "
+        "CASE WHEN mapping.destination_id = excluded.destination_id THEN mapping.payload_hash END)"
+    )
+
+    def add_mapping(self, source_model, source_id, destination_id, payload_hash=None):
         """
         إضافة أو تحديث ربط جديد في قاعدة البيانات.
         إذا كان الربط موجودًا بالفعل، فسيتم تحديث `destination_id`.
+        تتم الكتابة في SQLite على دفعات (عند امتلاء المخزن المؤقت، أو الخروج من
+        `batch()`، أو استدعاء `flush()`)، بينما يتم تحديث الفهرس في الذاكرة فورًا.
 
         Args:
             source_model (str): اسم الموديل في Odoo (مثل 'res.partner').
             source_id (int): المعرف الرقمي للسجل في نظام المصدر.
             destination_id (int): المعرف الرقمي للسجل في نظام الوجهة.
+            payload_hash (str): بصمة البيانات التي تمت كتابتها في الوجهة (اختياري).
         Raises:
             sqlite3.Error: إذا فشلت عملية الإضافة أو التحديث.
         """
-        # `INSERT OR REPLACE` يضمن أننا إما نضيف ربطًا جديدًا أو نحدث ربطًا موجودًا.
-        sql = "INSERT OR REPLACE INTO mapping (source_model, source_id, destination_id) VALUES (?, ?, ?)"
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, (source_model, source_id, destination_id))
-            self.conn.commit()
+            self._queue_mappings([(source_model, int(source_id), int(destination_id), payload_hash)])
         except sqlite3.Error as e:
             print(f"فشل في إضافة ربط لـ {source_model} ({source_id}): {e}")
             raise
 
+    def add_mappings_bulk(self, source_model, mappings):
+        """
+        إضافة أو تحديث مجموعة من الروابط لنموذج واحد في معاملة واحدة.
+
+        Args:
+            source_model (str): اسم الموديل في Odoo.
+            mappings (dict | iterable): قاموس {معرف المصدر: معرف الوجهة}
+                أو قائمة أزواج (معرف المصدر، معرف الوجهة).
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الإضافة.
+        """
+        if isinstance(mappings, dict):
+            mappings = mappings.items()
+        rows = [(source_model, int(source_id), int(destination_id), None) for source_id, destination_id in mappings]
+        if not rows:
+            return
+        try:
+            self._queue_mappings(rows)
+        except sqlite3.Error as e:
+            print(f"فشل في إضافة {len(rows)} ربط لـ {source_model}: {e}")
+            raise
+
     def get_destination_id(self, source_model, source_id):
         """
         جلب معرف الوجهة المقابل لمعرف المصدر من قاعدة بيانات الربط.
@@ -105,14 +328,169 @@ class SyncKeyManager:
         """
         sql = "SELECT destination_id FROM mapping WHERE source_model = ? AND source_id = ?"
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, (source_model, source_id))
-            result = cursor.fetchone()
-            return result[0] if result else None
+            with self._lock:
+                if self._index is not None:
+                    return self._index.get(source_model, {}).get(int(source_id))
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (source_model, source_id))
+                result = cursor.fetchone()
+                return result[0] if result else None
         except sqlite3.Error as e:
             print(f"فشل في البحث عن ربط لـ {source_model} ({source_id}): {e}")
             return None
 
+    def get_destination_ids_bulk(self, source_model, source_ids):
+        """
+        جلب معرفات الوجهة لمجموعة من معرفات المصدر باستخدام استعلامات `IN`.
+
+        Args:
+            source_model (str): اسم الموديل في Odoo.
+            source_ids (iterable): معرفات المصدر.
+
+        Returns:
+            dict: قاموس {معرف المصدر: معرف الوجهة} للمعرفات الموجودة فقط.
+        Raises:
+            sqlite3.Error: إذا فشلت عملية البحث.
+        """
+        ids = sorted({int(sid) for sid in source_ids})
+        result = {}
+        try:
+            with self._lock:
+                if self._index is not None:
+                    model_index = self._index.get(source_model, {})
+                    return {sid: model_index[sid] for sid in ids if sid in model_index}
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                for start in range(0, len(ids), self.CHUNK_SIZE):
+                    chunk = ids[start:start + self.CHUNK_SIZE]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(
+                        f"SELECT source_id, destination_id FROM mapping "
+                        f"WHERE source_model = ? AND source_id IN ({placeholders})",
+                        [source_model] + chunk
+                    )
+                    result.update(cursor.fetchall())
+                return result
+        except sqlite3.Error as e:
+            print(f"فشل في البحث عن روابط {source_model}: {e}")
+            raise
+
+    def get_source_id(self, source_model, destination_id):
+        """
+        جلب معرف المصدر المقابل لمعرف الوجهة (بحث عكسي عبر الفهرس العكسي).
+
+        Args:
+            source_model (str): اسم الموديل في Odoo.
+            destination_id (int): المعرف الرقمي للسجل في نظام الوجهة.
+
+        Returns:
+            int or None: أصغر معرف مصدر مربوط بهذا السجل، وإلا None.
+        """
+        return self.get_source_ids_bulk(source_model, [destination_id]).get(int(destination_id))
+
+    def get_source_ids_bulk(self, source_model, destination_ids):
+        """
+        جلب معرفات المصدر لمجموعة من معرفات الوجهة باستخدام الفهرس العكسي
+        `(source_model, destination_id)` واستعلامات `IN`.
+        إذا كان سجل الوجهة مربوطًا بأكثر من سجل مصدر يتم إرجاع أصغرها
+        (راجع `find_duplicate_destinations`).
+
+        Args:
+            source_model (str): اسم الموديل في Odoo.
+            destination_ids (iterable): معرفات الوجهة.
+
+        Returns:
+            dict: قاموس {معرف الوجهة: معرف المصدر} للمعرفات المربوطة فقط.
+        Raises:
+            sqlite3.Error: إذا فشلت عملية البحث.
+        """
+        ids = sorted({int(did) for did in destination_ids})
+        result = {}
+        try:
+            with self._lock:
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                for start in range(0, len(ids), self.CHUNK_SIZE):
+                    chunk = ids[start:start + self.CHUNK_SIZE]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(
+                        f"SELECT destination_id, MIN(source_id) FROM mapping "
+                        f"WHERE source_model = ? AND destination_id IN ({placeholders}) "
+                        f"GROUP BY destination_id",
+                        [source_model] + chunk
+                    )
+                    result.update(cursor.fetchall())
+                return result
+        except sqlite3.Error as e:
+            print(f"فشل في البحث العكسي عن روابط {source_model}: {e}")
+            raise
+
+    def find_duplicate_destinations(self, source_model=None):
+        """
+        فحص اتساق جدول الربط: إيجاد سجلات الوجهة المربوطة بأكثر من سجل مصدر
+        في نفس النموذج (مثل التكرارات الناتجة عن تعديلات يدوية في الوجهة).
+
+        Args:
+            source_model (str): اسم الموديل (اختياري). إذا لم يُحدد يتم فحص جميع النماذج.
+
+        Returns:
+            list: قائمة ثلاثيات (النموذج، معرف الوجهة، قائمة معرفات المصدر مرتبة).
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الفحص.
+        """
+        sql = (
+            "SELECT source_model, destination_id, GROUP_CONCAT(source_id) FROM mapping "
+            + ("WHERE source_model = ? " if source_model else "")
+            + "GROUP BY source_model, destination_id HAVING COUNT(*) > 1 "
+            "ORDER BY source_model, destination_id"
+        )
+        try:
+            with self._lock:
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (source_model,) if source_model else ())
+                return [
+                    (model, destination_id, sorted(int(sid) for sid in source_ids.split(',')))
+                    for model, destination_id, source_ids in cursor.fetchall()
+                ]
+        except sqlite3.Error as e:
+            print(f"فشل في فحص تكرار روابط الوجهة: {e}")
+            raise
+
+    def get_payload_hashes(self, source_model, source_ids):
+        """
+        جلب معرف الوجهة وبصمة آخر بيانات مكتوبة لمجموعة من معرفات المصدر.
+
+        Args:
+            source_model (str): اسم الموديل في Odoo.
+            source_ids (iterable): معرفات المصدر.
+
+        Returns:
+            dict: قاموس {معرف المصدر: (معرف الوجهة، البصمة)} للروابط التي لها بصمة فقط.
+        Raises:
+            sqlite3.Error: إذا فشلت عملية البحث.
+        """
+        ids = sorted({int(sid) for sid in source_ids})
+        result = {}
+        try:
+            with self._lock:
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                for start in range(0, len(ids), self.CHUNK_SIZE):
+                    chunk = ids[start:start + self.CHUNK_SIZE]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(
+                        f"SELECT source_id, destination_id, payload_hash FROM mapping "
+                        f"WHERE source_model = ? AND payload_hash IS NOT NULL AND source_id IN ({placeholders})",
+                        [source_model] + chunk
+                    )
+                    result.update((sid, (did, digest)) for sid, did, digest in cursor.fetchall())
+                return result
+        except sqlite3.Error as e:
+            print(f"فشل في جلب بصمات البيانات لـ {source_model}: {e}")
+            raise
+
     def get_all_source_ids_for_model(self, source_model):
         """
         جلب جميع معرفات المصدر المخزنة لنموذج معين.
@@ -127,14 +505,46 @@ class SyncKeyManager:
         """
         sql = "SELECT source_id FROM mapping WHERE source_model = ?"
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, (source_model,))
-            results = cursor.fetchall()
-            return [row[0] for row in results]
+            with self._lock:
+                if self._index is not None:
+                    return list(self._index.get(source_model, ()))
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (source_model,))
+                results = cursor.fetchall()
+                return [row[0] for row in results]
         except sqlite3.Error as e:
             print(f"فشل في جلب جميع معرفات المصدر لـ {source_model}: {e}")
             raise
 
+    def iter_mappings(self, source_model, chunk_size=CHUNK_SIZE):
+        """
+        المرور على روابط نموذج معين على شكل مجموعات مرتبة حسب معرف المصدر،
+        دون تحميل جميع الروابط في الذاكرة دفعة واحدة.
+
+        Args:
+            source_model (str): اسم الموديل في Odoo.
+            chunk_size (int): عدد الروابط في كل مجموعة.
+
+        Yields:
+            list: قائمة أزواج (معرف المصدر، معرف الوجهة).
+        """
+        sql = (
+            "SELECT source_id, destination_id FROM mapping "
+            "WHERE source_model = ? AND source_id > ? ORDER BY source_id LIMIT ?"
+        )
+        last_id = -1
+        while True:
+            with self._lock:
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (source_model, last_id, chunk_size))
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
     def remove_mapping(self, source_model, source_id):
         """
         إزالة ربط معين من قاعدة البيانات.
@@ -147,20 +557,283 @@ class SyncKeyManager:
         """
         sql = "DELETE FROM mapping WHERE source_model = ? AND source_id = ?"
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, (source_model, source_id))
-            self.conn.commit()
+            with self._lock:
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (source_model, source_id))
+                if self._index is not None:
+                    self._index.get(source_model, {}).pop(int(source_id), None)
+                self._commit()
         except sqlite3.Error as e:
             print(f"فشل في إزالة ربط لـ {source_model} ({source_id}): {e}")
             raise
 
+    def get_meta(self, key, default=None):
+        """
+        جلب قيمة محفوظة في جدول `meta`.
+
+        Args:
+            key (str): اسم المفتاح.
+            default: القيمة المرجعة إذا لم يكن المفتاح موجودًا.
+
+        Returns:
+            str or None: القيمة المحفوظة، أو `default` إذا لم توجد.
+        """
+        sql = "SELECT value FROM meta WHERE key = ?"
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (key,))
+                result = cursor.fetchone()
+                return result[0] if result else default
+        except sqlite3.Error as e:
+            print(f"فشل في جلب القيمة '{key}' من جدول meta: {e}")
+            return default
+
+    def set_meta(self, key, value):
+        """
+        حفظ (أو تحديث) قيمة في جدول `meta`.
+
+        Args:
+            key (str): اسم المفتاح.
+            value: القيمة المراد حفظها (تُخزن كنص).
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الحفظ.
+        """
+        sql = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (key, str(value)))
+                self._commit()
+        except sqlite3.Error as e:
+            print(f"فشل في حفظ القيمة '{key}' في جدول meta: {e}")
+            raise
+
+    def remove_mappings_bulk(self, source_model, source_ids):
+        """
+        إزالة مجموعة من الروابط لنموذج واحد في معاملة واحدة.
+
+        Args:
+            source_model (str): اسم الموديل في Odoo.
+            source_ids (iterable): معرفات المصدر المراد إزالة روابطها.
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الإزالة.
+        """
+        rows = [(source_model, int(source_id)) for source_id in source_ids]
+        if not rows:
+            return
+        sql = "DELETE FROM mapping WHERE source_model = ? AND source_id = ?"
+        try:
+            with self._lock:
+                self._flush_pending()
+                cursor = self.conn.cursor()
+                cursor.executemany(sql, rows)
+                if self._index is not None:
+                    model_index = self._index.get(source_model, {})
+                    for _, source_id in rows:
+                        model_index.pop(source_id, None)
+                self._commit()
+        except sqlite3.Error as e:
+            print(f"فشل في إزالة {len(rows)} ربط لـ {source_model}: {e}")
+            raise
+
+    def get_reference_data(self, model):
+        """
+        جلب معرفات البيانات المرجعية المحفوظة لنموذج في الوجهة.
+
+        Args:
+            model (str): اسم النموذج (مثال: 'res.country').
+
+        Returns:
+            dict: قاموس {(حقل البحث، القيمة): معرف الوجهة}.
+        """
+        sql = "SELECT key_field, key, destination_id FROM reference_data WHERE model = ?"
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (model,))
+                return {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            print(f"فشل في جلب البيانات المرجعية لـ {model}: {e}")
+            return {}
+
+    def replace_reference_data(self, model, entries):
+        """
+        استبدال جميع معرفات البيانات المرجعية المحفوظة لنموذج في معاملة واحدة.
+
+        Args:
+            model (str): اسم النموذج.
+            entries (dict): قاموس {(حقل البحث، القيمة): معرف الوجهة}.
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الحفظ.
+        """
+        rows = [(model, key_field, key, int(destination_id)) for (key_field, key), destination_id in entries.items()]
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute("DELETE FROM reference_data WHERE model = ?", (model,))
+                cursor.executemany(
+                    "INSERT INTO reference_data (model, key_field, key, destination_id) VALUES (?, ?, ?, ?)", rows
+                )
+                self._commit()
+        except sqlite3.Error as e:
+            print(f"فشل في حفظ البيانات المرجعية لـ {model}: {e}")
+            raise
+
+    def get_watermark(self, module, model):
+        """
+        جلب مؤشر التقدم المحفوظ لوحدة مزامنة ونموذج.
+
+        Args:
+            module (str): اسم وحدة المزامنة.
+            model (str): اسم النموذج.
+
+        Returns:
+            tuple or None: (write_date, last_id) أو None إذا لم يكن هناك مؤشر.
+        """
+        sql = "SELECT write_date, last_id FROM watermarks WHERE module = ? AND model = ?"
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (module, model))
+                result = cursor.fetchone()
+                return tuple(result) if result else None
+        except sqlite3.Error as e:
+            print(f"فشل في جلب مؤشر التقدم لـ {module}/{model}: {e}")
+            return None
+
+    def set_watermark(self, module, model, write_date, last_id):
+        """
+        حفظ (أو تحديث) مؤشر التقدم لوحدة مزامنة ونموذج.
+
+        Args:
+            module (str): اسم وحدة المزامنة.
+            model (str): اسم النموذج.
+            write_date (str): قيمة write_date لآخر سجل تمت مزامنته.
+            last_id (int): معرف آخر سجل تمت مزامنته.
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الحفظ.
+        """
+        sql = "INSERT OR REPLACE INTO watermarks (module, model, write_date, last_id) VALUES (?, ?, ?, ?)"
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute(sql, (module, model, write_date, int(last_id)))
+                self._commit()
+        except sqlite3.Error as e:
+            print(f"فشل في حفظ مؤشر التقدم لـ {module}/{model}: {e}")
+            raise
+
+    def record_failures(self, module, model, failures, base_delay=60, max_delay=86400):
+        """
+        تسجيل (أو تحديث) سجلات فشلت مزامنتها في جدول `failed_records`.
+        يتم مضاعفة مهلة إعادة المحاولة مع كل فشل متكرر (exponential backoff):
+        base_delay * 2^(المحاولات - 1) بحد أقصى max_delay.
+
+        Args:
+            module (str): اسم وحدة المزامنة.
+            model (str): اسم النموذج.
+            failures (dict): قاموس {معرف المصدر: (المرحلة، الخطأ)}.
+            base_delay (int): مهلة إعادة المحاولة بعد أول فشل (بالثواني).
+            max_delay (int): الحد الأقصى لمهلة إعادة المحاولة (بالثواني).
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الحفظ.
+        """
+        now = time.time()
+        rows = [
+            (module, model, int(source_id), stage, str(error), now, now + base_delay, max_delay, base_delay)
+            for source_id, (stage, error) in failures.items()
+        ]
+        if not rows:
+            return
+        sql = (
+            "INSERT INTO failed_records (module, model, source_id, stage, error, attempts, last_failed_at, next_retry_at) "
+            "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+            "ON CONFLICT (module, model, source_id) DO UPDATE SET "
+            "stage = excluded.stage, error = excluded.error, attempts = failed_records.attempts + 1, "
+            "last_failed_at = excluded.last_failed_at, "
+            "next_retry_at = excluded.last_failed_at + MIN(?, ? * (1 << failed_records.attempts))"
+        )
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.executemany(sql, rows)
+                self._commit()
+        except sqlite3.Error as e:
+            print(f"فشل في تسجيل {len(rows)} سجل فاشل لـ {module}/{model}: {e}")
+            raise
+
+    def clear_failures(self, module, model, source_ids):
+        """
+        إزالة سجلات من جدول `failed_records` بعد نجاح مزامنتها.
+
+        Args:
+            module (str): اسم وحدة المزامنة.
+            model (str): اسم النموذج.
+            source_ids (iterable): معرفات المصدر.
+        Raises:
+            sqlite3.Error: إذا فشلت عملية الإزالة.
+        """
+        rows = [(module, model, int(source_id)) for source_id in source_ids]
+        if not rows:
+            return
+        sql = "DELETE FROM failed_records WHERE module = ? AND model = ? AND source_id = ?"
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.executemany(sql, rows)
+                self._commit()
+        except sqlite3.Error as e:
+            print(f"فشل في إزالة السجلات الفاشلة لـ {module}/{model}: {e}")
+            raise
+
+    def get_failed_records(self, module, model, due_only=True, now=None):
+        """
+        جلب السجلات الفاشلة لوحدة مزامنة ونموذج.
+
+        Args:
+            module (str): اسم وحدة المزامنة.
+            model (str): اسم النموذج.
+            due_only (bool): جلب السجلات التي حان موعد إعادة محاولتها فقط.
+            now (float): الوقت الحالي (بالثواني منذ epoch)، الافتراضي الآن.
+
+        Returns:
+            list: قائمة قواميس {'source_id', 'stage', 'error', 'attempts', 'next_retry_at'}
+                مرتبة حسب معرف المصدر.
+        """
+        sql = (
+            "SELECT source_id, stage, error, attempts, next_retry_at FROM failed_records "
+            "WHERE module = ? AND model = ?"
+        )
+        params = [module, model]
+        if due_only:
+            sql += " AND next_retry_at <= ?"
+            params.append(time.time() if now is None else now)
+        sql += " ORDER BY source_id"
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                cursor.execute(sql, params)
+                return [
+                    {'source_id': row[0], 'stage': row[1], 'error': row[2], 'attempts': row[3], 'next_retry_at': row[4]}
+                    for row in cursor.fetchall()
+                ]
+        except sqlite3.Error as e:
+            print(f"فشل في جلب السجلات الفاشلة لـ {module}/{model}: {e}")
+            raise
+
     def close_connection(self):
         """
         إغلاق اتصال قاعدة البيانات بأمان.
         يجب استدعاء هذه الدالة عند الانتهاء من استخدام مدير المفاتيح.
         """
         if self.conn:
-            self.conn.close()
+            with self._lock:
+                # حفظ أي عمليات معلقة (بما فيها الروابط المؤجلة) قبل الإغلاق.
+                self._flush_pending()
+                self.conn.commit()
+                self.conn.close()
             print("تم إغلاق اتصال قاعدة بيانات الربط.")
 
 # --- مثال على كيفية الاستخدام (للاختبار فقط) ---
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+نتيجة وحدة عمل المزامنة
+sync_result.py
+
+الغرض:
+- جمع نتائج وحدة عمل واحدة (الروابط المكتشفة، الروابط الجديدة، السجلات الفاشلة)
+  في الذاكرة بدلاً من الكتابة في `SyncKeyManager` من داخل خيوط العمل.
+- تُدمج النتيجة لاحقًا من خيط واحد داخل معاملة `key_manager.batch()`؛ تستخدمها
+  مجموعة خيوط الشركات (`CompanyWorkerPool`) وخط المعالجة المتدفق (`SyncPipeline`).
+"""
+
+
+class SyncResult:
+    """
+    نتيجة مزامنة وحدة عمل واحدة (شركة أو دفعة) قبل دمجها في قاعدة بيانات الربط.
+    """
+    def __init__(self):
+        # روابط تم اكتشافها في الوجهة عبر حقول `x_*_sync_id`: {النموذج: {المصدر: الوجهة}}.
+        self.discovered = {}
+        # روابط السجلات التي تم إنشاؤها أو تحديثها: قائمة (المصدر، الوجهة، بصمة البيانات).
+        self.mappings = []
+        # السجلات الفاشلة: {المرحلة: {معرف المصدر: الخطأ}}.
+        self.failures = {}
+        # سجلات المصدر المعدلة (لتقديم مؤشر التقدم).
+        self.changed = []
+        # سجلات فاشلة سابقًا لم تعد بحاجة لإعادة المحاولة (مثل المحذوفة من المصدر).
+        self.cleared = []
+
+    def discover(self, model, resolved):
+        self.discovered.setdefault(model, {}).update(resolved)
+
+    def add_mapping(self, source_id, destination_id, payload_hash=None):
+        self.mappings.append((source_id, destination_id, payload_hash))
+
+    def fail(self, source_ids, stage, error):
+        stage_failures = self.failures.setdefault(stage, {})
+        for source_id in source_ids:
+            stage_failures[source_id] = error
+
+    def clear(self, source_ids):
+        self.cleared.extend(source_ids)
+
+    def apply(self, key_manager, model, tracker):
+        """
+        كتابة النتيجة في قاعدة بيانات الربط وجدول السجلات الفاشلة.
+        يجب استدعاؤها من الخيط الرئيسي داخل `key_manager.batch()`.
+
+        Args:
+            key_manager: كائن مدير مفاتيح المزامنة.
+            model (str): نموذج السجلات المربوطة.
+            tracker (FailedRecordTracker): متتبع السجلات الفاشلة للوحدة.
+        """
+        for discovered_model, resolved in self.discovered.items():
+            key_manager.add_mappings_bulk(discovered_model, resolved)
+        for source_id, destination_id, payload_hash in self.mappings:
+            key_manager.add_mapping(model, source_id, destination_id, payload_hash=payload_hash)
+        # السجلات المربوطة التي فشلت في مرحلة لاحقة (مثل الترحيل) تبقى في قائمة
+        # الفاشلة حتى تنجح فعلًا، مع الحفاظ على عدد محاولاتها.
+        failed_ids = {source_id for errors in self.failures.values() for source_id in errors}
+        tracker.clear([source_id for source_id, _, _ in self.mappings if source_id not in failed_ids] + self.cleared)
+        for stage, errors in self.failures.items():
+            tracker.record_many(errors, stage)
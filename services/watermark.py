@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة مؤشرات التقدم (watermarks) لكل وحدة مزامنة
+watermark.py
+
+الغرض:
+- الاحتفاظ لكل (وحدة، نموذج) بمؤشر على شكل (write_date, id) لآخر سجل تمت
+  مزامنته، محفوظ في جدول `watermarks` داخل `sync_map.db`.
+- بناء نطاق (domain) تزايدي يعتمد على المؤشر بدلاً من `write_date > last_sync_time`:
+  السجلات التي تشترك في نفس الثانية لا يتم تخطيها ولا تكرارها، لأن `id`
+  يفصل بينها.
+- يخزن Odoo قيمة `write_date` بالميكروثانية بينما تعيدها واجهة RPC مقربة إلى
+  الثانية، ولجميع السجلات المكتوبة في معاملة واحدة نفس القيمة. لذلك لا تتم
+  مقارنة `write_date` بالمساواة أبدًا: المؤشر يعني "جميع الثواني قبل `write_date`
+  مكتملة، وداخل ثانية `write_date` اكتملت المعرفات حتى `last_id`".
+- تقديم المؤشر بعد كل دفعة مكتملة، بحيث يستأنف التشغيل التالي من حيث توقف
+  هذا التشغيل حتى لو فشلت وحدة أخرى أو توقف البرنامج.
+"""
+
+from datetime import datetime, timedelta
+
+WRITE_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _next_second(write_date):
+    """
+    بداية الثانية التالية لقيمة `write_date` (بصيغة Odoo النصية).
+    """
+    return (datetime.strptime(write_date[:19], WRITE_DATE_FORMAT) + timedelta(seconds=1)).strftime(WRITE_DATE_FORMAT)
+
+
+class WatermarkCursor:
+    """
+    مؤشر (write_date, id) لنموذج واحد ضمن وحدة مزامنة واحدة.
+    """
+    # الترتيب الذي يجب أن تُقرأ به السجلات حتى يكون تقديم المؤشر صحيحًا.
+    ORDER = 'write_date asc, id asc'
+
+    def __init__(self, key_manager, module_name, model, default_write_date):
+        """
+        Args:
+            key_manager: كائن مدير مفاتيح المزامنة (يحفظ المؤشرات).
+            module_name (str): اسم وحدة المزامنة (مثال: 'InvoiceSyncModule').
+            model (str): اسم النموذج في المصدر (مثال: 'account.move.line').
+            default_write_date (str): نقطة البداية إذا لم يكن هناك مؤشر محفوظ
+                (عادة آخر وقت مزامنة عام من `last_sync_time.txt`).
+        """
+        self.key_manager = key_manager
+        self.module_name = module_name
+        self.model = model
+        saved = key_manager.get_watermark(module_name, model)
+        self.write_date, self.last_id = saved if saved else (default_write_date, 0)
+        # أكبر موضع تمت مشاهدته ولم يُحفظ بعد (انظر `observe` و `commit`).
+        self._pending = None
+
+    def domain(self):
+        """
+        النطاق الذي يطابق السجلات الواقعة بعد المؤشر الحالي:
+        write_date في ثانية لاحقة، أو في ثانية المؤشر و id > آخر معرف.
+        """
+        return self._after(self.write_date, self.last_id)
+
+    @staticmethod
+    def _after(write_date, last_id):
+        return [
+            '&', ('write_date', '>=', write_date),
+            '|', ('write_date', '>=', _next_second(write_date)), ('id', '>', last_id),
+        ]
+
+    def iter_chunks(self, model, domain, fields, chunk_size=500):
+        """
+        قراءة السجلات الواقعة بعد المؤشر على دفعات، بحيث تنتهي كل دفعة عند حد
+        يمكن حفظ المؤشر عنده (`advance(chunk)`) دون تخطي أو تكرار سجلات:
+        - تُقرأ الدفعة بترتيب `ORDER`، ثم تُستبعد سجلات آخر ثانية فيها لأنها قد
+          تكون ناقصة، وتُقرأ من جديد في الدفعة التالية.
+        - إذا كانت الدفعة كلها في ثانية واحدة (سجلات أكثر من حجم الدفعة في نفس
+          الثانية)، تتم قراءة هذه الثانية وحدها بترتيب `id`.
+        لا يتم تغيير المؤشر هنا؛ يتم تقديمه بعد حفظ كل دفعة.
+
+        Args:
+            model: كائن النموذج في المصدر (مثال: `source['res.partner']`).
+            domain (list): شروط البحث الإضافية.
+            fields (list): الحقول المطلوبة (يجب أن تتضمن 'write_date').
+            chunk_size (int): الحد الأقصى لعدد السجلات في كل استدعاء.
+
+        Yields:
+            list: دفعات السجلات.
+        """
+        chunk_size = max(1, int(chunk_size))
+        write_date, last_id = self.write_date, self.last_id
+        while True:
+            rows = model.search_read(domain + self._after(write_date, last_id), fields, limit=chunk_size, order=self.ORDER)
+            if len(rows) < chunk_size:
+                if rows:
+                    yield rows
+                return
+            last_second = rows[-1]['write_date']
+            complete = [row for row in rows if row['write_date'] != last_second]
+            if complete:
+                yield complete
+                write_date, last_id = max((row['write_date'], row['id']) for row in complete)
+                continue
+            # جميع سجلات الدفعة في ثانية واحدة: قراءة هذه الثانية بترتيب المعرف.
+            if last_second != write_date:
+                last_id = 0
+            write_date = last_second
+            window = [('write_date', '>=', write_date), ('write_date', '<', _next_second(write_date))]
+            while True:
+                rows = model.search_read(domain + window + [('id', '>', last_id)], fields, limit=chunk_size, order='id asc')
+                if rows:
+                    yield rows
+                    last_id = rows[-1]['id']
+                if len(rows) < chunk_size:
+                    break
+
+    def observe(self, records):
+        """
+        تسجيل أكبر (write_date, id) في السجلات المعطاة دون حفظه، لاستخدامه عندما
+        لا يمكن حفظ المؤشر إلا بعد اكتمال عدة دفعات (مثل سطور القيود).
+
+        Args:
+            records (iterable): قواميس تحتوي على 'id' و 'write_date'.
+        """
+        position = self._pending or (self.write_date, self.last_id)
+        for record in records:
+            if record.get('write_date'):
+                position = max(position, (record['write_date'], record['id']))
+        self._pending = position
+
+    def commit(self):
+        """
+        حفظ الموضع المسجل عبر `observe` كمؤشر جديد.
+        يجب استدعاؤها فقط بعد اكتمال مزامنة جميع السجلات المسجلة.
+        """
+        position, self._pending = self._pending, None
+        if position and position != (self.write_date, self.last_id):
+            self.write_date, self.last_id = position
+            self.key_manager.set_watermark(self.module_name, self.model, self.write_date, self.last_id)
+
+    def advance(self, records):
+        """
+        تقديم المؤشر إلى أكبر (write_date, id) في السجلات المعطاة وحفظه.
+        يجب استدعاؤها فقط بعد اكتمال مزامنة هذه السجلات.
+
+        Args:
+            records (iterable): قواميس تحتوي على 'id' و 'write_date'.
+        """
+        self.observe(records)
+        self.commit()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+وحدة تجميع عمليات الكتابة المتطابقة
+write_planner.py
+
+الغرض:
+- جمع عمليات `write` المعلقة لنموذج واحد، وتجميعها حسب قاموس القيم المطابق.
+- تنفيذ استدعاء `write(ids, vals)` واحد لكل مجموعة بدلاً من استدعاء لكل سجل
+  (مثل أرشفة جميع السجلات المحذوفة بـ {'active': False}، أو السجلات التي
+  تحصل على نفس القيم بعد التحويل).
+- الرجوع إلى الكتابة سجلًا بسجل فقط عند فشل الاستدعاء المجمع، حتى لا يمنع
+  سجل واحد غير صالح تحديث بقية المجموعة.
+"""
+
+import logging
+
+from services.payload_hash import payload_hash
+
+
+class WritePlanner:
+    """
+    مخطط عمليات الكتابة لنموذج واحد في الوجهة.
+
+    مثال:
+        planner = WritePlanner(dest_conn, 'account.tax')
+        for destination_id in ids:
+            planner.add(destination_id, {'active': False})
+        written, failed = planner.flush()
+    """
+    def __init__(self, dest_conn, model, logger=None):
+        """
+        Args:
+            dest_conn: كائن اتصال Odoo API للوجهة.
+            model (str): اسم النموذج (مثال: 'res.partner').
+            logger: كائن المنسق (logger) المستخدم لتسجيل التفاصيل.
+        """
+        self.dest = dest_conn
+        self.model = model
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        # {بصمة القيم: (القيم، قائمة معرفات الوجهة)} بترتيب الإضافة.
+        self._groups = {}
+
+    def __len__(self):
+        return sum(len(ids) for _, ids in self._groups.values())
+
+    def add(self, destination_id, vals):
+        """
+        إضافة عملية كتابة معلقة لسجل واحد.
+
+        Args:
+            destination_id (int): معرف السجل في الوجهة.
+            vals (dict): القيم المراد كتابتها.
+        """
+        key = payload_hash(vals)
+        if key not in self._groups:
+            self._groups[key] = (vals, [])
+        ids = self._groups[key][1]
+        if destination_id not in ids:
+            ids.append(destination_id)
+
+    def flush(self):
+        """
+        تنفيذ جميع عمليات الكتابة المعلقة: استدعاء `write` واحد لكل مجموعة قيم متطابقة.
+
+        Returns:
+            tuple: (قائمة المعرفات التي تمت كتابتها، قاموس {المعرف: الخطأ} للفاشلة).
+        """
+        groups, self._groups = self._groups, {}
+        if not groups:
+            return [], {}
+        total = sum(len(ids) for _, ids in groups.values())
+        self.logger.info(f"      - كتابة {total} سجل {self.model} في {len(groups)} استدعاء write.")
+
+        written, failed = [], {}
+        for vals, ids in groups.values():
+            try:
+                self.dest[self.model].write(ids, vals)
+                written.extend(ids)
+                continue
+            except Exception as e:
+                if len(ids) == 1:
+                    failed[ids[0]] = e
+                    continue
+                self.logger.warning(f"      - فشل استدعاء write المجمع لـ {len(ids)} سجل ({e}). المحاولة سجلًا بسجل.")
+
+            for destination_id in ids:
+                try:
+                    self.dest[self.model].write([destination_id], vals)
+                    written.append(destination_id)
+                except Exception as e:
+                    failed[destination_id] = e
+        return written, failed
@@ -9,18 +9,32 @@ modules/accounts_sync.py
 """
 
 import logging
+import threading
+
+from odoorpc.client import DEFAULT_MAP_WORKERS
+from services.company_pool import CompanyWorkerPool
+from services.sync_result import SyncResult
+from services.id_resolver import DestinationIdResolver
+from services.deletion_detector import DeletionDetector
+from services.payload_hash import PayloadHashFilter
+from services.write_planner import WritePlanner
+from services.batch_creator import AdaptiveBatchCreator
+from services.failed_records import FailedRecordTracker, STAGE_CREATE, STAGE_TRANSFORM, STAGE_UPDATE
+from services.watermark import WatermarkCursor
 
 class AccountSyncModule:
     """
     وحدة متخصصة لمزامنة شجرة الحسابات (account.account).
     """
     MODEL = 'account.account'
+    # وحدات المزامنة التي يجب أن تنجح قبل تشغيل هذه الوحدة (أسماء الكلاسات).
+    DEPENDS_ON = ('CompanySyncModule',)
     # الحقول الأساسية للحساب. تأكد من تطابقها مع احتياجاتك.
     FIELDS_TO_SYNC = [
         'id', 'name', 'code', 'reconcile', 'company_ids', 'account_type', 'write_date'
     ]
 
-    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None):
+    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None, settings=None, reference_data=None):
         """
         تهيئة الوحدة بالخدمات التي تحتاجها من المحرك.
 
@@ -30,6 +44,8 @@ class AccountSyncModule:
             key_manager: كائن مدير مفاتيح المزامنة.
             last_sync_time: آخر طابع زمني للمزامنة الناجحة.
             loggers (dict): قاموس يحتوي على كائنات المنسق (loggers) المختلفة.
+            settings (dict): إعدادات المزامنة من قسم [sync] (اختياري).
+            reference_data (ReferenceDataCache): ذاكرة البيانات المرجعية المشتركة (اختياري).
         """
         self.source = source_conn
         self.dest = dest_conn
@@ -42,13 +58,43 @@ class AccountSyncModule:
         self.logger = loggers.get("accounts_sync", logging.getLogger(__name__))
         self.activity_logger = loggers.get("activity", logging.getLogger(__name__))
         self.error_logger = loggers.get("error", logging.getLogger(__name__))
+        self.resolver = DestinationIdResolver(self.dest, self.key_manager, logger=self.logger)
+        self.settings = settings or {}
+        self.creator = AdaptiveBatchCreator(
+            self.dest, self.MODEL,
+            batch_size=self.settings.get('create_batch_size', AdaptiveBatchCreator.DEFAULT_BATCH_SIZE),
+            target_seconds=self.settings.get('create_target_seconds', AdaptiveBatchCreator.DEFAULT_TARGET_SECONDS),
+            sync_field='x_account_sync_id', logger=self.logger
+        )
+        # منشئات الدفعات الخاصة باتصالات خيوط `company_pool`.
+        self._creators = {}
+        self._creators_lock = threading.Lock()
+        # معالجة الشركات بالتوازي، لكل خيط اتصالاته الخاصة.
+        self.company_pool = CompanyWorkerPool(
+            self.source, self.dest,
+            max_workers=self.settings.get('company_workers', CompanyWorkerPool.DEFAULT_WORKERS),
+            logger=self.logger
+        )
+        self.failures = FailedRecordTracker(self.key_manager, self.__class__.__name__, self.MODEL, logger=self.logger)
+        # وضع إعادة محاولة السجلات الفاشلة فقط (بدون فحص الحذف).
+        self.retry_mode = False
+        self.payload_filter = PayloadHashFilter(self.key_manager, self.MODEL, 'x_account_sync_id', logger=self.logger)
+        self.deletion_detector = DeletionDetector(
+            self.source, self.key_manager,
+            chunk_size=self.settings.get('deletion_chunk_size', DeletionDetector.DEFAULT_CHUNK_SIZE),
+            scan_every=self.settings.get('deletion_scan_every', 1),
+            logger=self.logger
+        )
 
         self.logger.info("تم تهيئة وحدة مزامنة شجرة الحسابات.")
 
     def run(self):
         """
         نقطة الدخول الرئيسية لتشغيل مزامنة هذه الوحدة.
-        تقوم بجلب السجلات المعدلة من المصدر وتمريرها لدالة المزامنة الفردية.
+        تتم قراءة الحسابات المعدلة مرة واحدة ثم توزيعها على وحدات عمل الشركات بحيث
+        يُعالج كل حساب في وحدة واحدة فقط (انظر `_assign_units`)، وتعمل الوحدات على
+        مجموعة خيوط محدودة (`company_workers`). تُدمج نتائج جميع الشركات في قاعدة
+        بيانات الربط ضمن معاملة واحدة.
         """
         self.logger.info("بدء مزامنة شجرة الحسابات...")
         
@@ -59,110 +105,280 @@ class AccountSyncModule:
             self.logger.info("  - لا توجد شركات في المصدر لمزامنة الحسابات.")
             return
 
-        total_companies = len(source_companies)
-        for i, company in enumerate(source_companies):
-            self.logger.info(f"\n--- مزامنة الحسابات للشركة: {company.get('name')} (ID: {company['id']}) ({i+1}/{total_companies}) ---")
-            
+        # حل معرفات الشركات في الوجهة دفعة واحدة عبر `x_company_sync_id`.
+        dest_company_ids = self.resolver.resolve('res.company', 'x_company_sync_id', [c['id'] for c in source_companies])
+
+        # مؤشر تقدم واحد لجميع الشركات، يتم تقديمه في نهاية التشغيل فقط.
+        watermark = WatermarkCursor(self.key_manager, self.__class__.__name__, self.MODEL, self.last_sync_time)
+        skipped_companies = False
+        for company in source_companies:
             # جلب معرف الشركة المقابل في الوجهة باستخدام `x_company_sync_id`.
-            dest_company_ids_in_dest = self.dest['res.company'].search([('x_company_sync_id', '=', str(company['id']))], limit=1)
-            if not dest_company_ids_in_dest:
+            if not dest_company_ids.get(company['id']):
                 self.logger.warning(f"  - تحذير: لم يتم العثور على الشركة ID {company['id']} في الوجهة عبر x_company_sync_id. سيتم تخطي حسابات هذه الشركة.")
+                skipped_companies = True
+
+        # 2. قراءة الحسابات المعدلة في جميع الشركات مرة واحدة.
+        # استخدام مؤشر التقدم (write_date, id) للمزامنة التزايدية.
+        changed = self.source[self.MODEL].search_read(
+            [('company_ids', 'in', [c['id'] for c in source_companies])] + watermark.domain(),
+            ['id', 'write_date'], order=WatermarkCursor.ORDER
+        )
+        chunk_size = self.settings.get('read_chunk_size', 500)
+        accounts_data = []
+        for start in range(0, len(changed), chunk_size):
+            accounts_data.extend(self.source[self.MODEL].read([r['id'] for r in changed[start:start + chunk_size]], self.FIELDS_TO_SYNC))
+        self.logger.info(f"  - تم العثور على {len(accounts_data)} حساب معدل في المصدر.")
+
+        units = self._assign_units(accounts_data, dest_company_ids, {c['id']: c for c in source_companies})
+        results = self.company_pool.map(self._sync_company, units)
+        changed_records, error = self._apply_results(results)
+
+        # تقديم مؤشر التقدم فقط إذا تمت معالجة جميع الشركات، حتى لا يتم تخطي
+        # سجلات الشركات غير الموجودة في الوجهة بعد.
+        if skipped_companies or error is not None:
+            self.logger.warning("  - لم يتم تقديم مؤشر التقدم لأن بعض الشركات لم تتم معالجتها.")
+        else:
+            watermark.advance(changed_records)
+        if error is not None:
+            raise error
+
+        # معالجة الحذف مرة واحدة بعد مزامنة جميع الشركات (وليس لكل شركة).
+        self._handle_deletions()
+
+        self.logger.info(f"  - عدد السجلات التي تم تخطيها دون تغيير: {self.payload_filter.skipped}.")
+        self.logger.info("اكتملت مزامنة شجرة الحسابات.")
+
+    def retry_failed(self):
+        """
+        وضع `--retry-failed`: إعادة مزامنة السجلات المسجلة كفاشلة فقط والتي حان
+        موعد إعادة محاولتها، دون تحريك مؤشر التقدم أو فحص الحذف.
+        يتم تجميع السجلات حسب الشركة لأن التحويل يعتمد على شركة الوجهة.
+        """
+        self.logger.info("بدء إعادة محاولة مزامنة الحسابات الفاشلة...")
+        self.retry_mode = True
+        source_ids = self.failures.due_ids()
+        self.logger.info(f"  - عدد السجلات المستحقة لإعادة المحاولة: {len(source_ids)}.")
+        chunk_size = self.settings.get('read_chunk_size', 500)
+        for start in range(0, len(source_ids), chunk_size):
+            ids = source_ids[start:start + chunk_size]
+            source_data = self.source[self.MODEL].search_read([('id', 'in', ids)], self.FIELDS_TO_SYNC)
+            # السجلات التي لم تعد موجودة في المصدر لا تحتاج إلى إعادة محاولة.
+            self.failures.clear(set(ids) - {r['id'] for r in source_data})
+
+            source_company_ids = {company_id for record in source_data for company_id in record.get('company_ids') or []}
+            dest_company_ids = self.resolver.resolve('res.company', 'x_company_sync_id', source_company_ids)
+            units = self._assign_units(source_data, dest_company_ids, {})
+            _, error = self._apply_results(self.company_pool.map(self._sync_company, units))
+            if error is not None:
+                raise error
+        self.logger.info("اكتملت إعادة محاولة مزامنة الحسابات الفاشلة.")
+
+    def _assign_units(self, accounts_data, dest_company_ids, companies_by_id):
+        """
+        توزيع الحسابات على وحدات عمل الشركات بحيث يُعالج كل حساب في وحدة واحدة فقط.
+        الحساب قد ينتمي لعدة شركات (`company_ids`)؛ معالجته في أكثر من وحدة بالتوازي
+        تؤدي إلى إنشائه أكثر من مرة في الوجهة، لذلك يُسند إلى أول شركة مربوطة له
+        ويُكتب في الوجهة مع جميع شركاته المربوطة.
+
+        Args:
+            accounts_data (list): قائمة قواميس الحسابات المقروءة من المصدر.
+            dest_company_ids (dict): {معرف الشركة في المصدر: معرف الشركة في الوجهة}.
+            companies_by_id (dict): شركات المصدر حسب المعرف (لأسماء الشركات في السجلات).
+
+        Returns:
+            list: وحدات العمل (الشركة في المصدر، معرف الشركة في الوجهة، الحسابات، `dest_company_ids`).
+        """
+        units = {}
+        for record in accounts_data:
+            mapped = [company_id for company_id in sorted(record.get('company_ids') or []) if dest_company_ids.get(company_id)]
+            if not mapped:
+                self.logger.warning(f"  - تحذير: لا توجد شركة مربوطة في الوجهة للحساب ID {record['id']}. سيتم تأجيله.")
                 continue
-            dest_company_id = dest_company_ids_in_dest[0]
-
-            # البحث عن الحسابات الخاصة بهذه الشركة في المصدر.
-            # استخدام `write_date` للمزامنة التزايدية.
-            company_accounts_ids = self.source['account.account'].search([
-                ('company_ids', 'in', [company['id']]),
-                ('write_date', '>', self.last_sync_time)
-            ])
-            company_accounts_data = self.source['account.account'].read(company_accounts_ids, self.FIELDS_TO_SYNC)
-            
-            total_accounts_in_company = len(company_accounts_data)
-            self.logger.info(f"  - تم العثور على {total_accounts_in_company} حساب في المصدر لهذه الشركة.")
-
-            # 2. تجهيز السجلات للمزامنة الدفعية.
-            records_to_create = []
-            records_to_update = []
-
-            for j, account_record in enumerate(company_accounts_data):
-                self.logger.debug(f"    - معالجة حساب {j+1}/{total_accounts_in_company}: {account_record.get('code')} {account_record.get('name')} (ID: {account_record['id']})")
-                source_id = account_record['id']
-                source_code = account_record.get('code')
-                source_name = account_record.get('name')
-
-                if not source_code:
-                    self.logger.warning(f"    - تخطي الحساب '{source_name}' (ID: {source_id}) لأنه لا يحتوي على كود في المصدر.")
+            owner = mapped[0]
+            unit = units.get(owner)
+            if unit is None:
+                unit = units[owner] = (companies_by_id.get(owner, {'id': owner}), dest_company_ids[owner], [], dest_company_ids)
+            unit[2].append(record)
+        return list(units.values())
+
+    def _sync_company(self, unit, source, dest):
+        """
+        وحدة عمل شركة واحدة (تعمل داخل خيط من `company_pool`): دفع حسابات الشركة
+        إلى الوجهة باستخدام اتصالات الخيط، دون الكتابة في قاعدة بيانات الربط.
+
+        Args:
+            unit (tuple): (الشركة في المصدر، معرف الشركة في الوجهة، الحسابات، `dest_company_ids`).
+            source: اتصال المصدر الخاص بالخيط.
+            dest: اتصال الوجهة الخاص بالخيط.
+
+        Returns:
+            SyncResult: نتيجة الشركة لدمجها لاحقًا.
+        """
+        company, dest_company_id, company_accounts_data, dest_company_ids = unit
+        self.logger.info(f"\n--- مزامنة {len(company_accounts_data)} حساب للشركة: {company.get('name')} (ID: {company['id']}) ---")
+        result = SyncResult()
+        # سجلات المصدر المعدلة (لتقديم مؤشر التقدم).
+        result.changed = company_accounts_data
+        self._sync_company_records(company_accounts_data, dest_company_id, dest, result, dest_company_ids)
+        return result
+
+    def _apply_results(self, results):
+        """
+        دمج نتائج جميع الشركات في قاعدة بيانات الربط وجدول السجلات الفاشلة
+        ضمن معاملة واحدة.
+
+        Args:
+            results (list): قائمة (وحدة العمل، SyncResult، الخطأ) من `company_pool.map`.
+
+        Returns:
+            tuple: (سجلات المصدر المعدلة في الشركات الناجحة، أول خطأ أو None).
+        """
+        changed_records, first_error = [], None
+        with self.key_manager.batch():
+            for unit, result, error in results:
+                if error is not None:
+                    self.error_logger.error(f"    - [خطأ] فشلت مزامنة حسابات الشركة ID {unit[0]['id']}. الخطأ: {error}")
+                    first_error = first_error or error
                     continue
+                result.apply(self.key_manager, self.MODEL, self.failures)
+                changed_records.extend(result.changed)
+        return changed_records, first_error
 
-                transformed_data = self._transform_data(account_record, dest_company_id)
-                transformed_data['company_ids'] = [(6, 0, [dest_company_id])]
-
-                # 1. البحث في الوجهة مباشرة باستخدام `x_account_sync_id`.
-                search_domain_x_sync_id = [('x_account_sync_id', '=', str(source_id))]
-                existing_record_by_x_sync_id = self.dest[self.MODEL].search(search_domain_x_sync_id, limit=1)
-
-                if existing_record_by_x_sync_id:
-                    destination_id = existing_record_by_x_sync_id[0]
-                    records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
-                else:
-                    # 2. إذا لم يتم العثور عليه عبر `x_account_sync_id`، حاول البحث بالكود ومعرف الشركة.
-                    search_domain_by_code = [
-                        ('code', '=', source_code),
-                        ('company_ids', 'in', [dest_company_id])
-                    ]
-                    existing_record_by_code = self.dest[self.MODEL].search(search_domain_by_code, limit=1)
-
-                    if existing_record_by_code:
-                        destination_id = existing_record_by_code[0]
-                        transformed_data['x_account_sync_id'] = str(source_id)
-                        records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
-                    else:
-                        # 3. لم يتم العثور عليه بأي من الطريقتين، قم بإنشاء جديد.
-                        transformed_data['x_account_sync_id'] = str(source_id)
-                        records_to_create.append({'data': transformed_data, 'source_id': source_id})
-            
-            self._batch_sync_records(records_to_create, records_to_update)
-            
-        self.logger.info("اكتملت مزامنة شجرة الحسابات.")
+    def _creator_for(self, dest):
+        """
+        منشئ الدفعات الخاص باتصال الوجهة (لكل خيط منشئ خاص يحتفظ بحجم دفعته المتكيف).
+        """
+        if dest is self.dest:
+            return self.creator
+        with self._creators_lock:
+            creator = self._creators.get(id(dest))
+            if creator is None or creator.dest is not dest:
+                creator = self._creators[id(dest)] = AdaptiveBatchCreator(
+                    dest, self.MODEL, batch_size=self.creator.batch_size,
+                    target_seconds=self.creator.target_seconds, sync_field=self.creator.sync_field, logger=self.logger
+                )
+            return creator
+
+    def _sync_company_records(self, company_accounts_data, dest_company_id, dest, result, dest_company_ids):
+        """
+        تحويل الحسابات المقروءة من المصدر لشركة واحدة ودفعها إلى الوجهة.
+
+        Args:
+            company_accounts_data (list): قائمة قواميس الحسابات المقروءة من المصدر.
+            dest_company_id (int): معرف الشركة المقابلة في الوجهة (للبحث بالكود).
+            dest: اتصال الوجهة المستخدم.
+            result (SyncResult): نتيجة الشركة التي تُجمع فيها الروابط والأخطاء.
+            dest_company_ids (dict): {معرف الشركة في المصدر: معرف الشركة في الوجهة}.
+        """
+        company_accounts_ids = [r['id'] for r in company_accounts_data]
+        total_accounts_in_company = len(company_accounts_data)
+
+        # تجهيز السجلات للمزامنة الدفعية.
+        records_to_create = []
+        records_to_update = []
+
+        # حل معرفات الحسابات الموجودة في الوجهة دفعة واحدة عبر `x_account_sync_id`.
+        existing_ids = DestinationIdResolver(dest, logger=self.logger).resolve(self.MODEL, 'x_account_sync_id', company_accounts_ids)
+        result.discover(self.MODEL, existing_ids)
+
+        # الحسابات غير المربوطة التي يجب البحث عنها بالكود ومعرف الشركة.
+        lookups = []
+
+        for j, account_record in enumerate(company_accounts_data):
+            self.logger.debug(f"    - معالجة حساب {j+1}/{total_accounts_in_company}: {account_record.get('code')} {account_record.get('name')} (ID: {account_record['id']})")
+            source_id = account_record['id']
+            source_code = account_record.get('code')
+            source_name = account_record.get('name')
+
+            if not source_code:
+                self.logger.warning(f"    - تخطي الحساب '{source_name}' (ID: {source_id}) لأنه لا يحتوي على كود في المصدر.")
+                continue
+
+            transformed_data = self._transform_data(account_record, dest_company_id)
+            # جميع شركات الحساب المربوطة في الوجهة (الحساب قد يكون مشتركًا بين عدة شركات).
+            account_companies = sorted({dest_company_ids[cid] for cid in account_record.get('company_ids') or [] if dest_company_ids.get(cid)} | {dest_company_id})
+            transformed_data['company_ids'] = [(6, 0, account_companies)]
+
+            # 1. البحث في نتائج الحل المسبق باستخدام `x_account_sync_id`.
+            destination_id = existing_ids.get(source_id)
+
+            if destination_id:
+                records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
+            else:
+                transformed_data['x_account_sync_id'] = str(source_id)
+                search_domain_by_code = [
+                    ('code', '=', source_code),
+                    ('company_ids', 'in', [dest_company_id])
+                ]
+                lookups.append(({'data': transformed_data, 'source_id': source_id}, search_domain_by_code))
+
+        # 2. إذا لم يتم العثور عليه عبر `x_account_sync_id`، حاول البحث بالكود ومعرف الشركة.
+        # لكل حساب نطاق بحث مختلف، لذلك تُرسل عمليات البحث بالتوازي بدلاً من واحدة تلو الأخرى.
+        found = dest.map_execute(self.MODEL, 'search', [(domain,) for _, domain in lookups],
+                                 max_workers=self.settings.get('rpc_concurrency', DEFAULT_MAP_WORKERS), limit=1)
+        for (record, _), (existing_record_by_code, error) in zip(lookups, found):
+            if error is not None:
+                self.error_logger.error(f"    - [خطأ] فشل البحث عن الحساب بالكود للمصدر ID: {record['source_id']}. الخطأ: {error}")
+                result.fail([record['source_id']], STAGE_TRANSFORM, error)
+            elif existing_record_by_code:
+                records_to_update.append(dict(record, id=existing_record_by_code[0]))
+            else:
+                # 3. لم يتم العثور عليه بأي من الطريقتين، قم بإنشاء جديد.
+                records_to_create.append(record)
 
-    def _batch_sync_records(self, records_to_create, records_to_update):
+        self._batch_sync_records(records_to_create, records_to_update, dest, result)
+
+    def _batch_sync_records(self, records_to_create, records_to_update, dest, result):
         """
         يقوم بمزامنة السجلات على دفعات (batch) لزيادة الكفاءة.
+        الروابط والأخطاء تُجمع في `result` ولا تُكتب في قاعدة بيانات الربط هنا.
         """
         self.logger.info(f"بدء المزامنة الدفعية: {len(records_to_create)} سجلات للإنشاء، {len(records_to_update)} سجلات للتحديث.")
 
+        # تخطي التحديثات التي لا تغير البيانات المكتوبة سابقًا في الوجهة.
+        records_to_update = self.payload_filter.filter_updates(records_to_update)
+
         # إنشاء السجلات الجديدة
         if records_to_create:
             self.logger.info(f"إنشاء {len(records_to_create)} سجل جديد...")
             try:
-                new_records_data = [rec['data'] for rec in records_to_create]
-                new_destination_ids = self.dest[self.MODEL].create(new_records_data)
-                for i, new_destination_id in enumerate(new_destination_ids):
+                # الإنشاء على دفعات متكيفة مع عزل السجلات الفاشلة فقط.
+                created, failed = self._creator_for(dest).create([rec['data'] for rec in records_to_create])
+                for i, new_destination_id in created.items():
                     source_id = records_to_create[i]['source_id']
-                    self.key_manager.add_mapping(self.MODEL, source_id, new_destination_id)
+                    result.add_mapping(source_id, new_destination_id, payload_hash=self.payload_filter.hash(records_to_create[i]['data']))
                     self.activity_logger.info(f"    - تم إنشاء حساب جديد في الوجهة بمعرف ID: {new_destination_id} من المصدر ID: {source_id}")
+                for i, error in failed.items():
+                    self.error_logger.error(f"    - [خطأ] فشل في إنشاء الحساب من المصدر ID: {records_to_create[i]['source_id']}. الخطأ: {error}")
+                    result.fail([records_to_create[i]['source_id']], STAGE_CREATE, error)
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في إنشاء سجلات الحسابات الجديدة دفعيًا. الخطأ: {e}")
+                result.fail([rec['source_id'] for rec in records_to_create], STAGE_CREATE, e)
 
         # تحديث السجلات الموجودة
         if records_to_update:
             self.logger.info(f"تحديث {len(records_to_update)} سجل موجود...")
             try:
+                # تجميع التحديثات ذات القيم المتطابقة في استدعاء write واحد لكل مجموعة.
+                planner = WritePlanner(dest, self.MODEL, logger=self.logger)
+                for record_data in records_to_update:
+                    planner.add(record_data['id'], record_data['data'])
+                _, failed = planner.flush()
                 for record_data in records_to_update:
                     destination_id = record_data['id']
                     source_id = record_data['source_id']
-                    data = record_data['data']
-                    self.dest[self.MODEL].write([destination_id], data)
-                    self.key_manager.add_mapping(self.MODEL, source_id, destination_id)
+                    if destination_id in failed:
+                        self.error_logger.error(f"    - [خطأ] فشل في تحديث الحساب ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
+                        result.fail([source_id], STAGE_UPDATE, failed[destination_id])
+                        continue
+                    result.add_mapping(source_id, destination_id, payload_hash=record_data['payload_hash'])
                     self.activity_logger.info(f"    - تم تحديث حساب موجود في الوجهة ID: {destination_id} من المصدر ID: {source_id}")
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في تحديث سجلات الحسابات دفعيًا. الخطأ: {e}")
+                result.fail([rec['source_id'] for rec in records_to_update], STAGE_UPDATE, e)
 
         self.logger.info("اكتملت المزامنة الدفعية للحسابات.")
 
-        self._handle_deletions()
-
     def _handle_deletions(self):
         """
         يتعامل مع حذف السجلات عن طريق أرشفة السجلات في الوجهة
@@ -170,39 +386,34 @@ class AccountSyncModule:
         """
         self.logger.info("بدء معالجة حذف الحسابات...")
         
-        # 1. جلب جميع معرفات المصدر المخزنة محليًا لـ account.account.
-        mapped_source_ids = self.key_manager.get_all_source_ids_for_model(self.MODEL)
-        self.logger.debug(f"  - تم العثور على {len(mapped_source_ids)} معرف مصدر mapped لـ {self.MODEL}.")
-
-        if not mapped_source_ids:
-            self.logger.info("  - لا توجد معرفات مصدر mapped لـ account.account. تخطي معالجة الحذف.")
+        # 1. تشغيل الفحص فقط إذا كان مستحقًا في هذا التشغيل (كل N تشغيلات)، وليس في وضع إعادة المحاولة.
+        if self.retry_mode or not self.deletion_detector.is_due(self.__class__.__name__):
             return
 
-        # 2. جلب جميع معرفات account.account النشطة من نظام المصدر.
-        active_source_ids = self.source[self.MODEL].search([])
-        self.logger.debug(f"  - تم العثور على {len(active_source_ids)} معرف account.account نشط في المصدر.")
+        # 2. سؤال المصدر على دفعات عن المعرفات المربوطة التي لا تزال موجودة،
+        #    وحساب المحذوف منها بعمليات المجموعات بدلاً من جلب جميع المعرفات.
+        deleted = self.deletion_detector.find_deleted(self.MODEL)
+        self.logger.info(f"  - تم تحديد {len(deleted)} سجل account.account للحذف (الأرشفة) في الوجهة.")
 
-        # 3. تحديد السجلات التي تم حذفها في المصدر (موجودة في mapped_source_ids ولكن ليست في active_source_ids).
-        deleted_source_ids = [sid for sid in mapped_source_ids if sid not in active_source_ids]
-        self.logger.info(f"  - تم تحديد {len(deleted_source_ids)} سجل account.account للحذف (الأرشفة) في الوجهة.")
-
-        if not deleted_source_ids:
+        if not deleted:
             self.logger.info("  - لا توجد سجلات محذوفة في المصدر تتطلب الأرشفة في الوجهة.")
             return
 
-        # 4. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
-        for source_id in deleted_source_ids:
-            destination_id = self.key_manager.get_destination_id(self.MODEL, source_id)
-            if destination_id:
-                try:
-                    # أرشفة السجل في الوجهة (ضبط active = False).
-                    self.dest[self.MODEL].write([destination_id], {'active': False})
+        # 3. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
+        # أرشفة جميع السجلات المحذوفة في استدعاء write واحد.
+        planner = WritePlanner(self.dest, self.MODEL, logger=self.logger)
+        for destination_id in deleted.values():
+            planner.add(destination_id, {'active': False})
+        archived, failed = planner.flush()
+        archived = set(archived)
+        # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+        with self.key_manager.batch():
+            for source_id, destination_id in deleted.items():
+                if destination_id in archived:
                     self.key_manager.remove_mapping(self.MODEL, source_id)
                     self.activity_logger.info(f"    - تم أرشفة الحساب ID: {destination_id} في الوجهة وإزالة الربط للمصدر ID: {source_id}.")
-                except Exception as e:
-                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الحساب ID {destination_id} (المصدر ID: {source_id}). الخطأ: {e}")
-            else:
-                self.logger.warning(f"    - تحذير: لم يتم العثور على معرف الوجهة لـ account.account المصدر ID: {source_id} في قاعدة بيانات الربط.")
+                elif destination_id in failed:
+                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الحساب ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
 
         self.logger.info("اكتملت معالجة حذف الحسابات.")
 
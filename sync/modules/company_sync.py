@@ -10,17 +10,27 @@ modules/company_sync.py
 
 import logging
 
+from services.id_resolver import DestinationIdResolver
+from services.deletion_detector import DeletionDetector
+from services.payload_hash import PayloadHashFilter
+from services.write_planner import WritePlanner
+from services.batch_creator import AdaptiveBatchCreator
+from services.failed_records import FailedRecordTracker, STAGE_CREATE, STAGE_UPDATE
+from services.reference_cache import ReferenceDataCache
+
 class CompanySyncModule:
     """
     وحدة متخصصة لمزامنة الشركات (res.company).
     """
     MODEL = 'res.company'
+    # وحدات المزامنة التي يجب أن تنجح قبل تشغيل هذه الوحدة (أسماء الكلاسات).
+    DEPENDS_ON = ()
     # قائمة الحقول التي نريد مزامنتها. يمكن تعديلها حسب الحاجة.
     FIELDS_TO_SYNC = [
         'id', 'name', 'currency_id', 'phone', 'email', 'website', 'vat', 'company_registry'
     ]
 
-    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None):
+    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None, settings=None, reference_data=None):
         """
         تهيئة الوحدة بالخدمات التي تحتاجها من المحرك.
 
@@ -30,6 +40,8 @@ class CompanySyncModule:
             key_manager: كائن مدير مفاتيح المزامنة.
             last_sync_time: آخر طابع زمني للمزامنة الناجحة.
             loggers (dict): قاموس يحتوي على كائنات المنسق (loggers) المختلفة.
+            settings (dict): إعدادات المزامنة من قسم [sync] (اختياري).
+            reference_data (ReferenceDataCache): ذاكرة البيانات المرجعية المشتركة (اختياري).
         """
         self.source = source_conn
         self.dest = dest_conn
@@ -42,6 +54,25 @@ class CompanySyncModule:
         self.logger = loggers.get("company_sync", logging.getLogger(__name__))
         self.activity_logger = loggers.get("activity", logging.getLogger(__name__))
         self.error_logger = loggers.get("error", logging.getLogger(__name__))
+        self.resolver = DestinationIdResolver(self.dest, self.key_manager, logger=self.logger)
+        self.settings = settings or {}
+        self.reference_data = reference_data if reference_data is not None else ReferenceDataCache(self.dest, self.key_manager, logger=self.logger)
+        self.creator = AdaptiveBatchCreator(
+            self.dest, self.MODEL,
+            batch_size=self.settings.get('create_batch_size', AdaptiveBatchCreator.DEFAULT_BATCH_SIZE),
+            target_seconds=self.settings.get('create_target_seconds', AdaptiveBatchCreator.DEFAULT_TARGET_SECONDS),
+            sync_field='x_company_sync_id', logger=self.logger
+        )
+        self.failures = FailedRecordTracker(self.key_manager, self.__class__.__name__, self.MODEL, logger=self.logger)
+        # وضع إعادة محاولة السجلات الفاشلة فقط (بدون فحص الحذف).
+        self.retry_mode = False
+        self.payload_filter = PayloadHashFilter(self.key_manager, self.MODEL, 'x_company_sync_id', logger=self.logger)
+        self.deletion_detector = DeletionDetector(
+            self.source, self.key_manager,
+            chunk_size=self.settings.get('deletion_chunk_size', DeletionDetector.DEFAULT_CHUNK_SIZE),
+            scan_every=self.settings.get('deletion_scan_every', 1),
+            logger=self.logger
+        )
 
         self.logger.info("تم تهيئة وحدة مزامنة الشركات.")
 
@@ -60,9 +91,45 @@ class CompanySyncModule:
         total_records = len(source_data)
         self.logger.info(f"تم العثور على {total_records} شركة في المصدر.")
 
-        # 2. تجهيز السجلات للمزامنة الدفعية.
+        self._sync_chunk(source_data)
+        
+        self.logger.info(f"  - عدد السجلات التي تم تخطيها دون تغيير: {self.payload_filter.skipped}.")
+        self.logger.info("اكتملت مزامنة الشركات.")
+
+    def retry_failed(self):
+        """
+        وضع `--retry-failed`: إعادة مزامنة السجلات المسجلة كفاشلة فقط والتي حان
+        موعد إعادة محاولتها، دون تحريك مؤشر التقدم أو فحص الحذف.
+        """
+        self.logger.info("بدء إعادة محاولة مزامنة الشركات الفاشلة...")
+        self.retry_mode = True
+        source_ids = self.failures.due_ids()
+        self.logger.info(f"  - عدد السجلات المستحقة لإعادة المحاولة: {len(source_ids)}.")
+        chunk_size = self.settings.get('read_chunk_size', 500)
+        for start in range(0, len(source_ids), chunk_size):
+            ids = source_ids[start:start + chunk_size]
+            source_data = self.source[self.MODEL].search_read([('id', 'in', ids)], self.FIELDS_TO_SYNC)
+            # السجلات التي لم تعد موجودة في المصدر لا تحتاج إلى إعادة محاولة.
+            self.failures.clear(set(ids) - {r['id'] for r in source_data})
+            if source_data:
+                self._sync_chunk(source_data)
+        self.logger.info("اكتملت إعادة محاولة مزامنة الشركات الفاشلة.")
+
+    def _sync_chunk(self, source_data):
+        """
+        تحويل مجموعة من سجلات الشركات في المصدر ودفعها إلى الوجهة.
+
+        Args:
+            source_data (list): قائمة قواميس السجلات المقروءة من المصدر.
+        """
+        total_records = len(source_data)
+
+        # تجهيز السجلات للمزامنة الدفعية.
         records_to_create = []
         records_to_update = []
+
+        # حل معرفات الوجهة لجميع الشركات دفعة واحدة عبر `x_company_sync_id`.
+        existing_ids = self.resolver.resolve(self.MODEL, 'x_company_sync_id', [r['id'] for r in source_data])
         
         for i, record in enumerate(source_data):
             self.logger.debug(f"  - معالجة شركة {i+1}/{total_records}: {record.get('name')} (ID: {record['id']})")
@@ -70,12 +137,10 @@ class CompanySyncModule:
             company_name = record.get('name')
             transformed_data = self._transform_data(record)
 
-            # 1. البحث في الوجهة مباشرة باستخدام حقل `x_company_sync_id`.
-            search_domain_x_sync_id = [('x_company_sync_id', '=', str(source_id))]
-            existing_record_by_x_sync_id = self.dest[self.MODEL].search(search_domain_x_sync_id, limit=1)
+            # 1. البحث في نتائج الحل المسبق باستخدام حقل `x_company_sync_id`.
+            destination_id = existing_ids.get(source_id)
 
-            if existing_record_by_x_sync_id:
-                destination_id = existing_record_by_x_sync_id[0]
+            if destination_id:
                 records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
             else:
                 # 2. إذا لم يتم العثور عليه عبر x_company_sync_id، حاول البحث بالاسم في Odoo الوجهة.
@@ -91,8 +156,6 @@ class CompanySyncModule:
                     records_to_create.append({'data': transformed_data, 'source_id': source_id})
 
         self._batch_sync_records(records_to_create, records_to_update)
-        
-        self.logger.info("اكتملت مزامنة الشركات.")
 
     def _batch_sync_records(self, records_to_create, records_to_update):
         """
@@ -100,32 +163,53 @@ class CompanySyncModule:
         """
         self.logger.info(f"بدء المزامنة الدفعية: {len(records_to_create)} سجلات للإنشاء، {len(records_to_update)} سجلات للتحديث.")
 
+        # تخطي التحديثات التي لا تغير البيانات المكتوبة سابقًا في الوجهة.
+        records_to_update = self.payload_filter.filter_updates(records_to_update)
+
         # إنشاء السجلات الجديدة
         if records_to_create:
             self.logger.info(f"إنشاء {len(records_to_create)} سجل جديد...")
             try:
-                new_records_data = [rec['data'] for rec in records_to_create]
-                new_destination_ids = self.dest[self.MODEL].create(new_records_data)
-                for i, new_destination_id in enumerate(new_destination_ids):
-                    source_id = records_to_create[i]['source_id']
-                    self.key_manager.add_mapping(self.MODEL, source_id, new_destination_id)
-                    self.activity_logger.info(f"    - تم إنشاء شركة جديدة في الوجهة بمعرف ID: {new_destination_id} من المصدر ID: {source_id}")
+                # الإنشاء على دفعات متكيفة مع عزل السجلات الفاشلة فقط.
+                created, failed = self.creator.create([rec['data'] for rec in records_to_create])
+                # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+                with self.key_manager.batch():
+                    for i, new_destination_id in created.items():
+                        source_id = records_to_create[i]['source_id']
+                        self.key_manager.add_mapping(self.MODEL, source_id, new_destination_id, payload_hash=self.payload_filter.hash(records_to_create[i]['data']))
+                        self.activity_logger.info(f"    - تم إنشاء شركة جديدة في الوجهة بمعرف ID: {new_destination_id} من المصدر ID: {source_id}")
+                self.failures.clear([records_to_create[i]['source_id'] for i in created])
+                for i, error in failed.items():
+                    self.error_logger.error(f"    - [خطأ] فشل في إنشاء الشركة من المصدر ID: {records_to_create[i]['source_id']}. الخطأ: {error}")
+                self.failures.record_many({records_to_create[i]['source_id']: error for i, error in failed.items()}, STAGE_CREATE)
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في إنشاء سجلات الشركات الجديدة دفعيًا. الخطأ: {e}")
+                self.failures.record([rec['source_id'] for rec in records_to_create], STAGE_CREATE, e)
 
         # تحديث السجلات الموجودة
         if records_to_update:
             self.logger.info(f"تحديث {len(records_to_update)} سجل موجود...")
             try:
+                # تجميع التحديثات ذات القيم المتطابقة في استدعاء write واحد لكل مجموعة.
+                planner = WritePlanner(self.dest, self.MODEL, logger=self.logger)
                 for record_data in records_to_update:
-                    destination_id = record_data['id']
-                    source_id = record_data['source_id']
-                    data = record_data['data']
-                    self.dest[self.MODEL].write([destination_id], data)
-                    self.key_manager.add_mapping(self.MODEL, source_id, destination_id)
-                    self.activity_logger.info(f"    - تم تحديث شركة موجودة في الوجهة ID: {destination_id} من المصدر ID: {source_id}")
+                    planner.add(record_data['id'], record_data['data'])
+                _, failed = planner.flush()
+                # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+                with self.key_manager.batch():
+                    for record_data in records_to_update:
+                        destination_id = record_data['id']
+                        source_id = record_data['source_id']
+                        if destination_id in failed:
+                            self.error_logger.error(f"    - [خطأ] فشل في تحديث الشركة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
+                            self.failures.record([source_id], STAGE_UPDATE, failed[destination_id])
+                            continue
+                        self.key_manager.add_mapping(self.MODEL, source_id, destination_id, payload_hash=record_data['payload_hash'])
+                        self.failures.clear([source_id])
+                        self.activity_logger.info(f"    - تم تحديث شركة موجودة في الوجهة ID: {destination_id} من المصدر ID: {source_id}")
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في تحديث سجلات الشركات دفعيًا. الخطأ: {e}")
+                self.failures.record([rec['source_id'] for rec in records_to_update], STAGE_UPDATE, e)
 
         self.logger.info("اكتملت المزامنة الدفعية للشركات.")
 
@@ -138,39 +222,34 @@ class CompanySyncModule:
         """
         self.logger.info("بدء معالجة حذف الشركات...")
         
-        # 1. جلب جميع معرفات المصدر المخزنة محليًا لـ res.company.
-        mapped_source_ids = self.key_manager.get_all_source_ids_for_model(self.MODEL)
-        self.logger.debug(f"  - تم العثور على {len(mapped_source_ids)} معرف مصدر mapped لـ {self.MODEL}.")
-
-        if not mapped_source_ids:
-            self.logger.info("  - لا توجد معرفات مصدر mapped لـ res.company. تخطي معالجة الحذف.")
+        # 1. تشغيل الفحص فقط إذا كان مستحقًا في هذا التشغيل (كل N تشغيلات)، وليس في وضع إعادة المحاولة.
+        if self.retry_mode or not self.deletion_detector.is_due(self.__class__.__name__):
             return
 
-        # 2. جلب جميع معرفات res.company النشطة من نظام المصدر.
-        active_source_ids = self.source[self.MODEL].search([])
-        self.logger.debug(f"  - تم العثور على {len(active_source_ids)} معرف res.company نشط في المصدر.")
-
-        # 3. تحديد السجلات التي تم حذفها في المصدر (موجودة في mapped_source_ids ولكن ليست في active_source_ids).
-        deleted_source_ids = [sid for sid in mapped_source_ids if sid not in active_source_ids]
-        self.logger.info(f"  - تم تحديد {len(deleted_source_ids)} سجل res.company للحذف (الأرشفة) في الوجهة.")
+        # 2. سؤال المصدر على دفعات عن المعرفات المربوطة التي لا تزال موجودة،
+        #    وحساب المحذوف منها بعمليات المجموعات بدلاً من جلب جميع المعرفات.
+        deleted = self.deletion_detector.find_deleted(self.MODEL)
+        self.logger.info(f"  - تم تحديد {len(deleted)} سجل res.company للحذف (الأرشفة) في الوجهة.")
 
-        if not deleted_source_ids:
+        if not deleted:
             self.logger.info("  - لا توجد سجلات محذوفة في المصدر تتطلب الأرشفة في الوجهة.")
             return
 
-        # 4. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
-        for source_id in deleted_source_ids:
-            destination_id = self.key_manager.get_destination_id(self.MODEL, source_id)
-            if destination_id:
-                try:
-                    # أرشفة السجل في الوجهة (ضبط active = False).
-                    self.dest[self.MODEL].write([destination_id], {'active': False})
+        # 3. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
+        # أرشفة جميع السجلات المحذوفة في استدعاء write واحد.
+        planner = WritePlanner(self.dest, self.MODEL, logger=self.logger)
+        for destination_id in deleted.values():
+            planner.add(destination_id, {'active': False})
+        archived, failed = planner.flush()
+        archived = set(archived)
+        # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+        with self.key_manager.batch():
+            for source_id, destination_id in deleted.items():
+                if destination_id in archived:
                     self.key_manager.remove_mapping(self.MODEL, source_id)
                     self.activity_logger.info(f"    - تم أرشفة الشركة ID: {destination_id} في الوجهة وإزالة الربط للمصدر ID: {source_id}.")
-                except Exception as e:
-                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الشركة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {e}")
-            else:
-                self.logger.warning(f"    - تحذير: لم يتم العثور على معرف الوجهة لـ res.company المصدر ID: {source_id} في قاعدة بيانات الربط.")
+                elif destination_id in failed:
+                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الشركة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
 
         self.logger.info("اكتملت معالجة حذف الشركات.")
 
@@ -191,10 +270,19 @@ class CompanySyncModule:
         data_to_sync.pop('id', None)
 
         # معالجة currency_id (ربط العملة).
-        # نفترض أن معرفات العملات متناسقة أو يمكن ربطها مباشرة.
-        # في سيناريو أكثر تعقيدًا، قد تحتاج إلى وحدة مزامنة للعملات.
+        # يتم ربط العملة برمزها (الحقل name) عبر ذاكرة البيانات المرجعية (بما فيها
+        # العملات غير النشطة). معرف العملة في المصدر لا يطابق بالضرورة نفس العملة
+        # في الوجهة، لذلك لا تتم كتابة العملة إذا لم توجد في الوجهة.
         if data_to_sync.get('currency_id'):
-            source_currency_id = data_to_sync['currency_id'][0]
-            data_to_sync['currency_id'] = source_currency_id
+            source_currency_id, currency_name = data_to_sync['currency_id'][:2]
+            dest_currency_id = self.reference_data.get('res.currency', 'name', currency_name)
+            if dest_currency_id:
+                data_to_sync['currency_id'] = dest_currency_id
+            else:
+                self.logger.warning(
+                    f"  - تحذير: العملة '{currency_name}' (ID {source_currency_id}) غير موجودة في الوجهة. "
+                    f"لن تتم مزامنة عملة الشركة '{source_record.get('name')}'."
+                )
+                data_to_sync.pop('currency_id')
             
         return data_to_sync
\ No newline at end of file
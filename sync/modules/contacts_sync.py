@@ -1,13 +1,24 @@
 import logging
 
+from services.id_resolver import DestinationIdResolver
+from services.deletion_detector import DeletionDetector
+from services.payload_hash import PayloadHashFilter
+from services.write_planner import WritePlanner
+from services.batch_creator import AdaptiveBatchCreator
+from services.failed_records import FailedRecordTracker, STAGE_CREATE, STAGE_UPDATE
+from services.watermark import WatermarkCursor
+from services.reference_cache import ReferenceDataCache
+
 class ContactSyncModule:
     MODEL = 'res.partner'
+    # وحدات المزامنة التي يجب أن تنجح قبل تشغيل هذه الوحدة (أسماء الكلاسات).
+    DEPENDS_ON = ()
     FIELDS_TO_SYNC = [
         'id', 'name', 'display_name', 'write_date', 'company_type', 'street', 'city',
         'zip', 'country_id', 'phone', 'email', 'website', 'vat'
     ]
 
-    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None):
+    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None, settings=None, reference_data=None):
         self.source = source_conn
         self.dest = dest_conn
         self.key_manager = key_manager
@@ -17,33 +28,92 @@ class ContactSyncModule:
         self.logger = loggers.get("contacts_sync", logging.getLogger(__name__))
         self.activity_logger = loggers.get("activity", logging.getLogger(__name__))
         self.error_logger = loggers.get("error", logging.getLogger(__name__))
+        self.resolver = DestinationIdResolver(self.dest, self.key_manager, logger=self.logger)
+        self.settings = settings or {}
+        # البلدان في الوجهة من ذاكرة البيانات المرجعية المشتركة بدلاً من البحث لكل جهة اتصال.
+        self.reference_data = reference_data if reference_data is not None else ReferenceDataCache(self.dest, self.key_manager, logger=self.logger)
+        self.creator = AdaptiveBatchCreator(
+            self.dest, self.MODEL,
+            batch_size=self.settings.get('create_batch_size', AdaptiveBatchCreator.DEFAULT_BATCH_SIZE),
+            target_seconds=self.settings.get('create_target_seconds', AdaptiveBatchCreator.DEFAULT_TARGET_SECONDS),
+            sync_field='x_partner_sync_id', logger=self.logger
+        )
+        self.failures = FailedRecordTracker(self.key_manager, self.__class__.__name__, self.MODEL, logger=self.logger)
+        # وضع إعادة محاولة السجلات الفاشلة فقط (بدون فحص الحذف).
+        self.retry_mode = False
+        self.payload_filter = PayloadHashFilter(self.key_manager, self.MODEL, 'x_partner_sync_id', logger=self.logger)
+        self.deletion_detector = DeletionDetector(
+            self.source, self.key_manager,
+            chunk_size=self.settings.get('deletion_chunk_size', DeletionDetector.DEFAULT_CHUNK_SIZE),
+            scan_every=self.settings.get('deletion_scan_every', 1),
+            logger=self.logger
+        )
 
         self.logger.info("تم تهيئة وحدة مزامنة جهات الاتصال.")
 
     def run(self):
         self.logger.info("بدء مزامنة جهات الاتصال...")
         
-        domain = [('write_date', '>', self.last_sync_time)]
-        source_ids = self.source[self.MODEL].search(domain)
-        source_data = self.source[self.MODEL].read(source_ids, self.FIELDS_TO_SYNC)
-        
-        total_records = len(source_data)
+        # جلب السجلات الواقعة بعد مؤشر التقدم (write_date, id) الخاص بهذه الوحدة
+        # على دفعات بترتيب المؤشر، ومعالجة كل دفعة ودفعها إلى الوجهة قبل قراءة الدفعة التالية.
+        watermark = WatermarkCursor(self.key_manager, self.__class__.__name__, self.MODEL, self.last_sync_time)
+        chunk_size = self.settings.get('read_chunk_size', 500)
+        total_records = 0
+        for source_data in watermark.iter_chunks(self.source[self.MODEL], [], self.FIELDS_TO_SYNC, chunk_size=chunk_size):
+            total_records += len(source_data)
+            self.logger.info(f"--- معالجة دفعة من {len(source_data)} سجل (الإجمالي حتى الآن: {total_records}) ---")
+            self._sync_chunk(source_data)
+            # تقديم مؤشر التقدم بعد حفظ روابط الدفعة، حتى يستأنف التشغيل التالي من هنا.
+            watermark.advance(source_data)
+
         self.logger.info(f"تم العثور على {total_records} سجل في المصدر.")
 
+        self._handle_deletions()
+
+        self.logger.info(f"  - عدد السجلات التي تم تخطيها دون تغيير: {self.payload_filter.skipped}.")
+        self.logger.info("اكتملت مزامنة جهات الاتصال.")
+
+    def retry_failed(self):
+        """
+        وضع `--retry-failed`: إعادة مزامنة السجلات المسجلة كفاشلة فقط والتي حان
+        موعد إعادة محاولتها، دون تحريك مؤشر التقدم أو فحص الحذف.
+        """
+        self.logger.info("بدء إعادة محاولة مزامنة جهات الاتصال الفاشلة...")
+        self.retry_mode = True
+        source_ids = self.failures.due_ids()
+        self.logger.info(f"  - عدد السجلات المستحقة لإعادة المحاولة: {len(source_ids)}.")
+        chunk_size = self.settings.get('read_chunk_size', 500)
+        for start in range(0, len(source_ids), chunk_size):
+            ids = source_ids[start:start + chunk_size]
+            source_data = self.source[self.MODEL].search_read([('id', 'in', ids)], self.FIELDS_TO_SYNC)
+            # السجلات التي لم تعد موجودة في المصدر لا تحتاج إلى إعادة محاولة.
+            self.failures.clear(set(ids) - {r['id'] for r in source_data})
+            if source_data:
+                self._sync_chunk(source_data)
+        self.logger.info("اكتملت إعادة محاولة مزامنة جهات الاتصال الفاشلة.")
+
+    def _sync_chunk(self, source_data):
+        """
+        تحويل دفعة واحدة من سجلات المصدر ودفعها إلى الوجهة.
+
+        Args:
+            source_data (list): قائمة قواميس سجلات المصدر.
+        """
+        total_records = len(source_data)
         records_to_create = []
         records_to_update = []
 
+        # حل معرفات الوجهة لجميع سجلات الدفعة مرة واحدة بدلاً من بحث لكل سجل.
+        existing_ids = self.resolver.resolve(self.MODEL, 'x_partner_sync_id', [r['id'] for r in source_data])
+
         for i, record in enumerate(source_data):
             self.logger.debug(f"  - معالجة سجل {i+1}/{total_records}: {record.get('display_name', '')} (ID: {record['id']})")
             
             source_id = record['id']
             transformed_data = self._transform_data(record)
 
-            search_domain = [('x_partner_sync_id', '=', str(source_id))]
-            existing_record_ids = self.dest[self.MODEL].search(search_domain, limit=1)
-            
-            if existing_record_ids:
-                destination_id = existing_record_ids[0]
+            destination_id = existing_ids.get(source_id)
+            if destination_id:
                 records_to_update.append({
                     'id': destination_id,
                     'data': transformed_data,
@@ -56,12 +126,10 @@ class ContactSyncModule:
         if records_to_create:
             self._batch_create_records(records_to_create)
 
+        # تخطي التحديثات التي لا تغير البيانات المكتوبة سابقًا في الوجهة.
+        records_to_update = self.payload_filter.filter_updates(records_to_update)
         if records_to_update:
             self._batch_update_records(records_to_update)
-            
-        self._handle_deletions()
-
-        self.logger.info("اكتملت مزامنة جهات الاتصال.")
 
     def _handle_deletions(self):
         """
@@ -70,65 +138,79 @@ class ContactSyncModule:
         """
         self.logger.info("بدء معالجة حذف جهات الاتصال...")
         
-        # 1. جلب جميع معرفات المصدر المخزنة محليًا لـ res.partner.
-        mapped_source_ids = self.key_manager.get_all_source_ids_for_model(self.MODEL)
-        self.logger.debug(f"  - تم العثور على {len(mapped_source_ids)} معرف مصدر mapped لـ {self.MODEL}.")
-
-        if not mapped_source_ids:
-            self.logger.info("  - لا توجد معرفات مصدر mapped لـ res.partner. تخطي معالجة الحذف.")
+        # 1. تشغيل الفحص فقط إذا كان مستحقًا في هذا التشغيل (كل N تشغيلات)، وليس في وضع إعادة المحاولة.
+        if self.retry_mode or not self.deletion_detector.is_due(self.__class__.__name__):
             return
 
-        # 2. جلب جميع معرفات res.partner النشطة من نظام المصدر.
-        active_source_ids = self.source[self.MODEL].search([])
-        self.logger.debug(f"  - تم العثور على {len(active_source_ids)} معرف res.partner نشط في المصدر.")
+        # 2. سؤال المصدر على دفعات عن المعرفات المربوطة التي لا تزال موجودة،
+        #    وحساب المحذوف منها بعمليات المجموعات بدلاً من جلب جميع المعرفات.
+        deleted = self.deletion_detector.find_deleted(self.MODEL)
+        self.logger.info(f"  - تم تحديد {len(deleted)} سجل res.partner للحذف (الأرشفة) في الوجهة.")
 
-        # 3. تحديد السجلات التي تم حذفها في المصدر (موجودة في mapped_source_ids ولكن ليست في active_source_ids).
-        deleted_source_ids = [sid for sid in mapped_source_ids if sid not in active_source_ids]
-        self.logger.info(f"  - تم تحديد {len(deleted_source_ids)} سجل res.partner للحذف (الأرشفة) في الوجهة.")
-
-        if not deleted_source_ids:
+        if not deleted:
             self.logger.info("  - لا توجد سجلات محذوفة في المصدر تتطلب الأرشفة في الوجهة.")
             return
 
-        # 4. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
-        for source_id in deleted_source_ids:
-            destination_id = self.key_manager.get_destination_id(self.MODEL, source_id)
-            if destination_id:
-                try:
-                    # أرشفة السجل في الوجهة (ضبط active = False).
-                    self.dest[self.MODEL].write([destination_id], {'active': False})
+        # 3. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
+        # أرشفة جميع السجلات المحذوفة في استدعاء write واحد.
+        planner = WritePlanner(self.dest, self.MODEL, logger=self.logger)
+        for destination_id in deleted.values():
+            planner.add(destination_id, {'active': False})
+        archived, failed = planner.flush()
+        archived = set(archived)
+        # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+        with self.key_manager.batch():
+            for source_id, destination_id in deleted.items():
+                if destination_id in archived:
                     self.key_manager.remove_mapping(self.MODEL, source_id)
                     self.activity_logger.info(f"    - تم أرشفة جهة الاتصال ID: {destination_id} في الوجهة وإزالة الربط للمصدر ID: {source_id}.")
-                except Exception as e:
-                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة جهة الاتصال ID {destination_id} (المصدر ID: {source_id}). الخطأ: {e}")
-            else:
-                self.logger.warning(f"    - تحذير: لم يتم العثور على معرف الوجهة لـ res.partner المصدر ID: {source_id} في قاعدة بيانات الربط.")
+                elif destination_id in failed:
+                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة جهة الاتصال ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
 
         self.logger.info("اكتملت معالجة حذف جهات الاتصال.")
 
     def _batch_create_records(self, records_data):
-        self.logger.info(f"    - إنشاء {len(records_data)} سجل جديد دفعة واحدة.")
+        self.logger.info(f"    - إنشاء {len(records_data)} سجل جديد على دفعات.")
         try:
-            new_destination_ids = self.dest[self.MODEL].create(records_data)
-            for i, new_id in enumerate(new_destination_ids):
-                source_id = records_data[i]['x_partner_sync_id'] # Assuming x_partner_sync_id is set in transformed_data
-                self.key_manager.add_mapping(self.MODEL, int(source_id), new_id)
-                self.logger.debug(f"      - تم إنشاء سجل جديد في الوجهة بمعرف ID: {new_id} وتم تسجيل الربط للمصدر ID: {source_id}.")
+            # الإنشاء على دفعات متكيفة مع عزل السجلات الفاشلة فقط.
+            created, failed = self.creator.create(records_data)
+            for i, error in failed.items():
+                self.error_logger.error(f"    - [خطأ] فشل في إنشاء جهة الاتصال من المصدر ID: {records_data[i]['x_partner_sync_id']}. الخطأ: {error}")
+            self.failures.record_many({int(records_data[i]['x_partner_sync_id']): error for i, error in failed.items()}, STAGE_CREATE)
+            # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+            with self.key_manager.batch():
+                for i, new_id in created.items():
+                    source_id = records_data[i]['x_partner_sync_id'] # Assuming x_partner_sync_id is set in transformed_data
+                    self.key_manager.add_mapping(self.MODEL, int(source_id), new_id, payload_hash=self.payload_filter.hash(records_data[i]))
+                    self.logger.debug(f"      - تم إنشاء سجل جديد في الوجهة بمعرف ID: {new_id} وتم تسجيل الربط للمصدر ID: {source_id}.")
+                self.failures.clear([int(records_data[i]['x_partner_sync_id']) for i in created])
         except Exception as e:
             self.error_logger.error(f"    - [خطأ] فشل في إنشاء سجلات دفعة واحدة: {e}")
+            self.failures.record([int(rec['x_partner_sync_id']) for rec in records_data], STAGE_CREATE, e)
 
     def _batch_update_records(self, records_to_update):
         self.logger.info(f"    - تحديث {len(records_to_update)} سجل دفعة واحدة.")
         try:
+            # تجميع التحديثات ذات القيم المتطابقة في استدعاء write واحد لكل مجموعة.
+            planner = WritePlanner(self.dest, self.MODEL, logger=self.logger)
             for record_data in records_to_update:
-                destination_id = record_data['id']
-                source_id = record_data['source_id']
-                data = record_data['data']
-                self.dest[self.MODEL].write([destination_id], data)
-                self.key_manager.add_mapping(self.MODEL, source_id, destination_id)
-                self.logger.debug(f"      - تم تحديث سجل الوجهة ID: {destination_id} وتم تسجيل الربط للمصدر ID: {source_id}.")
+                planner.add(record_data['id'], record_data['data'])
+            _, failed = planner.flush()
+            # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+            with self.key_manager.batch():
+                for record_data in records_to_update:
+                    destination_id = record_data['id']
+                    source_id = record_data['source_id']
+                    if destination_id in failed:
+                        self.error_logger.error(f"    - [خطأ] فشل في تحديث جهة الاتصال ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
+                        self.failures.record([source_id], STAGE_UPDATE, failed[destination_id])
+                        continue
+                    self.key_manager.add_mapping(self.MODEL, source_id, destination_id, payload_hash=record_data['payload_hash'])
+                    self.failures.clear([source_id])
+                    self.logger.debug(f"      - تم تحديث سجل الوجهة ID: {destination_id} وتم تسجيل الربط للمصدر ID: {source_id}.")
         except Exception as e:
             self.error_logger.error(f"    - [خطأ] فشل في تحديث سجلات دفعة واحدة: {e}")
+            self.failures.record([rec['source_id'] for rec in records_to_update], STAGE_UPDATE, e)
 
     def _transform_data(self, source_record):
         data_to_sync = source_record.copy()
@@ -138,9 +220,9 @@ class ContactSyncModule:
 
         if data_to_sync.get('country_id'):
             country_name = data_to_sync['country_id'][1]
-            dest_country_ids = self.dest['res.country'].search([('name', '=', country_name)], limit=1)
-            if dest_country_ids:
-                data_to_sync['country_id'] = dest_country_ids[0]
+            dest_country_id = self.reference_data.get('res.country', 'name', country_name)
+            if dest_country_id:
+                data_to_sync['country_id'] = dest_country_id
             else:
                 data_to_sync.pop('country_id')
                 self.logger.warning(f"    - تحذير: لم يتم العثور على بلد '{country_name}' في نظام الوجهة. سيتم تجاهل الحقل.")
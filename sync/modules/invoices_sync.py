@@ -11,11 +11,26 @@ modules/invoices_sync.py
 
 import logging
 
+from services.id_resolver import DestinationIdResolver
+from services.deletion_detector import DeletionDetector
+from services.payload_hash import PayloadHashFilter
+from services.write_planner import WritePlanner
+from services.batch_creator import AdaptiveBatchCreator
+from services.failed_records import FailedRecordTracker, STAGE_TRANSFORM, STAGE_CREATE, STAGE_UPDATE, STAGE_POST
+from services.sync_result import SyncResult
+from services.relation_cache import RelationalLookupCache
+from services.reference_cache import ReferenceDataCache
+from services.move_posting import MovePostingPipeline
+from services.watermark import WatermarkCursor
+from core.pipeline import SyncPipeline
+
 class InvoiceSyncModule:
     """
     وحدة متخصصة لمزامنة الفواتير (account.move).
     """
     MODEL = 'account.move'
+    # وحدات المزامنة التي يجب أن تنجح قبل تشغيل هذه الوحدة (أسماء الكلاسات).
+    DEPENDS_ON = ('ContactSyncModule', 'AccountSyncModule', 'JournalSyncModule', 'TaxSyncModule')
     # سنركز على الفواتير التي لم يتم دفعها بعد (لترحيل الأرصدة الافتتاحية)
     # ونوعها فواتير عملاء أو فواتير موردين
     DOMAIN = [
@@ -31,7 +46,7 @@ class InvoiceSyncModule:
         'product_id', 'name', 'quantity', 'price_unit', 'account_id', 'tax_ids', 'tax_line_id', 'write_date', 'move_id'
     ]
 
-    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None):
+    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None, settings=None, reference_data=None):
         """
         تهيئة الوحدة بالخدمات التي تحتاجها من المحرك.
 
@@ -41,6 +56,8 @@ class InvoiceSyncModule:
             key_manager: كائن مدير مفاتيح المزامنة.
             last_sync_time: آخر طابع زمني للمزامنة الناجحة.
             loggers (dict): قاموس يحتوي على كائنات المنسق (loggers) المختلفة.
+            settings (dict): إعدادات المزامنة من قسم [sync] (اختياري).
+            reference_data (ReferenceDataCache): ذاكرة البيانات المرجعية المشتركة (اختياري).
         """
         self.source = source_conn
         self.dest = dest_conn
@@ -50,139 +67,313 @@ class InvoiceSyncModule:
         self.logger = loggers.get("invoices_sync", logging.getLogger(__name__))
         self.activity_logger = loggers.get("activity", logging.getLogger(__name__))
         self.error_logger = loggers.get("error", logging.getLogger(__name__))
+        self.resolver = DestinationIdResolver(self.dest, self.key_manager, logger=self.logger)
+        self.posting = MovePostingPipeline(self.dest, self.MODEL, logger=self.logger, error_logger=self.error_logger)
+        self.settings = settings or {}
+        self.creator = AdaptiveBatchCreator(
+            self.dest, self.MODEL,
+            batch_size=self.settings.get('create_batch_size', AdaptiveBatchCreator.DEFAULT_BATCH_SIZE),
+            target_seconds=self.settings.get('create_target_seconds', AdaptiveBatchCreator.DEFAULT_TARGET_SECONDS),
+            sync_field='x_move_sync_id', logger=self.logger
+        )
+        self.failures = FailedRecordTracker(self.key_manager, self.__class__.__name__, self.MODEL, logger=self.logger)
+        # وضع إعادة محاولة السجلات الفاشلة فقط (بدون فحص الحذف).
+        self.retry_mode = False
+        self.payload_filter = PayloadHashFilter(self.key_manager, self.MODEL, 'x_move_sync_id', logger=self.logger)
+        self.deletion_detector = DeletionDetector(
+            self.source, self.key_manager,
+            chunk_size=self.settings.get('deletion_chunk_size', DeletionDetector.DEFAULT_CHUNK_SIZE),
+            scan_every=self.settings.get('deletion_scan_every', 1),
+            logger=self.logger
+        )
+        # البلدان وعلامات الضرائب في الوجهة من ذاكرة البيانات المرجعية المشتركة.
+        self.reference_data = reference_data if reference_data is not None else ReferenceDataCache(self.dest, self.key_manager, logger=self.logger)
+        self.lookup = RelationalLookupCache(self.source, self.dest, self.resolver, logger=self.logger, reference_data=self.reference_data)
+        self._lines_by_id = {}
 
         self.logger.info("تم تهيئة وحدة مزامنة الفواتير.")
 
     def run(self):
         """
         نقطة الدخول الرئيسية لتشغيل مزامنة هذه الوحدة.
-        تقوم بجلب الفواتير المعدلة من المصدر وتمريرها لدالة المزامنة الفردية.
+        تقوم بجلب الفواتير المعدلة من المصدر دفعة بدفعة وتمريرها عبر خط المعالجة المتدفق.
         """
         print("بدء مزامنة الفواتير...")
         
-        # اقرأ آخر وقت مزامنة من الملف.
-        last_sync_timestamp = self.last_sync_time
+        # مؤشرات التقدم (write_date, id) للرؤوس والسطور، مع `last_sync_time` كنقطة بداية.
+        move_cursor = WatermarkCursor(self.key_manager, self.__class__.__name__, self.MODEL, self.last_sync_time)
+        line_cursor = WatermarkCursor(self.key_manager, self.__class__.__name__, 'account.move.line', self.last_sync_time)
+
+        # قراءة الدفعة التالية وتحويل ودفع الدفعات السابقة في نفس الوقت.
+        totals = {'records': 0}
+        self._run_pipeline(self._read_changed_chunks(move_cursor, line_cursor, totals))
+
+        total_records = totals['records']
+        print(f"تم العثور على {total_records} فاتورة/قيد معدل للمزامنة.")
+        if not total_records:
+            print("لا توجد سجلات جديدة أو معدلة للمزامنة.")
+
+        # مؤشر الرؤوس يتقدم بعد حفظ كل دفعة (`_commit_chunk`)؛ أما مؤشر السطور فلا
+        # يُحفظ إلا بعد اكتمال جميع الدفعات لأن قيودها تُعالج في نهاية القراءة.
+        line_cursor.commit()
+
+        self._handle_deletions()
+            
+        self.logger.info(f"  - عدد السجلات التي تم تخطيها دون تغيير: {self.payload_filter.skipped}.")
+        self.logger.info("اكتملت مزامنة الفواتير.")
+
+    def retry_failed(self):
+        """
+        وضع `--retry-failed`: إعادة مزامنة السجلات المسجلة كفاشلة فقط والتي حان
+        موعد إعادة محاولتها، دون تحريك مؤشر التقدم أو فحص الحذف.
+        """
+        self.logger.info("بدء إعادة محاولة مزامنة الفواتير الفاشلة...")
+        self.retry_mode = True
+        source_ids = self.failures.due_ids()
+        self.logger.info(f"  - عدد السجلات المستحقة لإعادة المحاولة: {len(source_ids)}.")
+        self._run_pipeline(self._read_failed_chunks(source_ids))
+        self.logger.info("اكتملت إعادة محاولة مزامنة الفواتير الفاشلة.")
+
+    def _run_pipeline(self, chunks):
+        """
+        تشغيل مراحل المزامنة على دفعات المصدر: التحويل ثم الدفع إلى الوجهة في خيوط
+        مستقلة، وحفظ الروابط في الخيط الحالي.
+
+        Args:
+            chunks (iterable): مولد دفعات المصدر (انظر `_read_chunk`).
+        """
+        pipeline = SyncPipeline(
+            self.__class__.__name__,
+            queue_size=self.settings.get('pipeline_queue_size', SyncPipeline.DEFAULT_QUEUE_SIZE),
+            logger=self.logger
+        )
+        # لكل مرحلة عملاؤها الخاصون: القراءة تستخدم `self.source`، والتحويل والدفع
+        # يستخدمان نسخًا تُغلق عند انتهاء خط المعالجة.
+        transform_dest = pipeline.clone(self.dest)
+        self.resolver.dest = self.lookup.dest = transform_dest
+        self.lookup.source = pipeline.clone(self.source)
+        push_dest = pipeline.clone(self.dest)
+        self.creator.dest = self.posting.dest = push_dest
+        try:
+            # مرحلة التحويل بخيط واحد لأن `self.lookup` و`self._lines_by_id` غير آمنين للخيوط.
+            pipeline.add_stage('transform', self._transform_chunk)
+            pipeline.add_stage('push', self._push_chunk)
+            pipeline.run(chunks, commit=self._commit_chunk)
+        finally:
+            self.resolver.dest = self.lookup.dest = self.creator.dest = self.posting.dest = self.dest
+            self.lookup.source = self.source
+
+    def _read_changed_chunks(self, move_cursor, line_cursor, totals):
+        """
+        مرحلة القراءة: توليد دفعات الفواتير المعدلة منذ آخر مزامنة.
 
-        # 1. ابحث عن معرّفات الفواتير (الرؤوس) التي تم تعديلها.
+        Args:
+            move_cursor (WatermarkCursor): مؤشر تقدم رؤوس الفواتير.
+            line_cursor (WatermarkCursor): مؤشر تقدم سطور الفواتير.
+            totals (dict): يتم تحديث `totals['records']` بعدد الفواتير المقروءة.
+
+        Yields:
+            dict: دفعة المصدر (انظر `_read_chunk`).
+        """
+        # تتم القراءة والمعالجة على دفعات حتى تبقى الذاكرة محدودة بحجم الدفعة.
+        chunk_size = self.settings.get('read_chunk_size', 500)
+
+        # 1. ابحث عن سطور الفواتير التي تم تعديلها وتتبعها إلى الفاتورة الأم.
+        # يتم الاحتفاظ بمعرّفات الفواتير فقط (مجموعة فريدة) وليس بيانات السطور،
+        # وهذا يضمن أننا نعالج الفاتورة الأم مرة واحدة فقط حتى لو تغيرت عدة سطور فيها.
+        domain_lines = line_cursor.domain() + [('move_id.move_type', 'in', ['out_invoice', 'in_invoice'])]
+        moves_from_lines = set()
+        for lines_data in self.source['account.move.line'].iter_search_read(domain_lines, ['move_id', 'write_date'], chunk_size=chunk_size):
+            moves_from_lines.update(line['move_id'][0] for line in lines_data if line.get('move_id'))
+            line_cursor.observe(lines_data)
+
+        # 2. اقرأ الفواتير (الرؤوس) التي تم تعديلها دفعة بدفعة؛ تتم مزامنة كل دفعة
+        # في المراحل التالية أثناء قراءة الدفعة التي تليها.
         # يتم استخدام `DOMAIN` لفلترة نوع الفواتير المطلوبة.
-        domain_moves = self.DOMAIN + [('write_date', '>', last_sync_timestamp)]
-        updated_move_ids = self.source[self.MODEL].search(domain_moves)
+        # القراءة بترتيب المؤشر (write_date, id) حتى يمكن تقديمه بعد حفظ كل دفعة.
+        chunks = move_cursor.iter_chunks(self.source[self.MODEL], self.DOMAIN, self.FIELDS_TO_SYNC, chunk_size=chunk_size)
+        for records_to_sync in chunks:
+            moves_from_lines.difference_update(record['id'] for record in records_to_sync)
+            totals['records'] += len(records_to_sync)
+            chunk = self._read_chunk(records_to_sync)
+            chunk['cursor'] = move_cursor
+            yield chunk
+
+        # 3. الفواتير التي تغيرت سطورها فقط (لم تتم معالجتها في الخطوة السابقة).
+        remaining_ids = sorted(moves_from_lines)
+        for start in range(0, len(remaining_ids), chunk_size):
+            records_to_sync = self.source[self.MODEL].read(remaining_ids[start:start + chunk_size], self.FIELDS_TO_SYNC)
+            totals['records'] += len(records_to_sync)
+            yield self._read_chunk(records_to_sync)
+
+    def _read_failed_chunks(self, source_ids):
+        """
+        مرحلة القراءة في وضع إعادة المحاولة: توليد دفعات السجلات الفاشلة المستحقة.
 
-        # 2. ابحث عن معرّفات سطور الفواتير التي تم تعديلها.
-        # يتم البحث في `account.move.line` عن السطور التي تغيرت وتتبعها إلى الفاتورة الأم.
-        domain_lines = [('write_date', '>', last_sync_timestamp), ('move_id.move_type', 'in', ['out_invoice', 'in_invoice'])]
-        lines_data = self.source['account.move.line'].search_read(domain_lines, ['move_id'])
+        Args:
+            source_ids (list): معرفات المصدر المستحقة لإعادة المحاولة.
 
-        # 3. استخرج معرّفات الفواتير الفريدة من السطور المعدلة.
-        # هذا يضمن أننا نعالج الفاتورة الأم مرة واحدة فقط حتى لو تغيرت عدة سطور فيها.
-        moves_from_lines = []
-        if lines_data:
-            moves_from_lines = list(set([line['move_id'][0] for line in lines_data if line.get('move_id')]))
+        Yields:
+            dict: دفعة المصدر (انظر `_read_chunk`).
+        """
+        chunk_size = self.settings.get('read_chunk_size', 500)
+        for start in range(0, len(source_ids), chunk_size):
+            ids = source_ids[start:start + chunk_size]
+            source_data = self.source[self.MODEL].search_read([('id', 'in', ids)], self.FIELDS_TO_SYNC)
+            chunk = self._read_chunk(source_data)
+            # السجلات التي لم تعد موجودة في المصدر لا تحتاج إلى إعادة محاولة.
+            chunk['result'].clear(set(ids) - {r['id'] for r in source_data})
+            yield chunk
+
+    def _read_chunk(self, records):
+        """
+        قراءة سطور دفعة من الفواتير في استدعاء واحد وتجهيز الدفعة لبقية المراحل.
 
-        # 4. ادمج القائمتين معًا في قائمة واحدة فريدة من المعرّفات.
-        # هذه القائمة تحتوي على جميع الفواتير التي تحتاج إلى مزامنة (سواء تغير رأسها أو أحد سطورها).
-        all_invoice_ids_to_sync = list(set(updated_move_ids + moves_from_lines))
+        Args:
+            records (list): قائمة قواميس الفواتير المقروءة من المصدر.
+
+        Returns:
+            dict: الدفعة {'records', 'lines', 'create', 'update', 'result', 'cursor'}.
+        """
+        line_ids = sorted({line_id for record in records for line_id in record.get('invoice_line_ids') or []})
+        lines = self.source['account.move.line'].read(line_ids, self.LINE_FIELDS) if line_ids else []
+        return {
+            'records': records,
+            'lines': lines,
+            'create': [],
+            'update': [],
+            'result': SyncResult(),
+            # مؤشر التقدم الذي يُقدم بعد حفظ الدفعة (None للدفعات خارج ترتيب المؤشر).
+            'cursor': None,
+        }
 
-        print(f"تم العثور على {len(all_invoice_ids_to_sync)} فاتورة/قيد معدل للمزامنة.")
+    def _transform_chunk(self, chunk):
+        """
+        مرحلة التحويل: حل المعرفات والعلاقات وتحويل فواتير الدفعة.
 
-        # إذا لم تكن هناك سجلات للمزامنة، قم بالخروج من الدالة.
-        if not all_invoice_ids_to_sync:
-            print("لا توجد سجلات جديدة أو معدلة للمزامنة.")
-            print("اكتملت مزامنة الفواتير.")
-            return # للخروج من الدالة إذا لم يكن هناك شيء لعمله
+        Args:
+            chunk (dict): دفعة المصدر.
 
-        # اقرأ البيانات الكاملة للسجلات التي تحتاج إلى مزامنة فقط.
-        # يتم جلب جميع الحقول المحددة في `FIELDS_TO_SYNC`.
-        records_to_sync = self.source[self.MODEL].read(all_invoice_ids_to_sync, self.FIELDS_TO_SYNC)
-        
+        Returns:
+            dict: نفس الدفعة بعد تعبئة `create` و`update`.
+        """
+        records_to_sync = chunk['records']
         total_records = len(records_to_sync)
         print(f"--- معالجة دفعة من {total_records} فاتورة ---")
 
-        # 2. تجهيز السجلات للمزامنة الدفعية.
-        records_to_create = []
-        records_to_update = []
+        # حل معرفات الفواتير الموجودة في الوجهة دفعة واحدة عبر `x_move_sync_id`.
+        existing_ids = self.resolver.resolve(self.MODEL, 'x_move_sync_id', [r['id'] for r in records_to_sync])
+
+        # حل علاقات الدفعة مسبقًا حتى يصبح التحويل عمليات بحث في الذاكرة فقط.
+        self._prefetch_relations(records_to_sync, chunk['lines'])
 
         for i, record in enumerate(records_to_sync):
             self.logger.debug(f"  - معالجة فاتورة {i+1}/{total_records}: {record.get('name')} (ID: {record['id']})")
             source_id = record['id']
             
-            # 1. البحث في الوجهة مباشرة باستخدام `x_move_sync_id`.
-            search_domain_x_sync_id = [('x_move_sync_id', '=', str(source_id))]
-            existing_record_ids = self.dest[self.MODEL].search(search_domain_x_sync_id, limit=1)
+            # 1. البحث في نتائج الحل المسبق باستخدام `x_move_sync_id`.
+            destination_id = existing_ids.get(source_id)
 
-            if existing_record_ids:
-                destination_id = existing_record_ids[0]
+            if destination_id:
                 transformed_data = self._transform_data(record, is_update=True)
                 if not transformed_data:
                     self.logger.warning(f"    - فشل تحويل بيانات الفاتورة ID {source_id} للتحديث. سيتم تخطيها.")
+                    chunk['result'].fail([source_id], STAGE_TRANSFORM, 'فشل تحويل البيانات')
                     continue
-                records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
+                chunk['update'].append({
+                    'id': destination_id, 'data': transformed_data, 'source_id': source_id,
+                    'posted': record.get('state') == 'posted',
+                })
             else:
                 transformed_data = self._transform_data(record, is_update=False)
                 if not transformed_data:
                     self.logger.warning(f"    - فشل تحويل بيانات الفاتورة ID {source_id} للإنشاء. سيتم تخطيها.")
+                    chunk['result'].fail([source_id], STAGE_TRANSFORM, 'فشل تحويل البيانات')
                     continue
                 transformed_data['x_move_sync_id'] = str(source_id)
-                records_to_create.append({'data': transformed_data, 'source_id': source_id})
-        
-        self._batch_sync_records(records_to_create, records_to_update)
-            
-        self.logger.info("اكتملت مزامنة الفواتير.")
+                chunk['create'].append({'data': transformed_data, 'source_id': source_id})
+
+        return chunk
 
-    def _batch_sync_records(self, records_to_create, records_to_update):
+    def _push_chunk(self, chunk):
         """
-        يقوم بمزامنة السجلات على دفعات (batch) لزيادة الكفاءة.
+        مرحلة الدفع: مزامنة السجلات المحولة مع الوجهة على دفعات (batch) لزيادة الكفاءة.
+        يتم جمع الروابط والأخطاء في `chunk['result']` ليتم حفظها في مرحلة الحفظ.
         """
+        records_to_create = chunk['create']
+        records_to_update = chunk['update']
+        result = chunk['result']
         self.logger.info(f"بدء المزامنة الدفعية: {len(records_to_create)} سجلات للإنشاء، {len(records_to_update)} سجلات للتحديث.")
 
+        # تخطي التحديثات التي لا تغير البيانات المكتوبة سابقًا في الوجهة.
+        records_to_update = self.payload_filter.filter_updates(records_to_update)
+
         # إنشاء السجلات الجديدة
         if records_to_create:
             self.logger.info(f"إنشاء {len(records_to_create)} سجل جديد...")
             try:
-                new_records_data = [rec['data'] for rec in records_to_create]
-                new_destination_ids = self.dest[self.MODEL].create(new_records_data)
-                for i, new_destination_id in enumerate(new_destination_ids):
+                # الإنشاء على دفعات متكيفة مع عزل السجلات الفاشلة فقط.
+                created, failed = self.creator.create([rec['data'] for rec in records_to_create])
+                for i, error in failed.items():
+                    self.error_logger.error(f"    - [خطأ] فشل في إنشاء الفاتورة من المصدر ID: {records_to_create[i]['source_id']}. الخطأ: {error}")
+                    result.fail([records_to_create[i]['source_id']], STAGE_CREATE, error)
+                # ترحيل جميع السجلات الجديدة في استدعاء واحد.
+                posted_ids, post_failed = self.posting.post(list(created.values()))
+                for i, new_destination_id in created.items():
                     source_id = records_to_create[i]['source_id']
-                    self.key_manager.add_mapping(self.MODEL, source_id, new_destination_id)
                     self.activity_logger.info(f"    - تم إنشاء فاتورة جديدة في الوجهة بمعرف ID: {new_destination_id} من المصدر ID: {source_id}")
-                    # Post the newly created invoice
-                    self.dest[self.MODEL].browse([new_destination_id]).action_post()
+                    if new_destination_id in post_failed:
+                        # لا يتم حفظ البصمة إذا فشل الترحيل حتى لا يتم تخطي السجل في إعادة المحاولة.
+                        result.add_mapping(source_id, new_destination_id, payload_hash=None)
+                        result.fail([source_id], STAGE_POST, post_failed[new_destination_id])
+                        continue
+                    result.add_mapping(source_id, new_destination_id, payload_hash=self.payload_filter.hash(records_to_create[i]['data']))
+                for new_destination_id in posted_ids:
                     self.activity_logger.info(f"    - تم ترحيل الفاتورة ID {new_destination_id} بعد الإنشاء.")
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في إنشاء سجلات الفواتير الجديدة دفعيًا. الخطأ: {e}")
+                result.fail([rec['source_id'] for rec in records_to_create], STAGE_CREATE, e)
 
         # تحديث السجلات الموجودة
         if records_to_update:
             self.logger.info(f"تحديث {len(records_to_update)} سجل موجود...")
             try:
+                # قراءة الحالات، إلغاء الترحيل، الكتابة، ثم إعادة الترحيل دفعة واحدة.
+                # يتم ترحيل المسودات التي حركتها في المصدر مرحلة (مثل حركة فشل ترحيلها بعد الإنشاء).
+                updated_ids, failed = self.posting.update(
+                    [(rec['id'], rec['data']) for rec in records_to_update],
+                    post_ids=[rec['id'] for rec in records_to_update if rec.get('posted')]
+                )
+                updated_ids = set(updated_ids)
                 for record_data in records_to_update:
                     destination_id = record_data['id']
                     source_id = record_data['source_id']
-                    data = record_data['data']
-
-                    # Get current state of the invoice in destination
-                    current_invoice = self.dest[self.MODEL].read([destination_id], ['state'])[0]
-                    
-                    # Unpost if currently posted
-                    if current_invoice['state'] == 'posted':
-                        self.logger.info(f"      - إلغاء ترحيل الفاتورة ID {destination_id} قبل التحديث.")
-                        self.dest[self.MODEL].browse([destination_id]).button_draft()
-
-                    self.dest[self.MODEL].write([destination_id], data)
-                    self.key_manager.add_mapping(self.MODEL, source_id, destination_id)
+                    if destination_id not in updated_ids:
+                        result.fail([source_id], STAGE_UPDATE, failed.get(destination_id))
+                        continue
+                    # لا يتم حفظ البصمة إذا فشلت إعادة الترحيل حتى تتم إعادة المحاولة لاحقًا.
+                    digest = record_data['payload_hash'] if destination_id not in failed else None
+                    result.add_mapping(source_id, destination_id, payload_hash=digest)
+                    if destination_id in failed:
+                        result.fail([source_id], STAGE_POST, failed[destination_id])
                     self.activity_logger.info(f"    - تم تحديث فاتورة موجودة في الوجهة ID: {destination_id} من المصدر ID: {source_id}")
 
-                    # Repost if it was originally posted
-                    if current_invoice['state'] == 'posted':
-                        self.logger.info(f"      - إعادة ترحيل الفاتورة ID {destination_id} بعد التحديث.")
-                        self.dest[self.MODEL].browse([destination_id]).action_post()
-
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في تحديث سجلات الفواتير دفعيًا. الخطأ: {e}")
+                result.fail([rec['source_id'] for rec in records_to_update], STAGE_UPDATE, e)
 
         self.logger.info("اكتملت المزامنة الدفعية للفواتير.")
+        return chunk
 
-        self._handle_deletions()
+    def _commit_chunk(self, chunk):
+        """
+        مرحلة الحفظ: كتابة روابط الدفعة وسجلاتها الفاشلة ضمن معاملة واحدة، ثم
+        تقديم مؤشر التقدم إلى آخر سجل في الدفعة حتى يستأنف التشغيل التالي بعدها.
+        """
+        with self.key_manager.batch():
+            chunk['result'].apply(self.key_manager, self.MODEL, self.failures)
+        if chunk['cursor'] is not None:
+            chunk['cursor'].advance(chunk['records'])
 
     def _handle_deletions(self):
         """
@@ -191,45 +382,37 @@ class InvoiceSyncModule:
         """
         self.logger.info("بدء معالجة حذف الفواتير...")
         
-        # 1. جلب جميع معرفات المصدر المخزنة محليًا لـ account.move.
-        mapped_source_ids = self.key_manager.get_all_source_ids_for_model(self.MODEL)
-        self.logger.debug(f"  - تم العثور على {len(mapped_source_ids)} معرف مصدر mapped لـ {self.MODEL}.")
-
-        if not mapped_source_ids:
-            self.logger.info("  - لا توجد معرفات مصدر mapped لـ account.move. تخطي معالجة الحذف.")
+        # 1. تشغيل الفحص فقط إذا كان مستحقًا في هذا التشغيل (كل N تشغيلات)، وليس في وضع إعادة المحاولة.
+        if self.retry_mode or not self.deletion_detector.is_due(self.__class__.__name__):
             return
 
-        # 2. جلب جميع معرفات account.move النشطة من نظام المصدر.
-        active_source_ids = self.source[self.MODEL].search([])
-        self.logger.debug(f"  - تم العثور على {len(active_source_ids)} معرف account.move نشط في المصدر.")
-
-        # 3. تحديد السجلات التي تم حذفها في المصدر (موجودة في mapped_source_ids ولكن ليست في active_source_ids).
-        deleted_source_ids = [sid for sid in mapped_source_ids if sid not in active_source_ids]
-        self.logger.info(f"  - تم تحديد {len(deleted_source_ids)} سجل account.move للحذف (الأرشفة) في الوجهة.")
+        # 2. سؤال المصدر على دفعات عن المعرفات المربوطة التي لا تزال موجودة،
+        #    وحساب المحذوف منها بعمليات المجموعات بدلاً من جلب جميع المعرفات.
+        deleted = self.deletion_detector.find_deleted(self.MODEL)
+        self.logger.info(f"  - تم تحديد {len(deleted)} سجل account.move للحذف (الأرشفة) في الوجهة.")
 
-        if not deleted_source_ids:
+        if not deleted:
             self.logger.info("  - لا توجد سجلات محذوفة في المصدر تتطلب الأرشفة في الوجهة.")
             return
 
-        # 4. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
-        for source_id in deleted_source_ids:
-            destination_id = self.key_manager.get_destination_id(self.MODEL, source_id)
-            if destination_id:
-                try:
-                    # أرشفة السجل في الوجهة (ضبط active = False).
-                    # For account.move, we might need to unpost first if it's posted.
-                    current_move = self.dest[self.MODEL].read([destination_id], ['state'])[0]
-                    if current_move['state'] == 'posted':
-                        self.logger.info(f"      - إلغاء ترحيل الفاتورة ID {destination_id} قبل الأرشفة.")
-                        self.dest[self.MODEL].browse([destination_id]).button_draft()
-
-                    self.dest[self.MODEL].write([destination_id], {'active': False})
+        # 3. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
+        # إلغاء ترحيل الحركات المرحلة منها دفعة واحدة قبل الأرشفة.
+        _, unpost_failed = self.posting.unpost(list(deleted.values()))
+        # أرشفة جميع السجلات المحذوفة في استدعاء write واحد.
+        planner = WritePlanner(self.dest, self.MODEL, logger=self.logger)
+        for destination_id in deleted.values():
+            if destination_id not in unpost_failed:
+                planner.add(destination_id, {'active': False})
+        archived, failed = planner.flush()
+        archived = set(archived)
+        # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+        with self.key_manager.batch():
+            for source_id, destination_id in deleted.items():
+                if destination_id in archived:
                     self.key_manager.remove_mapping(self.MODEL, source_id)
                     self.activity_logger.info(f"    - تم أرشفة الفاتورة ID: {destination_id} في الوجهة وإزالة الربط للمصدر ID: {source_id}.")
-                except Exception as e:
-                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الفاتورة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {e}")
-            else:
-                self.logger.warning(f"    - تحذير: لم يتم العثور على معرف الوجهة لـ account.move المصدر ID: {source_id} في قاعدة بيانات الربط.")
+                elif destination_id in failed:
+                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الفاتورة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
 
         self.logger.info("اكتملت معالجة حذف الفواتير.")
 
@@ -243,6 +426,21 @@ class InvoiceSyncModule:
 
     
 
+    def _prefetch_relations(self, records, lines):
+        """
+        يحل مسبقًا كل العلاقات التي تحتاجها `_transform_data`
+        (العملاء، دفاتر اليومية، الحسابات، الضرائب) لدفعة من الفواتير.
+
+        Args:
+            records (list): قائمة قواميس الفواتير المقروءة من المصدر.
+            lines (list): سطور الفواتير المقروءة مسبقًا في مرحلة القراءة.
+        """
+        self._lines_by_id = {line['id']: line for line in lines}
+
+        self.lookup.prefetch('res.partner', [r['partner_id'][0] for r in records if r.get('partner_id')])
+        self.lookup.prefetch('account.journal', [r['journal_id'][0] for r in records if r.get('journal_id')])
+        self.lookup.prefetch_lines(lines)
+
     def _transform_data(self, source_record, is_update=False):
         """
         تحويل بيانات الفاتورة من تنسيق المصدر إلى تنسيق مناسب لـ Odoo API في الوجهة.
@@ -264,29 +462,29 @@ class InvoiceSyncModule:
         # 1. ربط العميل (partner_id).
         if not source_record.get('partner_id'): return None
         source_partner_id = source_record['partner_id'][0]
-        # البحث عن معرف العميل المقابل في الوجهة باستخدام `x_partner_sync_id`.
-        dest_partner_ids_in_dest = self.dest['res.partner'].search([('x_partner_sync_id', '=', str(source_partner_id))], limit=1)
-        if not dest_partner_ids_in_dest:
+        # البحث عن معرف العميل المقابل في الوجهة (محلول مسبقًا عبر `x_partner_sync_id`).
+        dest_partner_id = self.lookup.get('res.partner', source_partner_id)
+        if not dest_partner_id:
             print(f"    - خطأ: العميل ID {source_partner_id} غير موجود في الوجهة (لا يوجد x_partner_sync_id مطابق). سيتم تخطي الفاتورة.")
             return None
-        data_to_sync['partner_id'] = dest_partner_ids_in_dest[0]
+        data_to_sync['partner_id'] = dest_partner_id
 
         # 2. ربط دفتر اليومية (journal_id).
         source_journal_id = source_record['journal_id'][0]
-        # البحث عن معرف دفتر اليومية المقابل في الوجهة باستخدام `x_journal_sync_id`.
-        dest_journal_ids_in_dest = self.dest['account.journal'].search([('x_journal_sync_id', '=', str(source_journal_id))], limit=1)
-        if not dest_journal_ids_in_dest:
+        # البحث عن معرف دفتر اليومية المقابل في الوجهة (محلول مسبقًا عبر `x_journal_sync_id`).
+        dest_journal_id = self.lookup.get('account.journal', source_journal_id)
+        if not dest_journal_id:
             print(f"    - خطأ: دفتر اليومية ID {source_journal_id} غير موجود في الوجهة (لا يوجد x_journal_sync_id مطابق). سيتم تخطي الفاتورة.")
             return None
-        data_to_sync['journal_id'] = dest_journal_ids_in_dest[0]
+        data_to_sync['journal_id'] = dest_journal_id
 
         # 3. نسخ الحقول البسيطة (التواريخ).
         for field in ['invoice_date', 'date', 'invoice_date_due']:
             if source_record.get(field):
                 data_to_sync[field] = source_record[field]
         
-        # 4. تحويل سطور الفاتورة (invoice_line_ids).
-        line_ids_data = self.source['account.move.line'].read(source_record['invoice_line_ids'], self.LINE_FIELDS)
+        # 4. تحويل سطور الفاتورة (invoice_line_ids) من السطور المقروءة مسبقًا.
+        line_ids_data = [self._lines_by_id[line_id] for line_id in source_record['invoice_line_ids'] if line_id in self._lines_by_id]
         
         final_line_commands = []
         
@@ -309,21 +507,21 @@ class InvoiceSyncModule:
             }
             # ربط الحساب.
             source_acc_id = line['account_id'][0]
-            # البحث عن معرف الحساب المقابل في الوجهة باستخدام `x_account_sync_id`.
-            dest_acc_ids_in_dest = self.dest['account.account'].search([('x_account_sync_id', '=', str(source_acc_id))], limit=1)
-            if not dest_acc_ids_in_dest: 
+            # البحث عن معرف الحساب المقابل في الوجهة (محلول مسبقًا عبر `x_account_sync_id`).
+            dest_acc_id = self.lookup.get('account.account', source_acc_id)
+            if not dest_acc_id: 
                 print(f"      - خطأ في السطر: الحساب ID {source_acc_id} غير موجود في الوجهة (لا يوجد x_account_sync_id مطابق). سيتم تخطي هذا السطر.")
                 continue # تخطي هذا السطر
-            transformed_line['account_id'] = dest_acc_ids_in_dest[0]
+            transformed_line['account_id'] = dest_acc_id
             
             # ربط الضرائب.
             source_tax_ids = line.get('tax_ids', [])
             destination_tax_ids = []
             for tax_id in source_tax_ids:
-                # البحث عن معرف الضريبة المقابل في الوجهة باستخدام `x_tax_sync_id`.
-                dest_tax_ids_in_dest = self.dest['account.tax'].search([('x_tax_sync_id', '=', str(tax_id))], limit=1)
-                if dest_tax_ids_in_dest:
-                    destination_tax_ids.append(dest_tax_ids_in_dest[0])
+                # البحث عن معرف الضريبة المقابل في الوجهة (محلول مسبقًا عبر `x_tax_sync_id`).
+                dest_tax_id = self.lookup.get('account.tax', tax_id)
+                if dest_tax_id:
+                    destination_tax_ids.append(dest_tax_id)
                 else:
                     print(f"      - تحذير في السطر: الضريبة ID {tax_id} غير موجودة في الوجهة (لا يوجد x_tax_sync_id مطابق). سيتم تخطيها.")
             transformed_line['tax_ids'] = [(6, 0, destination_tax_ids)]
@@ -9,18 +9,32 @@ modules/taxes_sync.py
 """
 
 import logging
+import threading
+
+from odoorpc.client import DEFAULT_MAP_WORKERS
+from services.company_pool import CompanyWorkerPool
+from services.sync_result import SyncResult
+from services.id_resolver import DestinationIdResolver
+from services.deletion_detector import DeletionDetector
+from services.payload_hash import PayloadHashFilter
+from services.write_planner import WritePlanner
+from services.batch_creator import AdaptiveBatchCreator
+from services.failed_records import FailedRecordTracker, STAGE_CREATE, STAGE_TRANSFORM, STAGE_UPDATE
+from services.watermark import WatermarkCursor
 
 class TaxSyncModule:
     """
     وحدة متخصصة لمزامنة سجلات الضرائب (account.tax).
     """
     MODEL = 'account.tax'
+    # وحدات المزامنة التي يجب أن تنجح قبل تشغيل هذه الوحدة (أسماء الكلاسات).
+    DEPENDS_ON = ('CompanySyncModule',)
     # الحقول الأساسية للضريبة. تأكد من تطابقها مع احتياجاتك.
     FIELDS_TO_SYNC = [
         'id', 'name', 'amount', 'type_tax_use', 'company_id', 'active'
     ]
 
-    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None):
+    def __init__(self, source_conn, dest_conn, key_manager, last_sync_time, loggers=None, settings=None, reference_data=None):
         """
         تهيئة الوحدة بالخدمات التي تحتاجها من المحرك.
 
@@ -30,6 +44,8 @@ class TaxSyncModule:
             key_manager: كائن مدير مفاتيح المزامنة.
             last_sync_time: آخر طابع زمني للمزامنة الناجحة.
             loggers (dict): قاموس يحتوي على كائنات المنسق (loggers) المختلفة.
+            settings (dict): إعدادات المزامنة من قسم [sync] (اختياري).
+            reference_data (ReferenceDataCache): ذاكرة البيانات المرجعية المشتركة (اختياري).
         """
         self.source = source_conn
         self.dest = dest_conn
@@ -42,13 +58,41 @@ class TaxSyncModule:
         self.logger = loggers.get("taxes_sync", logging.getLogger(__name__))
         self.activity_logger = loggers.get("activity", logging.getLogger(__name__))
         self.error_logger = loggers.get("error", logging.getLogger(__name__))
+        self.resolver = DestinationIdResolver(self.dest, self.key_manager, logger=self.logger)
+        self.settings = settings or {}
+        self.creator = AdaptiveBatchCreator(
+            self.dest, self.MODEL,
+            batch_size=self.settings.get('create_batch_size', AdaptiveBatchCreator.DEFAULT_BATCH_SIZE),
+            target_seconds=self.settings.get('create_target_seconds', AdaptiveBatchCreator.DEFAULT_TARGET_SECONDS),
+            sync_field='x_tax_sync_id', logger=self.logger
+        )
+        # منشئات الدفعات الخاصة باتصالات خيوط `company_pool`.
+        self._creators = {}
+        self._creators_lock = threading.Lock()
+        # معالجة الشركات بالتوازي، لكل خيط اتصالاته الخاصة.
+        self.company_pool = CompanyWorkerPool(
+            self.source, self.dest,
+            max_workers=self.settings.get('company_workers', CompanyWorkerPool.DEFAULT_WORKERS),
+            logger=self.logger
+        )
+        self.failures = FailedRecordTracker(self.key_manager, self.__class__.__name__, self.MODEL, logger=self.logger)
+        # وضع إعادة محاولة السجلات الفاشلة فقط (بدون فحص الحذف).
+        self.retry_mode = False
+        self.payload_filter = PayloadHashFilter(self.key_manager, self.MODEL, 'x_tax_sync_id', logger=self.logger)
+        self.deletion_detector = DeletionDetector(
+            self.source, self.key_manager,
+            chunk_size=self.settings.get('deletion_chunk_size', DeletionDetector.DEFAULT_CHUNK_SIZE),
+            scan_every=self.settings.get('deletion_scan_every', 1),
+            logger=self.logger
+        )
 
         self.logger.info("تم تهيئة وحدة مزامنة الضرائب.")
 
     def run(self):
         """
         نقطة الدخول الرئيسية لتشغيل مزامنة هذه الوحدة.
-        تقوم بجلب السجلات المعدلة من المصدر وتمريرها لدالة المزامنة الفردية.
+        تتم معالجة كل شركة كوحدة عمل مستقلة على مجموعة خيوط محدودة (`company_workers`)،
+        ثم تُدمج نتائج جميع الشركات في قاعدة بيانات الربط ضمن معاملة واحدة.
         """
         print("بدء مزامنة الضرائب...")
         
@@ -59,106 +103,255 @@ class TaxSyncModule:
             print("  - لا توجد شركات في المصدر لمزامنة الضرائب.")
             return
 
-        total_companies = len(source_companies)
-        for i, company in enumerate(source_companies):
-            print(f"\n--- مزامنة الضرائب للشركة: {company.get('name')} (ID: {company['id']}) ({i+1}/{total_companies}) ---")
-            
+        # حل معرفات الشركات في الوجهة دفعة واحدة عبر `x_company_sync_id`.
+        dest_company_ids = self.resolver.resolve('res.company', 'x_company_sync_id', [c['id'] for c in source_companies])
+
+        # مؤشر تقدم واحد لجميع الشركات، يتم تقديمه في نهاية التشغيل فقط.
+        watermark = WatermarkCursor(self.key_manager, self.__class__.__name__, self.MODEL, self.last_sync_time)
+        skipped_companies = False
+
+        units = []
+        for company in source_companies:
             # جلب معرف الشركة المقابل في الوجهة باستخدام `x_company_sync_id`.
-            dest_company_ids_in_dest = self.dest['res.company'].search([('x_company_sync_id', '=', str(company['id']))], limit=1)
-            if not dest_company_ids_in_dest:
+            dest_company_id = dest_company_ids.get(company['id'])
+            if not dest_company_id:
                 print(f"  - تحذير: لم يتم العثور على الشركة ID {company['id']} في الوجهة عبر x_company_sync_id. سيتم تخطي ضرائب هذه الشركة.")
+                skipped_companies = True
                 continue
-            dest_company_id = dest_company_ids_in_dest[0]
+            units.append((company, dest_company_id, None))
 
-            # البحث عن الضرائب الخاصة بهذه الشركة في المصدر.
-            # استخدام `write_date` للمزامنة التزايدية.
-            company_taxes_ids = self.source['account.tax'].search([
-                ('company_id', '=', company['id']),
-                ('write_date', '>', self.last_sync_time)
-            ])
-            company_taxes_data = self.source['account.tax'].read(company_taxes_ids, self.FIELDS_TO_SYNC)
-            
-            total_taxes_in_company = len(company_taxes_data)
-            print(f"  - تم العثور على {total_taxes_in_company} ضريبة في المصدر لهذه الشركة.")
-
-            # 2. تجهيز السجلات للمزامنة الدفعية.
-            records_to_create = []
-            records_to_update = []
-
-            for j, tax_record in enumerate(company_taxes_data):
-                self.logger.debug(f"    - معالجة ضريبة {j+1}/{total_taxes_in_company}: {tax_record.get('name')} (ID: {tax_record['id']})")
-                source_id = tax_record['id']
-                source_name = tax_record.get('name')
-                source_type_tax_use = tax_record.get('type_tax_use')
-
-                transformed_data = self._transform_data(tax_record, dest_company_id)
-
-                # 1. البحث في الوجهة مباشرة باستخدام `x_tax_sync_id`.
-                search_domain_x_sync_id = [('x_tax_sync_id', '=', str(source_id))]
-                existing_record_by_x_sync_id = self.dest[self.MODEL].search(search_domain_x_sync_id, limit=1)
-
-                if existing_record_by_x_sync_id:
-                    destination_id = existing_record_by_x_sync_id[0]
-                    records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
-                else:
-                    # 2. إذا لم يتم العثور عليه عبر `x_tax_sync_id`، حاول البحث بالاسم والنوع والشركة.
-                    search_domain_by_name = [
-                        ('name', '=', source_name),
-                        ('type_tax_use', '=', source_type_tax_use),
-                        ('company_id', '=', dest_company_id)
-                    ]
-                    existing_record_by_name = self.dest[self.MODEL].search(search_domain_by_name, limit=1)
-
-                    if existing_record_by_name:
-                        destination_id = existing_record_by_name[0]
-                        transformed_data['x_tax_sync_id'] = str(source_id)
-                        records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
-                    else:
-                        # 3. لم يتم العثور عليه بأي من الطريقتين، قم بإنشاء جديد.
-                        transformed_data['x_tax_sync_id'] = str(source_id)
-                        records_to_create.append({'data': transformed_data, 'source_id': source_id})
-            
-            self._batch_sync_records(records_to_create, records_to_update)
-            
+        results = self.company_pool.map(lambda unit, source, dest: self._sync_company(unit, source, dest, watermark), units)
+        changed_records, error = self._apply_results(results)
+
+        # تقديم مؤشر التقدم فقط إذا تمت معالجة جميع الشركات، حتى لا يتم تخطي
+        # سجلات الشركات غير الموجودة في الوجهة بعد.
+        if skipped_companies or error is not None:
+            self.logger.warning("  - لم يتم تقديم مؤشر التقدم لأن بعض الشركات لم تتم معالجتها.")
+        else:
+            watermark.advance(changed_records)
+        if error is not None:
+            raise error
+
+        # معالجة الحذف مرة واحدة بعد مزامنة جميع الشركات (وليس لكل شركة).
+        self._handle_deletions()
+
+        self.logger.info(f"  - عدد السجلات التي تم تخطيها دون تغيير: {self.payload_filter.skipped}.")
         self.logger.info("اكتملت مزامنة الضرائب.")
 
-    def _batch_sync_records(self, records_to_create, records_to_update):
+    def retry_failed(self):
+        """
+        وضع `--retry-failed`: إعادة مزامنة السجلات المسجلة كفاشلة فقط والتي حان
+        موعد إعادة محاولتها، دون تحريك مؤشر التقدم أو فحص الحذف.
+        يتم تجميع السجلات حسب الشركة لأن التحويل يعتمد على شركة الوجهة.
+        """
+        self.logger.info("بدء إعادة محاولة مزامنة الضرائب الفاشلة...")
+        self.retry_mode = True
+        source_ids = self.failures.due_ids()
+        self.logger.info(f"  - عدد السجلات المستحقة لإعادة المحاولة: {len(source_ids)}.")
+        chunk_size = self.settings.get('read_chunk_size', 500)
+        for start in range(0, len(source_ids), chunk_size):
+            ids = source_ids[start:start + chunk_size]
+            source_data = self.source[self.MODEL].search_read([('id', 'in', ids)], self.FIELDS_TO_SYNC)
+            # السجلات التي لم تعد موجودة في المصدر لا تحتاج إلى إعادة محاولة.
+            self.failures.clear(set(ids) - {r['id'] for r in source_data})
+
+            records_by_company = {}
+            for record in source_data:
+                if record.get('company_id'):
+                    records_by_company.setdefault(record['company_id'][0], []).append(record)
+            dest_company_ids = self.resolver.resolve('res.company', 'x_company_sync_id', list(records_by_company))
+            units = []
+            for company_id, records in records_by_company.items():
+                dest_company_id = dest_company_ids.get(company_id)
+                if not dest_company_id:
+                    self.logger.warning(f"  - تحذير: لم يتم العثور على الشركة ID {company_id} في الوجهة. سيتم تأجيل إعادة محاولة {len(records)} سجل.")
+                    continue
+                units.append(({'id': company_id}, dest_company_id, records))
+            _, error = self._apply_results(self.company_pool.map(self._sync_company, units))
+            if error is not None:
+                raise error
+        self.logger.info("اكتملت إعادة محاولة مزامنة الضرائب الفاشلة.")
+
+    def _sync_company(self, unit, source, dest, watermark=None):
+        """
+        وحدة عمل شركة واحدة (تعمل داخل خيط من `company_pool`): قراءة الضرائب المعدلة
+        من المصدر ودفعها إلى الوجهة باستخدام اتصالات الخيط، دون الكتابة في قاعدة بيانات الربط.
+
+        Args:
+            unit (tuple): (الشركة في المصدر، معرف الشركة في الوجهة، السجلات المقروءة مسبقًا أو None).
+            source: اتصال المصدر الخاص بالخيط.
+            dest: اتصال الوجهة الخاص بالخيط.
+            watermark (WatermarkCursor): مؤشر التقدم (عند قراءة التغييرات من المصدر).
+
+        Returns:
+            SyncResult: نتيجة الشركة لدمجها لاحقًا.
+        """
+        company, dest_company_id, company_taxes_data = unit
+        result = SyncResult()
+        if company_taxes_data is None:
+            print(f"\n--- مزامنة الضرائب للشركة: {company.get('name')} (ID: {company['id']}) ---")
+            # البحث عن الضرائب الخاصة بهذه الشركة في المصدر.
+            # استخدام مؤشر التقدم (write_date, id) للمزامنة التزايدية.
+            result.changed = source['account.tax'].search_read(
+                [('company_id', '=', company['id'])] + watermark.domain(), ['id', 'write_date'], order=WatermarkCursor.ORDER
+            )
+            company_taxes_ids = [r['id'] for r in result.changed]
+            company_taxes_data = source['account.tax'].read(company_taxes_ids, self.FIELDS_TO_SYNC)
+            print(f"  - تم العثور على {len(company_taxes_data)} ضريبة في المصدر للشركة ID {company['id']}.")
+
+        self._sync_company_records(company_taxes_data, dest_company_id, dest, result)
+        return result
+
+    def _apply_results(self, results):
+        """
+        دمج نتائج جميع الشركات في قاعدة بيانات الربط وجدول السجلات الفاشلة
+        ضمن معاملة واحدة.
+
+        Args:
+            results (list): قائمة (وحدة العمل، SyncResult، الخطأ) من `company_pool.map`.
+
+        Returns:
+            tuple: (سجلات المصدر المعدلة في الشركات الناجحة، أول خطأ أو None).
+        """
+        changed_records, first_error = [], None
+        with self.key_manager.batch():
+            for unit, result, error in results:
+                if error is not None:
+                    self.error_logger.error(f"    - [خطأ] فشلت مزامنة ضرائب الشركة ID {unit[0]['id']}. الخطأ: {error}")
+                    first_error = first_error or error
+                    continue
+                result.apply(self.key_manager, self.MODEL, self.failures)
+                changed_records.extend(result.changed)
+        return changed_records, first_error
+
+    def _creator_for(self, dest):
+        """
+        منشئ الدفعات الخاص باتصال الوجهة (لكل خيط منشئ خاص يحتفظ بحجم دفعته المتكيف).
+        """
+        if dest is self.dest:
+            return self.creator
+        with self._creators_lock:
+            creator = self._creators.get(id(dest))
+            if creator is None or creator.dest is not dest:
+                creator = self._creators[id(dest)] = AdaptiveBatchCreator(
+                    dest, self.MODEL, batch_size=self.creator.batch_size,
+                    target_seconds=self.creator.target_seconds, sync_field=self.creator.sync_field, logger=self.logger
+                )
+            return creator
+
+    def _sync_company_records(self, company_taxes_data, dest_company_id, dest, result):
+        """
+        تحويل الضرائب المقروءة من المصدر لشركة واحدة ودفعها إلى الوجهة.
+
+        Args:
+            company_taxes_data (list): قائمة قواميس الضرائب المقروءة من المصدر.
+            dest_company_id (int): معرف الشركة المقابلة في الوجهة.
+            dest: اتصال الوجهة المستخدم.
+            result (SyncResult): نتيجة الشركة التي تُجمع فيها الروابط والأخطاء.
+        """
+        company_taxes_ids = [r['id'] for r in company_taxes_data]
+        total_taxes_in_company = len(company_taxes_data)
+
+        # تجهيز السجلات للمزامنة الدفعية.
+        records_to_create = []
+        records_to_update = []
+
+        # حل معرفات الضرائب الموجودة في الوجهة دفعة واحدة عبر `x_tax_sync_id`.
+        existing_ids = DestinationIdResolver(dest, logger=self.logger).resolve(self.MODEL, 'x_tax_sync_id', company_taxes_ids)
+        result.discover(self.MODEL, existing_ids)
+
+        # الضرائب غير المربوطة التي يجب البحث عنها بالاسم والنوع والشركة.
+        lookups = []
+
+        for j, tax_record in enumerate(company_taxes_data):
+            self.logger.debug(f"    - معالجة ضريبة {j+1}/{total_taxes_in_company}: {tax_record.get('name')} (ID: {tax_record['id']})")
+            source_id = tax_record['id']
+            source_name = tax_record.get('name')
+            source_type_tax_use = tax_record.get('type_tax_use')
+
+            transformed_data = self._transform_data(tax_record, dest_company_id)
+
+            # 1. البحث في نتائج الحل المسبق باستخدام `x_tax_sync_id`.
+            destination_id = existing_ids.get(source_id)
+
+            if destination_id:
+                records_to_update.append({'id': destination_id, 'data': transformed_data, 'source_id': source_id})
+            else:
+                transformed_data['x_tax_sync_id'] = str(source_id)
+                search_domain_by_name = [
+                    ('name', '=', source_name),
+                    ('type_tax_use', '=', source_type_tax_use),
+                    ('company_id', '=', dest_company_id)
+                ]
+                lookups.append(({'data': transformed_data, 'source_id': source_id}, search_domain_by_name))
+
+        # 2. إذا لم يتم العثور عليه عبر `x_tax_sync_id`، حاول البحث بالاسم والنوع والشركة.
+        # لكل ضريبة نطاق بحث مختلف، لذلك تُرسل عمليات البحث بالتوازي بدلاً من واحدة تلو الأخرى.
+        found = dest.map_execute(self.MODEL, 'search', [(domain,) for _, domain in lookups],
+                                 max_workers=self.settings.get('rpc_concurrency', DEFAULT_MAP_WORKERS), limit=1)
+        for (record, _), (existing_record_by_name, error) in zip(lookups, found):
+            if error is not None:
+                self.error_logger.error(f"    - [خطأ] فشل البحث عن الضريبة بالاسم للمصدر ID: {record['source_id']}. الخطأ: {error}")
+                result.fail([record['source_id']], STAGE_TRANSFORM, error)
+            elif existing_record_by_name:
+                records_to_update.append(dict(record, id=existing_record_by_name[0]))
+            else:
+                # 3. لم يتم العثور عليه بأي من الطريقتين، قم بإنشاء جديد.
+                records_to_create.append(record)
+
+        self._batch_sync_records(records_to_create, records_to_update, dest, result)
+
+    def _batch_sync_records(self, records_to_create, records_to_update, dest, result):
         """
         يقوم بمزامنة السجلات على دفعات (batch) لزيادة الكفاءة.
+        الروابط والأخطاء تُجمع في `result` ولا تُكتب في قاعدة بيانات الربط هنا.
         """
         self.logger.info(f"بدء المزامنة الدفعية: {len(records_to_create)} سجلات للإنشاء، {len(records_to_update)} سجلات للتحديث.")
 
+        # تخطي التحديثات التي لا تغير البيانات المكتوبة سابقًا في الوجهة.
+        records_to_update = self.payload_filter.filter_updates(records_to_update)
+
         # إنشاء السجلات الجديدة
         if records_to_create:
             self.logger.info(f"إنشاء {len(records_to_create)} سجل جديد...")
             try:
-                new_records_data = [rec['data'] for rec in records_to_create]
-                new_destination_ids = self.dest[self.MODEL].create(new_records_data)
-                for i, new_destination_id in enumerate(new_destination_ids):
+                # الإنشاء على دفعات متكيفة مع عزل السجلات الفاشلة فقط.
+                created, failed = self._creator_for(dest).create([rec['data'] for rec in records_to_create])
+                for i, new_destination_id in created.items():
                     source_id = records_to_create[i]['source_id']
-                    self.key_manager.add_mapping(self.MODEL, source_id, new_destination_id)
+                    result.add_mapping(source_id, new_destination_id, payload_hash=self.payload_filter.hash(records_to_create[i]['data']))
                     self.activity_logger.info(f"    - تم إنشاء ضريبة جديدة في الوجهة بمعرف ID: {new_destination_id} من المصدر ID: {source_id}")
+                for i, error in failed.items():
+                    self.error_logger.error(f"    - [خطأ] فشل في إنشاء الضريبة من المصدر ID: {records_to_create[i]['source_id']}. الخطأ: {error}")
+                    result.fail([records_to_create[i]['source_id']], STAGE_CREATE, error)
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في إنشاء سجلات الضرائب الجديدة دفعيًا. الخطأ: {e}")
+                result.fail([rec['source_id'] for rec in records_to_create], STAGE_CREATE, e)
 
         # تحديث السجلات الموجودة
         if records_to_update:
             self.logger.info(f"تحديث {len(records_to_update)} سجل موجود...")
             try:
+                # تجميع التحديثات ذات القيم المتطابقة في استدعاء write واحد لكل مجموعة.
+                planner = WritePlanner(dest, self.MODEL, logger=self.logger)
+                for record_data in records_to_update:
+                    planner.add(record_data['id'], record_data['data'])
+                _, failed = planner.flush()
                 for record_data in records_to_update:
                     destination_id = record_data['id']
                     source_id = record_data['source_id']
-                    data = record_data['data']
-                    self.dest[self.MODEL].write([destination_id], data)
-                    self.key_manager.add_mapping(self.MODEL, source_id, destination_id)
+                    if destination_id in failed:
+                        self.error_logger.error(f"    - [خطأ] فشل في تحديث الضريبة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
+                        result.fail([source_id], STAGE_UPDATE, failed[destination_id])
+                        continue
+                    result.add_mapping(source_id, destination_id, payload_hash=record_data['payload_hash'])
                     self.activity_logger.info(f"    - تم تحديث ضريبة موجودة في الوجهة ID: {destination_id} من المصدر ID: {source_id}")
             except Exception as e:
                 self.error_logger.error(f"    - [خطأ] فشل في تحديث سجلات الضرائب دفعيًا. الخطأ: {e}")
+                result.fail([rec['source_id'] for rec in records_to_update], STAGE_UPDATE, e)
 
         self.logger.info("اكتملت المزامنة الدفعية للضرائب.")
 
-        self._handle_deletions()
-
     def _handle_deletions(self):
         """
         يتعامل مع حذف السجلات عن طريق أرشفة السجلات في الوجهة
@@ -166,39 +359,34 @@ class TaxSyncModule:
         """
         self.logger.info("بدء معالجة حذف الضرائب...")
         
-        # 1. جلب جميع معرفات المصدر المخزنة محليًا لـ account.tax.
-        mapped_source_ids = self.key_manager.get_all_source_ids_for_model(self.MODEL)
-        self.logger.debug(f"  - تم العثور على {len(mapped_source_ids)} معرف مصدر mapped لـ {self.MODEL}.")
-
-        if not mapped_source_ids:
-            self.logger.info("  - لا توجد معرفات مصدر mapped لـ account.tax. تخطي معالجة الحذف.")
+        # 1. تشغيل الفحص فقط إذا كان مستحقًا في هذا التشغيل (كل N تشغيلات)، وليس في وضع إعادة المحاولة.
+        if self.retry_mode or not self.deletion_detector.is_due(self.__class__.__name__):
             return
 
-        # 2. جلب جميع معرفات account.tax النشطة من نظام المصدر.
-        active_source_ids = self.source[self.MODEL].search([])
-        self.logger.debug(f"  - تم العثور على {len(active_source_ids)} معرف account.tax نشط في المصدر.")
+        # 2. سؤال المصدر على دفعات عن المعرفات المربوطة التي لا تزال موجودة،
+        #    وحساب المحذوف منها بعمليات المجموعات بدلاً من جلب جميع المعرفات.
+        deleted = self.deletion_detector.find_deleted(self.MODEL)
+        self.logger.info(f"  - تم تحديد {len(deleted)} سجل account.tax للحذف (الأرشفة) في الوجهة.")
 
-        # 3. تحديد السجلات التي تم حذفها في المصدر (موجودة في mapped_source_ids ولكن ليست في active_source_ids).
-        deleted_source_ids = [sid for sid in mapped_source_ids if sid not in active_source_ids]
-        self.logger.info(f"  - تم تحديد {len(deleted_source_ids)} سجل account.tax للحذف (الأرشفة) في الوجهة.")
-
-        if not deleted_source_ids:
+        if not deleted:
             self.logger.info("  - لا توجد سجلات محذوفة في المصدر تتطلب الأرشفة في الوجهة.")
             return
 
-        # 4. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
-        for source_id in deleted_source_ids:
-            destination_id = self.key_manager.get_destination_id(self.MODEL, source_id)
-            if destination_id:
-                try:
-                    # أرشفة السجل في الوجهة (ضبط active = False).
-                    self.dest[self.MODEL].write([destination_id], {'active': False})
+        # 3. أرشفة السجلات المحذوفة في الوجهة وإزالة الربط.
+        # أرشفة جميع السجلات المحذوفة في استدعاء write واحد.
+        planner = WritePlanner(self.dest, self.MODEL, logger=self.logger)
+        for destination_id in deleted.values():
+            planner.add(destination_id, {'active': False})
+        archived, failed = planner.flush()
+        archived = set(archived)
+        # تجميع عمليات الكتابة في قاعدة بيانات الربط ضمن معاملة واحدة.
+        with self.key_manager.batch():
+            for source_id, destination_id in deleted.items():
+                if destination_id in archived:
                     self.key_manager.remove_mapping(self.MODEL, source_id)
                     self.activity_logger.info(f"    - تم أرشفة الضريبة ID: {destination_id} في الوجهة وإزالة الربط للمصدر ID: {source_id}.")
-                except Exception as e:
-                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الضريبة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {e}")
-            else:
-                self.logger.warning(f"    - تحذير: لم يتم العثور على معرف الوجهة لـ account.tax المصدر ID: {source_id} في قاعدة بيانات الربط.")
+                elif destination_id in failed:
+                    self.error_logger.error(f"    - [خطأ] فشل في أرشفة الضريبة ID {destination_id} (المصدر ID: {source_id}). الخطأ: {failed[destination_id]}")
 
         self.logger.info("اكتملت معالجة حذف الضرائب.")
 
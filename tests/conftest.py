@@ -0,0 +1,8 @@
+import pytest
+from services.sync_key_manager import SyncKeyManager
+
+@pytest.fixture
+def key_manager(tmp_path):
+    manager = SyncKeyManager(str(tmp_path / "test_sync_map.db"))
+    yield manager
+    manager.close_connection()
@@ -0,0 +1,34 @@
+import pytest
+from benchmarks.fake_odoo import FakeOdooDatabase, FakeOdooServer
+from services.odoo_connector import OdooConnector
+from sync.modules.accounts_sync import AccountSyncModule
+
+def _connect(server):
+    return OdooConnector({'url': server.url, 'db': server.database.name, 'username': 'admin', 'password': 'admin'}).get_api()
+
+@pytest.fixture
+def servers():
+    source, dest = FakeOdooDatabase('source'), FakeOdooDatabase('dest')
+    for company in (1, 2):
+        source.insert('res.company', {'name': f'Company {company}'})
+        dest.insert('res.company', {'name': f'Company {company}', 'x_company_sync_id': str(company)})
+    source.insert('account.account', {'name': 'Shared', 'code': '100001', 'account_type': 'asset_current', 'company_ids': [1, 2]})
+    source.insert('account.account', {'name': 'Own', 'code': '100002', 'account_type': 'income', 'company_ids': [2]})
+    servers = [FakeOdooServer(source).start(), FakeOdooServer(dest).start()]
+    yield servers
+    for server in servers:
+        server.stop()
+
+def test_shared_account_is_created_once_with_all_companies(servers, key_manager):
+    source_server, dest_server = servers
+    module = AccountSyncModule(_connect(source_server), _connect(dest_server), key_manager, '1970-01-01 00:00:00',
+                               loggers={}, settings={'company_workers': 4})
+    module.run()
+
+    accounts = dest_server.database.table('account.account')
+    shared = [account for account in accounts.values() if account.get('x_account_sync_id') == '1']
+    assert len(shared) == 1
+    assert sorted(shared[0]['company_ids']) == [1, 2]
+    own = [account for account in accounts.values() if account.get('x_account_sync_id') == '2']
+    assert [account['company_ids'] for account in own] == [[2]]
+    assert key_manager.get_destination_id('account.account', 1) is not None
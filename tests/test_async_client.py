@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from benchmarks.datasets import generate_source
+from benchmarks.fake_odoo import FakeOdooServer
+from odoorpc import AsyncClient
+from odoorpc.connection.jsonrpc import JSONRPCError
+from odoorpc.exceptions import LoginException
+from odoorpc.metrics import metrics
+from services.odoo_connector import OdooConnector
+
+@pytest.fixture
+def server():
+    server = FakeOdooServer(generate_source(30), latency=0.02).start()
+    yield server
+    server.stop()
+
+def make_client(server, **kwargs):
+    return AsyncClient('127.0.0.1', 'source', 'admin', kwargs.pop('pwd', 'admin'), port=server.port, **kwargs)
+
+def test_mirrors_object_methods(server):
+    async def scenario():
+        async with make_client(server) as client:
+            partners = client['res.partner']
+            ids = await partners.search([('email', 'ilike', 'example')], limit=5)
+            rows = await partners.read(ids, ['name'])
+            single = await partners.read(ids[0], ['name'])
+            new_id = await partners.create({'name': 'Async Partner'})
+            await partners.write([new_id], {'email': 'async@example.com'})
+            found = await partners.search_read([('id', '=', new_id)], ['name', 'email'])
+            count = await partners.search_count([])
+            return ids, rows, single, found, count
+
+    ids, rows, single, found, count = asyncio.run(scenario())
+    assert len(ids) == 5 and [row['id'] for row in rows] == ids
+    assert single['id'] == ids[0]
+    assert found[0]['name'] == 'Async Partner' and found[0]['email'] == 'async@example.com'
+    assert count == 31
+
+def test_many_requests_in_flight_reuse_pooled_connections(server):
+    async def scenario():
+        async with make_client(server, pool_size=5) as client:
+            partners = client['res.partner']
+            return await asyncio.gather(*[partners.read([i], ['id']) for i in range(1, 31)])
+
+    metrics.reset()
+    results = asyncio.run(scenario())
+    assert [rows[0]['id'] for rows in results] == list(range(1, 31))
+    # 30 concurrent reads (plus login) over at most 5 connections.
+    assert server.connections <= 5
+    assert metrics.totals()['']['calls'] == 30
+
+def test_server_errors_and_bad_login_are_raised(server):
+    async def failing_write():
+        async with make_client(server) as client:
+            await client['res.partner'].write([999999], {'name': 'Missing'})
+
+    async def bad_login():
+        async with make_client(server, pwd='wrong') as client:
+            await client['res.partner'].search([])
+
+    with pytest.raises(JSONRPCError, match='does not exist'):
+        asyncio.run(failing_write())
+    with pytest.raises(LoginException):
+        asyncio.run(bad_login())
+
+def test_connector_builds_async_client_without_new_login(server):
+    connector = OdooConnector({'url': server.url, 'db': 'source', 'username': 'admin', 'password': 'admin'})
+    client = connector.get_async_api()
+    assert client.uid == connector.get_api().uid
+    before = server.requests
+    assert asyncio.run(client['res.country'].search_count([])) > 0
+    assert server.requests == before + 1
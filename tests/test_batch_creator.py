@@ -0,0 +1,77 @@
+import itertools
+from odoorpc.connection.jsonrpc import JSONRPCError
+from services.batch_creator import AdaptiveBatchCreator
+
+def make_dest(mocker, bad=()):
+    model = mocker.Mock()
+    ids = itertools.count(1000)
+    def create(vals_list):
+        if any(vals['name'] in bad for vals in vals_list):
+            raise JSONRPCError('Odoo Server Error', data={'name': 'ValidationError', 'message': 'validation error'})
+        return [next(ids) for _ in vals_list]
+    model.create.side_effect = create
+    return {'account.move': model}
+
+def test_creates_in_chunks_of_batch_size(mocker):
+    dest = make_dest(mocker)
+    creator = AdaptiveBatchCreator(dest, 'account.move', batch_size=4, max_batch_size=4)
+    created, failed = creator.create([{'name': f'M{i}'} for i in range(10)])
+    assert sorted(created) == list(range(10))
+    assert failed == {}
+    assert [len(call.args[0]) for call in dest['account.move'].create.call_args_list] == [4, 4, 2]
+
+def test_failed_chunk_is_bisected_to_isolate_bad_records(mocker):
+    dest = make_dest(mocker, bad={'M5'})
+    creator = AdaptiveBatchCreator(dest, 'account.move', batch_size=8)
+    created, failed = creator.create([{'name': f'M{i}'} for i in range(8)])
+    assert list(failed) == [5]
+    assert sorted(created) == [0, 1, 2, 3, 4, 6, 7]
+    assert len(set(created.values())) == 7
+
+def test_batch_size_grows_when_fast_and_shrinks_when_slow(mocker):
+    dest = make_dest(mocker)
+    clock = mocker.patch('services.batch_creator.time.monotonic')
+    creator = AdaptiveBatchCreator(dest, 'account.move', batch_size=2, target_seconds=10)
+    clock.side_effect = [0, 1]
+    creator.create([{'name': 'A'}, {'name': 'B'}])
+    assert creator.batch_size == 4
+    clock.side_effect = [0, 40]
+    creator.create([{'name': f'M{i}'} for i in range(4)])
+    assert creator.batch_size == 1
+
+def test_payload_limit_caps_chunk(mocker):
+    dest = make_dest(mocker)
+    creator = AdaptiveBatchCreator(dest, 'account.move', batch_size=10, max_payload_bytes=40)
+    creator.create([{'name': 'x' * 20} for _ in range(3)])
+    assert [len(call.args[0]) for call in dest['account.move'].create.call_args_list] == [1, 1, 1]
+
+def test_transport_error_is_not_resent(mocker):
+    dest = make_dest(mocker)
+    dest['account.move'].create.side_effect = JSONRPCError('Cannot connect to url: Read timed out')
+    creator = AdaptiveBatchCreator(dest, 'account.move', batch_size=8)
+    created, failed = creator.create([{'name': f'M{i}'} for i in range(4)])
+    assert created == {}
+    assert sorted(failed) == [0, 1, 2, 3]
+    assert dest['account.move'].create.call_count == 1
+
+def test_transport_error_looks_up_records_created_by_server(mocker):
+    dest = make_dest(mocker)
+    dest['account.move'].create.side_effect = JSONRPCError('Cannot connect to url: Read timed out')
+    dest['account.move'].search_read.return_value = [{'id': 501, 'x_move_sync_id': '1'}, {'id': 502, 'x_move_sync_id': '2'}]
+    creator = AdaptiveBatchCreator(dest, 'account.move', batch_size=8, sync_field='x_move_sync_id')
+    created, failed = creator.create([{'name': f'M{i}', 'x_move_sync_id': str(i)} for i in range(3)])
+    assert created == {1: 501, 2: 502}
+    assert list(failed) == [0]
+    assert dest['account.move'].create.call_count == 1
+    domain = dest['account.move'].search_read.call_args.args[0]
+    assert domain == [('x_move_sync_id', 'in', ['0', '1', '2'])]
+
+def test_batch_size_does_not_grow_until_bad_record_is_isolated(mocker):
+    dest = make_dest(mocker, bad={'M5'})
+    mocker.patch('services.batch_creator.time.monotonic', return_value=0)
+    creator = AdaptiveBatchCreator(dest, 'account.move', batch_size=8)
+    created, failed = creator.create([{'name': f'M{i}'} for i in range(16)])
+    assert list(failed) == [5]
+    assert len(created) == 15
+    sizes = [len(call.args[0]) for call in dest['account.move'].create.call_args_list]
+    assert sizes == [8, 4, 4, 2, 1, 1, 1, 1, 1, 2, 4, 1]
@@ -0,0 +1,73 @@
+import threading
+import time
+from odoorpc.client import Client
+
+def test_server_version_is_resolved_once(mocker):
+    client = Client('localhost', protocol='json-rpc')
+    db = mocker.Mock()
+    db.server_base_version.return_value = 17.0
+    mocker.patch.object(type(client), 'services', new_callable=mocker.PropertyMock).return_value.db = db
+    assert client.server_version == 17.0
+    assert client.server_version == 17.0
+    assert db.server_base_version.call_count == 1
+    client.clean_caches()
+    assert client.server_version == 17.0
+    assert db.server_base_version.call_count == 2
+
+def test_server_version_can_be_seeded(mocker):
+    client = Client('localhost', protocol='json-rpc')
+    services = mocker.patch.object(type(client), 'services', new_callable=mocker.PropertyMock)
+    client.server_version = '16.0'
+    assert client.server_version == 16.0
+    services.return_value.db.server_base_version.assert_not_called()
+
+def test_clone_has_own_connection_and_reuses_login(mocker):
+    client = Client('localhost', dbname='db', user='admin', pwd='secret', protocol='json-rpc')
+    client._uid = 2
+    client.server_version = '17.0'
+    clone = client.clone()
+    assert clone is not client
+    assert clone.connection is not client.connection
+    assert (clone.host, clone.dbname, clone.username, clone.uid) == ('localhost', 'db', 'admin', 2)
+    services = mocker.patch.object(type(clone), 'services', new_callable=mocker.PropertyMock)
+    assert clone.server_version == 17.0
+    services.return_value.db.server_base_version.assert_not_called()
+
+def test_map_execute_keeps_order_and_captures_errors(mocker):
+    client = Client('localhost', dbname='db', user='admin', pwd='secret', protocol='json-rpc')
+    client._uid = 2
+
+    def execute(obj, method, value, **kwargs):
+        time.sleep(0.01 * (5 - value))
+        if value == 2:
+            raise ValueError('bad value')
+        return [value * 10, kwargs['limit']]
+
+    mocker.patch.object(client, 'execute', side_effect=execute)
+    clone = mocker.patch.object(client, 'clone')
+    results = client.map_execute('res.partner', 'search', [1, 2, (3,), 4], max_workers=4, limit=1)
+    assert [result for result, _ in results] == [[10, 1], None, [30, 1], [40, 1]]
+    assert isinstance(results[1][1], ValueError)
+    assert [error for _, error in results].count(None) == 3
+    clone.assert_not_called()
+
+def test_map_execute_clones_client_for_not_thread_safe_connector(mocker):
+    client = Client('localhost', dbname='db', user='admin', pwd='secret', protocol='xml-rpc')
+    client._uid = 2
+    barrier = threading.Barrier(2)
+
+    def execute(obj, method, value):
+        # both calls must run at the same time, each on its own clone
+        barrier.wait(timeout=5)
+        return value
+
+    def make_clone():
+        clone = mocker.Mock()
+        clone.execute.side_effect = execute
+        return clone
+
+    mocker.patch.object(client, 'clone', side_effect=make_clone)
+    mocker.patch.object(client, 'execute', side_effect=AssertionError('shared client used'))
+    results = client.map_execute('res.partner', 'read', [1, 2], max_workers=2)
+    assert results == [(1, None), (2, None)]
+    assert client.clone.call_count == 2
@@ -0,0 +1,58 @@
+import threading
+from unittest.mock import MagicMock
+from odoorpc.metrics import metrics
+from services.company_pool import CompanyWorkerPool
+from services.sync_result import SyncResult
+from services.failed_records import FailedRecordTracker, STAGE_CREATE
+
+def test_results_are_applied_to_mappings_and_failures(key_manager):
+    tracker = FailedRecordTracker(key_manager, 'AccountSyncModule', 'account.account')
+    tracker.record([1, 4], STAGE_CREATE, 'old error')
+    result = SyncResult()
+    result.discover('account.account', {3: 303})
+    result.add_mapping(1, 101, payload_hash='h1')
+    result.fail([2], STAGE_CREATE, 'boom')
+    result.clear([4])
+    with key_manager.batch():
+        result.apply(key_manager, 'account.account', tracker)
+    assert key_manager.get_destination_id('account.account', 1) == 101
+    assert key_manager.get_destination_id('account.account', 3) == 303
+    assert key_manager.get_payload_hashes('account.account', [1]) == {1: (101, 'h1')}
+    rows = key_manager.get_failed_records('AccountSyncModule', 'account.account', due_only=False)
+    assert [(row['source_id'], row['error']) for row in rows] == [(2, 'boom')]
+
+def test_single_worker_runs_inline_with_main_connections():
+    source, dest = MagicMock(), MagicMock()
+    pool = CompanyWorkerPool(source, dest, max_workers=1)
+    results = pool.map(lambda item, s, d: (item, s, d), [1, 2])
+    assert [result for _, result, _ in results] == [(1, source, dest), (2, source, dest)]
+    source.clone.assert_not_called()
+
+def test_workers_use_cloned_connections_and_keep_metrics_scope():
+    source, dest = MagicMock(), MagicMock()
+    source.clone.side_effect = lambda: MagicMock(name='source_clone')
+    dest.clone.side_effect = lambda: MagicMock(name='dest_clone')
+    barrier = threading.Barrier(2)
+
+    def work(item, s, d):
+        barrier.wait(timeout=5)
+        return s, d, metrics.current_scope
+
+    pool = CompanyWorkerPool(source, dest, max_workers=2)
+    with metrics.scope('AccountSyncModule'):
+        results = pool.map(work, [1, 2])
+    connections = [(s, d) for _, (s, d, _), _ in results]
+    assert len(set(connections)) == 2
+    assert all(s is not source and d is not dest for s, d in connections)
+    assert {scope for _, (_, _, scope), _ in results} == {'AccountSyncModule'}
+
+def test_errors_are_returned_per_item():
+    def work(item, s, d):
+        if item == 2:
+            raise ValueError('company 2')
+        return item * 10
+
+    pool = CompanyWorkerPool(MagicMock(), MagicMock(), max_workers=3)
+    results = pool.map(work, [1, 2, 3])
+    assert [(item, result) for item, result, _ in results] == [(1, 10), (2, None), (3, 30)]
+    assert isinstance(results[1][2], ValueError)
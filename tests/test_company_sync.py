@@ -0,0 +1,17 @@
+from unittest.mock import MagicMock
+from sync.modules.company_sync import CompanySyncModule
+
+def make_module(currencies):
+    reference_data = MagicMock()
+    reference_data.get.side_effect = lambda model, field, value: currencies.get(value)
+    return CompanySyncModule(MagicMock(), MagicMock(), MagicMock(), '1970-01-01 00:00:00', loggers={}, reference_data=reference_data)
+
+def test_currency_is_mapped_by_name():
+    module = make_module({'SAR': 20})
+    assert module._transform_data({'id': 1, 'name': 'My Company', 'currency_id': [7, 'SAR']})['currency_id'] == 20
+
+def test_missing_currency_is_logged_and_not_sent(caplog):
+    module = make_module({})
+    data = module._transform_data({'id': 1, 'name': 'My Company', 'currency_id': [7, 'XYZ']})
+    assert 'currency_id' not in data
+    assert 'XYZ' in caplog.text
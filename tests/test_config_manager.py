@@ -66,3 +66,15 @@ password = test_online_pass
     config_manager = ConfigManager(config_file=str(config_path))
     with pytest.raises(ValueError, match="Key 'password' not found in section 'COMMUNITY_ODOO'"):
         config_manager.get_community_credentials()
+
+def test_get_sync_settings_defaults_and_overrides(tmp_path):
+    config_path = tmp_path / "config.ini"
+    config_path.write_text("[odoo_community]\nurl = x\n")
+    assert ConfigManager(config_file=str(config_path)).get_sync_settings() == ConfigManager.DEFAULT_SYNC_SETTINGS
+    config_path.write_text("[sync]\ndeletion_scan_every = 5\npreload_mappings = false\nsqlite_synchronous = full\nsqlite_cache_size = -2000\n")
+    settings = ConfigManager(config_file=str(config_path)).get_sync_settings()
+    assert settings['deletion_scan_every'] == 5
+    assert settings['preload_mappings'] is False
+    assert settings['sqlite_synchronous'] == 'full'
+    assert settings['sqlite_cache_size'] == -2000
+    assert settings['deletion_chunk_size'] == ConfigManager.DEFAULT_SYNC_SETTINGS['deletion_chunk_size']
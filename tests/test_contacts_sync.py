@@ -0,0 +1,67 @@
+import pytest
+from benchmarks.fake_odoo import FakeOdooDatabase, FakeOdooServer
+from services.odoo_connector import OdooConnector
+from sync.modules.contacts_sync import ContactSyncModule
+
+@pytest.fixture
+def servers():
+    source = FakeOdooDatabase('source')
+    # المعرفات بترتيب معاكس لـ write_date حتى يختلف ترتيب المؤشر عن ترتيب المعرف.
+    for index, write_date in enumerate(['2025-01-04 00:00:00', '2025-01-03 00:00:00', '2025-01-02 00:00:00', '2025-01-01 00:00:00'], 1):
+        source.insert('res.partner', {'name': f'Partner {index}', 'write_date': write_date})
+    servers = [FakeOdooServer(source).start(), FakeOdooServer(FakeOdooDatabase('dest')).start()]
+    yield servers
+    for server in servers:
+        server.stop()
+
+def test_watermark_advances_after_each_committed_chunk(servers, key_manager, monkeypatch):
+    source, dest = [
+        OdooConnector({'url': server.url, 'db': server.database.name, 'username': 'admin', 'password': 'admin'}).get_api()
+        for server in servers
+    ]
+    module = ContactSyncModule(source, dest, key_manager, '1970-01-01 00:00:00', loggers={}, settings={'read_chunk_size': 3})
+    synced = []
+
+    def sync_chunk(source_data):
+        if synced:
+            raise RuntimeError('interrupted')
+        synced.append([record['id'] for record in source_data])
+    monkeypatch.setattr(module, '_sync_chunk', sync_chunk)
+
+    with pytest.raises(RuntimeError):
+        module.run()
+    assert synced == [[4, 3]]
+    assert key_manager.get_watermark('ContactSyncModule', 'res.partner') == ('2025-01-02 00:00:00', 3)
+
+def test_resume_inside_one_write_date_second_reads_each_record_once(key_manager, monkeypatch):
+    source_db = FakeOdooDatabase('source')
+    # عدد السجلات في الثانية نفسها أكبر من حجم الدفعة.
+    for index in range(1, 6):
+        source_db.insert('res.partner', {'name': f'Partner {index}', 'write_date': '2025-01-01 00:00:00'})
+    servers = [FakeOdooServer(source_db).start(), FakeOdooServer(FakeOdooDatabase('dest')).start()]
+    try:
+        source, dest = [
+            OdooConnector({'url': server.url, 'db': server.database.name, 'username': 'admin', 'password': 'admin'}).get_api()
+            for server in servers
+        ]
+        synced = []
+
+        def run(interrupt_after):
+            module = ContactSyncModule(source, dest, key_manager, '1970-01-01 00:00:00', loggers={}, settings={'read_chunk_size': 2})
+
+            def sync_chunk(source_data):
+                if len(synced) == interrupt_after:
+                    raise RuntimeError('interrupted')
+                synced.append([record['id'] for record in source_data])
+            monkeypatch.setattr(module, '_sync_chunk', sync_chunk)
+            monkeypatch.setattr(module, '_handle_deletions', lambda: None)
+            module.run()
+
+        with pytest.raises(RuntimeError):
+            run(interrupt_after=1)
+        assert key_manager.get_watermark('ContactSyncModule', 'res.partner') == ('2025-01-01 00:00:00', 2)
+        run(interrupt_after=None)
+        assert synced == [[1, 2], [3, 4], [5]]
+    finally:
+        for server in servers:
+            server.stop()
@@ -0,0 +1,21 @@
+import pytest
+from services.deletion_detector import DeletionDetector
+
+@pytest.fixture
+def source(mocker):
+    model = mocker.Mock()
+    return {'res.partner': model}
+
+def test_find_deleted_checks_mapped_ids_in_chunks(key_manager, source):
+    key_manager.add_mappings_bulk('res.partner', {1: 101, 2: 102, 3: 103, 4: 104, 5: 105})
+    source['res.partner'].search.side_effect = lambda domain, context=None: [i for i in domain[0][2] if i != 4]
+    detector = DeletionDetector(source, key_manager, chunk_size=2)
+    assert detector.find_deleted('res.partner') == {4: 104}
+    assert source['res.partner'].search.call_count == 3
+    _, kwargs = source['res.partner'].search.call_args
+    assert kwargs['context'] == {'active_test': False}
+
+def test_is_due_every_n_runs(key_manager, source):
+    detector = DeletionDetector(source, key_manager, scan_every=3)
+    assert [detector.is_due('ContactSyncModule') for _ in range(6)] == [False, False, True, False, False, True]
+    assert DeletionDetector(source, key_manager).is_due('ContactSyncModule') is True
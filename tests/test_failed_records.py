@@ -0,0 +1,43 @@
+import time
+from services.failed_records import FailedRecordTracker, STAGE_CREATE, STAGE_UPDATE
+
+def test_record_stores_stage_error_and_attempts(key_manager):
+    tracker = FailedRecordTracker(key_manager, 'ContactSyncModule', 'res.partner')
+    tracker.record_many({4: ValueError('Invalid email')}, STAGE_CREATE)
+
+    rows = key_manager.get_failed_records('ContactSyncModule', 'res.partner', due_only=False)
+    assert len(rows) == 1
+    assert rows[0]['source_id'] == 4
+    assert rows[0]['stage'] == STAGE_CREATE
+    assert rows[0]['error'] == 'Invalid email'
+    assert rows[0]['attempts'] == 1
+
+def test_retry_delay_doubles_with_each_failure(key_manager):
+    delays = []
+    for _ in range(3):
+        before = time.time()
+        key_manager.record_failures('TaxSyncModule', 'account.tax', {7: (STAGE_UPDATE, 'boom')}, base_delay=60, max_delay=200)
+        row = key_manager.get_failed_records('TaxSyncModule', 'account.tax', due_only=False)[0]
+        delays.append(round(row['next_retry_at'] - before))
+    assert delays == [60, 120, 200]
+    assert row['attempts'] == 3
+
+def test_due_ids_only_returns_records_whose_delay_has_passed(key_manager):
+    tracker = FailedRecordTracker(key_manager, 'ContactSyncModule', 'res.partner')
+    tracker.record([1, 2], STAGE_CREATE, 'boom')
+
+    assert tracker.due_ids() == []
+    later = time.time() + tracker.RETRY_BASE_SECONDS + 1
+    due = key_manager.get_failed_records('ContactSyncModule', 'res.partner', now=later)
+    assert [row['source_id'] for row in due] == [1, 2]
+
+def test_clear_removes_only_given_records_of_the_module(key_manager):
+    contacts = FailedRecordTracker(key_manager, 'ContactSyncModule', 'res.partner')
+    invoices = FailedRecordTracker(key_manager, 'InvoiceSyncModule', 'account.move')
+    contacts.record([1, 2], STAGE_CREATE, 'boom')
+    invoices.record([1], STAGE_CREATE, 'boom')
+
+    contacts.clear([1])
+
+    assert [r['source_id'] for r in key_manager.get_failed_records('ContactSyncModule', 'res.partner', due_only=False)] == [2]
+    assert [r['source_id'] for r in key_manager.get_failed_records('InvoiceSyncModule', 'account.move', due_only=False)] == [1]
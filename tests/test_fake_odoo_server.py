@@ -0,0 +1,40 @@
+import pytest
+from benchmarks.datasets import generate_source
+from benchmarks.fake_odoo import FakeOdooServer
+from services.odoo_connector import OdooConnector
+
+@pytest.fixture
+def server():
+    server = FakeOdooServer(generate_source(30)).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def api(server):
+    connector = OdooConnector({'url': server.url, 'db': 'source', 'username': 'admin', 'password': 'admin'})
+    return connector.get_api()
+
+def test_search_read_pages_and_reads_many2one_as_pairs(api):
+    chunks = list(api['res.partner'].iter_search_read([('email', 'ilike', 'example')], ['name', 'country_id'], chunk_size=20))
+    assert [len(chunk) for chunk in chunks] == [20, 10]
+    country_id, country_name = chunks[0][0]['country_id']
+    assert country_name == api['res.country'].read([country_id], ['name'])[0]['name']
+
+def test_create_with_one2many_commands_and_post(api, server):
+    move_id = api['account.move'].create({
+        'name': 'INV/TEST', 'move_type': 'out_invoice',
+        'invoice_line_ids': [(0, 0, {'name': 'Line', 'tax_ids': [(6, 0, [1])]})],
+    })
+    lines = api['account.move.line'].search_read([('move_id', '=', move_id)], ['tax_ids'])
+    assert [line['tax_ids'] for line in lines] == [[1]]
+
+    api['account.move'].browse([move_id]).action_post()
+    assert server.database.table('account.move')[move_id]['state'] == 'posted'
+
+def test_server_errors_are_returned_as_jsonrpc_errors(api):
+    with pytest.raises(Exception, match='does not exist'):
+        api['res.partner'].write([999999], {'name': 'Missing'})
+
+def test_wrong_password_is_rejected(server):
+    with pytest.raises(ConnectionError):
+        OdooConnector({'url': server.url, 'db': 'source', 'username': 'admin', 'password': 'wrong'})
@@ -0,0 +1,40 @@
+import pytest
+from services.id_resolver import DestinationIdResolver
+
+@pytest.fixture
+def dest(mocker):
+    partner_model = mocker.Mock()
+    return {'res.partner': partner_model}
+
+def test_resolve_returns_mapping_and_feeds_key_manager(dest, key_manager):
+    dest['res.partner'].search_read.return_value = [
+        {'id': 201, 'x_partner_sync_id': '1'},
+        {'id': 202, 'x_partner_sync_id': '2'},
+    ]
+    resolver = DestinationIdResolver(dest, key_manager)
+    result = resolver.resolve('res.partner', 'x_partner_sync_id', [1, 2, 3])
+    assert result == {1: 201, 2: 202}
+    dest['res.partner'].search_read.assert_called_once_with(
+        [('x_partner_sync_id', 'in', ['1', '2', '3'])], ['id', 'x_partner_sync_id'])
+    assert key_manager.get_destination_id('res.partner', 1) == 201
+    assert key_manager.get_destination_id('res.partner', 3) is None
+
+def test_resolve_chunks_requests(dest):
+    dest['res.partner'].search_read.return_value = []
+    resolver = DestinationIdResolver(dest, chunk_size=2)
+    resolver.resolve('res.partner', 'x_partner_sync_id', [5, 1, 3, 1, 4])
+    assert dest['res.partner'].search_read.call_count == 2
+
+def test_resolve_keeps_first_match_and_ignores_bad_values(dest):
+    dest['res.partner'].search_read.return_value = [
+        {'id': 10, 'x_partner_sync_id': '7'},
+        {'id': 11, 'x_partner_sync_id': '7'},
+        {'id': 12, 'x_partner_sync_id': False},
+    ]
+    resolver = DestinationIdResolver(dest)
+    assert resolver.resolve('res.partner', 'x_partner_sync_id', [7]) == {7: 10}
+
+def test_resolve_empty_input_makes_no_rpc(dest):
+    resolver = DestinationIdResolver(dest)
+    assert resolver.resolve('res.partner', 'x_partner_sync_id', []) == {}
+    dest['res.partner'].search_read.assert_not_called()
@@ -0,0 +1,54 @@
+from unittest.mock import MagicMock
+from services.failed_records import STAGE_POST
+from services.move_posting import MovePostingPipeline
+from services.sync_result import SyncResult
+from sync.modules.journal_entries_sync import JournalEntrySyncModule
+
+def test_created_moves_that_fail_to_post_are_stored_without_hash():
+    module = JournalEntrySyncModule(MagicMock(), MagicMock(), MagicMock(), '1970-01-01 00:00:00', loggers={})
+    module.creator = MagicMock()
+    module.creator.create.return_value = ({0: 501, 1: 502}, {})
+    module.posting = MagicMock()
+    module.posting.post.return_value = ([501], {502: 'unbalanced'})
+    chunk = {
+        'create': [{'source_id': 1, 'data': {'name': 'A'}}, {'source_id': 2, 'data': {'name': 'B'}}],
+        'update': [],
+        'result': SyncResult(),
+    }
+    module._push_chunk(chunk)
+    result = chunk['result']
+    assert result.mappings == [(1, 501, module.payload_filter.hash({'name': 'A'})), (2, 502, None)]
+    assert result.failures == {STAGE_POST: {2: 'unbalanced'}}
+
+def test_move_that_failed_to_post_is_posted_on_retry(key_manager):
+    module = JournalEntrySyncModule(MagicMock(), MagicMock(), key_manager, '1970-01-01 00:00:00', loggers={})
+    dest = {'account.move': MagicMock()}
+    dest['account.move'].browse.return_value.action_post.side_effect = [Exception('unbalanced'), Exception('unbalanced'), None]
+    dest['account.move'].read.return_value = [{'id': 501, 'state': 'draft'}]
+    module.posting = MovePostingPipeline(dest)
+    module.creator = MagicMock()
+    module.creator.create.return_value = ({0: 501}, {})
+
+    # 1. الإنشاء ينجح والترحيل يفشل: يبقى السجل في قائمة الفاشلة.
+    chunk = {'create': [{'source_id': 1, 'data': {'name': 'A'}}], 'update': [], 'result': SyncResult()}
+    module._push_chunk(chunk)
+    chunk['result'].apply(key_manager, module.MODEL, module.failures)
+    assert [row['stage'] for row in key_manager.get_failed_records('JournalEntrySyncModule', 'account.move', due_only=False)] == [STAGE_POST]
+
+    # 2. إعادة المحاولة تسلك مسار التحديث وتحاول ترحيل المسودة؛ فشل الترحيل مجددًا
+    # يزيد عدد المحاولات بدلاً من إعادة تعيينه.
+    def retry():
+        chunk = {'create': [], 'update': [{'id': 501, 'source_id': 1, 'data': {'name': 'A'}, 'posted': True}], 'result': SyncResult()}
+        module._push_chunk(chunk)
+        return chunk
+
+    chunk = retry()
+    chunk['result'].apply(key_manager, module.MODEL, module.failures)
+    assert [row['attempts'] for row in key_manager.get_failed_records('JournalEntrySyncModule', 'account.move', due_only=False)] == [2]
+
+    # 3. إزالة الفشل فقط بعد نجاح الترحيل.
+    chunk = retry()
+    assert dest['account.move'].browse.return_value.action_post.call_count == 3
+    assert dest['account.move'].browse.call_args_list[-1].args == ([501],)
+    chunk['result'].apply(key_manager, module.MODEL, module.failures)
+    assert key_manager.get_failed_records('JournalEntrySyncModule', 'account.move', due_only=False) == []
@@ -0,0 +1,26 @@
+from odoorpc.connection.jsonrpc import ConnectorJSONRPC
+
+def test_services_share_one_pooled_session():
+    connector = ConnectorJSONRPC('localhost', 8069, extra_args={'pool_size': '4', 'keep_alive': 'false'})
+    common = connector.get_service('common')
+    obj = connector.get_service('object')
+    assert common.session is connector.session
+    assert obj.session is connector.session
+    adapter = connector.session.get_adapter('http://localhost:8069')
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.read == 0
+    assert connector.session.headers['Connection'] == 'close'
+
+def test_update_extra_args_recreates_session():
+    connector = ConnectorJSONRPC('localhost', 8069)
+    session = connector.session
+    connector.update_extra_args(pool_size=2)
+    assert connector.session is not session
+    assert connector.session.get_adapter('http://localhost:8069')._pool_maxsize == 2
+
+def test_rpc_call_uses_session(mocker):
+    connector = ConnectorJSONRPC('localhost', 8069)
+    post = mocker.patch.object(connector.session, 'post')
+    post.return_value.text = '{"result": "16.0"}'
+    assert connector.get_service('common').version() == '16.0'
+    post.assert_called_once()
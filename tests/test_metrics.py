@@ -0,0 +1,73 @@
+import json
+import pytest
+from odoorpc.connection.jsonrpc import ConnectorJSONRPC
+from odoorpc.metrics import RPCMetrics, metrics
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_calls_are_aggregated_per_scope_model_and_method():
+    collector = RPCMetrics(buckets=(0.1, 1.0, float('inf')))
+    with collector.scope('ContactSyncModule'):
+        collector.record_call('res.partner', 'search_read', 0.05)
+        collector.record_call('res.partner', 'search_read', 0.5, error=True)
+        collector.record_bytes('res.partner', 'search_read', 100, 2000)
+    collector.record_call('res.partner', 'search_read', 2.0)
+
+    rows = collector.snapshot()
+    assert [(row['scope'], row['calls']) for row in rows] == [('', 1), ('ContactSyncModule', 2)]
+    contacts = rows[1]
+    assert contacts['errors'] == 1
+    assert contacts['request_bytes'] == 100 and contacts['response_bytes'] == 2000
+    assert [count for _, count in contacts['buckets']] == [1, 1, 0]
+    assert collector.totals()['ContactSyncModule']['seconds'] == pytest.approx(0.55)
+
+def test_reports_are_written_as_json_and_prometheus(tmp_path):
+    collector = RPCMetrics(buckets=(1.0, float('inf')))
+    with collector.scope('TaxSyncModule'):
+        collector.record_call('account.tax', 'create', 0.2)
+    collector.write_json(str(tmp_path / 'metrics.json'))
+    collector.write_prometheus(str(tmp_path / 'metrics.prom'))
+
+    data = json.loads((tmp_path / 'metrics.json').read_text())
+    assert data['totals']['TaxSyncModule']['calls'] == 1
+    prom = (tmp_path / 'metrics.prom').read_text()
+    labels = 'scope="TaxSyncModule",model="account.tax",method="create"'
+    assert f'odoorpc_calls_total{{{labels}}} 1' in prom
+    assert f'odoorpc_call_seconds_bucket{{{labels},le="+Inf"}} 1' in prom
+
+def test_prometheus_families_are_grouped_and_labels_escaped(tmp_path):
+    collector = RPCMetrics(buckets=(float('inf'),))
+    with collector.scope('Module "A"\\1\n'):
+        collector.record_call('res.partner', 'read', 0.1)
+        collector.record_call('res.partner', 'write', 0.1)
+    collector.write_prometheus(str(tmp_path / 'metrics.prom'))
+
+    lines = (tmp_path / 'metrics.prom').read_text().splitlines()
+    assert 'odoorpc_calls_total{scope="Module \\"A\\"\\\\1\\n",model="res.partner",method="read"} 1' in lines
+    # كل عائلة في كتلة واحدة: HELP ثم TYPE ثم جميع عيناتها.
+    families = []
+    for line in lines:
+        if line.startswith('# HELP '):
+            families.append(line.split()[2])
+        elif line.startswith('# TYPE '):
+            assert line.split()[2] == families[-1]
+        else:
+            assert line.startswith(families[-1])
+    assert families == ['odoorpc_calls_total', 'odoorpc_errors_total', 'odoorpc_request_bytes_total',
+                        'odoorpc_response_bytes_total', 'odoorpc_call_seconds']
+
+def test_jsonrpc_calls_record_payload_sizes_per_model(mocker):
+    connector = ConnectorJSONRPC('localhost', 8069)
+    post = mocker.patch.object(connector.session, 'post')
+    post.return_value.content = b'{"result": [1, 2]}'
+    post.return_value.text = '{"result": [1, 2]}'
+    connector.get_service('object').execute_kw('db', 1, 'pwd', 'res.partner', 'search', [[]], {})
+
+    row = metrics.snapshot()[0]
+    assert (row['model'], row['method']) == ('res.partner', 'search')
+    assert row['response_bytes'] == len(b'{"result": [1, 2]}')
+    assert row['request_bytes'] == len(post.call_args.kwargs['data'])
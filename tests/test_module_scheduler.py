@@ -0,0 +1,41 @@
+import threading
+import time
+from core.module_scheduler import ModuleScheduler, SUCCEEDED, FAILED, BLOCKED
+
+def test_dependents_wait_for_their_dependencies():
+    order = []
+    lock = threading.Lock()
+    def run(name):
+        time.sleep(0.01)
+        with lock:
+            order.append(name)
+    tasks = [('journals', ['accounts']), ('accounts', ['companies']), ('companies', []), ('contacts', [])]
+    results = ModuleScheduler(max_workers=3).run(tasks, run)
+    assert all(status == SUCCEEDED for status, _ in results.values())
+    assert order.index('companies') < order.index('accounts') < order.index('journals')
+
+def test_failure_blocks_only_dependents():
+    ran = []
+    def run(name):
+        ran.append(name)
+        if name == 'accounts':
+            raise RuntimeError('boom')
+    tasks = [('companies', []), ('accounts', ['companies']), ('journals', ['accounts']),
+             ('invoices', ['journals', 'contacts']), ('contacts', [])]
+    results = ModuleScheduler(max_workers=2).run(tasks, run)
+    assert results['accounts'][0] == FAILED
+    assert str(results['accounts'][1]) == 'boom'
+    assert results['journals'][0] == BLOCKED
+    assert results['invoices'][0] == BLOCKED
+    assert results['contacts'][0] == SUCCEEDED
+    assert 'journals' not in ran
+
+def test_independent_modules_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+    results = ModuleScheduler(max_workers=2).run([('a', []), ('b', [])], lambda name: barrier.wait())
+    assert results == {'a': (SUCCEEDED, None), 'b': (SUCCEEDED, None)}
+
+def test_unregistered_dependencies_are_ignored_and_cycles_blocked():
+    results = ModuleScheduler().run([('a', ['missing']), ('b', ['c']), ('c', ['b'])], lambda name: None)
+    assert results['a'][0] == SUCCEEDED
+    assert results['b'][0] == BLOCKED and results['c'][0] == BLOCKED
@@ -0,0 +1,44 @@
+import pytest
+from services.move_posting import MovePostingPipeline
+
+@pytest.fixture
+def dest(mocker):
+    model = mocker.Mock()
+    model.read.return_value = [{'id': 1, 'state': 'posted'}, {'id': 2, 'state': 'draft'}, {'id': 3, 'state': 'posted'}]
+    return {'account.move': model}
+
+def test_update_reads_unposts_and_reposts_in_batches(dest):
+    pipeline = MovePostingPipeline(dest)
+    written, failed = pipeline.update([(1, {'ref': 'a'}), (2, {'ref': 'b'}), (3, {'ref': 'c'})])
+    model = dest['account.move']
+    assert written == [1, 2, 3] and failed == {}
+    model.read.assert_called_once_with([1, 2, 3], ['state'])
+    browsed = [call.args[0] for call in model.browse.call_args_list]
+    assert browsed == [[1, 3], [1, 3]]
+    model.browse.return_value.button_draft.assert_called_once()
+    model.browse.return_value.action_post.assert_called_once()
+
+def test_post_falls_back_to_per_record_on_batch_failure(dest, mocker):
+    model = dest['account.move']
+    def browse(ids):
+        record = mocker.Mock()
+        if len(ids) > 1 or ids == [2]:
+            record.action_post.side_effect = Exception('invalid')
+        return record
+    model.browse.side_effect = browse
+    posted, failed = MovePostingPipeline(dest).post([1, 2, 3])
+    assert posted == [1, 3]
+    assert list(failed) == [2]
+
+def test_unpost_only_touches_posted_moves(dest):
+    drafted, failed = MovePostingPipeline(dest).unpost([2], states={2: 'draft'})
+    assert drafted == [] and failed == {}
+    dest['account.move'].browse.assert_not_called()
+
+def test_update_posts_drafts_whose_source_move_is_posted(dest):
+    pipeline = MovePostingPipeline(dest)
+    written, failed = pipeline.update([(1, {'ref': 'a'}), (2, {'ref': 'b'})], post_ids=[2])
+    model = dest['account.move']
+    assert written == [1, 2] and failed == {}
+    browsed = [call.args[0] for call in model.browse.call_args_list]
+    assert browsed == [[1], [1, 2]]
@@ -0,0 +1,57 @@
+from odoorpc.orm.object import Object
+
+def make_object(mocker, rows):
+    service = mocker.Mock()
+    service.client.server_version = 16.0
+
+    def execute(name, method, **kwargs):
+        last_id = kwargs['domain'][-1][2]
+        matched = [row for row in rows if row['id'] > last_id]
+        return matched[:kwargs['limit']]
+    service.execute.side_effect = execute
+    return Object(service, 'res.partner'), service
+
+def test_iter_search_read_pages_by_last_id(mocker):
+    rows = [{'id': i, 'name': f'P{i}'} for i in range(1, 6)]
+    obj, service = make_object(mocker, rows)
+    chunks = list(obj.iter_search_read([('active', '=', True)], ['name'], chunk_size=2))
+    assert [[r['id'] for r in chunk] for chunk in chunks] == [[1, 2], [3, 4], [5]]
+    domains = [call.kwargs['domain'] for call in service.execute.call_args_list]
+    assert domains == [
+        [('active', '=', True), ('id', '>', 0)],
+        [('active', '=', True), ('id', '>', 2)],
+        [('active', '=', True), ('id', '>', 4)],
+    ]
+    assert all(call.kwargs['order'] == 'id asc' for call in service.execute.call_args_list)
+
+def test_iter_search_read_is_lazy(mocker):
+    rows = [{'id': i} for i in range(1, 5)]
+    obj, service = make_object(mocker, rows)
+    chunks = obj.iter_search_read(chunk_size=2)
+    assert service.execute.call_count == 0
+    next(chunks)
+    assert service.execute.call_count == 1
+
+def test_iter_search_read_stops_on_exact_multiple(mocker):
+    rows = [{'id': i} for i in range(1, 5)]
+    obj, service = make_object(mocker, rows)
+    assert len(list(obj.iter_search_read(chunk_size=2))) == 2
+    assert service.execute.call_count == 3
+
+def test_iter_search_read_pages_by_custom_keyset(mocker):
+    rows = [{'id': 5, 'write_date': 'a'}, {'id': 2, 'write_date': 'b'}, {'id': 3, 'write_date': 'b'}]
+    service = mocker.Mock()
+    service.client.server_version = 16.0
+    service.execute.side_effect = [rows[:2], rows[2:]]
+    obj = Object(service, 'res.partner')
+    chunks = list(obj.iter_search_read(
+        [('active', '=', True)], ['write_date'], chunk_size=2, order='write_date asc, id asc',
+        keyset=lambda record: [('write_date', '>=', record['write_date']), ('id', '!=', record['id'])]
+    ))
+    assert chunks == [rows[:2], rows[2:]]
+    calls = service.execute.call_args_list
+    assert [call.kwargs['domain'] for call in calls] == [
+        [('active', '=', True)],
+        [('active', '=', True), ('write_date', '>=', 'b'), ('id', '!=', 2)],
+    ]
+    assert all(call.kwargs['order'] == 'write_date asc, id asc' for call in calls)
@@ -93,3 +93,50 @@ def test_get_api_reconnects_if_needed(mock_odoorpc, credentials, mock_logger):
         port=8069
     )
     mock_logger.warning.assert_called_with("الاتصال غير قائم. محاولة إعادة الاتصال...")
+
+def test_odoo_connector_passes_connection_pool_settings(mock_odoorpc, credentials, mock_logger):
+    credentials.update({'pool_size': '4', 'keep_alive': 'false', 'max_retries': ''})
+    OdooConnector(credentials, logger=mock_logger)
+    _, kwargs = mock_odoorpc.call_args
+    assert kwargs['pool_size'] == '4'
+    assert kwargs['keep_alive'] == 'false'
+    assert 'max_retries' not in kwargs
+
+def test_ensure_custom_fields_creates_only_missing_fields_in_one_call(mock_odoorpc, credentials, mock_logger, mocker):
+    api = mock_odoorpc.return_value
+    api.__getitem__ = mocker.Mock(side_effect=lambda name: api.env[name])
+    api.env['ir.model.fields'].search_read.return_value = [{'model': 'res.partner', 'name': 'x_partner_sync_id'}]
+    api.env['ir.model'].search_read.return_value = [{'id': 7, 'model': 'account.move'}]
+    connector = OdooConnector(credentials, logger=mock_logger)
+
+    created = connector.ensure_custom_fields([
+        ('res.partner', 'x_partner_sync_id', 'Partner Sync ID', 'char'),
+        ('account.move', 'x_move_sync_id', 'Move Sync ID', 'char'),
+        ('account.move', 'x_original_source_id', 'Original Source ID', 'integer'),
+    ])
+
+    assert created == [('account.move', 'x_move_sync_id'), ('account.move', 'x_original_source_id')]
+    api.env['ir.model.fields'].search_read.assert_called_once_with(
+        [('model', 'in', ['account.move', 'res.partner']),
+         ('name', 'in', ['x_move_sync_id', 'x_original_source_id', 'x_partner_sync_id'])],
+        ['model', 'name']
+    )
+    api.env['ir.model'].search_read.assert_called_once_with([('model', 'in', ['account.move'])], ['id', 'model'])
+    (values,), _ = api.env['ir.model.fields'].create.call_args
+    assert [(v['model_id'], v['name'], v['ttype']) for v in values] == [
+        (7, 'x_move_sync_id', 'char'), (7, 'x_original_source_id', 'integer')
+    ]
+
+def test_ensure_custom_fields_skips_create_when_all_exist(mock_odoorpc, credentials, mock_logger, mocker):
+    api = mock_odoorpc.return_value
+    api.__getitem__ = mocker.Mock(side_effect=lambda name: api.env[name])
+    api.env['ir.model.fields'].search_read.return_value = [{'model': 'res.partner', 'name': 'x_partner_sync_id'}]
+    connector = OdooConnector(credentials, logger=mock_logger)
+    assert connector.ensure_custom_fields([('res.partner', 'x_partner_sync_id', 'Partner Sync ID', 'char')]) == []
+    api.env['ir.model'].search_read.assert_not_called()
+    api.env['ir.model.fields'].create.assert_not_called()
+
+def test_close_closes_http_session(mock_odoorpc, credentials, mock_logger):
+    connector = OdooConnector(credentials, logger=mock_logger)
+    connector.close()
+    mock_odoorpc.return_value.connection.close.assert_called_once_with()
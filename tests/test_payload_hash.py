@@ -0,0 +1,53 @@
+import threading
+from services.payload_hash import PayloadHashFilter, payload_hash
+
+def test_hash_is_stable_and_ignores_key_order_and_excluded_fields():
+    a = payload_hash({'name': 'A', 'tax_ids': [(6, 0, [1, 2])]})
+    b = payload_hash({'tax_ids': [(6, 0, [1, 2])], 'name': 'A', 'x_sync_id': '5'}, exclude=('x_sync_id',))
+    assert a == b
+    assert a != payload_hash({'name': 'B', 'tax_ids': [(6, 0, [1, 2])]})
+
+def test_unchanged_payloads_are_skipped(key_manager):
+    payload_filter = PayloadHashFilter(key_manager, 'res.partner', 'x_partner_sync_id')
+    key_manager.add_mapping('res.partner', 1, 101, payload_hash=payload_filter.hash({'name': 'A', 'x_partner_sync_id': '1'}))
+    key_manager.add_mapping('res.partner', 2, 102, payload_hash=payload_filter.hash({'name': 'B'}))
+    changed = payload_filter.filter_updates([
+        {'id': 101, 'source_id': 1, 'data': {'name': 'A'}},
+        {'id': 102, 'source_id': 2, 'data': {'name': 'B2'}},
+        {'id': 103, 'source_id': 3, 'data': {'name': 'C'}},
+    ])
+    assert [rec['source_id'] for rec in changed] == [2, 3]
+    assert changed[0]['payload_hash'] == payload_filter.hash({'name': 'B2'})
+    assert payload_filter.skipped == 1
+
+def test_payload_is_not_skipped_for_another_destination(key_manager):
+    payload_filter = PayloadHashFilter(key_manager, 'res.partner')
+    key_manager.add_mapping('res.partner', 1, 101, payload_hash=payload_filter.hash({'name': 'A'}))
+    changed = payload_filter.filter_updates([{'id': 555, 'source_id': 1, 'data': {'name': 'A'}}])
+    assert len(changed) == 1
+
+def test_source_write_date_copies_do_not_change_the_hash(key_manager):
+    payload_filter = PayloadHashFilter(key_manager, 'account.move', 'x_move_sync_id')
+    assert payload_filter.hash({'ref': 'A', 'x_original_write_date': '2025-01-01 00:00:00'}) == \
+        payload_filter.hash({'ref': 'A', 'x_original_write_date': '2025-06-01 00:00:00'})
+
+def test_clear_command_of_the_update_path_does_not_change_the_hash():
+    line = (0, 0, {'name': 'Line', 'tax_ids': [(6, 0, [1])]})
+    assert payload_hash({'invoice_line_ids': [(5, 0, 0), line]}) == payload_hash({'invoice_line_ids': [line]})
+    assert payload_hash({'invoice_line_ids': [(5, 0, 0), line]}) != payload_hash({'invoice_line_ids': []})
+
+def test_skipped_count_is_exact_across_threads(key_manager):
+    payload_filter = PayloadHashFilter(key_manager, 'account.tax')
+    for source_id in range(1, 51):
+        key_manager.add_mapping('account.tax', source_id, 100 + source_id, payload_hash=payload_filter.hash({'name': 'T'}))
+
+    def work():
+        payload_filter.filter_updates([
+            {'id': 100 + source_id, 'source_id': source_id, 'data': {'name': 'T'}} for source_id in range(1, 51)
+        ])
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert payload_filter.skipped == 400
@@ -0,0 +1,98 @@
+import threading
+import time
+import pytest
+from odoorpc.metrics import metrics
+from core.pipeline import SyncPipeline
+
+def test_items_flow_through_stages_in_order():
+    committed = []
+    pipeline = SyncPipeline('test', queue_size=1)
+    pipeline.add_stage('double', lambda item: item * 2).add_stage('inc', lambda item: item + 1)
+    stats = pipeline.run(range(5), commit=committed.append)
+    assert committed == [1, 3, 5, 7, 9]
+    assert list(stats) == ['read', 'double', 'inc', 'commit']
+    assert all(s['items'] == 5 for s in stats.values())
+
+def test_stages_overlap():
+    def slow(item):
+        time.sleep(0.05)
+        return item
+
+    def read():
+        for item in range(6):
+            time.sleep(0.05)
+            yield item
+
+    pipeline = SyncPipeline('test')
+    pipeline.add_stage('transform', slow).add_stage('push', slow)
+    started = time.perf_counter()
+    pipeline.run(read(), commit=lambda item: time.sleep(0.05))
+    # بالتتابع: 6 × 4 × 0.05 = 1.2 ث؛ بالتداخل قريب من 6 × 0.05 + زمن ملء المراحل.
+    assert time.perf_counter() - started < 0.8
+
+def test_none_drops_item():
+    committed = []
+    pipeline = SyncPipeline('test').add_stage('odd', lambda item: item if item % 2 else None)
+    pipeline.run(range(6), commit=committed.append)
+    assert committed == [1, 3, 5]
+
+def test_stage_error_stops_pipeline_and_is_raised():
+    read_items = []
+
+    def read():
+        for item in range(1000):
+            read_items.append(item)
+            yield item
+
+    def fail(item):
+        if item == 3:
+            raise ValueError('bad chunk')
+        return item
+
+    pipeline = SyncPipeline('test', queue_size=1).add_stage('transform', fail)
+    with pytest.raises(ValueError, match='bad chunk'):
+        pipeline.run(read())
+    assert len(read_items) < 1000
+
+def test_source_and_commit_errors_are_raised():
+    def read():
+        yield 1
+        raise RuntimeError('source down')
+
+    with pytest.raises(RuntimeError, match='source down'):
+        SyncPipeline('test').add_stage('noop', lambda item: item).run(read())
+
+    def commit(item):
+        raise KeyError(item)
+
+    with pytest.raises(KeyError):
+        SyncPipeline('test').add_stage('noop', lambda item: item).run(range(100), commit=commit)
+
+def test_multiple_workers_keep_metrics_scope():
+    barrier = threading.Barrier(3)
+    seen = []
+
+    def work(item):
+        barrier.wait(timeout=5)
+        seen.append((threading.current_thread().name, metrics.current_scope))
+        return item
+
+    pipeline = SyncPipeline('test').add_stage('push', work, workers=3)
+    with metrics.scope('InvoiceSyncModule'):
+        stats = pipeline.run(range(3))
+    assert stats['push']['items'] == 3
+    assert len({name for name, _ in seen}) == 3
+    assert {scope for _, scope in seen} == {'InvoiceSyncModule'}
+
+def test_stage_clones_are_closed_when_the_pipeline_finishes(mocker):
+    client = mocker.Mock()
+    clones = [mocker.Mock(), mocker.Mock()]
+    client.clone.side_effect = clones
+    pipeline = SyncPipeline('test')
+    transform_client, push_client = pipeline.clone(client), pipeline.clone(client)
+    assert [transform_client, push_client] == clones
+    pipeline.add_stage('noop', lambda item: item)
+    with pytest.raises(KeyError):
+        pipeline.run(range(3), commit=lambda item: {}[item])
+    for clone in clones:
+        clone.connection.close.assert_called_once_with()
@@ -0,0 +1,74 @@
+import pytest
+from services.reference_cache import ReferenceDataCache
+
+ROWS = {
+    'res.country': [{'id': 10, 'code': 'SA', 'name': 'Saudi Arabia'}, {'id': 11, 'code': 'EG', 'name': 'Egypt'}],
+    'res.currency': [{'id': 20, 'name': 'SAR'}],
+    'res.company': [{'id': 1, 'name': 'My Company'}],
+    'account.account.tag': [
+        {'id': 30, 'name': '+10', 'applicability': 'taxes', 'country_id': [10, 'Saudi Arabia']},
+        {'id': 31, 'name': '+10', 'applicability': 'taxes', 'country_id': False},
+    ],
+}
+
+@pytest.fixture
+def dest(mocker):
+    dest = {}
+    for model, rows in ROWS.items():
+        obj = dest[model] = mocker.Mock()
+        obj.search_count.return_value = len(rows)
+        obj.search_read.side_effect = lambda domain, fields, rows=rows, **kwargs: (
+            [{'id': rows[-1]['id'], 'write_date': '2025-01-01 00:00:00'}] if fields == ['write_date'] else rows
+        )
+    return dest
+
+def full_reads(dest):
+    return sum(1 for obj in dest.values() for call in obj.search_read.call_args_list if call.args[1] != ['write_date'])
+
+def test_lookups_by_name_code_and_composite_key(dest, key_manager):
+    cache = ReferenceDataCache(dest, key_manager)
+    cache.load()
+    assert cache.get('res.country', 'name', 'Egypt') == 11
+    assert cache.get('res.country', 'code', 'SA') == 10
+    assert cache.get('res.currency', 'name', 'SAR') == 20
+    assert cache.get('res.company', 'name', 'My Company') == 1
+    assert cache.get_tax_tag('+10', 'taxes', 10) == 30
+    assert cache.get_tax_tag('+10', 'taxes', False) == 31
+    assert cache.get('res.country', 'name', 'Atlantis') is None
+
+def test_persisted_cache_skips_rpc_within_ttl(dest, key_manager):
+    ReferenceDataCache(dest, key_manager, namespace='dest|db').load()
+    assert full_reads(dest) == 4
+    for obj in dest.values():
+        obj.reset_mock()
+    cache = ReferenceDataCache(dest, key_manager, namespace='dest|db')
+    cache.load()
+    assert cache.get('res.country', 'name', 'Egypt') == 11
+    assert all(not obj.method_calls for obj in dest.values())
+
+def test_expired_cache_reloads_only_when_fingerprint_changes(dest, key_manager):
+    ReferenceDataCache(dest, key_manager, ttl=0).load()
+    for obj in dest.values():
+        obj.search_read.reset_mock()
+    ReferenceDataCache(dest, key_manager, ttl=0).load()
+    assert full_reads(dest) == 0
+
+    dest['res.country'].search_count.return_value = 3
+    cache = ReferenceDataCache(dest, key_manager, ttl=0)
+    cache.load()
+    assert full_reads(dest) == 1
+    assert cache.get('res.country', 'code', 'EG') == 11
+
+def test_namespaces_are_isolated(dest, key_manager):
+    ReferenceDataCache(dest, key_manager, namespace='a').load()
+    for obj in dest.values():
+        obj.search_read.reset_mock()
+    ReferenceDataCache(dest, key_manager, namespace='b').load()
+    assert full_reads(dest) == 4
+
+def test_currencies_and_countries_include_inactive_records(dest, key_manager):
+    ReferenceDataCache(dest, key_manager).load()
+    for model in ('res.currency', 'res.country'):
+        assert all(call.kwargs['context'] == {'active_test': False} for call in dest[model].search_read.call_args_list)
+        assert dest[model].search_count.call_args.kwargs['context'] == {'active_test': False}
+    assert all(call.kwargs['context'] is None for call in dest['res.company'].search_read.call_args_list)
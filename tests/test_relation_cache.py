@@ -0,0 +1,90 @@
+import pytest
+from services.relation_cache import RelationalLookupCache
+
+@pytest.fixture
+def connections(mocker):
+    source = {
+        'account.account.tag': mocker.Mock(),
+        'res.country': mocker.Mock(),
+    }
+    dest = {
+        'account.account': mocker.Mock(),
+        'account.account.tag': mocker.Mock(),
+        'res.country': mocker.Mock(),
+    }
+    return source, dest
+
+@pytest.fixture
+def resolver(mocker):
+    resolver = mocker.Mock()
+    resolver.resolve.side_effect = lambda model, field, ids: {sid: sid + 1000 for sid in ids if sid != 99}
+    return resolver
+
+def test_prefetch_resolves_once_per_source_id(connections, resolver):
+    source, dest = connections
+    cache = RelationalLookupCache(source, dest, resolver)
+    cache.prefetch('account.account', [1, 2, 99])
+    cache.prefetch('account.account', [1, 2, 99])
+    assert resolver.resolve.call_count == 1
+    assert cache.get('account.account', 1) == 1001
+    assert cache.get('account.account', 99) is None
+
+def test_prefetch_lines_collects_all_relations(connections, resolver):
+    source, dest = connections
+    source['account.account.tag'].read.return_value = []
+    dest['account.account.tag'].search_read.return_value = []
+    cache = RelationalLookupCache(source, dest, resolver)
+    cache.prefetch_lines([
+        {'account_id': [1, 'A'], 'partner_id': [5, 'P'], 'tax_ids': [7, 8], 'tax_tag_ids': []},
+        {'account_id': [2, 'B'], 'partner_id': False, 'tax_ids': [7]},
+    ])
+    calls = {call.args[0]: set(call.args[2]) for call in resolver.resolve.call_args_list}
+    assert calls == {'account.account': {1, 2}, 'res.partner': {5}, 'account.tax': {7, 8}}
+
+def test_prefetch_companies_normalizes_many2one(connections, resolver):
+    source, dest = connections
+    dest['account.account'].read.return_value = [{'id': 1001, 'company_id': [3, 'Co']}]
+    cache = RelationalLookupCache(source, dest, resolver)
+    cache.prefetch_companies('account.account', [1001, None], field='company_id')
+    assert cache.get_companies('account.account', 1001) == [3]
+    dest['account.account'].read.assert_called_once_with([1001], ['company_id'])
+
+def test_prefetch_tax_tags_matches_by_name_applicability_and_country(connections, resolver):
+    source, dest = connections
+    source['account.account.tag'].read.return_value = [
+        {'id': 1, 'name': '+10', 'applicability': 'taxes', 'country_id': [50, 'SA']},
+        {'id': 2, 'name': '+20', 'applicability': 'taxes', 'country_id': False},
+        {'id': 3, 'name': 'missing', 'applicability': 'taxes', 'country_id': False},
+    ]
+    source['res.country'].read.return_value = [{'id': 50, 'code': 'SA'}]
+    dest['res.country'].search_read.return_value = [{'id': 500, 'code': 'SA'}]
+    dest['account.account.tag'].search_read.return_value = [
+        {'id': 900, 'name': '+10', 'applicability': 'taxes', 'country_id': [400, 'XX']},
+        {'id': 901, 'name': '+10', 'applicability': 'taxes', 'country_id': [500, 'SA']},
+        {'id': 902, 'name': '+20', 'applicability': 'taxes', 'country_id': False},
+    ]
+    cache = RelationalLookupCache(source, dest, resolver)
+    cache.prefetch_tax_tags([1, 2, 3])
+    cache.prefetch_tax_tags([1, 2, 3])
+    assert cache.get_tax_tag(1) == 901
+    assert cache.get_tax_tag(2) == 902
+    assert cache.get_tax_tag(3) is None
+    assert cache.get_tax_tag_name(3) == 'missing'
+    source['account.account.tag'].read.assert_called_once()
+
+def test_prefetch_tax_tags_uses_reference_data(connections, resolver, mocker):
+    source, dest = connections
+    source['account.account.tag'].read.return_value = [
+        {'id': 1, 'name': '+10', 'applicability': 'taxes', 'country_id': [50, 'SA']},
+    ]
+    source['res.country'].read.return_value = [{'id': 50, 'code': 'SA'}]
+    reference_data = mocker.Mock()
+    reference_data.get.return_value = 500
+    reference_data.get_tax_tag.return_value = 901
+    cache = RelationalLookupCache(source, dest, resolver, reference_data=reference_data)
+    cache.prefetch_tax_tags([1])
+    assert cache.get_tax_tag(1) == 901
+    reference_data.get.assert_called_once_with('res.country', 'code', 'SA')
+    reference_data.get_tax_tag.assert_called_once_with('+10', 'taxes', 500)
+    dest['res.country'].search_read.assert_not_called()
+    dest['account.account.tag'].search_read.assert_not_called()
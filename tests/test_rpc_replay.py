@@ -0,0 +1,37 @@
+import gzip
+import pytest
+from benchmarks.datasets import generate_source
+from benchmarks.fake_odoo import FakeOdooServer
+from odoorpc.connection.jsonrpc import JSONRPCError
+from odoorpc.connection.recording import close_recorders
+from odoorpc.connection.replay import ReplayError
+from services.odoo_connector import OdooConnector
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / 'source.jsonl.gz')
+    server = FakeOdooServer(generate_source(10), password='secret').start()
+    credentials = {'url': server.url, 'db': 'source', 'username': 'admin', 'password': 'secret'}
+    api = OdooConnector(dict(credentials, record_to=path)).get_api()
+    live = api['res.partner'].search_read([('id', '<=', 3)], ['name'])
+    with pytest.raises(JSONRPCError):
+        api['res.partner'].write([999], {'name': 'Missing'})
+    server.stop()
+    close_recorders()
+    return path, credentials, live
+
+def test_recording_never_contains_password(recording):
+    path, _, _ = recording
+    content = gzip.open(path, 'rt').read()
+    assert 'secret' not in content
+    assert '"search_read"' in content
+
+def test_replay_serves_recorded_results_and_errors_offline(recording):
+    path, credentials, live = recording
+    api = OdooConnector(dict(credentials, password='other', replay_from=path)).get_api()
+
+    assert api['res.partner'].search_read([('id', '<=', 3)], ['name']) == live
+    with pytest.raises(JSONRPCError, match='does not exist'):
+        api['res.partner'].write([999], {'name': 'Missing'})
+    with pytest.raises(ReplayError):
+        api['res.partner'].unlink([1])
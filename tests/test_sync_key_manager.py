@@ -51,3 +51,162 @@ def test_remove_non_existent_mapping(setup_key_manager):
     manager = setup_key_manager
     manager.remove_mapping('res.partner', 999) # Should not raise an error
     assert manager.get_destination_id('res.partner', 999) is None
+
+def test_meta_values_persist(setup_key_manager):
+    manager = setup_key_manager
+    assert manager.get_meta('server_version:x', 'none') == 'none'
+    manager.set_meta('server_version:x', 17.0)
+    assert manager.get_meta('server_version:x') == '17.0'
+
+def test_bulk_add_get_and_remove(setup_key_manager):
+    manager = setup_key_manager
+    manager.add_mappings_bulk('res.partner', {1: 101, 2: 102, 3: 103})
+    manager.add_mappings_bulk('account.move', [(1, 901)])
+    assert manager.get_destination_ids_bulk('res.partner', [1, 2, 4]) == {1: 101, 2: 102}
+    manager.remove_mappings_bulk('res.partner', [1, 3])
+    assert manager.get_destination_ids_bulk('res.partner', [1, 2, 3]) == {2: 102}
+    assert manager.get_destination_id('account.move', 1) == 901
+
+def test_batch_commits_once_on_exit(setup_key_manager, mocker):
+    manager = setup_key_manager
+    manager.conn = mocker.Mock(wraps=manager.conn)
+    with manager.batch():
+        manager.add_mapping('res.partner', 1, 101)
+        with manager.batch():
+            manager.add_mapping('res.partner', 2, 102)
+        manager.remove_mapping('res.partner', 1)
+        assert manager.conn.commit.call_count == 0
+    assert manager.conn.commit.call_count == 1
+    assert manager.get_destination_ids_bulk('res.partner', [1, 2]) == {2: 102}
+
+def test_mappings_can_be_written_from_several_threads(setup_key_manager):
+    import threading
+    manager = setup_key_manager
+    def worker(offset):
+        with manager.batch():
+            for i in range(50):
+                manager.add_mapping('res.partner', offset + i, offset + i + 1000)
+    threads = [threading.Thread(target=worker, args=(n * 100,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(manager.get_all_source_ids_for_model('res.partner')) == 200
+
+def test_write_from_another_thread_does_not_commit_an_open_batch(setup_key_manager):
+    import threading
+    manager = setup_key_manager
+    in_batch, writer_done = threading.Event(), threading.Event()
+
+    def writer():
+        in_batch.wait(timeout=5)
+        manager.set_meta('other', 'x')
+        writer_done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reader = sqlite3.connect(manager.db_file)
+    with manager.batch():
+        manager.set_meta('first', '1')
+        in_batch.set()
+        # الكتابة من الخيط الآخر تنتظر حتى نهاية النطاق بدلاً من تنفيذ commit لنصفه.
+        assert not writer_done.wait(timeout=0.2)
+        assert reader.execute("SELECT value FROM meta WHERE key = 'first'").fetchall() == []
+        manager.set_meta('second', '2')
+    thread.join(timeout=5)
+    assert writer_done.is_set()
+    assert dict(reader.execute("SELECT key, value FROM meta WHERE key IN ('first', 'second', 'other')")) == {
+        'first': '1', 'second': '2', 'other': 'x'
+    }
+    reader.close()
+
+def test_payload_hash_survives_remapping_to_same_destination_only(setup_key_manager):
+    manager = setup_key_manager
+    manager.add_mapping('res.partner', 1, 101, payload_hash='abc')
+    manager.add_mapping('res.partner', 1, 101)
+    assert manager.get_payload_hashes('res.partner', [1]) == {1: (101, 'abc')}
+    manager.add_mappings_bulk('res.partner', {1: 202})
+    assert manager.get_payload_hashes('res.partner', [1]) == {}
+    assert manager.get_destination_id('res.partner', 1) == 202
+
+def test_payload_hash_column_is_added_to_existing_database(tmp_path):
+    db_file = str(tmp_path / 'old_sync_map.db')
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE mapping (source_model TEXT NOT NULL, source_id INTEGER NOT NULL, "
+                 "destination_id INTEGER NOT NULL, PRIMARY KEY (source_model, source_id))")
+    conn.execute("INSERT INTO mapping VALUES ('res.partner', 1, 101)")
+    conn.commit()
+    conn.close()
+    manager = SyncKeyManager(db_file)
+    manager.add_mapping('res.partner', 1, 101, payload_hash='abc')
+    assert manager.get_payload_hashes('res.partner', [1]) == {1: (101, 'abc')}
+    manager.close_connection()
+
+def test_preloaded_index_serves_lookups_without_sql(setup_key_manager, mocker):
+    manager = setup_key_manager
+    manager.add_mappings_bulk('res.partner', {1: 101, 2: 102})
+    assert manager.preload() == 2
+    manager.conn = mocker.Mock(wraps=manager.conn)
+    assert manager.get_destination_id('res.partner', 1) == 101
+    assert manager.get_destination_ids_bulk('res.partner', [1, 2, 3]) == {1: 101, 2: 102}
+    assert sorted(manager.get_all_source_ids_for_model('res.partner')) == [1, 2]
+    manager.conn.cursor.assert_not_called()
+
+def test_preloaded_index_follows_writes_and_removals(setup_key_manager):
+    manager = setup_key_manager
+    manager.preload()
+    manager.add_mapping('account.move', 5, 905)
+    manager.remove_mapping('account.move', 5)
+    manager.add_mapping('account.move', 6, 906)
+    assert manager.get_destination_ids_bulk('account.move', [5, 6]) == {6: 906}
+
+def test_mapping_writes_are_buffered_until_flush(setup_key_manager):
+    manager = setup_key_manager
+    manager.add_mapping('res.partner', 1, 101)
+    other = sqlite3.connect(manager.db_file)
+    assert other.execute("SELECT COUNT(*) FROM mapping").fetchone()[0] == 0
+    manager.flush()
+    assert other.execute("SELECT COUNT(*) FROM mapping").fetchone()[0] == 1
+    other.close()
+
+@pytest.mark.parametrize('write', [
+    lambda manager: manager.set_watermark('ContactSyncModule', 'res.partner', '2025-01-01 00:00:00', 1),
+    lambda manager: manager.set_meta('last_sync_time', '2025-01-01 00:00:00'),
+    lambda manager: manager.record_failures('ContactSyncModule', 'res.partner', {2: ('create', 'error')}),
+])
+def test_committing_writes_flush_buffered_mappings(setup_key_manager, write):
+    manager = setup_key_manager
+    manager.add_mapping('res.partner', 1, 101)
+    write(manager)
+    other = sqlite3.connect(manager.db_file)
+    assert other.execute("SELECT COUNT(*) FROM mapping").fetchone()[0] == 1
+    other.close()
+
+def test_reverse_lookup_uses_destination_index(setup_key_manager):
+    manager = setup_key_manager
+    manager.add_mappings_bulk('account.move', {1: 9123, 2: 9124})
+    manager.add_mapping('res.partner', 1, 9123)
+    assert manager.get_source_id('account.move', 9123) == 1
+    assert manager.get_source_ids_bulk('account.move', [9123, 9124, 9999]) == {9123: 1, 9124: 2}
+    plan = manager.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT source_id FROM mapping WHERE source_model = ? AND destination_id = ?",
+        ('account.move', 9123)
+    ).fetchall()
+    assert 'mapping_destination_idx' in str(plan)
+
+def test_find_duplicate_destinations(setup_key_manager):
+    manager = setup_key_manager
+    manager.add_mappings_bulk('account.move', {1: 500, 2: 501, 3: 500})
+    manager.add_mappings_bulk('res.partner', {1: 500})
+    assert manager.find_duplicate_destinations() == [('account.move', 500, [1, 3])]
+    assert manager.find_duplicate_destinations('res.partner') == []
+
+def test_sqlite_pragmas_are_validated(tmp_path):
+    manager = SyncKeyManager(str(tmp_path / 'sync_map.db'), synchronous='full', cache_size='-2000')
+    assert manager.conn.execute("PRAGMA synchronous").fetchone() == (2,)
+    assert manager.conn.execute("PRAGMA cache_size").fetchone() == (-2000,)
+    manager.close_connection()
+    with pytest.raises(ValueError):
+        SyncKeyManager(str(tmp_path / 'other.db'), synchronous='NORMAL; DROP TABLE mapping')
+    with pytest.raises(ValueError):
+        SyncKeyManager(str(tmp_path / 'other.db'), cache_size='8000; DROP TABLE mapping')
@@ -0,0 +1,80 @@
+from benchmarks.fake_odoo import FakeOdooDatabase
+from services.watermark import WatermarkCursor
+
+class SecondPrecisionModel:
+    """
+    نموذج يحاكي Odoo: `write_date` مخزنة بالميكروثانية وتُقرأ مقربة إلى الثانية.
+    """
+    def __init__(self, write_dates):
+        self.database = FakeOdooDatabase()
+        for write_date in write_dates:
+            self.database.insert('res.partner', {'name': 'P', 'write_date': write_date})
+        self.calls = 0
+
+    def search_read(self, domain, fields, limit=None, order=None):
+        self.calls += 1
+        assert self.calls < 100
+        rows = self.database.execute('res.partner', 'search_read', [domain, fields], {'limit': limit, 'order': order})
+        return [dict(row, write_date=row['write_date'][:19]) for row in rows]
+
+def read_all(key_manager, model, chunk_size):
+    ids = []
+    while True:
+        cursor = WatermarkCursor(key_manager, 'ContactSyncModule', 'res.partner', '2025-01-01 00:00:00')
+        chunk = next(cursor.iter_chunks(model, [], ['write_date'], chunk_size=chunk_size), None)
+        if chunk is None:
+            return ids
+        ids.extend(row['id'] for row in chunk)
+        cursor.advance(chunk)
+
+def test_cursor_starts_from_default_write_date(key_manager):
+    cursor = WatermarkCursor(key_manager, 'ContactSyncModule', 'res.partner', '2025-01-01 00:00:00')
+    assert cursor.domain() == [
+        '&', ('write_date', '>=', '2025-01-01 00:00:00'),
+        '|', ('write_date', '>=', '2025-01-01 00:00:01'), ('id', '>', 0),
+    ]
+
+def test_advance_persists_highest_write_date_and_id(key_manager):
+    cursor = WatermarkCursor(key_manager, 'ContactSyncModule', 'res.partner', '2025-01-01 00:00:00')
+    cursor.advance([
+        {'id': 7, 'write_date': '2025-02-01 10:00:00'},
+        {'id': 3, 'write_date': '2025-02-01 10:00:00'},
+        {'id': 9, 'write_date': '2025-01-15 08:00:00'},
+    ])
+    assert key_manager.get_watermark('ContactSyncModule', 'res.partner') == ('2025-02-01 10:00:00', 7)
+
+    resumed = WatermarkCursor(key_manager, 'ContactSyncModule', 'res.partner', '2025-01-01 00:00:00')
+    assert resumed.domain()[-1] == ('id', '>', 7)
+
+def test_watermarks_are_kept_per_module_and_model(key_manager):
+    WatermarkCursor(key_manager, 'InvoiceSyncModule', 'account.move', '2025-01-01 00:00:00').advance(
+        [{'id': 1, 'write_date': '2025-03-01 00:00:00'}])
+    assert key_manager.get_watermark('JournalEntrySyncModule', 'account.move') is None
+    assert key_manager.get_watermark('InvoiceSyncModule', 'account.move.line') is None
+
+def test_advance_never_moves_backwards(key_manager):
+    key_manager.set_watermark('ContactSyncModule', 'res.partner', '2025-05-01 00:00:00', 4)
+    cursor = WatermarkCursor(key_manager, 'ContactSyncModule', 'res.partner', '2025-01-01 00:00:00')
+    cursor.advance([{'id': 50, 'write_date': '2025-04-01 00:00:00'}])
+    assert key_manager.get_watermark('ContactSyncModule', 'res.partner') == ('2025-05-01 00:00:00', 4)
+
+def test_observe_is_saved_only_on_commit(key_manager):
+    cursor = WatermarkCursor(key_manager, 'InvoiceSyncModule', 'account.move', '2025-01-01 00:00:00')
+    cursor.observe([{'id': 9, 'write_date': '2025-02-01 00:00:00'}])
+    cursor.observe([{'id': 12, 'write_date': '2025-01-20 00:00:00'}])
+    assert key_manager.get_watermark('InvoiceSyncModule', 'account.move') is None
+    cursor.commit()
+    assert key_manager.get_watermark('InvoiceSyncModule', 'account.move') == ('2025-02-01 00:00:00', 9)
+
+def test_resumed_chunks_never_skip_or_repeat_records_of_one_second(key_manager):
+    write_dates = [f'2025-01-02 10:00:00.{900 - i:06d}' for i in range(7)] + ['2025-01-02 10:00:01.000001', '2025-01-03 00:00:00.5']
+    model = SecondPrecisionModel(write_dates)
+    # كل دفعة تُقرأ في تشغيل جديد يستأنف من المؤشر المحفوظ.
+    assert read_all(key_manager, model, chunk_size=3) == list(range(1, 10))
+
+def test_chunks_end_before_a_partially_read_second(key_manager):
+    write_dates = ['2025-01-02 09:00:00.1', '2025-01-02 10:00:00.3', '2025-01-02 10:00:00.2', '2025-01-02 10:00:00.1']
+    model = SecondPrecisionModel(write_dates)
+    cursor = WatermarkCursor(key_manager, 'ContactSyncModule', 'res.partner', '2025-01-01 00:00:00')
+    chunks = [[row['id'] for row in chunk] for chunk in cursor.iter_chunks(model, [], ['write_date'], chunk_size=3)]
+    assert chunks == [[1], [2, 3, 4]]
@@ -0,0 +1,31 @@
+from services.write_planner import WritePlanner
+
+def test_identical_values_are_written_in_one_call(mocker):
+    dest = {'account.tax': mocker.Mock()}
+    planner = WritePlanner(dest, 'account.tax')
+    for destination_id in (1, 2, 3):
+        planner.add(destination_id, {'active': False})
+    planner.add(4, {'name': 'VAT'})
+    assert len(planner) == 4
+    written, failed = planner.flush()
+    assert sorted(written) == [1, 2, 3, 4]
+    assert failed == {}
+    assert dest['account.tax'].write.call_args_list == [
+        mocker.call([1, 2, 3], {'active': False}),
+        mocker.call([4], {'name': 'VAT'}),
+    ]
+    assert len(planner) == 0
+
+def test_failed_group_falls_back_to_single_writes(mocker):
+    dest = {'res.partner': mocker.Mock()}
+    def write(ids, vals):
+        if 2 in ids:
+            raise Exception('access error')
+    dest['res.partner'].write.side_effect = write
+    planner = WritePlanner(dest, 'res.partner')
+    for destination_id in (1, 2, 3):
+        planner.add(destination_id, {'active': False})
+    written, failed = planner.flush()
+    assert written == [1, 3]
+    assert list(failed) == [2]
+    assert dest['res.partner'].write.call_count == 4